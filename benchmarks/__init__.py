@@ -0,0 +1 @@
+"""End-to-end pipeline benchmarks (see benchmarks/run.py)."""
@@ -0,0 +1,223 @@
+"""Benchmark harness: generate, set up, load, create views and query at a scale.
+
+Generation and queries run in-process (peak memory via tracemalloc). The
+pipeline scripts run as child processes exactly as a user would run them,
+with peak RSS taken from ``os.wait4``. Results are plain dicts so they can be
+written to JSON and compared against a stored baseline.
+"""
+
+from __future__ import annotations
+
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tomllib
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.dashboard_queries import DASHBOARD_QUERIES
+from src.data_generator import generate_bulk_dataset
+from src.db import PROJECT_ROOT, get_connection
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent / "scales.toml"
+
+# Differences below these absolute amounts are treated as noise, whatever the ratio.
+NOISE_FLOORS = {"seconds": 0.05, "peak_mb": 5.0, "median_ms": 1.0}
+
+
+class BenchmarkError(RuntimeError):
+    """Raised when a benchmarked step fails."""
+
+
+@dataclass(frozen=True)
+class Scale:
+    """One dataset size to benchmark."""
+
+    name: str
+    donors: int
+    donations: int
+    campaigns: int = 10
+
+
+def load_config(path: Path = DEFAULT_CONFIG_PATH) -> tuple[dict[str, Scale], dict[str, object]]:
+    """Read scales and settings from the TOML config."""
+    with open(path, "rb") as f:
+        config = tomllib.load(f)
+    scales = {name: Scale(name=name, **values) for name, values in config.get("scales", {}).items()}
+    return scales, config.get("settings", {})
+
+
+def machine_info() -> dict[str, object]:
+    """Context needed to judge whether two result files are comparable."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _step(seconds: float, rows: int, peak_mb: float) -> dict[str, float]:
+    return {
+        "seconds": round(seconds, 4),
+        "rows": rows,
+        "rows_per_sec": round(rows / seconds, 1) if seconds else 0.0,
+        "peak_mb": round(peak_mb, 1),
+    }
+
+
+def run_script(script: str, cwd: Path, env: dict[str, str]) -> tuple[float, float]:
+    """Run a pipeline script as a child process.
+
+    Returns:
+        (wall seconds, peak RSS in MB) of the child.
+
+    Raises:
+        BenchmarkError: If the script exits non-zero (with its output tail).
+    """
+    with tempfile.TemporaryFile(mode="w+") as log:
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, str(PROJECT_ROOT / script)],
+            cwd=cwd,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - started
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode != 0:
+            log.seek(0)
+            tail = "".join(log.readlines()[-20:])
+            raise BenchmarkError(f"{script} exited with {proc.returncode}:\n{tail}")
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS.
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return seconds, usage.ru_maxrss / divisor
+
+
+def time_queries(conn, queries: dict[str, tuple[str, dict]], repeats: int) -> dict[str, dict[str, float]]:
+    """Run each (sql, params) query ``repeats`` times after one warm-up; report median and max."""
+    results: dict[str, dict[str, float]] = {}
+    with conn.cursor() as cursor:
+        for name, (sql, params) in queries.items():
+            cursor.execute(sql, params)
+            rows = len(cursor.fetchall())
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {
+                "median_ms": round(statistics.median(timings), 3),
+                "max_ms": round(max(timings), 3),
+                "rows": rows,
+            }
+    conn.rollback()
+    return results
+
+
+def ensure_database(name: str) -> None:
+    """Create the benchmark database if it does not exist."""
+    conn = get_connection(instrumented=False, database="postgres")
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+            if cursor.fetchone() is None:
+                cursor.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        conn.close()
+
+
+def run_scale(scale: Scale, workdir: Path, database: str, query_repeats: int = 5) -> dict[str, object]:
+    """Benchmark every pipeline step at one scale.
+
+    Args:
+        scale: Dataset size.
+        workdir: Scratch directory; data is generated under ``workdir/data``.
+        database: Benchmark database name (overwritten by database_setup.py).
+        query_repeats: Timed runs per dashboard query.
+
+    Returns:
+        Dict with row counts, per-step timings and per-query latencies.
+    """
+    env = {**os.environ, "DB_NAME": database}
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    counts = generate_bulk_dataset(
+        workdir / "data" / "synthetic",
+        n_donors=scale.donors,
+        n_donations=scale.donations,
+        n_campaigns=scale.campaigns,
+    )
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    total_rows = sum(counts.values())
+
+    steps = {"generate": _step(seconds, total_rows, peak)}
+    for step, script, rows in (
+        ("setup", "database_setup.py", 0),
+        ("load", "load_data.py", total_rows),
+        ("views", "create_views.py", 0),
+    ):
+        seconds, peak = run_script(script, workdir, env)
+        steps[step] = _step(seconds, rows, peak)
+
+    conn = get_connection(instrumented=False, database=database)
+    try:
+        queries = time_queries(conn, DASHBOARD_QUERIES, query_repeats)
+    finally:
+        conn.close()
+
+    return {"rows": counts, "steps": steps, "queries": queries}
+
+
+def build_results(scales: dict[str, dict[str, object]]) -> dict[str, object]:
+    """Wrap per-scale results with a timestamp and machine info."""
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "machine": machine_info(),
+        "scales": scales,
+    }
+
+
+def _worse(metric: str, current: float, baseline: float, tolerance: float) -> bool:
+    if abs(current - baseline) < NOISE_FLOORS.get(metric, 0.0):
+        return False
+    return current > baseline * (1 + tolerance)
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Compare results with a baseline; list metrics that got worse than allowed.
+
+    Time and memory metrics regress when they exceed the baseline by more
+    than ``tolerance`` (and by more than the metric's noise floor). Scales,
+    steps or queries missing from either side are ignored.
+    """
+    regressions = []
+    for scale, current in results.get("scales", {}).items():
+        base = baseline.get("scales", {}).get(scale)
+        if not base:
+            continue
+        for group, metrics in (("steps", ("seconds", "peak_mb")), ("queries", ("median_ms",))):
+            for name, values in current.get(group, {}).items():
+                base_values = base.get(group, {}).get(name)
+                if not base_values:
+                    continue
+                for metric in metrics:
+                    if metric in values and metric in base_values and _worse(
+                        metric, values[metric], base_values[metric], tolerance
+                    ):
+                        old, new = base_values[metric], values[metric]
+                        change = f"+{new / old - 1:.0%}" if old else "was 0"
+                        regressions.append(f"{scale}/{group}/{name}/{metric}: {new} vs baseline {old} ({change})")
+    return regressions
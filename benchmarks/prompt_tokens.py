@@ -0,0 +1,75 @@
+"""Assistant prompt size with doc retrieval vs. full docs.
+
+For each sample question (and for ``explain_data``, which has no
+question), builds the system prompt both ways and reports the estimated
+tokens saved per request (``src.ai_assistant.estimate_tokens``). The
+schema is a small DonorPerfect-style gift export.
+
+Usage:
+  uv run python -m benchmarks.prompt_tokens
+  uv run python -m benchmarks.prompt_tokens --chunks 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from src import ai_assistant
+from src.schema_inference import infer_schema
+
+RESULTS_PATH = Path(__file__).resolve().parent / "results" / "prompt_tokens.json"
+
+QUESTIONS = (
+    None,
+    "How do DonorPerfect gift records map to our donations table?",
+    "What are the Constant Contact API rate limits?",
+    "Which columns in my file contain PII?",
+    "How is donor retention rate calculated?",
+    "Can I import Raiser's Edge constituents?",
+)
+
+
+def sample_schema() -> dict:
+    return infer_schema(pd.DataFrame({
+        "donor_id": [1, 2, 3],
+        "first_name": ["Ann", "Bo", "Cy"],
+        "gift_date": ["2024-01-05", "2024-02-01", "2024-03-09"],
+        "amount": [25.0, 100.0, 50.0],
+        "gift_type": ["VISA", "CHECK", "CASH"],
+    }))
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure assistant prompt tokens saved by doc retrieval")
+    parser.add_argument("--chunks", type=int, help="Retrieved sections per prompt (default: ASSISTANT_DOC_CHUNKS)")
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH, help="Where to write the JSON results")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.chunks is not None:
+        ai_assistant.DOC_CHUNKS = args.chunks
+    schema = sample_schema()
+    results = []
+    print("Estimated system prompt tokens (full docs -> retrieved):")
+    for question in QUESTIONS:
+        savings = ai_assistant.context_token_savings(schema, question)
+        results.append({"question": question or "(explain_data)", **savings})
+        print(
+            f"   - {question or '(explain_data)'}: {savings['full_tokens']:,} -> {savings['prompt_tokens']:,}"
+            f" ({savings['saved_tokens'] / savings['full_tokens']:.0%} saved)"
+        )
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
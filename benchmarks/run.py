@@ -0,0 +1,121 @@
+"""
+Run end-to-end pipeline benchmarks against a local Postgres.
+
+Each selected scale is generated, set up, loaded, given views and queried
+in a dedicated database (BENCH_DB_NAME, default donorcrm_bench; it is
+dropped and recreated by database_setup.py). Results go to JSON and are
+compared against a stored baseline; any regression exits non-zero.
+
+Usage:
+  uv run python -m benchmarks.run --scales small,100k
+  uv run python -m benchmarks.run --scales 1m --update-baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.harness import (
+    DEFAULT_CONFIG_PATH,
+    BenchmarkError,
+    build_results,
+    ensure_database,
+    find_regressions,
+    load_config,
+    run_scale,
+)
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+RESULTS_DIR = BENCH_DIR / "results"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the DataBridge pipeline")
+    parser.add_argument("--scales", default="small", help="Comma-separated scale names from the config")
+    parser.add_argument("--config", type=Path, default=DEFAULT_CONFIG_PATH)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--tolerance", type=float, help="Override the config's regression tolerance")
+    parser.add_argument("--update-baseline", action="store_true", help="Merge these results into the baseline")
+    parser.add_argument("--keep-data", action="store_true", help="Keep generated CSVs for inspection")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    scales, settings = load_config(args.config)
+    selected = [s.strip() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in selected if s not in scales]
+    if unknown:
+        print(f"Unknown scales: {', '.join(unknown)} (available: {', '.join(scales)})")
+        return 2
+
+    database = os.getenv("BENCH_DB_NAME", "donorcrm_bench")
+    tolerance = args.tolerance if args.tolerance is not None else float(settings.get("tolerance", 0.25))
+    repeats = int(settings.get("query_repeats", 5))
+
+    print(f"Benchmarking scales {', '.join(selected)} in database {database}...")
+    print("=" * 50)
+    try:
+        ensure_database(database)
+    except Exception as e:
+        print(f"Could not prepare benchmark database: {e}")
+        return 1
+
+    per_scale = {}
+    for name in selected:
+        scale = scales[name]
+        workdir = Path(tempfile.mkdtemp(prefix=f"databridge-bench-{name}-"))
+        print(f"\n{name}: {scale.donors:,} donors, {scale.donations:,} donations")
+        try:
+            per_scale[name] = run_scale(scale, workdir, database, repeats)
+        except BenchmarkError as e:
+            print(f"   Failed: {e}")
+            return 1
+        finally:
+            if args.keep_data:
+                print(f"   Data kept in {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+        for step, r in per_scale[name]["steps"].items():
+            print(f"   - {step}: {r['seconds']:.2f}s, {r['rows_per_sec']:,.0f} rows/s, peak {r['peak_mb']:.0f} MB")
+        for query, r in per_scale[name]["queries"].items():
+            print(f"   - query {query}: {r['median_ms']:.1f} ms median ({r['rows']:,} rows)")
+
+    results = build_results(per_scale)
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\nResults written to {output}")
+
+    if args.update_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"scales": {}}
+        baseline["scales"].update(results["scales"])
+        baseline["machine"] = results["machine"]
+        args.baseline.write_text(json.dumps(baseline, indent=2), encoding="utf-8")
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("No baseline yet; run with --update-baseline to record one.")
+        return 0
+    regressions = find_regressions(results, json.loads(args.baseline.read_text()), tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {tolerance:.0%}:")
+        for r in regressions:
+            print(f"   - {r}")
+        return 1
+    print(f"No regressions beyond {tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Streamlit startup and rerun timing.
+
+Each measurement runs in a fresh interpreter so module caches from one
+page do not hide the import cost of another:
+
+- ``imports``: cold import time of the modules the app pulls in.
+- ``pages``: Streamlit's ``AppTest`` (no server or browser) runs the app
+  script once on the page (cold start, including lazy imports), then
+  reruns it ``--reruns`` times as a widget interaction would.
+
+Usage:
+  uv run python -m benchmarks.startup
+  uv run python -m benchmarks.startup --repeats 5 --reruns 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from src.db import PROJECT_ROOT
+
+APP_SCRIPT = PROJECT_ROOT / "streamlit_app.py"
+RESULTS_PATH = Path(__file__).resolve().parent / "results" / "startup.json"
+
+PAGES = ("Dashboard", "Portfolios", "Data intake assistant")
+IMPORTED_MODULES = ("streamlit", "pandas", "psycopg2", "openai", "src.ai_assistant", "src.ui.dashboard", "src.ui.intake")
+
+_IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def _run_python(args: list[str]) -> str:
+    proc = subprocess.run(
+        [sys.executable, *args], cwd=PROJECT_ROOT, capture_output=True, text=True, check=False
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed")
+    return proc.stdout.strip().splitlines()[-1]
+
+
+def import_seconds(module: str, repeats: int = 3) -> float:
+    """Median cold import time of ``module`` over fresh interpreters."""
+    return statistics.median(
+        float(_run_python(["-c", _IMPORT_SNIPPET.format(module=module)])) for _ in range(repeats)
+    )
+
+
+def measure_page(page: str, reruns: int) -> dict[str, float]:
+    """Time the first run of ``page`` and its reruns in this process (AppTest)."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(APP_SCRIPT), default_timeout=120)
+    started = time.perf_counter()
+    app.run()
+    nav = next(r for r in app.sidebar.radio if r.label == "Go to")
+    if nav.value != page:
+        nav.set_value(page)
+        started = time.perf_counter()
+        app.run()
+    first = time.perf_counter() - started
+    timings = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - started)
+    return {"first_run_s": round(first, 4), "rerun_median_s": round(statistics.median(timings), 4)}
+
+
+def page_timings(page: str, reruns: int, repeats: int) -> dict[str, float]:
+    """Median of ``measure_page`` over fresh interpreters."""
+    samples = [
+        json.loads(_run_python(["-m", "benchmarks.startup", "--page", page, "--reruns", str(reruns)]))
+        for _ in range(repeats)
+    ]
+    return {key: round(statistics.median(s[key] for s in samples), 4) for key in samples[0]}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure Streamlit startup and rerun times")
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh interpreters per measurement")
+    parser.add_argument("--reruns", type=int, default=5, help="Reruns timed per page")
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH, help="Where to write the JSON results")
+    parser.add_argument("--page", help=argparse.SUPPRESS)  # worker mode: one page, print JSON
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.page:
+        print(json.dumps(measure_page(args.page, args.reruns)))
+        return 0
+
+    results: dict[str, dict] = {"imports": {}, "pages": {}}
+    print("Cold imports (median seconds):")
+    for module in IMPORTED_MODULES:
+        try:
+            results["imports"][module] = round(import_seconds(module, args.repeats), 4)
+            print(f"   - {module}: {results['imports'][module]:.3f}")
+        except RuntimeError as e:
+            print(f"   - {module}: not importable ({e})")
+
+    print("App runs (median seconds):")
+    for page in PAGES:
+        results["pages"][page] = page_timings(page, args.reruns, args.repeats)
+        timing = results["pages"][page]
+        print(f"   - {page}: first run {timing['first_run_s']:.3f}, rerun {timing['rerun_median_s']:.3f}")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,32 +1,21 @@
 """
 Database connection setup and table creation
 """
-import os
+import sys
 
-import psycopg2
-from psycopg2 import sql
-from dotenv import load_dotenv
+from src import db
+from src.dashboard_queries import ensure_donor_totals_schema
+from src.data_quality import ensure_dq_schema
+from src.history import ensure_history_schema
+from src.portfolio import ensure_portfolio_schema
+from src.query_metrics import ensure_query_log_schema
+from src.timeseries import ensure_rollup_schema
+from src.watermarks import bump_watermarks, ensure_watermark_schema
 
 
-load_dotenv()
-
-
-def _build_db_config() -> dict[str, object]:
-    """Build psycopg2 connection args from environment variables."""
-    cfg: dict[str, object] = {
-        "host": os.getenv("DB_HOST", "localhost"),
-        "port": int(os.getenv("DB_PORT", "5432")),
-        "database": os.getenv("DB_NAME", "donorcrm_db"),
-        "user": os.getenv("DB_USER", "postgres"),
-    }
-    password = os.getenv("DB_PASSWORD", "").strip()
-    if password:
-        cfg["password"] = password
-    return cfg
-
 def get_connection():
     """Get database connection"""
-    return psycopg2.connect(**_build_db_config())
+    return db.get_connection(source="database_setup")
 
 def create_tables():
     """Create database tables"""
@@ -98,6 +87,33 @@ def create_tables():
     CREATE INDEX idx_donors_email ON donors(email);
     CREATE INDEX idx_portfolio_assignments_donor ON portfolio_assignments(donor_id);
     CREATE INDEX idx_portfolio_assignments_holder ON portfolio_assignments(portfolio_holder_id);
+    
+    -- Constant Contact sync tables (incremental; kept across core table rebuilds)
+    CREATE TABLE IF NOT EXISTS cc_contacts (
+        contact_id UUID PRIMARY KEY,
+        email VARCHAR(255),
+        permission_to_send VARCHAR(50),
+        opt_in_date TIMESTAMPTZ,
+        first_name VARCHAR(100),
+        last_name VARCHAR(100),
+        company_name VARCHAR(100),
+        created_at TIMESTAMPTZ,
+        updated_at TIMESTAMPTZ,
+        last_synced_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    CREATE INDEX IF NOT EXISTS idx_cc_contacts_email ON cc_contacts(email);
+    CREATE INDEX IF NOT EXISTS idx_cc_contacts_updated ON cc_contacts(updated_at);
+    
+    CREATE TABLE IF NOT EXISTS cc_contact_engagement (
+        contact_id UUID NOT NULL,
+        campaign_activity_id UUID NOT NULL,
+        send_date TIMESTAMPTZ,
+        open_date TIMESTAMPTZ,
+        click_date TIMESTAMPTZ,
+        bounce_type VARCHAR(50),
+        unsubscribe_date TIMESTAMPTZ,
+        PRIMARY KEY (contact_id, campaign_activity_id)
+    );
     """
     
     try:
@@ -109,6 +125,20 @@ def create_tables():
         
         # Execute the SQL
         cursor.execute(create_tables_sql)
+        
+        # Row-hash triggers and SCD Type 2 history tables (history survives rebuilds)
+        ensure_history_schema(cursor)
+        ensure_dq_schema(cursor)
+        ensure_query_log_schema(cursor)
+        ensure_portfolio_schema(cursor)
+        ensure_rollup_schema(cursor)
+        ensure_donor_totals_schema(cursor)
+        
+        # Recreated tables are empty: bump their watermarks so readers notice
+        ensure_watermark_schema(cursor)
+        bump_watermarks(cursor, [
+            'donors', 'campaigns', 'donations', 'portfolio_holders', 'portfolio_assignments',
+        ])
         conn.commit()
         
         print("Tables created successfully!")
@@ -161,6 +191,8 @@ if __name__ == "__main__":
     
     if test_connection():
         print("\n")
-        create_tables()
+        if not create_tables():
+            sys.exit(1)
     else:
-        print("Fix connection issues before creating tables")
\ No newline at end of file
+        print("Fix connection issues before creating tables")
+        sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+Export the core tables to Parquet snapshots for offline analytics (DuckDB).
+
+Run:
+  uv run python export_snapshots.py                      # write data/snapshots/
+  uv run python export_snapshots.py --query "SELECT * FROM vw_monthly_giving"
+
+The dashboard reads the snapshots when started with DATABRIDGE_BACKEND=duckdb.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from src.db import get_connection
+from src.offline import SNAPSHOT_DIR, OfflineEngine, export_snapshots
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export Parquet snapshots or query them offline")
+    parser.add_argument("--dir", type=Path, default=SNAPSHOT_DIR, help="Snapshot directory")
+    parser.add_argument("--query", help="Run SQL against the existing snapshot instead of exporting")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    if args.query:
+        try:
+            print(OfflineEngine(args.dir).query_df(args.query).to_string(index=False))
+            return 0
+        except Exception as e:
+            print(f"Error querying snapshot: {e}")
+            return 1
+
+    print("Exporting snapshots...")
+    try:
+        conn = get_connection(source="export_snapshots")
+        try:
+            manifest = export_snapshots(conn, args.dir)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Error exporting snapshots: {e}")
+        return 1
+
+    for table, info in manifest["tables"].items():
+        print(f"   - {table}: {info['rows']:,} rows")
+    print(f"Snapshot written to {args.dir} in {manifest['seconds']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
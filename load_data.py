@@ -1,316 +1,243 @@
 """
 Load CSV data into PostgreSQL database
 """
-import os
+from decimal import Decimal
 
 import pandas as pd
-import psycopg2
-from psycopg2.extras import execute_batch
 import sys
-from dotenv import load_dotenv
 
+from src import db
+from src.bulk_loader import batch_records, upsert_batch
+from src.dashboard_queries import ensure_donor_totals_schema, refresh_donor_totals
+from src.data_quality import ensure_dq_schema, load_rules, run_checks
+from src.history import apply_history, ensure_history_schema
+from src.portfolio import ensure_portfolio_schema, refresh_portfolio_aggregates
+from src.query_metrics import ensure_query_log_schema, flush_query_log
+from src.reconciliation import RECON_SPECS, SourceProfile, reconcile, write_report
+from src.timeseries import ensure_rollup_schema, refresh_giving_rollups
+from src.watermarks import bump_watermarks, ensure_watermark_schema
 
-load_dotenv()
 
+def get_connection(instrumented=True):
+    """Get database connection (queries are recorded under source "load_data")
 
-def _build_db_config() -> dict[str, object]:
-    """Build psycopg2 connection args from environment variables."""
-    cfg: dict[str, object] = {
-        "host": os.getenv("DB_HOST", "localhost"),
-        "port": int(os.getenv("DB_PORT", "5432")),
-        "database": os.getenv("DB_NAME", "donorcrm_db"),
-        "user": os.getenv("DB_USER", "postgres"),
-    }
-    password = os.getenv("DB_PASSWORD", "").strip()
-    if password:
-        cfg["password"] = password
-    return cfg
+    Bulk CSV loads pass instrumented=False: every COPY and merge would
+    otherwise be fingerprinted and buffered into query_log.
+    """
+    return db.get_connection(source="load_data", instrumented=instrumented)
 
-def get_connection():
-    """Get database connection"""
-    return psycopg2.connect(**_build_db_config())
+CSV_CHUNK_SIZE = 10_000
 
-def load_donors():
-    """Load donors from CSV to database"""
-    print("\nLoading donors...")
+# Source profiles filled while each CSV is streamed in; reconciled after the load.
+SOURCE_PROFILES: dict[str, SourceProfile] = {}
+
+
+def _records(frame):
+    """Rows as dicts of native Python values for COPY
+
+    NaN becomes None, and whole floats become ints (pandas reads an integer
+    column with gaps, e.g. gifts without a campaign, as float).
+    """
+    values = frame.astype(object).where(frame.notna(), None)
+    for record in values.to_dict("records"):
+        yield {c: int(v) if isinstance(v, float) and v.is_integer() else v for c, v in record.items()}
+
+def _load_csv(label, csv_path, table, columns):
+    """Stream a CSV into a table in chunks, profiling each chunk for reconciliation.
+
+    Each chunk is sent with one COPY into a staging table and merged on the
+    primary key (the first column) by ``bulk_loader.upsert_batch``, so the
+    stage can re-run against loaded tables (e.g. when the CSVs change but
+    setup is skipped) without duplicate-key errors or wiping rows synced by
+    connectors. Unchanged rows are not rewritten. The load owns only the keys
+    in the CSV, and reconciliation checks exactly those rows.
+    """
+    print(f"\nLoading {label}...")
     
+    conn = None
     try:
-        # Read CSV
-        df = pd.read_csv('data/synthetic/donors.csv')
-        print(f"   Read {len(df)} donors from CSV")
-        
-        # Connect to database
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Prepare INSERT statement
-        insert_sql = """
-            INSERT INTO donors (
-                donor_id, first_name, last_name, email, phone,
-                address, city, state, zip_code, created_date, donor_type
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        # Convert DataFrame to list of tuples
-        records = [
-            (
-                row['donor_id'], row['first_name'], row['last_name'], 
-                row['email'], row['phone'], row['address'], row['city'],
-                row['state'], row['zip_code'], row['created_date'], 
-                row['donor_type']
-            )
-            for _, row in df.iterrows()
-        ]
-        
-        # Batch insert for performance
-        execute_batch(cursor, insert_sql, records, page_size=100)
+        conn = get_connection(instrumented=False)
+        profile = SOURCE_PROFILES[table] = SourceProfile(RECON_SPECS[table])
+        
+        loaded = 0
+        with conn.cursor() as cursor:
+            for chunk in pd.read_csv(csv_path, chunksize=CSV_CHUNK_SIZE):
+                profile.update(chunk)
+                for batch in batch_records(table, _records(chunk[columns]), columns, batch_size=CSV_CHUNK_SIZE):
+                    loaded += upsert_batch(cursor, batch, key=[columns[0]])
+            bump_watermarks(cursor, [table])
         conn.commit()
-        
-        # Verify count
-        cursor.execute("SELECT COUNT(*) FROM donors")
-        count = cursor.fetchone()[0]
-        print(f"   Loaded {count} donors into database")
-        
-        cursor.close()
-        conn.close()
+        print(f"   Loaded {loaded:,} {label} into database")
         return True
         
     except Exception as e:
-        print(f"   Error loading donors: {e}")
+        if conn is not None and not conn.closed:
+            conn.rollback()
+        print(f"   Error loading {label}: {e}")
         return False
+    
+    finally:
+        if conn is not None:
+            conn.close()
+
+def load_donors():
+    """Load donors from CSV to database"""
+    return _load_csv('donors', 'data/synthetic/donors.csv', 'donors', [
+        'donor_id', 'first_name', 'last_name', 'email', 'phone',
+        'address', 'city', 'state', 'zip_code', 'created_date', 'donor_type',
+    ])
 
 def load_campaigns():
     """Load campaigns from CSV to database"""
-    print("\nLoading campaigns...")
-    
+    return _load_csv('campaigns', 'data/synthetic/campaigns.csv', 'campaigns', [
+        'campaign_id', 'campaign_name', 'start_date', 'end_date',
+        'goal_amount', 'campaign_type',
+    ])
+
+def load_donations():
+    """Load donations from CSV to database"""
+    return _load_csv('donations', 'data/synthetic/donations.csv', 'donations', [
+        'donation_id', 'donor_id', 'campaign_id', 'amount',
+        'donation_date', 'payment_method', 'is_recurring',
+    ])
+
+def load_portfolio_holders():
+    """Load portfolio holders from CSV to database"""
+    return _load_csv('portfolio holders', 'data/synthetic/portfolio_holders.csv', 'portfolio_holders', [
+        'portfolio_holder_id', 'name', 'email',
+    ])
+
+def load_portfolio_assignments():
+    """Load portfolio assignments from CSV to database"""
+    return _load_csv('portfolio assignments', 'data/synthetic/portfolio_assignments.csv', 'portfolio_assignments', [
+        'assignment_id', 'donor_id', 'portfolio_holder_id', 'assigned_date',
+    ])
+
+def record_history():
+    """Record donor and campaign changes as SCD Type 2 versions"""
+    print("\nRecording donor and campaign history...")
     try:
-        # Read CSV
-        df = pd.read_csv('data/synthetic/campaigns.csv')
-        print(f"   Read {len(df)} campaigns from CSV")
-        
-        # Connect to database
         conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Prepare INSERT statement
-        insert_sql = """
-            INSERT INTO campaigns (
-                campaign_id, campaign_name, start_date, end_date,
-                goal_amount, campaign_type
-            ) VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        
-        # Convert DataFrame to list of tuples
-        records = [
-            (
-                row['campaign_id'], row['campaign_name'], 
-                row['start_date'], row['end_date'],
-                row['goal_amount'], row['campaign_type']
-            )
-            for _, row in df.iterrows()
-        ]
-        
-        # Batch insert
-        execute_batch(cursor, insert_sql, records, page_size=100)
-        conn.commit()
-        
-        # Verify count
-        cursor.execute("SELECT COUNT(*) FROM campaigns")
-        count = cursor.fetchone()[0]
-        print(f"   Loaded {count} campaigns into database")
-        
-        cursor.close()
+        summary = apply_history(conn)
         conn.close()
+        for table, counts in summary.items():
+            print(
+                f"   - {table}: {counts['inserted']:,} new, "
+                f"{counts['updated']:,} changed, {counts['deleted']:,} removed"
+            )
         return True
-        
     except Exception as e:
-        print(f"   Error loading campaigns: {e}")
+        print(f"   Error recording history: {e}")
         return False
 
-def load_donations():
-    """Load donations from CSV to database"""
-    print("\nLoading donations...")
-    
+def refresh_portfolios():
+    """Rebuild per-portfolio aggregates read by the portfolio dashboard"""
+    print("\nRefreshing portfolio aggregates...")
     try:
-        # Read CSV
-        df = pd.read_csv('data/synthetic/donations.csv')
-        print(f"   Read {len(df)} donations from CSV")
-        
-        # Connect to database
         conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Prepare INSERT statement
-        insert_sql = """
-            INSERT INTO donations (
-                donation_id, donor_id, campaign_id, amount,
-                donation_date, payment_method, is_recurring
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        # Convert DataFrame to list of tuples (campaign_id can be NaN for gifts without campaign)
-        records = [
-            (
-                row['donation_id'], row['donor_id'],
-                row['campaign_id'] if pd.notna(row['campaign_id']) else None,
-                row['amount'], row['donation_date'], row['payment_method'],
-                row['is_recurring']
-            )
-            for _, row in df.iterrows()
-        ]
-        
-        # Batch insert
-        execute_batch(cursor, insert_sql, records, page_size=100)
-        conn.commit()
-        
-        # Verify count
-        cursor.execute("SELECT COUNT(*) FROM donations")
-        count = cursor.fetchone()[0]
-        print(f"   Loaded {count} donations into database")
-        
-        cursor.close()
+        counts = refresh_portfolio_aggregates(conn)
         conn.close()
+        print(f"   - {counts['holders']:,} portfolios, {counts['donors']:,} assigned donors")
         return True
-        
     except Exception as e:
-        print(f"   Error loading donations: {e}")
+        print(f"   Error refreshing portfolio aggregates: {e}")
         return False
 
-def load_portfolio_holders():
-    """Load portfolio holders from CSV to database"""
-    print("\nLoading portfolio holders...")
+def refresh_rollups():
+    """Rebuild the day/week/month giving rollups read by the trend chart"""
+    print("\nRefreshing giving rollups...")
     try:
-        df = pd.read_csv('data/synthetic/portfolio_holders.csv')
-        print(f"   Read {len(df)} portfolio holders from CSV")
         conn = get_connection()
-        cursor = conn.cursor()
-        insert_sql = """
-            INSERT INTO portfolio_holders (
-                portfolio_holder_id, name, email
-            ) VALUES (%s, %s, %s)
-        """
-        records = [
-            (row['portfolio_holder_id'], row['name'], row['email'])
-            for _, row in df.iterrows()
-        ]
-        execute_batch(cursor, insert_sql, records, page_size=100)
-        conn.commit()
-        cursor.execute("SELECT COUNT(*) FROM portfolio_holders")
-        count = cursor.fetchone()[0]
-        print(f"   Loaded {count} portfolio holders into database")
-        cursor.close()
+        counts = refresh_giving_rollups(conn)
         conn.close()
+        print(f"   - {counts['day']:,} daily, {counts['week']:,} weekly, {counts['month']:,} monthly rows")
         return True
     except Exception as e:
-        print(f"   Error loading portfolio holders: {e}")
+        print(f"   Error refreshing giving rollups: {e}")
         return False
 
-def load_portfolio_assignments():
-    """Load portfolio assignments from CSV to database"""
-    print("\nLoading portfolio assignments...")
+def refresh_totals():
+    """Rebuild the per-donor lifetime totals read by the top donors table"""
+    print("\nRefreshing donor totals...")
     try:
-        df = pd.read_csv('data/synthetic/portfolio_assignments.csv')
-        print(f"   Read {len(df)} portfolio assignments from CSV")
         conn = get_connection()
-        cursor = conn.cursor()
-        insert_sql = """
-            INSERT INTO portfolio_assignments (
-                assignment_id, donor_id, portfolio_holder_id, assigned_date
-            ) VALUES (%s, %s, %s, %s)
-        """
-        records = [
-            (
-                row['assignment_id'], row['donor_id'],
-                row['portfolio_holder_id'], row['assigned_date']
-            )
-            for _, row in df.iterrows()
-        ]
-        execute_batch(cursor, insert_sql, records, page_size=100)
-        conn.commit()
-        cursor.execute("SELECT COUNT(*) FROM portfolio_assignments")
-        count = cursor.fetchone()[0]
-        print(f"   Loaded {count} portfolio assignments into database")
-        cursor.close()
+        donors = refresh_donor_totals(conn)
         conn.close()
+        print(f"   - {donors:,} donors")
         return True
     except Exception as e:
-        print(f"   Error loading portfolio assignments: {e}")
+        print(f"   Error refreshing donor totals: {e}")
         return False
 
 def verify_data():
-    """Run some queries to verify data loaded correctly"""
+    """Reconcile loaded tables against the source files and write a JSON report"""
     print("\nVerifying data...")
     print("=" * 50)
     
     try:
         conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Total counts
-        cursor.execute("SELECT COUNT(*) FROM donors")
-        donor_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM campaigns")
-        campaign_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM donations")
-        donation_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM portfolio_holders")
-        holder_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM portfolio_assignments")
-        assignment_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM donations WHERE campaign_id IS NULL")
-        gifts_no_campaign = cursor.fetchone()[0]
-        
-        print("Record counts:")
-        print(f"   - Donors: {donor_count:,}")
-        print(f"   - Campaigns: {campaign_count}")
-        print(f"   - Donations: {donation_count:,}")
-        print(f"   - Portfolio holders: {holder_count}")
-        print(f"   - Portfolio assignments: {assignment_count:,}")
-        print(f"   - Gifts without campaign: {gifts_no_campaign:,}")
-        
-        # Total donation amount
-        cursor.execute("SELECT SUM(amount) FROM donations")
-        total_amount = cursor.fetchone()[0]
-        print(f"\nTotal donations: ${total_amount:,.2f}")
-        
-        # Average donation
-        cursor.execute("SELECT AVG(amount) FROM donations")
-        avg_amount = cursor.fetchone()[0]
-        print(f"Average donation: ${avg_amount:.2f}")
-        
-        # Sample donor with donations
-        cursor.execute("""
-            SELECT 
-                d.first_name, 
-                d.last_name, 
-                COUNT(don.donation_id) as num_donations,
-                SUM(don.amount) as total_given
-            FROM donors d
-            LEFT JOIN donations don ON d.donor_id = don.donor_id
-            GROUP BY d.donor_id, d.first_name, d.last_name
-            HAVING COUNT(don.donation_id) > 0
-            ORDER BY total_given DESC
-            LIMIT 5
-        """)
-        
-        print("\nTop 5 donors by total amount:")
-        for row in cursor.fetchall():
-            print(f"   - {row[0]} {row[1]}: {row[2]} donations, ${row[3]:,.2f} total")
+        report = reconcile(conn, SOURCE_PROFILES)
+        conn.close()
+        report_path = write_report(report)
+        
+        print("Reconciliation (source vs database):")
+        for table, result in report["tables"].items():
+            status = "OK" if result["passed"] else "MISMATCH"
+            print(f"   - {table}: {result['database']['rows']:,} rows [{status}]")
+            for mismatch in result["mismatches"]:
+                print(f"       {mismatch}")
+        
+        donations = report["tables"].get("donations")
+        if donations:
+            db_totals = donations["database"]
+            total = Decimal(db_totals["amount_sum"])
+            print(f"\nGifts without campaign: {db_totals['null_counts']['campaign_id']:,}")
+            print(f"Total donations: ${total:,.2f}")
+            if db_totals["rows"]:
+                print(f"Average donation: ${total / db_totals['rows']:.2f}")
+        
+        print(f"\nReport written to {report_path}")
+        return report["passed"]
         
-        cursor.close()
+    except Exception as e:
+        print(f"Error verifying data: {e}")
+        return False
+
+def check_data_quality():
+    """Run the configured data quality rules and record results in dq_results"""
+    print("\nChecking data quality...")
+    
+    try:
+        conn = get_connection()
+        results = run_checks(conn, load_rules())
         conn.close()
         
-        return True
+        errors = 0
+        for r in results:
+            status = "OK" if r.passed else ("FAIL" if r.rule.severity == "error" else "WARN")
+            print(
+                f"   - {r.rule.name}: {r.failed_rows:,} of {r.rows_checked:,} rows failing "
+                f"[{status}] ({r.query_ms:.1f} ms)"
+            )
+            if not r.passed and r.rule.severity == "error":
+                errors += 1
+        print(f"   {len(results)} rules checked, {errors} failed")
+        return errors == 0
         
     except Exception as e:
-        print(f"Error verifying data: {e}")
+        print(f"   Error checking data quality: {e}")
         return False
 
+def flush_query_metrics():
+    """Write this run's query timings to query_log (failures are not fatal)"""
+    try:
+        conn = get_connection()
+        written = flush_query_log(conn)
+        conn.close()
+        print(f"\nRecorded {written} query timings in query_log")
+    except Exception as e:
+        print(f"\nWarning: could not write query_log: {e}")
+
 if __name__ == "__main__":
     print("Starting data load process...")
     print("=" * 50)
@@ -318,6 +245,23 @@ if __name__ == "__main__":
     # Load data in order (donors and campaigns first, then donations)
     success = True
     
+    # Row-hash triggers must exist before rows are written
+    try:
+        conn = get_connection()
+        with conn.cursor() as cursor:
+            ensure_history_schema(cursor)
+            ensure_dq_schema(cursor)
+            ensure_watermark_schema(cursor)
+            ensure_query_log_schema(cursor)
+            ensure_portfolio_schema(cursor)
+            ensure_rollup_schema(cursor)
+            ensure_donor_totals_schema(cursor)
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Error preparing history and data quality tables: {e}")
+        sys.exit(1)
+    
     if not load_donors():
         success = False
     
@@ -333,8 +277,27 @@ if __name__ == "__main__":
     if success and not load_portfolio_assignments():
         success = False
     
+    if success and not record_history():
+        success = False
+    
+    if success and not refresh_portfolios():
+        success = False
+    
+    if success and not refresh_rollups():
+        success = False
+    
+    if success and not refresh_totals():
+        success = False
+    
+    if success and not verify_data():
+        success = False
+    
+    if success and not check_data_quality():
+        success = False
+    
+    flush_query_metrics()
+    
     if success:
-        verify_data()
         print("\n" + "=" * 50)
         print("DATA LOAD COMPLETE!")
         print("=" * 50)
@@ -1,6 +1,63 @@
-def main():
-    print("Hello from nonprofit-data-pipeline!")
+"""
+Run the DataBridge pipeline: generate -> setup -> load -> views.
+
+Stages whose inputs (file contents, table load watermarks, upstream stages)
+are unchanged since their last successful run are skipped. Run history is
+kept in data/state/run_history.jsonl.
+
+Usage:
+  uv run python main.py                  # run everything that is out of date
+  uv run python main.py --stage views    # views plus anything upstream of it
+  uv run python main.py --dry-run        # show what would run
+  uv run python main.py --force          # ignore run history
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from src.orchestrator import FAILED, PIPELINE, Orchestrator
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the DataBridge pipeline")
+    parser.add_argument(
+        "--stage",
+        action="append",
+        choices=[s.name for s in PIPELINE],
+        help="Run only this stage and its upstream stages (repeatable)",
+    )
+    parser.add_argument("--force", action="store_true", help="Run stages even if inputs are unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="Show which stages would run")
+    parser.add_argument("--jobs", type=int, default=4, help="Maximum stages to run in parallel")
+    parser.add_argument("--verbose", action="store_true", help="Print each stage's output")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    print("Running DataBridge pipeline...")
+    print("=" * 50)
+
+    outcomes = Orchestrator(max_workers=args.jobs).run(
+        selected=args.stage, force=args.force, dry_run=args.dry_run
+    )
+
+    for outcome in outcomes:
+        detail = f" ({outcome.reason})" if outcome.reason else ""
+        timing = f" in {outcome.seconds:.1f}s" if outcome.seconds else ""
+        print(f"   - {outcome.stage}: {outcome.status}{timing}{detail}")
+        if outcome.output and (args.verbose or outcome.status == FAILED):
+            for line in outcome.output.rstrip().splitlines():
+                print(f"       {line}")
+
+    failed = [o.stage for o in outcomes if o.status == FAILED]
+    if failed:
+        print(f"\nPipeline failed at: {', '.join(failed)}")
+        return 1
+    print("\nPipeline complete.")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
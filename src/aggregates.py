@@ -0,0 +1,41 @@
+"""Materialized dashboard aggregates and the tables they are built from.
+
+The portfolio aggregates, giving rollups and donor totals are rebuilt from
+the core tables. Every writer to those tables (the CSV load and connector
+syncs) calls ``refresh_aggregates`` with the tables it wrote afterwards, so
+dashboards never read totals older than the data they summarize.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+
+from src.dashboard_queries import refresh_donor_totals
+from src.portfolio import refresh_portfolio_aggregates
+from src.timeseries import refresh_giving_rollups
+
+# Aggregate -> (source tables, refresh function); refreshed in this order.
+AGGREGATES: dict[str, tuple[tuple[str, ...], Callable]] = {
+    "portfolios": (("donations", "portfolio_assignments", "portfolio_holders"), refresh_portfolio_aggregates),
+    "rollups": (("donations", "campaigns", "donors"), refresh_giving_rollups),
+    "donor_totals": (("donations",), refresh_donor_totals),
+}
+
+
+def stale_aggregates(tables: Iterable[str]) -> list[str]:
+    """Aggregates built from any of ``tables``, in refresh order."""
+    written = set(tables)
+    return [name for name, (sources, _) in AGGREGATES.items() if written & set(sources)]
+
+
+def refresh_aggregates(conn, tables: Iterable[str]) -> dict[str, object]:
+    """Rebuild every aggregate built from ``tables``, each in its own transaction.
+
+    Args:
+        conn: Open psycopg2 connection.
+        tables: Core tables that were written.
+
+    Returns:
+        Dict of aggregate name -> what its refresh function returned.
+    """
+    return {name: AGGREGATES[name][1](conn) for name in stale_aggregates(tables)}
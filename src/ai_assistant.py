@@ -1,24 +1,94 @@
 """AI assistant for data intake: load docs, build context, call LLM.
 
 Uses OpenAI API (key from OPENAI_API_KEY). No PII is sent to the model.
+
+The OpenAI SDK and .env are loaded on the first call that needs a client,
+not at import, and the client is reused for the life of the process.
+
+Completions are streamed with ``AsyncOpenAI`` on one background event loop
+thread. ``start_stream`` begins the request immediately and returns a plain
+iterator of text chunks, so Streamlit can render tokens as they arrive
+(``st.write_stream``) and the script thread is free while the request is in
+flight. ``OPENAI_BASE_URL`` points the client at any OpenAI-compatible server.
+
+Docs are read once and re-read only when a file's mtime changes, and the
+schema and base prompt are cached per (schema fingerprint, docs version);
+only the doc sections retrieved for the question are added per turn, so a
+chat turn costs a few ``stat`` calls instead of re-reading every doc.
+
+Instead of every doc in full, the prompt carries the target table sections
+of the data dictionary plus the ``DOC_CHUNKS`` doc sections that best match
+the question and the uploaded column names (BM25, ``src/doc_index.py``).
+Set ``ASSISTANT_DOC_CHUNKS=0`` to send the full docs.
+
+Chat prompts are held to a token budget (``src/context_budget.py``): recent
+messages verbatim, older ones folded into a rolling summary, and doc
+sections and schema detail trimmed to fit. ``build_chat_messages`` returns
+the per-turn size as ``PromptMetrics``.
+
+``explain_data`` answers are kept in a persistent SQLite cache
+(``src/response_cache.py``) keyed by the file's structure, the docs version
+and the model, so re-uploading the same file (or one shaped like it) does
+not call the model again.
 """
 
+from __future__ import annotations
+
+import asyncio
+import hashlib
 import os
+import pickle
+import queue
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Iterator
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
-
-from openai import OpenAI
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Any
 
+from src.column_mapping import ColumnMapping, format_mappings_for_prompt
+from src.context_budget import (
+    ContextBudget,
+    ConversationMemory,
+    PromptMetrics,
+    estimate_tokens,
+    fit_chunks,
+    fit_schema_text,
+    message_tokens,
+    schema_levels,
+    split_history,
+)
+from src.doc_index import INDEX_PATH, DocChunk, load_doc_index
+from src.response_cache import CACHE_PATH, ResponseCache, fingerprint
 from src.schema_inference import format_schema_for_prompt
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
 # Project root: parent of src/
 _PROJECT_ROOT = Path(__file__).resolve().parent.parent
 _DOCS_DIR = _PROJECT_ROOT / "docs"
 _INTEGRATIONS_DIR = _DOCS_DIR / "integrations"
+_DOC_INDEX_PATH = INDEX_PATH
+_RESPONSE_CACHE_PATH = CACHE_PATH
+
+MODEL = "gpt-4o-mini"
+# Size cap of the explain_data response cache, in MB.
+RESPONSE_CACHE_MB = float(os.environ.get("ASSISTANT_CACHE_MB", "16"))
+NO_KEY_MESSAGE = "OpenAI API key is not set. Add OPENAI_API_KEY to your environment or .env to use the assistant."
+REVIEW_PROMPT = (
+    "For each low-confidence column, say which DataBridge field (table.column) it maps to, "
+    "or that it has no target, with a one-line reason. Be concise."
+)
+EXPLAIN_PROMPT = (
+    "Summarize this dataset: what it contains, what each column likely represents, and how it could map "
+    "to our DataBridge schema (donors, campaigns, donations). Be concise."
+)
 
-# Load environment variables from .env if present (safe no-op if missing).
-load_dotenv(_PROJECT_ROOT / ".env")
+# Retrieved doc sections per prompt; 0 sends every doc in full.
+DOC_CHUNKS = int(os.environ.get("ASSISTANT_DOC_CHUNKS", "6"))
+# Data dictionary sections always sent: the tables uploads are mapped to.
+PINNED_SECTIONS = ("Table: donors", "Table: campaigns", "Table: donations")
 
 
 def _read_file(path: Path) -> str:
@@ -31,27 +101,74 @@ def _read_file(path: Path) -> str:
         return ""
 
 
+def _mtime_ns(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=64)
+def _read_version(path: Path, mtime_ns: int) -> str:
+    return _read_file(path)
+
+
+def _read_cached(path: Path) -> str:
+    """``_read_file``, re-read only when the file's mtime changes."""
+    mtime = _mtime_ns(path)
+    return "" if mtime is None else _read_version(path, mtime)
+
+
+@lru_cache(maxsize=4)
+def _list_docs(directory: Path, mtime_ns: int) -> tuple[Path, ...]:
+    # A directory's mtime changes when files are added, removed or renamed.
+    return tuple(sorted(directory.glob("*.md")))
+
+
+def _integration_paths() -> tuple[Path, ...]:
+    mtime = _mtime_ns(_INTEGRATIONS_DIR)
+    if mtime is None or not _INTEGRATIONS_DIR.is_dir():
+        return ()
+    return _list_docs(_INTEGRATIONS_DIR, mtime)
+
+
 def load_data_dictionary() -> str:
     """Load docs/DATA_DICTIONARY.md for LLM context."""
-    return _read_file(_DOCS_DIR / "DATA_DICTIONARY.md")
+    return _read_cached(_DOCS_DIR / "DATA_DICTIONARY.md")
 
 
 def load_integration_docs() -> dict[str, str]:
     """Load all docs/integrations/*.md; return dict of filename -> content."""
-    out: dict[str, str] = {}
-    if not _INTEGRATIONS_DIR.is_dir():
-        return out
-    for p in _INTEGRATIONS_DIR.glob("*.md"):
-        out[p.stem] = _read_file(p)
-    return out
+    return {p.stem: _read_cached(p) for p in _integration_paths()}
+
+
+def docs_version() -> tuple[int | None, ...]:
+    """mtimes of every doc in the prompt; changes whenever one of them does."""
+    paths = (_DOCS_DIR / "DATA_DICTIONARY.md", _INTEGRATIONS_DIR, *_integration_paths())
+    return tuple(_mtime_ns(p) for p in paths)
+
+
+def schema_fingerprint(schema: dict[str, Any] | None) -> str | None:
+    """Hash of an ``infer_schema`` result (None when no data is loaded).
+
+    Pickle is about 3x faster than JSON here; the same schema built in a
+    different key order only costs a cache miss.
+    """
+    if schema is None:
+        return None
+    return hashlib.md5(pickle.dumps(schema, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
 
 
 def build_system_context(
     schema_text: str,
     data_dictionary: str = "",
     integration_docs: dict[str, str] | None = None,
+    doc_chunks: list[DocChunk] | None = None,
 ) -> str:
-    """Build the system prompt context: schema + data dictionary + integration docs."""
+    """Build the system prompt context: schema + data dictionary + integration docs.
+
+    ``doc_chunks`` are retrieved doc sections, sent instead of (or as well as) whole docs.
+    """
     parts = [
         "You are a data intake assistant for a nonprofit donor data pipeline (DataBridge).",
         "You help users understand uploaded or connected data: its structure, what fields mean,",
@@ -75,77 +192,368 @@ def build_system_context(
                 parts.append(f"### {name}")
                 parts.append(content)
                 parts.append("")
+    if doc_chunks:
+        parts.append(_doc_chunks_text(doc_chunks))
     return "\n".join(parts)
 
 
-def get_client() -> OpenAI | None:
-    """Return OpenAI client if OPENAI_API_KEY is set; else None."""
+def _doc_chunks_text(doc_chunks: list[DocChunk]) -> str:
+    parts = ["", "---", "", "## Relevant DataBridge documentation (excerpts)"]
+    for chunk in doc_chunks:
+        parts.extend([f"### {chunk.source}: {chunk.heading}", chunk.text, ""])
+    return "\n".join(parts)
+
+
+# Size of the instructions alone, i.e. the prompt around the schema and doc sections.
+_EMPTY_CONTEXT_TOKENS = estimate_tokens(build_system_context(""))
+
+
+def retrieve_doc_chunks(
+    schema: dict[str, Any] | None, question: str | None = None, k: int | None = None
+) -> list[DocChunk]:
+    """Pinned target tables plus the ``k`` sections best matching the question and column names."""
+    k = DOC_CHUNKS if k is None else k
+    index = load_doc_index(_DOCS_DIR, _DOC_INDEX_PATH)
+    pinned = [c for c in index.chunks if c.source == "DATA_DICTIONARY.md" and c.heading in PINNED_SECTIONS]
+    query = " ".join([question or "", *(c["name"] for c in (schema or {}).get("columns", []))])
+    hits = [c for c, _ in index.search(query, k + len(pinned)) if c not in pinned]
+    return pinned + hits[:k]
+
+
+NO_DATA_TEXT = "No dataset is currently loaded. The user may ask about the target schema or integrations."
+_CONTEXT_CACHE_SIZE = 16
+_context_cache: OrderedDict[tuple[str | None, bool, tuple[int | None, ...]], str] = OrderedDict()
+_context_lock = threading.Lock()
+
+
+def _base_context_for(schema: dict[str, Any] | None, full_docs: bool) -> str:
+    """Schema and base prompt (plus every doc in full when ``full_docs``), cached.
+
+    Entries are keyed on ``schema_fingerprint`` and ``docs_version``, so an
+    edited doc or a new upload builds a fresh prompt and every other turn
+    reuses it whatever the question.
+    """
+    key = (schema_fingerprint(schema), full_docs, docs_version())
+
+    def build() -> str:
+        schema_text = format_schema_for_prompt(schema) if schema else NO_DATA_TEXT
+        if full_docs:
+            return build_system_context(schema_text, load_data_dictionary(), load_integration_docs())
+        return build_system_context(schema_text)
+
+    return _cached(_context_cache, key, build, _CONTEXT_CACHE_SIZE)
+
+
+def _cached(cache: OrderedDict, key: Any, build: Callable[[], Any], size: int) -> Any:
+    """LRU lookup in ``cache``; ``build`` runs outside the lock on a miss."""
+    with _context_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    value = build()
+    with _context_lock:
+        cache[key] = value
+        while len(cache) > size:
+            cache.popitem(last=False)
+    return value
+
+
+def system_context_for(
+    schema: dict[str, Any] | None, question: str | None = None, doc_chunks: int | None = None
+) -> str:
+    """``build_system_context`` for a schema, question and the current docs.
+
+    The schema and base prompt come from a cache keyed on the schema and
+    docs version; the doc sections retrieved for ``question`` are appended
+    per call and never cached. ``doc_chunks`` overrides ``DOC_CHUNKS``.
+    """
+    doc_chunks = DOC_CHUNKS if doc_chunks is None else doc_chunks
+    if doc_chunks <= 0:
+        return _base_context_for(schema, full_docs=True)
+    base = _base_context_for(schema, full_docs=False)
+    chunks = retrieve_doc_chunks(schema, question, doc_chunks)
+    return base + "\n" + _doc_chunks_text(chunks) if chunks else base
+
+
+_SCHEMA_CACHE_SIZE = 64
+_schema_cache: OrderedDict[tuple[str | None, int | None], Any] = OrderedDict()
+
+
+def fitted_schema_text(schema: dict[str, Any], max_tokens: int) -> tuple[str, str]:
+    """``fit_schema_text`` cached per (schema fingerprint, token allowance).
+
+    The untruncated levels are formatted once per schema, so an allowance not
+    seen before (it shrinks as the history grows) formats again only when
+    columns have to be cut.
+    """
+    fp = schema_fingerprint(schema)
+    levels = _cached(_schema_cache, (fp, None), lambda: list(schema_levels(schema)), _SCHEMA_CACHE_SIZE)
+    return _cached(
+        _schema_cache, (fp, max_tokens), lambda: fit_schema_text(schema, max_tokens, levels), _SCHEMA_CACHE_SIZE
+    )
+
+
+def context_token_savings(schema: dict[str, Any] | None, question: str | None = None) -> dict[str, int]:
+    """Estimated system prompt tokens with retrieval vs. with every doc in full."""
+    full = estimate_tokens(system_context_for(schema, question, doc_chunks=0))
+    retrieved = estimate_tokens(system_context_for(schema, question))
+    return {"full_tokens": full, "prompt_tokens": retrieved, "saved_tokens": full - retrieved}
+
+
+@lru_cache(maxsize=1)
+def _load_env() -> None:
+    """Load environment variables from .env if present (safe no-op if missing)."""
+    from dotenv import load_dotenv
+
+    load_dotenv(_PROJECT_ROOT / ".env")
+
+
+@lru_cache(maxsize=4)
+def _client_for_key(key: str, base_url: str | None) -> AsyncOpenAI:
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=key, base_url=base_url)
+
+
+def get_client() -> AsyncOpenAI | None:
+    """Return the async OpenAI client if OPENAI_API_KEY is set; else None."""
+    _load_env()
     key = os.environ.get("OPENAI_API_KEY", "").strip()
     if not key:
         return None
-    return OpenAI(api_key=key)
+    return _client_for_key(key, os.environ.get("OPENAI_BASE_URL") or None)
 
 
-def explain_data(schema: dict[str, Any]) -> str:
-    """One-shot: ask the LLM to explain the ingested data structure and suggest mappings.
+@lru_cache(maxsize=1)
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """One event loop for every LLM call, running in a daemon thread.
 
-    Returns the model's response text, or an error message if API key missing or call fails.
+    The async client's connection pool is bound to this loop, so requests
+    from any Streamlit session reuse the same connections.
     """
-    schema_text = format_schema_for_prompt(schema)
-    data_dictionary = load_data_dictionary()
-    integration_docs = load_integration_docs()
-    system = build_system_context(schema_text, data_dictionary, integration_docs)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="assistant-llm", daemon=True).start()
+    return loop
+
+
+_END = object()
+
+
+def start_stream(chunks: AsyncIterator[str]) -> Iterator[str]:
+    """Start consuming ``chunks`` on the background loop now; iterate them from any thread."""
+    received: queue.Queue = queue.Queue()
+
+    async def pump() -> None:
+        try:
+            async for chunk in chunks:
+                received.put(chunk)
+        except BaseException as e:  # surfaced in the iterating thread
+            received.put(e)
+        finally:
+            received.put(_END)
+
+    asyncio.run_coroutine_threadsafe(pump(), _event_loop())
+
+    def iterate() -> Iterator[str]:
+        while (item := received.get()) is not _END:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    return iterate()
+
 
+async def stream_completion(
+    messages: list[dict[str, str]],
+    max_tokens: int = 1024,
+    on_complete: Callable[[str], None] | None = None,
+) -> AsyncIterator[str]:
+    """Yield completion text as it arrives; API errors become a final message.
+
+    ``on_complete`` gets the full text only when the stream finished without error.
+    It runs in a worker thread, so a blocking callback (the response cache's
+    SQLite write) does not stall other streams on the loop.
+    """
     client = get_client()
     if not client:
-        return "OpenAI API key is not set. Add OPENAI_API_KEY to your environment or .env to use the assistant."
-
+        yield NO_KEY_MESSAGE
+        return
+    parts: list[str] = []
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": "Summarize this dataset: what it contains, what each column likely represents, and how it could map to our DataBridge schema (donors, campaigns, donations). Be concise."},
-            ],
-            max_tokens=1024,
+        stream = await client.chat.completions.create(
+            model=MODEL, messages=messages, max_tokens=max_tokens, stream=True
         )
-        msg = response.choices[0].message
-        return (msg.content or "").strip()
+        async for event in stream:
+            delta = event.choices[0].delta.content if event.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
     except Exception as e:
-        return f"Error calling the assistant: {e!s}"
+        separator = "\n\n" if parts else ""
+        yield f"{separator}Error calling the assistant: {e!s}"
+        return
+    if on_complete and parts:
+        await asyncio.to_thread(on_complete, "".join(parts).strip())
+
+
+@lru_cache(maxsize=4)
+def _cache_at(path: Path, max_bytes: int) -> ResponseCache:
+    return ResponseCache(path, max_bytes)
+
+
+def response_cache() -> ResponseCache:
+    """The process-wide ``explain_data`` response cache."""
+    return _cache_at(_RESPONSE_CACHE_PATH, int(RESPONSE_CACHE_MB * 1024 * 1024))
+
+
+def explain_fingerprint(schema: dict[str, Any]) -> str:
+    """Cache key for ``explain_data``: the file's structure, not its values.
+
+    Column names, dtypes, PII kinds and value formats, plus the prompt, docs
+    version, retrieval setting and model. Row counts, samples and value
+    statistics are left out, so another export with the same layout hits.
+    """
+    columns = [
+        {
+            "name": c["name"],
+            "dtype": c["dtype"],
+            "pii": c.get("pii", []),
+            "formats": sorted(p for p, _ in (c.get("profile") or {}).get("patterns", [])),
+        }
+        for c in schema["columns"]
+    ]
+    return fingerprint({
+        "prompt": EXPLAIN_PROMPT,
+        "columns": columns,
+        "docs": docs_version(),
+        "doc_chunks": DOC_CHUNKS,
+        "model": MODEL,
+    })
+
+
+def stream_explain_data(schema: dict[str, Any]) -> Iterator[str]:
+    """``explain_data`` as a stream of text chunks; a cached answer comes as one chunk."""
+    cache = response_cache()
+    key = explain_fingerprint(schema)
+    cached = cache.get(key)
+    if cached is not None:
+        return iter([cached])
+    messages = [
+        {"role": "system", "content": system_context_for(schema)},
+        {"role": "user", "content": EXPLAIN_PROMPT},
+    ]
+    return start_stream(stream_completion(messages, on_complete=lambda text: cache.put(key, text)))
+
+
+def explain_data(schema: dict[str, Any]) -> str:
+    """One-shot: ask the LLM to explain the ingested data structure and suggest mappings.
+
+    Returns the model's response text (from the response cache when the same
+    structure was explained before), or an error message if API key missing
+    or call fails. Errors are not cached.
+    """
+    return "".join(stream_explain_data(schema)).strip()
+
+
+def review_mappings(schema: dict[str, Any], mappings: list[ColumnMapping]) -> str:
+    """Ask the LLM about the columns ``suggest_mappings`` could not map confidently.
+
+    Confident mappings are passed as settled; only the uncertain columns' schema
+    is sent, with the data dictionary (integration docs are already folded into
+    the local suggestions). Returns the reply, or a message if nothing is uncertain,
+    the API key is missing or the call fails.
+    """
+    unsure = {m.column for m in mappings if not m.confident}
+    if not unsure:
+        return "All columns were mapped confidently; nothing to review."
+    subset = {**schema, "columns": [c for c in schema["columns"] if c["name"] in unsure]}
+    subset["sample"] = [{k: v for k, v in row.items() if k in unsure} for row in schema["sample"]]
+    schema_text = format_schema_for_prompt(subset) + "\n\n" + format_mappings_for_prompt(mappings)
+    system = build_system_context(schema_text, load_data_dictionary())
+    messages = [{"role": "system", "content": system}, {"role": "user", "content": REVIEW_PROMPT}]
+    return "".join(start_stream(stream_completion(messages, max_tokens=512))).strip()
+
+
+def build_chat_messages(
+    user_message: str,
+    history: list[dict[str, str]],
+    schema: dict[str, Any] | None,
+    memory: ConversationMemory | None = None,
+    budget: ContextBudget | None = None,
+) -> tuple[list[dict[str, str]], PromptMetrics]:
+    """Messages for one chat turn within ``budget``, and their estimated size.
+
+    The newest message and recent history are sent as-is; older history is
+    folded into ``memory`` (pass the same one every turn to keep the summary
+    rolling). The system prompt gets the rest: the schema keeps at least half
+    of it when both schema and docs do not fit, and doc sections are dropped
+    from the least relevant end.
+    """
+    budget = budget or ContextBudget.from_env()
+    memory = memory if memory is not None else ConversationMemory()
+    start = split_history(history, budget)
+    memory.fold(history, start, budget.summary_tokens)
+    recent = [{"role": h["role"], "content": h["content"]} for h in history[start:]]
+    summary = memory.text()
+    summary_message = [{"role": "system", "content": summary}] if summary else []
+    user = {"role": "user", "content": user_message}
+
+    previous = next((h["content"] for h in reversed(history) if h["role"] == "user"), "")
+    question = f"{previous}\n{user_message}".strip()
+    if DOC_CHUNKS > 0:
+        candidates = retrieve_doc_chunks(schema, question)
+    else:
+        candidates = load_doc_index(_DOCS_DIR, _DOC_INDEX_PATH).chunks
+    fixed = sum(message_tokens(m) for m in [*summary_message, *recent, user])
+    available = budget.max_tokens - fixed - _EMPTY_CONTEXT_TOKENS - 4
+    docs_needed = estimate_tokens(_doc_chunks_text(candidates)) if candidates else 0
+    if schema:
+        schema_text, schema_level = fitted_schema_text(schema, max(available - docs_needed, available // 2))
+    else:
+        schema_text, schema_level = NO_DATA_TEXT, "no data"
+    chunks = fit_chunks(candidates, available - estimate_tokens(schema_text))
+    system = {"role": "system", "content": build_system_context(schema_text, doc_chunks=chunks)}
+
+    messages = [system, *summary_message, *recent, user]
+    metrics = PromptMetrics(
+        budget_tokens=budget.max_tokens,
+        system_tokens=message_tokens(system),
+        summary_tokens=sum(message_tokens(m) for m in summary_message),
+        history_tokens=sum(message_tokens(m) for m in recent),
+        message_tokens=message_tokens(user),
+        messages_verbatim=len(recent),
+        messages_summarized=start,
+        doc_sections=len(chunks),
+        doc_sections_dropped=len(candidates) - len(chunks),
+        schema_level=schema_level,
+    )
+    return messages, metrics
+
+
+def stream_chat_with_context(
+    user_message: str,
+    history: list[dict[str, str]],
+    schema: dict[str, Any] | None,
+    memory: ConversationMemory | None = None,
+    budget: ContextBudget | None = None,
+) -> Iterator[str]:
+    """``chat_with_context`` as a stream of text chunks (for ``st.write_stream``)."""
+    messages, _ = build_chat_messages(user_message, history, schema, memory, budget)
+    return start_stream(stream_completion(messages))
 
 
 def chat_with_context(
     user_message: str,
     history: list[dict[str, str]],
     schema: dict[str, Any] | None,
+    memory: ConversationMemory | None = None,
+    budget: ContextBudget | None = None,
 ) -> str:
-    """Send user message with full context (schema + docs) and return assistant reply.
+    """Send user message with context (schema + docs) and return assistant reply.
 
     history: list of {"role": "user"|"assistant", "content": "..."}.
     schema: current ingested schema (or None if no data loaded). If None, context is docs only.
+    Docs are retrieved for this message and the previous user message, so
+    follow-up questions keep their topic. See ``build_chat_messages`` for the budget.
     """
-    schema_text = format_schema_for_prompt(schema) if schema else "No dataset is currently loaded. The user may ask about the target schema or integrations."
-    data_dictionary = load_data_dictionary()
-    integration_docs = load_integration_docs()
-    system = build_system_context(schema_text, data_dictionary, integration_docs)
-
-    client = get_client()
-    if not client:
-        return "OpenAI API key is not set. Add OPENAI_API_KEY to your environment or .env to use the assistant."
-
-    messages: list[dict[str, str]] = [{"role": "system", "content": system}]
-    for h in history:
-        messages.append({"role": h["role"], "content": h["content"]})
-    messages.append({"role": "user", "content": user_message})
-
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            max_tokens=1024,
-        )
-        msg = response.choices[0].message
-        return (msg.content or "").strip()
-    except Exception as e:
-        return f"Error calling the assistant: {e!s}"
+    return "".join(stream_chat_with_context(user_message, history, schema, memory, budget)).strip()
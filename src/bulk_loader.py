@@ -0,0 +1,182 @@
+"""Bulk loading of typed column batches into Postgres.
+
+Connectors hand the loader ColumnBatch objects (one Python list per column,
+values already converted to int/Decimal/date/bool/str). Each batch is sent to
+the server with a single COPY instead of one INSERT per row.
+"""
+
+from __future__ import annotations
+
+import io
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any
+
+from psycopg2 import sql
+
+
+@dataclass
+class ColumnBatch:
+    """A batch of rows for one target table, stored column-wise.
+
+    Attributes:
+        table: Target table name (e.g. "donors").
+        columns: Column name -> list of values; all lists have the same length.
+    """
+
+    table: str
+    columns: dict[str, list[Any]]
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), []))
+
+    @property
+    def column_names(self) -> list[str]:
+        """Column names in load order."""
+        return list(self.columns)
+
+    def rows(self) -> Iterator[tuple[Any, ...]]:
+        """Iterate the batch row-wise as tuples in column order."""
+        return zip(*self.columns.values())
+
+
+def batch_records(
+    table: str,
+    records: Iterable[Mapping[str, Any]],
+    columns: Sequence[str],
+    batch_size: int = 1000,
+) -> Iterator[ColumnBatch]:
+    """Group an iterable of record dicts into ColumnBatch objects.
+
+    Records are consumed lazily, so at most batch_size rows are held in memory.
+
+    Args:
+        table: Target table name.
+        records: Iterable of dicts keyed by column name (missing keys become None).
+        columns: Columns to keep, in load order.
+        batch_size: Maximum rows per batch.
+
+    Returns:
+        Iterator of non-empty ColumnBatch objects.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+
+    def _empty() -> dict[str, list[Any]]:
+        return {c: [] for c in columns}
+
+    current = _empty()
+    size = 0
+    for record in records:
+        for c in columns:
+            current[c].append(record.get(c))
+        size += 1
+        if size >= batch_size:
+            yield ColumnBatch(table, current)
+            current = _empty()
+            size = 0
+    if size:
+        yield ColumnBatch(table, current)
+
+
+def _csv_field(value: Any) -> str:
+    """Render one value for COPY ... (FORMAT csv).
+
+    NULL is an unquoted empty field; strings are always quoted so that an
+    empty string stays distinct from NULL.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (int, float)):
+        return str(value)
+    text = str(value)
+    if isinstance(value, str):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _batch_to_csv(batch: ColumnBatch) -> io.StringIO:
+    buf = io.StringIO()
+    for row in batch.rows():
+        buf.write(",".join(_csv_field(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+def copy_batch(cursor, batch: ColumnBatch, table: str | None = None) -> int:
+    """COPY a batch into a table in a single round-trip.
+
+    Args:
+        cursor: Open psycopg2 cursor.
+        batch: Batch to load.
+        table: Override target table (defaults to batch.table).
+
+    Returns:
+        Number of rows sent.
+    """
+    if not len(batch):
+        return 0
+    stmt = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+        sql.Identifier(table or batch.table),
+        sql.SQL(", ").join(sql.Identifier(c) for c in batch.column_names),
+    )
+    cursor.copy_expert(stmt.as_string(cursor), _batch_to_csv(batch))
+    return len(batch)
+
+
+def upsert_batch(cursor, batch: ColumnBatch, key: Sequence[str]) -> int:
+    """Insert-or-update a batch: COPY into a temp table, then merge on key.
+
+    Used by incremental connectors and the CSV load, where the same record
+    can arrive again with changed values. Rows whose values are unchanged
+    are not rewritten.
+
+    Args:
+        cursor: Open psycopg2 cursor.
+        batch: Batch to load.
+        key: Primary/unique key columns of the target table.
+
+    Returns:
+        Number of rows sent.
+    """
+    if not len(batch):
+        return 0
+    staging = f"_stage_{batch.table}"
+    cursor.execute(
+        sql.SQL(
+            "CREATE TEMP TABLE IF NOT EXISTS {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP"
+        ).format(sql.Identifier(staging), sql.Identifier(batch.table))
+    )
+    cursor.execute(sql.SQL("TRUNCATE {}").format(sql.Identifier(staging)))
+    copy_batch(cursor, batch, table=staging)
+
+    cols = batch.column_names
+    updates = [c for c in cols if c not in key]
+    conflict_action = (
+        sql.SQL("DO UPDATE SET {} WHERE ({}) IS DISTINCT FROM ({})").format(
+            sql.SQL(", ").join(
+                sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in updates
+            ),
+            sql.SQL(", ").join(sql.Identifier(batch.table, c) for c in updates),
+            sql.SQL(", ").join(sql.SQL("EXCLUDED.{}").format(sql.Identifier(c)) for c in updates),
+        )
+        if updates
+        else sql.SQL("DO NOTHING")
+    )
+    cursor.execute(
+        sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} ON CONFLICT ({}) {}").format(
+            sql.Identifier(batch.table),
+            sql.SQL(", ").join(sql.Identifier(c) for c in cols),
+            sql.SQL(", ").join(sql.Identifier(c) for c in cols),
+            sql.Identifier(staging),
+            sql.SQL(", ").join(sql.Identifier(k) for k in key),
+            conflict_action,
+        )
+    )
+    return len(batch)
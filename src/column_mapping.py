@@ -0,0 +1,374 @@
+"""Local column mapping: suggest DataBridge target fields for uploaded columns.
+
+``build_mapping_index`` parses the target tables in ``docs/DATA_DICTIONARY.md``
+(column, SQL type, example values) and the source-field mapping tables in
+``docs/integrations/*.md`` (e.g. DonorPerfect ``gift_type`` ->
+``gifts.payment_method``) into a ``MappingIndex``: per target field, the
+normalized names it is known by, their character trigrams, its type and the
+shapes of its example values. ``load_mapping_index`` caches the index until
+one of the docs changes.
+
+``suggest_mappings`` scores every uploaded column against every target by
+name similarity, type compatibility and value profile (from
+``schema_inference``), and returns ranked candidates. Only columns without a
+confident match need the LLM.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from src.sketches import value_patterns
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DOCS_DIR = _PROJECT_ROOT / "docs"
+
+# Target tables an upload can map to.
+TARGET_TABLES = ("donors", "campaigns", "donations")
+# Table names used by source-system docs for our tables.
+TABLE_ALIASES = {"gifts": "donations", "gift": "donations", "donor": "donors", "campaign": "campaigns"}
+
+# Tokens with the same meaning in column names.
+CANONICAL_TOKENS = {
+    "gift": "donation", "gifts": "donation", "donations": "donation", "contribution": "donation",
+    "constituent": "donor", "donors": "donor", "amt": "amount", "dt": "date", "addr": "address",
+    "tel": "phone", "telephone": "phone", "mobile": "phone", "zipcode": "zip", "postal": "zip",
+    "postcode": "zip", "fname": "first name", "lname": "last name", "surname": "last name",
+    "firstname": "first name", "lastname": "last name", "mail": "email", "e": "",
+}
+
+SCORE_WEIGHTS = {"name": 0.6, "type": 0.2, "value": 0.2}
+CONFIDENT_SCORE = 0.7
+CONFIDENT_MARGIN = 0.05
+
+# (uploaded kind, target kind) -> compatibility; missing pairs score 0.
+TYPE_COMPATIBILITY = {
+    ("integer", "integer"): 1.0, ("integer", "decimal"): 0.8, ("decimal", "decimal"): 1.0,
+    ("decimal", "integer"): 0.6, ("date", "date"): 1.0, ("boolean", "boolean"): 1.0,
+    ("text", "text"): 1.0, ("integer", "text"): 0.5, ("date", "text"): 0.3,
+    ("decimal", "text"): 0.3, ("boolean", "text"): 0.3, ("text", "boolean"): 0.2,
+}
+
+_TABLE_HEADING = re.compile(r"^## Table: (\w+)\s*$")
+_BACKTICKED = re.compile(r"`([^`]+)`")
+_QUOTED = re.compile(r'"([^"]+)"')
+_DATE_SHAPE = re.compile(r"^9{1,4}[-/.]9{1,2}[-/.]9{1,4}([ T]9{1,2}:9{2}(:9{2})?.*)?$")
+_NUMBER_SHAPE = re.compile(r"^-?[9,]+(\.9+)?$")
+_BOOLEAN_VALUES = {"y", "n", "yes", "no", "true", "false", "t", "f", "0", "1"}
+
+
+@dataclass(frozen=True)
+class TargetField:
+    """One column of a target table, with every name it is known by."""
+
+    table: str
+    column: str
+    kind: str
+    description: str = ""
+    names: tuple[str, ...] = ()
+    example_shapes: frozenset[str] = frozenset()
+    example_values: frozenset[str] = frozenset()
+
+    @property
+    def key(self) -> str:
+        return f"{self.table}.{self.column}"
+
+
+@dataclass
+class MappingIndex:
+    """Target fields plus precomputed tokens and trigrams for each of their names."""
+
+    fields: list[TargetField]
+    _names: list[tuple[int, str, frozenset[str], frozenset[str]]] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self._names = [
+            (i, name, frozenset(name.split()), _trigrams(name))
+            for i, target in enumerate(self.fields)
+            for name in target.names
+        ]
+
+
+@dataclass(frozen=True)
+class ColumnMapping:
+    """Ranked target candidates for one uploaded column."""
+
+    column: str
+    candidates: tuple[tuple[str, float], ...]
+    confident: bool
+
+    @property
+    def target(self) -> str | None:
+        return self.candidates[0][0] if self.candidates else None
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase words with camelCase split and synonyms canonicalized."""
+    name = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", str(name))
+    words = re.split(r"[^a-z0-9]+", name.lower())
+    return " ".join(w for word in words if word for w in CANONICAL_TOKENS.get(word, word).split())
+
+
+def _trigrams(name: str) -> frozenset[str]:
+    padded = f"  {name} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def sql_kind(sql_type: str) -> str:
+    sql_type = sql_type.upper()
+    if sql_type.startswith(("INT", "BIGINT", "SMALLINT", "SERIAL")):
+        return "integer"
+    if sql_type.startswith(("DECIMAL", "NUMERIC", "MONEY", "REAL", "DOUBLE", "FLOAT")):
+        return "decimal"
+    if sql_type.startswith(("DATE", "TIMESTAMP")):
+        return "date"
+    if sql_type.startswith("BOOL"):
+        return "boolean"
+    return "text"
+
+
+def _shape(value: str) -> str:
+    """Value shape with runs collapsed: "(555) 123-4567" -> "(9) 9-9"."""
+    return re.sub(r"(.)\1+", r"\1", value_patterns(pd.Series([value])).iloc[0])
+
+
+def _table_rows(lines: list[str]) -> list[list[str]]:
+    rows = []
+    for line in lines:
+        if line.startswith("|") and not re.match(r"^\|[\s|:-]+\|?$", line):
+            rows.append([cell.strip() for cell in line.strip().strip("|").split("|")])
+    return rows
+
+
+def parse_data_dictionary(text: str, tables: tuple[str, ...] = TARGET_TABLES) -> list[TargetField]:
+    """Target fields from the "## Table: x" sections of the data dictionary."""
+    sections: dict[str, list[str]] = {}
+    current = None
+    for line in text.splitlines():
+        heading = _TABLE_HEADING.match(line)
+        if heading:
+            current = heading.group(1) if heading.group(1) in tables else None
+            sections.setdefault(current, []) if current else None
+        elif line.startswith("## "):
+            current = None
+        elif current:
+            sections[current].append(line)
+
+    fields = []
+    for table, lines in sections.items():
+        rows = _table_rows(lines)
+        if not rows:
+            continue
+        header = [h.lower() for h in rows[0]]
+        col, typ = header.index("column"), header.index("data type")
+        desc = header.index("description") if "description" in header else None
+        example = header.index("example") if "example" in header else None
+        for row in rows[1:]:
+            if len(row) < len(header):
+                continue
+            examples = _QUOTED.findall(row[example]) if example is not None else []
+            if example is not None and not examples and re.fullmatch(r"-?[\d.,]+", row[example]):
+                examples = [row[example]]
+            fields.append(TargetField(
+                table=table,
+                column=row[col],
+                kind=sql_kind(row[typ]),
+                description=row[desc] if desc is not None else "",
+                example_shapes=frozenset(_shape(e) for e in examples),
+                example_values=frozenset(e.lower() for e in examples),
+            ))
+    return fields
+
+
+def _resolve_target(token: str, fields: list[TargetField]) -> TargetField | None:
+    """Target for a mapping-cell token such as "gifts.amount" or "email"."""
+    if "." in token:
+        table, column = token.split(".", 1)
+        table = TABLE_ALIASES.get(table, table)
+        in_table = [f for f in fields if f.table == table]
+        exact = [f for f in in_table if f.column == column]
+        if exact:
+            return exact[0]
+        # home_phone -> phone, address_line1 -> address: one column whose words are all in the name.
+        words = set(column.split("_"))
+        partial = [f for f in in_table if set(f.column.split("_")) <= words]
+        return partial[0] if len(partial) == 1 else None
+    matches = [f for f in fields if f.column == token]
+    # A bare name resolves when it is one column (or the same key column in several tables).
+    return matches[0] if matches and len({f.column for f in matches}) == 1 else None
+
+
+def parse_integration_mappings(text: str, fields: list[TargetField]) -> list[tuple[str, str]]:
+    """(source field, target key) pairs from tables with a "Mapping" column."""
+    pairs = []
+    block: list[str] = []
+    for line in [*text.splitlines(), ""]:
+        if line.startswith("|"):
+            block.append(line)
+            continue
+        rows = _table_rows(block)
+        block = []
+        if not rows:
+            continue
+        mapping = next((i for i, h in enumerate(rows[0]) if "mapping" in h.lower()), None)
+        if mapping is None:
+            continue
+        for row in rows[1:]:
+            source = _BACKTICKED.findall(row[0]) if row else []
+            if not source or len(row) <= mapping:
+                continue
+            for token in _BACKTICKED.findall(row[mapping]):
+                target = _resolve_target(token, fields)
+                if target is not None:
+                    pairs.append((source[0], target.key))
+                    break
+    return pairs
+
+
+def build_mapping_index(docs_dir: Path = DOCS_DIR) -> MappingIndex:
+    """Parse the data dictionary and integration docs into a ``MappingIndex``."""
+    fields = parse_data_dictionary((docs_dir / "DATA_DICTIONARY.md").read_text(encoding="utf-8"))
+    synonyms: dict[str, set[str]] = {f.key: set() for f in fields}
+    for path in sorted((docs_dir / "integrations").glob("*.md")):
+        for source, key in parse_integration_mappings(path.read_text(encoding="utf-8"), fields):
+            synonyms[key].add(normalize_name(source.replace(".", " ")))
+    indexed = []
+    for f in fields:
+        names = {normalize_name(f.column), normalize_name(f"{f.table.rstrip('s')} {f.column}")}
+        indexed.append(TargetField(
+            table=f.table,
+            column=f.column,
+            kind=f.kind,
+            description=f.description,
+            names=tuple(sorted(names | synonyms[f.key])),
+            example_shapes=f.example_shapes,
+            example_values=f.example_values,
+        ))
+    return MappingIndex(indexed)
+
+
+def _docs_mtimes(docs_dir: Path) -> tuple[tuple[str, int], ...]:
+    paths = [docs_dir / "DATA_DICTIONARY.md", *sorted((docs_dir / "integrations").glob("*.md"))]
+    return tuple((p.name, p.stat().st_mtime_ns) for p in paths if p.is_file())
+
+
+@lru_cache(maxsize=4)
+def _cached_index(docs_dir: Path, mtimes: tuple[tuple[str, int], ...]) -> MappingIndex:
+    return build_mapping_index(docs_dir)
+
+
+def load_mapping_index(docs_dir: Path = DOCS_DIR) -> MappingIndex:
+    """``build_mapping_index``, rebuilt only when a doc file changes."""
+    return _cached_index(docs_dir, _docs_mtimes(docs_dir))
+
+
+def column_kind(dtype: str, profile: dict[str, Any] | None) -> str:
+    """integer, decimal, date, boolean or text, from dtype and value shapes."""
+    dtype = dtype.lower()
+    if dtype.startswith(("int", "uint")):
+        return "integer"
+    if dtype.startswith("float"):
+        return "decimal"
+    if dtype.startswith("bool"):
+        return "boolean"
+    if dtype.startswith("datetime"):
+        return "date"
+    profile = profile or {}
+    top = [str(v).lower() for v, _ in profile.get("top", [])]
+    if top and profile.get("distinct", 99) <= 2 and set(top) <= _BOOLEAN_VALUES:
+        return "boolean"
+    shapes = [p for p, _ in profile.get("patterns", [])]
+    if shapes and all(_DATE_SHAPE.match(p) for p in shapes):
+        return "date"
+    if shapes and all(_NUMBER_SHAPE.match(p) for p in shapes):
+        return "decimal"
+    return "text"
+
+
+def _value_score(target: TargetField, profile: dict[str, Any] | None) -> float | None:
+    """Share of the column's values that look like the target's examples; None if unknown."""
+    if not profile:
+        return None
+    scores = []
+    patterns = profile.get("patterns", [])
+    total = sum(c for _, c in patterns)
+    if target.example_shapes and total:
+        matching = sum(c for p, c in patterns if re.sub(r"(.)\1+", r"\1", p) in target.example_shapes)
+        scores.append(matching / total)
+    top = profile.get("top", [])
+    top_total = sum(c for _, c in top)
+    if target.example_values and top_total and len(target.example_values) > 1:
+        scores.append(sum(c for v, c in top if str(v).lower() in target.example_values) / top_total)
+    return max(scores) if scores else None
+
+
+def _name_scores(index: MappingIndex, column: str) -> list[float]:
+    name = normalize_name(column)
+    tokens, grams = frozenset(name.split()), _trigrams(name)
+    best = [0.0] * len(index.fields)
+    for i, target_name, target_tokens, target_grams in index._names:
+        if name == target_name or (tokens and tokens == target_tokens):
+            score = 1.0
+        else:
+            token = len(tokens & target_tokens) / len(tokens | target_tokens) if tokens else 0.0
+            gram = 2 * len(grams & target_grams) / (len(grams) + len(target_grams))
+            score = 0.5 * token + 0.5 * gram
+        best[i] = max(best[i], score)
+    return best
+
+
+def suggest_mappings(
+    schema: dict[str, Any],
+    index: MappingIndex | None = None,
+    top_n: int = 3,
+) -> list[ColumnMapping]:
+    """Ranked target suggestions for each column of an ``infer_schema`` result.
+
+    A column is confident when its best score reaches ``CONFIDENT_SCORE`` and
+    beats the best candidate with a different column name by
+    ``CONFIDENT_MARGIN`` (``donors.donor_id`` and ``donations.donor_id`` are
+    the same field, not rivals).
+    """
+    index = index or load_mapping_index()
+    suggestions = []
+    for col in schema["columns"]:
+        profile = col.get("profile")
+        kind = column_kind(col["dtype"], profile)
+        scored = []
+        for target, name_score in zip(index.fields, _name_scores(index, col["name"])):
+            parts = {"name": name_score, "type": TYPE_COMPATIBILITY.get((kind, target.kind), 0.0)}
+            value = _value_score(target, profile)
+            if value is not None:
+                parts["value"] = value
+            weight = sum(SCORE_WEIGHTS[p] for p in parts)
+            scored.append((target, sum(SCORE_WEIGHTS[p] * s for p, s in parts.items()) / weight))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        best_target, best = scored[0]
+        rival = next((s for t, s in scored if t.column != best_target.column), 0.0)
+        suggestions.append(ColumnMapping(
+            column=col["name"],
+            candidates=tuple((t.key, round(s, 3)) for t, s in scored[:top_n]),
+            confident=best >= CONFIDENT_SCORE and best - rival >= CONFIDENT_MARGIN,
+        ))
+    return suggestions
+
+
+def format_mappings_for_prompt(mappings: list[ColumnMapping]) -> str:
+    """Confident mappings as settled facts, the rest as open questions."""
+    lines = ["## Suggested column mappings (computed locally)"]
+    for m in mappings:
+        if m.confident:
+            lines.append(f"- {m.column} -> {m.target} (score {m.candidates[0][1]:.2f})")
+    unsure = [m for m in mappings if not m.confident]
+    if unsure:
+        lines.extend(["", "### Low-confidence columns"])
+        for m in unsure:
+            options = ", ".join(f"{key} ({score:.2f})" for key, score in m.candidates)
+            lines.append(f"- {m.column}: candidates {options}")
+    return "\n".join(lines)
@@ -0,0 +1 @@
+"""Source system connectors (see docs/integrations/)."""
@@ -0,0 +1,368 @@
+"""Async Constant Contact V3 sync with watermarks and rate limiting.
+
+Contacts are pulled incrementally: each run requests only contacts with
+``updated_after`` greater than the stored high-water mark, then advances the
+mark to the newest ``updated_at`` seen once every page has been loaded.
+Contact-level activity (``tracking/sends``) for several campaign activities
+is fetched concurrently. All requests share a token-bucket rate limiter and a
+concurrency bound (see docs/integrations/constantcontact.md, "Rate Limits").
+
+HTTP calls use the standard library in worker threads, so no async HTTP
+dependency is needed; each JSON page is converted to typed column batches as
+it arrives. ConstantContactConnector exposes the same contact paging to the
+threaded connector runtime.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections.abc import AsyncIterator, Iterable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from src.bulk_loader import ColumnBatch, batch_records, upsert_batch
+from src.connectors.runtime import Connector, RetryableError, RetryPolicy, TokenBucket, register
+from src.watermarks import bump_watermarks
+
+DEFAULT_BASE_URL = "https://api.cc.email/v3"
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_STATE_PATH = _PROJECT_ROOT / "data" / "state" / "constantcontact.json"
+
+CONTACT_COLUMNS = [
+    "contact_id",
+    "email",
+    "permission_to_send",
+    "opt_in_date",
+    "first_name",
+    "last_name",
+    "company_name",
+    "created_at",
+    "updated_at",
+]
+
+ENGAGEMENT_COLUMNS = [
+    "contact_id",
+    "campaign_activity_id",
+    "send_date",
+    "open_date",
+    "click_date",
+    "bounce_type",
+    "unsubscribe_date",
+]
+
+
+class ConstantContactError(RuntimeError):
+    """Raised when the API returns an error that retries cannot resolve."""
+
+
+def parse_timestamp(value: str | None) -> datetime | None:
+    """Parse an ISO-8601 UTC timestamp (``2023-12-01T09:00:00.000Z``)."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def format_timestamp(value: datetime) -> str:
+    """Format a timestamp the way the API expects in ``updated_after``."""
+    return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+
+def contact_row(contact: dict[str, Any]) -> dict[str, Any]:
+    """Flatten one contact resource into cc_contacts columns."""
+    email = contact.get("email_address") or {}
+    address = (email.get("address") or "").strip().lower()
+    return {
+        "contact_id": contact["contact_id"],
+        "email": address or None,
+        "permission_to_send": email.get("permission_to_send"),
+        "opt_in_date": parse_timestamp(email.get("opt_in_date")),
+        "first_name": contact.get("first_name"),
+        "last_name": contact.get("last_name"),
+        "company_name": contact.get("company_name"),
+        "created_at": parse_timestamp(contact.get("created_at")),
+        "updated_at": parse_timestamp(contact.get("updated_at")),
+    }
+
+
+def engagement_row(activity_id: str, send: dict[str, Any]) -> dict[str, Any]:
+    """Flatten one tracking/sends entry into cc_contact_engagement columns."""
+    return {
+        "contact_id": send["contact_id"],
+        "campaign_activity_id": activity_id,
+        "send_date": parse_timestamp(send.get("send_date")),
+        "open_date": parse_timestamp(send.get("open_date")),
+        "click_date": parse_timestamp(send.get("click_date")),
+        "bounce_type": send.get("bounce_type"),
+        "unsubscribe_date": parse_timestamp(send.get("unsubscribe_date")),
+    }
+
+
+def fetch_json(url: str, access_token: str, timeout: float = 60.0) -> dict[str, Any]:
+    """Blocking GET of one JSON document.
+
+    Raises:
+        RetryableError: On HTTP 429 or 5xx (carrying Retry-After when sent), and
+            on network failures: unreachable host, timeout or dropped connection.
+        ConstantContactError: On any other HTTP error.
+    """
+    req = urllib.request.Request(
+        url,
+        headers={"Authorization": f"Bearer {access_token}", "Accept": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.load(resp)
+    except urllib.error.HTTPError as e:
+        if e.code == 429 or e.code >= 500:
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            raise RetryableError(f"HTTP {e.code} for {url}", float(retry_after) if retry_after else None) from e
+        raise ConstantContactError(f"GET {url} failed with HTTP {e.code}") from e
+    except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+        raise RetryableError(f"GET {url} failed: {getattr(e, 'reason', e)}") from e
+
+
+class JsonWatermarkStore:
+    """High-water marks persisted as a small JSON file (written atomically)."""
+
+    def __init__(self, path: Path = DEFAULT_STATE_PATH) -> None:
+        self.path = Path(path)
+
+    def _read(self) -> dict[str, str]:
+        if not self.path.is_file():
+            return {}
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    def get(self, key: str) -> str | None:
+        return self._read().get(key)
+
+    def set(self, key: str, value: str) -> None:
+        data = self._read()
+        data[key] = value
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.path)
+
+
+class ConstantContactClient:
+    """Async client with bounded concurrency, rate limiting and retry with jitter."""
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str = DEFAULT_BASE_URL,
+        max_concurrency: int = 4,
+        rate_per_second: float = 10.0,
+        burst: int | None = None,
+        retry: RetryPolicy | None = None,
+        timeout: float = 60.0,
+    ) -> None:
+        if not access_token:
+            raise ValueError("Constant Contact access token is required")
+        self.access_token = access_token
+        self.base_url = base_url.rstrip("/")
+        self.retry = retry or RetryPolicy()
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate_per_second, burst)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.request_count = 0
+
+    @classmethod
+    def from_env(cls) -> "ConstantContactClient":
+        """Build a client from CONSTANT_CONTACT_ACCESS_TOKEN / CONSTANT_CONTACT_BASE_URL."""
+        return cls(
+            access_token=os.getenv("CONSTANT_CONTACT_ACCESS_TOKEN", "").strip(),
+            base_url=os.getenv("CONSTANT_CONTACT_BASE_URL", DEFAULT_BASE_URL).strip() or DEFAULT_BASE_URL,
+        )
+
+    def url(self, path: str, params: dict[str, Any] | None = None) -> str:
+        """Absolute URL for an API path, a ``_links`` href or a full URL."""
+        # `_links.next.href` values are absolute paths that already include /v3.
+        if path.startswith("http"):
+            url = path
+        elif path.startswith("/v3/"):
+            root = self.base_url[: -len("/v3")] if self.base_url.endswith("/v3") else self.base_url
+            url = root + path
+        else:
+            url = f"{self.base_url}/{path.lstrip('/')}"
+        if params:
+            url += ("&" if "?" in url else "?") + urllib.parse.urlencode(params)
+        return url
+
+    async def get_json(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+        """GET a JSON document, honouring the rate limit and retrying transient errors."""
+        url = self.url(path, params)
+        for attempt in range(self.retry.max_attempts):
+            await self.limiter.acquire_async()
+            try:
+                async with self._semaphore:
+                    self.request_count += 1
+                    return await asyncio.to_thread(fetch_json, url, self.access_token, self.timeout)
+            except self.retry.retry_on as e:
+                if attempt == self.retry.max_attempts - 1:
+                    raise
+                await asyncio.sleep(self.retry.delay(attempt, getattr(e, "retry_after", None)))
+        raise ConstantContactError(f"GET {url} failed after {self.retry.max_attempts} attempts")
+
+    async def iter_pages(
+        self, path: str, params: dict[str, Any] | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Follow cursor pagination (``_links.next.href``) and yield each page."""
+        page = await self.get_json(path, params)
+        while True:
+            yield page
+            next_href = ((page.get("_links") or {}).get("next") or {}).get("href")
+            if not next_href:
+                return
+            page = await self.get_json(next_href)
+
+
+async def iter_contact_batches(
+    client: ConstantContactClient,
+    updated_after: str | None = None,
+    page_size: int = 500,
+) -> AsyncIterator[ColumnBatch]:
+    """Yield one typed cc_contacts batch per page of changed contacts."""
+    params: dict[str, Any] = {"limit": page_size, "status": "all"}
+    if updated_after:
+        params["updated_after"] = updated_after
+    async for page in client.iter_pages("contacts", params):
+        contacts = page.get("contacts") or []
+        for batch in batch_records("cc_contacts", map(contact_row, contacts), CONTACT_COLUMNS, max(len(contacts), 1)):
+            yield batch
+
+
+async def iter_engagement_batches(
+    client: ConstantContactClient,
+    activity_ids: Iterable[str],
+    page_size: int = 500,
+) -> AsyncIterator[ColumnBatch]:
+    """Fetch tracking/sends for many campaign activities concurrently.
+
+    Each activity's cursor chain is walked by its own task; pages are handed
+    over through a bounded queue as they complete, so slow consumers hold
+    back producers instead of buffering every page.
+    """
+    queue: asyncio.Queue[ColumnBatch | None] = asyncio.Queue(maxsize=8)
+    ids = list(activity_ids)
+
+    async def _walk(activity_id: str) -> None:
+        path = f"reports/email_reports/{activity_id}/tracking/sends"
+        async for page in client.iter_pages(path, {"limit": page_size}):
+            sends = page.get("tracking_activities") or page.get("sends") or []
+            rows = [engagement_row(activity_id, s) for s in sends]
+            for batch in batch_records("cc_contact_engagement", rows, ENGAGEMENT_COLUMNS, max(len(rows), 1)):
+                await queue.put(batch)
+
+    async def _run_all() -> None:
+        try:
+            await asyncio.gather(*(_walk(a) for a in ids))
+        finally:
+            await queue.put(None)
+
+    runner = asyncio.create_task(_run_all())
+    try:
+        while (batch := await queue.get()) is not None:
+            yield batch
+        await runner
+    finally:
+        if not runner.done():
+            runner.cancel()
+
+
+@register
+class ConstantContactConnector(Connector):
+    """Runtime plugin for incremental contact sync.
+
+    The cursor is the next page URL. ``high_water`` tracks the newest
+    ``updated_at`` seen; persist it only after the pipeline succeeds.
+    """
+
+    name = "constantcontact"
+    target_table = "cc_contacts"
+    columns = CONTACT_COLUMNS
+    key = ["contact_id"]
+
+    def __init__(self, client: ConstantContactClient, updated_after: str | None = None, page_size: int = 500) -> None:
+        self.client = client
+        self.updated_after = updated_after
+        self.page_size = page_size
+        self.high_water = parse_timestamp(updated_after)
+
+    def initial_cursor(self) -> str:
+        params: dict[str, Any] = {"limit": self.page_size, "status": "all"}
+        if self.updated_after:
+            params["updated_after"] = self.updated_after
+        return self.client.url("contacts", params)
+
+    def fetch_page(self, cursor: str) -> tuple[dict[str, Any], str | None]:
+        page = fetch_json(cursor, self.client.access_token, self.client.timeout)
+        next_href = ((page.get("_links") or {}).get("next") or {}).get("href")
+        return page, self.client.url(next_href) if next_href else None
+
+    def parse(self, page: dict[str, Any]) -> list[dict[str, Any]]:
+        return page.get("contacts") or []
+
+    def transform(self, record: dict[str, Any]) -> dict[str, Any]:
+        row = contact_row(record)
+        ts = row["updated_at"]
+        if ts is not None and (self.high_water is None or ts > self.high_water):
+            self.high_water = ts
+        return row
+
+
+async def sync_contacts(
+    conn,
+    client: ConstantContactClient,
+    store: JsonWatermarkStore,
+    activity_ids: Iterable[str] = (),
+    page_size: int = 500,
+) -> dict[str, Any]:
+    """Incrementally sync contacts (and optional activity) into Postgres.
+
+    The ``contacts_updated_at`` watermark is only advanced after every page
+    has been committed, so an interrupted run re-fetches rather than skips.
+
+    Args:
+        conn: Open psycopg2 connection; open it with ``instrumented=False``
+            so bulk upserts are not timed into query_log.
+        client: Constant Contact client.
+        store: Watermark store.
+        activity_ids: campaign_activity_ids whose sends should be synced.
+        page_size: Records per API page (max 500).
+
+    Returns:
+        Dict with rows loaded per table and the new watermark.
+    """
+    watermark = store.get("contacts_updated_at")
+    high_water = parse_timestamp(watermark)
+    loaded = {"cc_contacts": 0, "cc_contact_engagement": 0}
+
+    def _load(batch: ColumnBatch, key: list[str]) -> int:
+        with conn.cursor() as cursor:
+            n = upsert_batch(cursor, batch, key=key)
+            bump_watermarks(cursor, [batch.table])
+        conn.commit()
+        return n
+
+    async for batch in iter_contact_batches(client, watermark, page_size):
+        loaded["cc_contacts"] += await asyncio.to_thread(_load, batch, ["contact_id"])
+        for ts in batch.columns["updated_at"]:
+            if ts is not None and (high_water is None or ts > high_water):
+                high_water = ts
+
+    async for batch in iter_engagement_batches(client, activity_ids, page_size):
+        loaded["cc_contact_engagement"] += await asyncio.to_thread(
+            _load, batch, ["contact_id", "campaign_activity_id"]
+        )
+
+    if high_water is not None:
+        store.set("contacts_updated_at", format_timestamp(high_water))
+    loaded["watermark"] = store.get("contacts_updated_at")
+    return loaded
@@ -0,0 +1,394 @@
+"""Streaming DonorPerfect XML API connector.
+
+Pages through DonorPerfect tables with keyset-paginated dynamic queries
+(``SELECT TOP n ... WHERE id > last_id ORDER BY id``) and parses each response
+incrementally with ``iterparse``, clearing elements as soon as a record has
+been converted. Records are typed (see docs/integrations/donorperfect.md,
+"Data Type Conversions") and grouped into ColumnBatch objects for the bulk
+loader, so memory stays bounded by page size regardless of result size.
+"""
+
+from __future__ import annotations
+
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import IO, Any
+
+from src.aggregates import refresh_aggregates
+from src.bulk_loader import ColumnBatch, batch_records
+from src.connectors.runtime import Connector, Pipeline, RetryableError, postgres_loader, register
+
+DEFAULT_BASE_URL = "https://www.donorperfect.net/prod/xmlrequest.asp"
+
+
+class DonorPerfectError(RuntimeError):
+    """Raised when the API returns an error document or an unusable response."""
+
+
+# --- Type conversions (DonorPerfect -> Python/PostgreSQL) ---
+
+def parse_int(value: str | None) -> int | None:
+    """DonorPerfect numeric -> int (None for empty)."""
+    if value is None or value == "":
+        return None
+    try:
+        return int(Decimal(value))
+    except InvalidOperation as e:
+        raise ValueError(f"Invalid numeric value: {value!r}") from e
+
+
+def parse_money(value: str | None) -> Decimal | None:
+    """DonorPerfect money -> Decimal rounded to cents (None for empty)."""
+    if value is None or value == "":
+        return None
+    try:
+        return Decimal(value.replace(",", "")).quantize(Decimal("0.01"))
+    except InvalidOperation as e:
+        raise ValueError(f"Invalid money value: {value!r}") from e
+
+
+def parse_date(value: str | None) -> date | None:
+    """DonorPerfect MM/DD/YYYY (optionally with a time part) -> date."""
+    if value is None or value == "":
+        return None
+    text = value.strip().split(" ")[0]
+    for fmt in ("%m/%d/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date value: {value!r}")
+
+
+def parse_flag(value: str | None) -> bool | None:
+    """DonorPerfect Y/N flag -> bool (None for empty)."""
+    if value is None or value == "":
+        return None
+    return value.strip().upper() == "Y"
+
+
+def parse_text(value: str | None) -> str | None:
+    """Strip text; empty strings become NULL (never '' in code fields)."""
+    if value is None:
+        return None
+    text = value.strip()
+    return text or None
+
+
+_DONOR_TYPES = {"IN": "Individual", "CO": "Business", "FO": "Foundation"}
+
+_PAYMENT_METHODS = {
+    "CHECK": "Check",
+    "CASH": "Cash",
+    "VISAIC": "Credit Card",
+    "MC": "Credit Card",
+    "AMEX": "Credit Card",
+    "DISCOVER": "Credit Card",
+    "EFT": "Bank Transfer",
+}
+
+
+def _donor_type(value: str | None) -> str | None:
+    code = parse_text(value)
+    if code is None:
+        return None
+    return _DONOR_TYPES.get(code.upper(), "Other")
+
+
+def _payment_method(value: str | None) -> str | None:
+    code = parse_text(value)
+    if code is None:
+        return None
+    return _PAYMENT_METHODS.get(code.upper(), code)
+
+
+@dataclass(frozen=True)
+class EntitySpec:
+    """How one DonorPerfect table is paged and mapped onto a DataBridge table.
+
+    Attributes:
+        source_table: DonorPerfect table (DP, DPGIFT, ...).
+        id_field: Monotonic numeric key used for keyset pagination.
+        target_table: DataBridge table the batches load into.
+        fields: DP field -> (target column, converter).
+        where: Extra filter appended to the paging query.
+    """
+
+    source_table: str
+    id_field: str
+    target_table: str
+    fields: dict[str, tuple[str, Callable[[str | None], Any]]]
+    where: str = ""
+
+    @property
+    def target_columns(self) -> list[str]:
+        return [target for target, _ in self.fields.values()]
+
+    @property
+    def key_column(self) -> str:
+        return self.fields[self.id_field][0]
+
+    def page_query(self, after_id: int, page_size: int) -> str:
+        """Dynamic SELECT for the page of records with id > after_id."""
+        extra = f" AND {self.where}" if self.where else ""
+        return (
+            f"SELECT TOP {int(page_size)} {', '.join(self.fields)} "
+            f"FROM {self.source_table} "
+            f"WHERE {self.id_field} > {int(after_id)}{extra} "
+            f"ORDER BY {self.id_field}"
+        )
+
+    def convert(self, record: dict[str, str | None]) -> dict[str, Any]:
+        """Convert a raw record (all strings) into typed target columns."""
+        return {target: fn(record.get(src)) for src, (target, fn) in self.fields.items()}
+
+
+DONORS = EntitySpec(
+    source_table="DP",
+    id_field="donor_id",
+    target_table="donors",
+    fields={
+        "donor_id": ("donor_id", parse_int),
+        "first_name": ("first_name", parse_text),
+        "last_name": ("last_name", parse_text),
+        "email": ("email", parse_text),
+        "home_phone": ("phone", parse_text),
+        "address": ("address", parse_text),
+        "city": ("city", parse_text),
+        "state": ("state", parse_text),
+        "zip": ("zip_code", parse_text),
+        "donor_type": ("donor_type", _donor_type),
+    },
+)
+
+# Only real money: gifts (G) and main split gifts (M); pledges and soft credits are skipped.
+GIFTS = EntitySpec(
+    source_table="DPGIFT",
+    id_field="gift_id",
+    target_table="donations",
+    fields={
+        "gift_id": ("donation_id", parse_int),
+        "donor_id": ("donor_id", parse_int),
+        "amount": ("amount", parse_money),
+        "gift_date": ("donation_date", parse_date),
+        "gift_type": ("payment_method", _payment_method),
+    },
+    where="record_type IN ('G', 'M')",
+)
+
+ENTITIES: dict[str, EntitySpec] = {"donors": DONORS, "gifts": GIFTS}
+
+
+# --- Streaming XML parsing ---
+
+def iter_records(source: IO[bytes]) -> Iterator[dict[str, str | None]]:
+    """Incrementally parse ``<record><field name=... value=.../></record>`` elements.
+
+    Each record is yielded as soon as its closing tag is read; the element and
+    everything already processed under the root are cleared afterwards, so
+    memory use does not grow with the size of the response.
+
+    Args:
+        source: Binary file-like object (HTTP response, open file, BytesIO).
+
+    Returns:
+        Iterator of dicts mapping field name -> raw string value ('' -> None).
+
+    Raises:
+        DonorPerfectError: If the response contains an ``<error>`` element or
+            is not well-formed XML.
+    """
+    root: ET.Element | None = None
+    try:
+        for event, elem in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag == "error":
+                message = (elem.text or "").strip() or elem.get("value") or "unknown error"
+                raise DonorPerfectError(f"DonorPerfect API error: {message}")
+            if elem.tag != "record":
+                continue
+            record: dict[str, str | None] = {}
+            for f in elem.iter("field"):
+                name = f.get("name") or f.get("id")
+                if name:
+                    value = f.get("value")
+                    record[name] = value if value != "" else None
+            elem.clear()
+            if root is not None:
+                root.clear()
+            yield record
+    except ET.ParseError as e:
+        raise DonorPerfectError(f"Malformed XML response: {e}") from e
+
+
+# --- HTTP client ---
+
+class DonorPerfectClient:
+    """Minimal XML API client that streams responses instead of buffering them."""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout: float = 60.0,
+    ) -> None:
+        if not api_key:
+            raise ValueError("DonorPerfect API key is required")
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls) -> "DonorPerfectClient":
+        """Build a client from DONORPERFECT_API_KEY / DONORPERFECT_BASE_URL."""
+        return cls(
+            api_key=os.getenv("DONORPERFECT_API_KEY", "").strip(),
+            base_url=os.getenv("DONORPERFECT_BASE_URL", DEFAULT_BASE_URL).strip() or DEFAULT_BASE_URL,
+        )
+
+    def build_url(self, action: str, params: str | None = None) -> str:
+        """Build a request URL; parameters are URL-encoded, the API key is not."""
+        url = f"{self.base_url}?apikey={self.api_key}&action={urllib.parse.quote(action, safe='')}"
+        if params:
+            url += f"&params={urllib.parse.quote(params, safe='')}"
+        return url
+
+    def stream(self, action: str, params: str | None = None) -> Iterator[dict[str, str | None]]:
+        """Run one API action and stream its records.
+
+        Raises:
+            RetryableError: On HTTP 429 or 5xx, and on network failures.
+            DonorPerfectError: On any other HTTP error or an error document.
+        """
+        # Messages leave out the URL: it carries the API key.
+        try:
+            with urllib.request.urlopen(self.build_url(action, params), timeout=self.timeout) as resp:
+                yield from iter_records(resp)
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                retry_after = e.headers.get("Retry-After") if e.headers else None
+                raise RetryableError(f"DonorPerfect HTTP {e.code}", float(retry_after) if retry_after else None) from e
+            raise DonorPerfectError(f"DonorPerfect request failed with HTTP {e.code}") from e
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise RetryableError(f"DonorPerfect request failed: {getattr(e, 'reason', e)}") from e
+
+    def paginate(self, spec: EntitySpec, page_size: int = 500) -> Iterator[dict[str, Any]]:
+        """Stream every record of an entity as typed dicts, one page at a time.
+
+        Pagination stops when a page returns fewer than page_size records.
+        """
+        after_id = 0
+        while True:
+            count = 0
+            for raw in self.stream(spec.page_query(after_id, page_size)):
+                row = spec.convert(raw)
+                key = row[spec.key_column]
+                if key is None:
+                    raise DonorPerfectError(f"{spec.source_table} record without {spec.id_field}")
+                after_id = max(after_id, key)
+                count += 1
+                yield row
+            if count < page_size:
+                return
+
+
+def iter_batches(
+    client: DonorPerfectClient,
+    entity: str,
+    page_size: int = 500,
+    batch_size: int = 1000,
+) -> Iterator[ColumnBatch]:
+    """Stream one entity ("donors" or "gifts") as typed column batches."""
+    spec = ENTITIES[entity]
+    return batch_records(
+        spec.target_table,
+        client.paginate(spec, page_size=page_size),
+        spec.target_columns,
+        batch_size=batch_size,
+    )
+
+
+@register
+class DonorPerfectConnector(Connector):
+    """Runtime plugin for one DonorPerfect entity.
+
+    The cursor is the last id seen; ``fetch_page`` reads one keyset page
+    (bounded by page_size) with the streaming parser.
+    """
+
+    name = "donorperfect"
+
+    def __init__(self, client: DonorPerfectClient, entity: str = "donors", page_size: int = 500) -> None:
+        self.client = client
+        self.spec = ENTITIES[entity]
+        self.page_size = page_size
+        self.target_table = self.spec.target_table
+        self.columns = self.spec.target_columns
+        self.key = [self.spec.key_column]
+
+    def initial_cursor(self) -> int:
+        return 0
+
+    def fetch_page(self, cursor: int) -> tuple[list[dict[str, str | None]], int | None]:
+        page = list(self.client.stream(self.spec.page_query(cursor, self.page_size)))
+        if len(page) < self.page_size:
+            return page, None
+        last = parse_int(page[-1].get(self.spec.id_field))
+        if last is None:
+            raise DonorPerfectError(f"{self.spec.source_table} record without {self.spec.id_field}")
+        return page, last
+
+    def parse(self, page: list[dict[str, str | None]]) -> list[dict[str, str | None]]:
+        return page
+
+    def transform(self, record: dict[str, str | None]) -> dict[str, Any]:
+        return self.spec.convert(record)
+
+
+def sync_to_database(
+    conn,
+    client: DonorPerfectClient,
+    entities: tuple[str, ...] = ("donors", "gifts"),
+    page_size: int = 500,
+    batch_size: int = 1000,
+    connect: Callable[[], Any] | None = None,
+) -> dict[str, int]:
+    """Pull DonorPerfect entities and upsert them into Postgres.
+
+    Donors are loaded before gifts so donation foreign keys resolve. Each
+    entity runs through the connector runtime, so a slow database throttles
+    fetching and failed requests are retried with jitter. Afterwards the
+    dashboard aggregates built from the tables that received rows are
+    rebuilt (``src.aggregates``).
+
+    Args:
+        conn: Open psycopg2 connection; open it with ``instrumented=False``
+            so bulk upserts are not timed into query_log.
+        client: DonorPerfect client.
+        entities: Entity names from ENTITIES, in load order.
+        page_size: Records per API request.
+        batch_size: Rows per COPY.
+        connect: Opens a replacement connection if ``conn`` drops mid-sync,
+            so the failed batch is retried on it (e.g.
+            ``lambda: get_connection(instrumented=False)``).
+
+    Returns:
+        Dict of entity -> rows loaded.
+    """
+    loader = postgres_loader(conn, connect)
+    loaded: dict[str, int] = {}
+    for entity in entities:
+        pipeline = Pipeline(DonorPerfectConnector(client, entity, page_size), loader, batch_size=batch_size)
+        loaded[entity] = pipeline.run().rows_loaded
+    refresh_aggregates(loader.conn, [ENTITIES[e].target_table for e in entities if loaded[e]])
+    return loaded
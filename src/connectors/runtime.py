@@ -0,0 +1,403 @@
+"""Generic connector runtime: plugin interface, retry, rate limiting, backpressure.
+
+Every integration implements the Connector interface (page-oriented fetch,
+parse, transform). The Pipeline runs fetch -> parse -> transform -> load as
+four threads connected by bounded queues: when the database is slow the load
+queue fills, upstream ``put`` calls block, and fetching pauses instead of
+buffering pages in memory. Each stage records throughput metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import queue
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+import psycopg2
+
+from src.bulk_loader import ColumnBatch, batch_records, upsert_batch
+from src.watermarks import bump_watermarks
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class RetryableError(Exception):
+    """A transient failure (throttling, 5xx, network) worth retrying.
+
+    Args:
+        message: Error description.
+        retry_after: Server-requested delay in seconds, if any.
+    """
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter.
+
+    Attributes:
+        max_attempts: Total attempts including the first call.
+        base_delay: Backoff base in seconds.
+        max_delay: Upper bound for a single delay.
+        retry_on: Exception types that trigger a retry. Connectors raise
+            RetryableError for transient failures (429, 5xx, network); other
+            errors, including permanent 4xx HTTP errors, are not retried.
+    """
+
+    max_attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    retry_on: tuple[type[BaseException], ...] = (RetryableError,)
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Seconds to wait before retry number ``attempt`` (0-based)."""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Call fn, retrying retryable failures; re-raises the last error."""
+        for attempt in range(self.max_attempts):
+            try:
+                return fn(*args, **kwargs)
+            except self.retry_on as e:
+                if attempt == self.max_attempts - 1:
+                    raise
+                wait = self.delay(attempt, getattr(e, "retry_after", None))
+                logger.warning("Retrying %s after %.2fs (%s)", getattr(fn, "__name__", fn), wait, e)
+                time.sleep(wait)
+        raise RuntimeError("unreachable")
+
+
+class TokenBucket:
+    """Token-bucket rate limiter usable from threads and from asyncio.
+
+    Allows bursts of up to ``capacity`` requests, refilled continuously at
+    ``rate`` tokens per second.
+    """
+
+    def __init__(self, rate: float, capacity: int | None = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = float(capacity if capacity is not None else max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token if available; otherwise return seconds until one is."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Block the calling thread until a token is available."""
+        while (wait := self._reserve()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait (without blocking the event loop) until a token is available."""
+        while (wait := self._reserve()) > 0:
+            await asyncio.sleep(wait)
+
+
+@dataclass
+class StageMetrics:
+    """Per-stage counters.
+
+    Attributes:
+        name: Stage name (fetch, parse, transform, load).
+        items_in: Items taken from the upstream queue.
+        items_out: Items produced downstream (pages, records, rows or loaded rows).
+        busy_seconds: Time spent doing the stage's own work.
+        blocked_seconds: Time spent waiting on a full downstream queue (backpressure).
+        errors: Exceptions raised (after retries).
+    """
+
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    busy_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+    errors: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Output items per busy second."""
+        return self.items_out / self.busy_seconds if self.busy_seconds else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "stage": self.name,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": round(self.busy_seconds, 4),
+            "blocked_seconds": round(self.blocked_seconds, 4),
+            "throughput_per_s": round(self.throughput, 1),
+            "errors": self.errors,
+        }
+
+
+class Connector(ABC):
+    """Plugin interface each integration implements.
+
+    Paging is cursor-based: ``fetch_page(cursor)`` returns a raw page and the
+    cursor for the next page (None when done), so the runtime can retry and
+    rate-limit each request independently.
+    """
+
+    name: str = ""
+    target_table: str = ""
+    columns: list[str] = []
+    key: list[str] = []
+
+    def initial_cursor(self) -> Any:
+        """Cursor for the first page (default None)."""
+        return None
+
+    @abstractmethod
+    def fetch_page(self, cursor: Any) -> tuple[Any, Any]:
+        """Fetch one raw page; return (page, next_cursor or None)."""
+
+    @abstractmethod
+    def parse(self, page: Any) -> Iterable[dict[str, Any]]:
+        """Split a raw page into raw records."""
+
+    def transform(self, record: dict[str, Any]) -> dict[str, Any] | None:
+        """Map a raw record onto target columns; return None to drop it."""
+        return record
+
+
+CONNECTORS: dict[str, type[Connector]] = {}
+
+
+def register(cls: type[Connector]) -> type[Connector]:
+    """Class decorator adding a connector to the registry under ``cls.name``."""
+    if not cls.name:
+        raise ValueError(f"{cls.__name__} must define a name")
+    CONNECTORS[cls.name] = cls
+    return cls
+
+
+class PostgresLoader:
+    """Loader that upserts each batch via COPY and commits it.
+
+    Connection-level failures (``OperationalError``) are rolled back while the
+    connection is still open and surfaced as RetryableError. A dropped
+    connection cannot be rolled back or reused, so the next attempt first
+    opens a new one through ``connect``; without ``connect`` the error is not
+    retried.
+
+    Attributes:
+        conn: Connection batches are loaded on (replaced after a drop).
+        connect: Zero-argument factory for a new connection, if any.
+    """
+
+    def __init__(self, conn, connect: Callable[[], Any] | None = None) -> None:
+        self.conn = conn
+        self.connect = connect
+
+    def __call__(self, batch: ColumnBatch, key: list[str]) -> int:
+        try:
+            if self.conn.closed and self.connect is not None:
+                self.conn = self.connect()
+            with self.conn.cursor() as cursor:
+                n = upsert_batch(cursor, batch, key=key)
+                bump_watermarks(cursor, [batch.table])
+            self.conn.commit()
+            return n
+        except psycopg2.OperationalError as e:
+            if not self.conn.closed:
+                self.conn.rollback()
+            elif self.connect is None:
+                raise
+            raise RetryableError(f"Load of {batch.table} failed: {e}") from e
+        except Exception:
+            if not self.conn.closed:
+                self.conn.rollback()
+            raise
+
+
+def postgres_loader(conn, connect: Callable[[], Any] | None = None) -> PostgresLoader:
+    """``PostgresLoader`` on ``conn``, reconnecting through ``connect`` after a drop."""
+    return PostgresLoader(conn, connect)
+
+
+@dataclass
+class PipelineResult:
+    """Outcome of a pipeline run."""
+
+    connector: str
+    rows_loaded: int
+    seconds: float
+    stages: list[StageMetrics] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "connector": self.connector,
+            "rows_loaded": self.rows_loaded,
+            "seconds": round(self.seconds, 4),
+            "stages": [s.as_dict() for s in self.stages],
+        }
+
+
+class Pipeline:
+    """Bounded producer/consumer pipeline for one connector.
+
+    Args:
+        connector: Connector plugin instance.
+        loader: Callable(batch, key) -> rows loaded (e.g. postgres_loader(conn)).
+        queue_size: Capacity of each inter-stage queue.
+        batch_size: Rows per ColumnBatch handed to the loader.
+        retry: Retry policy for fetch and load calls.
+        rate_limiter: Optional TokenBucket applied to fetch calls.
+    """
+
+    def __init__(
+        self,
+        connector: Connector,
+        loader: Callable[[ColumnBatch, list[str]], int],
+        queue_size: int = 4,
+        batch_size: int = 1000,
+        retry: RetryPolicy | None = None,
+        rate_limiter: TokenBucket | None = None,
+    ) -> None:
+        self.connector = connector
+        self.loader = loader
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.retry = retry or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.metrics = {n: StageMetrics(n) for n in ("fetch", "parse", "transform", "load")}
+        self._stop = threading.Event()
+        self._errors: list[BaseException] = []
+
+    # --- queue helpers (stop-aware so a failed stage cannot deadlock the others) ---
+
+    def _put(self, q: queue.Queue, item: Any, stage: StageMetrics) -> bool:
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                stage.blocked_seconds += time.perf_counter() - start
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _run_stage(self, stage: StageMetrics, body: Callable[[], None], out: queue.Queue | None) -> None:
+        try:
+            body()
+        except BaseException as e:  # propagate any failure to run()
+            stage.errors += 1
+            self._errors.append(e)
+            self._stop.set()
+        finally:
+            if out is not None and not self._stop.is_set():
+                self._put(out, _DONE, stage)
+
+    # --- stages ---
+
+    def _fetch(self, out: queue.Queue) -> None:
+        m = self.metrics["fetch"]
+        cursor = self.connector.initial_cursor()
+        while not self._stop.is_set():
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            start = time.perf_counter()
+            page, cursor = self.retry.call(self.connector.fetch_page, cursor)
+            m.busy_seconds += time.perf_counter() - start
+            m.items_out += 1
+            if not self._put(out, page, m) or cursor is None:
+                return
+
+    def _parse(self, inp: queue.Queue, out: queue.Queue) -> None:
+        m = self.metrics["parse"]
+        while (page := self._get(inp)) is not _DONE:
+            m.items_in += 1
+            start = time.perf_counter()
+            records = list(self.connector.parse(page))
+            m.busy_seconds += time.perf_counter() - start
+            m.items_out += len(records)
+            if not self._put(out, records, m):
+                return
+
+    def _transform(self, inp: queue.Queue, out: queue.Queue) -> None:
+        m = self.metrics["transform"]
+
+        def rows():
+            while (records := self._get(inp)) is not _DONE:
+                m.items_in += len(records)
+                start = time.perf_counter()
+                converted = [r for r in map(self.connector.transform, records) if r is not None]
+                m.busy_seconds += time.perf_counter() - start
+                m.items_out += len(converted)
+                yield from converted
+
+        for batch in batch_records(self.connector.target_table, rows(), self.connector.columns, self.batch_size):
+            if not self._put(out, batch, m):
+                return
+
+    def _load(self, inp: queue.Queue) -> None:
+        m = self.metrics["load"]
+        while (batch := self._get(inp)) is not _DONE:
+            m.items_in += len(batch)
+            start = time.perf_counter()
+            m.items_out += self.retry.call(self.loader, batch, list(self.connector.key))
+            m.busy_seconds += time.perf_counter() - start
+
+    def run(self) -> PipelineResult:
+        """Run all stages to completion; re-raises the first stage failure."""
+        pages: queue.Queue = queue.Queue(self.queue_size)
+        records: queue.Queue = queue.Queue(self.queue_size)
+        batches: queue.Queue = queue.Queue(self.queue_size)
+        m = self.metrics
+        threads = [
+            threading.Thread(target=self._run_stage, args=(m["fetch"], lambda: self._fetch(pages), pages)),
+            threading.Thread(target=self._run_stage, args=(m["parse"], lambda: self._parse(pages, records), records)),
+            threading.Thread(target=self._run_stage, args=(m["transform"], lambda: self._transform(records, batches), batches)),
+            threading.Thread(target=self._run_stage, args=(m["load"], lambda: self._load(batches), None)),
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if self._errors:
+            raise self._errors[0]
+        result = PipelineResult(
+            connector=self.connector.name,
+            rows_loaded=m["load"].items_out,
+            seconds=time.perf_counter() - start,
+            stages=list(m.values()),
+        )
+        logger.info("Connector %s loaded %d rows in %.2fs", result.connector, result.rows_loaded, result.seconds)
+        return result
@@ -0,0 +1,185 @@
+"""Token budget for assistant prompts: history, summary, schema and docs.
+
+Every chat turn used to resend the whole conversation plus the full system
+context. ``ContextBudget`` caps the prompt instead:
+
+- The last ``recent_messages`` messages are kept verbatim (fewer if they
+  alone would take more than ``history_share`` of the budget).
+- Older messages are folded into a ``ConversationMemory``: one short line
+  per message, kept incrementally across turns and capped at
+  ``summary_tokens`` (oldest lines go first). Summaries are extractive, so
+  they cost no extra model call.
+- The system prompt gets what is left: doc sections are dropped from the
+  least relevant end, then the schema loses sample rows, then value
+  profiles, then trailing columns (``fit_schema_text``).
+
+Tokens are estimated at about 4 characters each; no tokenizer is needed.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.schema_inference import format_schema_for_prompt
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English and markdown (about 4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: dict[str, str]) -> int:
+    """Estimated tokens of a chat message, including ~4 tokens of role framing."""
+    return estimate_tokens(message["content"]) + 4
+
+
+@dataclass(frozen=True)
+class ContextBudget:
+    """Prompt limits for one chat turn.
+
+    Args:
+        max_tokens: Estimated prompt tokens (system + summary + history + message).
+        recent_messages: Most recent history messages kept verbatim.
+        history_share: Largest share of ``max_tokens`` verbatim history may use.
+        summary_tokens: Cap on the summary of older messages.
+    """
+
+    max_tokens: int = 8000
+    recent_messages: int = 6
+    history_share: float = 0.4
+    summary_tokens: int = 400
+
+    @classmethod
+    def from_env(cls) -> ContextBudget:
+        """Budget from ``ASSISTANT_CONTEXT_TOKENS`` (default 8000)."""
+        return cls(max_tokens=int(os.environ.get("ASSISTANT_CONTEXT_TOKENS", "8000")))
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def _gist(text: str, max_chars: int = 160) -> str:
+    """First sentence of a message on one line, cut at ``max_chars``."""
+    text = " ".join(text.split())
+    first = _SENTENCE_END.split(text, maxsplit=1)[0]
+    return first if len(first) <= max_chars else first[: max_chars - 3].rstrip() + "..."
+
+
+@dataclass
+class ConversationMemory:
+    """Rolling summary of messages that no longer fit in the prompt verbatim.
+
+    Keep one per conversation (e.g. in ``st.session_state``): each call to
+    ``fold`` only summarizes messages that aged out since the last call.
+    """
+
+    lines: list[str] = field(default_factory=list)
+    folded: int = 0
+    dropped: int = 0
+
+    def fold(self, history: list[dict[str, str]], keep_from: int, max_tokens: int) -> None:
+        """Summarize ``history[folded:keep_from]`` and trim to ``max_tokens``."""
+        if keep_from < self.folded:  # history was cleared or replaced
+            self.lines, self.folded, self.dropped = [], 0, 0
+        for message in history[self.folded:keep_from]:
+            self.lines.append(f"- {message['role']}: {_gist(message['content'])}")
+        self.folded = max(self.folded, keep_from)
+        while self.lines and estimate_tokens(self.text()) > max_tokens:
+            self.lines.pop(0)
+            self.dropped += 1
+
+    def text(self) -> str:
+        if not self.lines:
+            return ""
+        header = "Summary of earlier messages in this conversation"
+        if self.dropped:
+            header += f" ({self.dropped} oldest omitted)"
+        return header + ":\n" + "\n".join(self.lines)
+
+
+def split_history(history: list[dict[str, str]], budget: ContextBudget) -> int:
+    """Index of the first message kept verbatim; everything before it is summarized."""
+    limit = budget.max_tokens * budget.history_share
+    start = len(history)
+    used = 0
+    while start > 0 and len(history) - start < budget.recent_messages:
+        cost = message_tokens(history[start - 1])
+        if used + cost > limit:
+            break
+        used += cost
+        start -= 1
+    return start
+
+
+SCHEMA_LEVELS = ("full", "no sample rows", "no value profiles", "columns truncated")
+
+
+def schema_levels(schema: dict[str, Any]) -> Iterator[tuple[str, str]]:
+    """Schema prompt text at each untruncated ``SCHEMA_LEVELS`` entry, most detailed first.
+
+    Lazy, so a caller that stops at the first level that fits formats only that one.
+    """
+    yield format_schema_for_prompt(schema), SCHEMA_LEVELS[0]
+    reduced = {**schema, "sample": []}
+    yield format_schema_for_prompt(reduced), SCHEMA_LEVELS[1]
+    reduced["columns"] = [{k: v for k, v in c.items() if k != "profile"} for c in schema["columns"]]
+    yield format_schema_for_prompt(reduced), SCHEMA_LEVELS[2]
+
+
+def fit_schema_text(
+    schema: dict[str, Any], max_tokens: int, levels: Iterable[tuple[str, str]] | None = None
+) -> tuple[str, str]:
+    """Schema prompt text within ``max_tokens`` and the ``SCHEMA_LEVELS`` entry used.
+
+    ``levels`` are already formatted ``schema_levels`` (e.g. cached per schema).
+    """
+    for text, level in schema_levels(schema) if levels is None else levels:
+        if estimate_tokens(text) <= max_tokens:
+            return text, level
+    columns = [{k: v for k, v in c.items() if k != "profile"} for c in schema["columns"]]
+    reduced = {**schema, "sample": [], "columns": columns}
+    lo, hi = 0, len(columns)
+    while lo < hi:  # most leading columns that fit
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(format_schema_for_prompt({**reduced, "columns": columns[:mid]})) + 12 <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    text = format_schema_for_prompt({**reduced, "columns": columns[:lo]})
+    return text + f"\n(... {len(columns) - lo} more columns not shown)", SCHEMA_LEVELS[3]
+
+
+def fit_chunks(chunks: list, max_tokens: int) -> list:
+    """Leading ``chunks`` (most relevant first) whose rendered size fits ``max_tokens``."""
+    kept, used = [], 0
+    for chunk in chunks:
+        cost = estimate_tokens(f"### {chunk.source}: {chunk.heading}\n{chunk.text}\n")
+        if used + cost > max_tokens:
+            break
+        kept.append(chunk)
+        used += cost
+    return kept
+
+
+@dataclass(frozen=True)
+class PromptMetrics:
+    """Estimated prompt size of one chat turn and what was cut to fit."""
+
+    budget_tokens: int
+    system_tokens: int
+    summary_tokens: int
+    history_tokens: int
+    message_tokens: int
+    messages_verbatim: int
+    messages_summarized: int
+    doc_sections: int
+    doc_sections_dropped: int
+    schema_level: str
+
+    @property
+    def total_tokens(self) -> int:
+        return self.system_tokens + self.summary_tokens + self.history_tokens + self.message_tokens
@@ -0,0 +1,174 @@
+"""Dashboard result cache invalidated by data version instead of a TTL.
+
+``DataVersionWatcher`` tracks the sum of ``load_watermarks`` versions. It
+LISTENs on the ``data_changed`` channel (sent by ``bump_watermarks``) and
+also re-reads the version every ``poll_interval`` seconds, which covers
+writers that bypass the watermarks helper and lost LISTEN connections.
+
+``VersionedCache`` keeps query results tagged with the version they were
+read at. An entry stays valid until the version moves; when it does, every
+cached query is re-run once in a background thread and stale results keep
+being served until the fresh ones are in, so users do not wait on cold
+aggregations after a load.
+"""
+
+from __future__ import annotations
+
+import logging
+import select
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any
+
+from src.watermarks import DATA_CHANGED_CHANNEL, data_version
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedCache:
+    """LRU cache of query results keyed on a data version.
+
+    Args:
+        loader: Computes the value for a key (e.g. runs the SQL).
+        version_source: Returns the current data version, or None if unknown.
+            With an unknown version nothing is reused.
+        max_entries: Least recently used entries beyond this are dropped.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Hashable], Any],
+        version_source: Callable[[], int | None],
+        max_entries: int = 64,
+    ):
+        self.loader = loader
+        self.version_source = version_source
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[int | None, Any]] = OrderedDict()
+        self._refreshing: set[Hashable] = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> tuple[Any, bool]:
+        """Value for ``key`` and whether it came from the cache.
+
+        A stale entry is still returned while a background refresh of it is
+        running; otherwise stale or missing entries are loaded inline.
+        """
+        version = self.version_source()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                (version is not None and entry[0] == version) or key in self._refreshing
+            ):
+                self._entries.move_to_end(key)
+                return entry[1], True
+        return self._load(key, version), False
+
+    def _load(self, key: Hashable, version: int | None) -> Any:
+        # The version is read before the query, so a load that races with a
+        # write is tagged with the older version and re-read next time.
+        value = self.loader(key)
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def refresh(self, keys: Iterable[Hashable] | None = None) -> threading.Thread:
+        """Re-run ``keys`` (default: everything cached) in a background thread."""
+        with self._lock:
+            pending = [k for k in (list(self._entries) if keys is None else keys) if k not in self._refreshing]
+            self._refreshing.update(pending)
+        thread = threading.Thread(target=self._refresh, args=(pending,), daemon=True)
+        thread.start()
+        return thread
+
+    def _refresh(self, keys: list[Hashable]) -> None:
+        for key in keys:
+            try:
+                self._load(key, self.version_source())
+            except Exception as e:
+                logger.warning("Background refresh failed: %s", e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DataVersionWatcher:
+    """Follows the data version via LISTEN/NOTIFY with polling as a fallback.
+
+    Args:
+        connect: Opens a new psycopg2 connection (used only by the watcher).
+        poll_interval: Seconds between version reads when no notification arrives.
+        on_change: Called with the new version whenever it changes.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        poll_interval: float = 30.0,
+        on_change: Callable[[int], None] | None = None,
+    ):
+        self.connect = connect
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self.version: int | None = None
+        self.ready = threading.Event()  # set after the first read attempt
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def current(self) -> int | None:
+        return self.version
+
+    def check(self, conn) -> int | None:
+        """Read the version on ``conn``; fires ``on_change`` if it moved."""
+        with conn.cursor() as cursor:
+            version = data_version(cursor)
+        previous, self.version = self.version, version
+        if previous is not None and version != previous and self.on_change:
+            self.on_change(version)
+        return version
+
+    def start(self) -> DataVersionWatcher:
+        """Start watching in a daemon thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self.connect()
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {DATA_CHANGED_CHANNEL}")
+                self.check(conn)
+                self.ready.set()
+                while not self._stop.is_set():
+                    # Wake on a notification or after poll_interval, then re-read either way.
+                    select.select([conn], [], [], self.poll_interval)
+                    conn.poll()
+                    conn.notifies.clear()
+                    self.check(conn)
+            except Exception as e:
+                logger.warning("Data version watcher error (retrying): %s", e)
+                self.version = None
+                self.ready.set()
+                self._stop.wait(self.poll_interval)
+            finally:
+                if conn is not None:
+                    conn.close()
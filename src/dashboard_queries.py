@@ -0,0 +1,285 @@
+"""SQL behind the Streamlit dashboard, shared with the benchmark harness.
+
+Every query is built from a ``DashboardFilters`` and returned as
+``(sql, params)`` so filters run in Postgres, not pandas. Only the joins a
+filter needs are added, and each query returns a bounded number of rows:
+KPI totals are a single row, the trend one row per month, campaigns at most
+``CAMPAIGN_LIMIT`` rows and donors one keyset page at a time.
+
+``refresh_donor_totals`` rebuilds ``donor_totals`` (lifetime totals per
+donor) after each load, so top-donor pages without a date or campaign filter
+read a few index entries instead of aggregating every donation.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+
+from src.watermarks import bump_watermarks
+
+CAMPAIGN_LIMIT = 200
+DONOR_PAGE_SIZE = 25
+DONOR_TOTALS_TABLES = ("donor_totals",)
+
+DONOR_TOTALS_DDL = """
+CREATE TABLE IF NOT EXISTS donor_totals (
+    donor_id INTEGER PRIMARY KEY,
+    donation_count INTEGER NOT NULL,
+    total_given NUMERIC(14, 2),
+    first_gift_date DATE,
+    last_gift_date DATE
+);
+CREATE INDEX IF NOT EXISTS idx_donor_totals_total_given ON donor_totals(total_given, donor_id);
+"""
+
+_REFRESH_DONOR_TOTALS_SQL = """
+INSERT INTO donor_totals (donor_id, donation_count, total_given, first_gift_date, last_gift_date)
+SELECT donor_id, COUNT(*), SUM(amount), MIN(donation_date), MAX(donation_date)
+FROM donations
+WHERE donor_id IS NOT NULL
+GROUP BY donor_id
+"""
+
+
+@dataclass(frozen=True)
+class DashboardFilters:
+    """Dashboard filter state; empty tuples and None mean "no filter".
+
+    Tuples (not lists) keep the filters hashable for caching and are
+    adapted by psycopg2 for ``IN %(name)s``.
+    """
+
+    start_date: date | None = None
+    end_date: date | None = None
+    campaign_types: tuple[str, ...] = ()
+    donor_types: tuple[str, ...] = ()
+    portfolio_holder_ids: tuple[int, ...] = ()
+
+
+def filtered_donations(filters: DashboardFilters) -> tuple[str, dict[str, object]]:
+    """CTE body selecting the donations that pass the filters.
+
+    Returns:
+        (SELECT statement, params) exposing donation_id, donor_id,
+        campaign_id, amount and donation_date.
+    """
+    joins: list[str] = []
+    where: list[str] = []
+    params: dict[str, object] = {}
+    if filters.start_date is not None:
+        where.append("dn.donation_date >= %(start_date)s")
+        params["start_date"] = filters.start_date
+    if filters.end_date is not None:
+        where.append("dn.donation_date <= %(end_date)s")
+        params["end_date"] = filters.end_date
+    if filters.campaign_types:
+        joins.append("JOIN campaigns c ON c.campaign_id = dn.campaign_id")
+        where.append("c.campaign_type IN %(campaign_types)s")
+        params["campaign_types"] = filters.campaign_types
+    if filters.donor_types:
+        joins.append("JOIN donors d ON d.donor_id = dn.donor_id")
+        where.append("d.donor_type IN %(donor_types)s")
+        params["donor_types"] = filters.donor_types
+    if filters.portfolio_holder_ids:
+        where.append(
+            "EXISTS (SELECT 1 FROM portfolio_assignments pa "
+            "WHERE pa.donor_id = dn.donor_id AND pa.portfolio_holder_id IN %(portfolio_holder_ids)s)"
+        )
+        params["portfolio_holder_ids"] = filters.portfolio_holder_ids
+    sql = "SELECT dn.donation_id, dn.donor_id, dn.campaign_id, dn.amount, dn.donation_date FROM donations dn"
+    if joins:
+        sql += " " + " ".join(joins)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql, params
+
+
+def kpi_query(filters: DashboardFilters) -> tuple[str, dict[str, object]]:
+    """One row: total_raised, donation_count, unique_donors, avg_donation."""
+    base, params = filtered_donations(filters)
+    return f"""
+WITH f AS ({base})
+SELECT
+  COALESCE(SUM(amount), 0)::numeric(14, 2) AS total_raised,
+  COUNT(*)::int AS donation_count,
+  COUNT(DISTINCT donor_id)::int AS unique_donors,
+  COALESCE(AVG(amount), 0)::numeric(14, 2) AS avg_donation
+FROM f;
+""", params
+
+
+def monthly_giving_query(filters: DashboardFilters) -> tuple[str, dict[str, object]]:
+    """One row per month with donations (same columns as vw_monthly_giving)."""
+    base, params = filtered_donations(filters)
+    return f"""
+WITH f AS ({base})
+SELECT
+  DATE_TRUNC('month', donation_date)::date AS month,
+  COUNT(*)::int AS donation_count,
+  COUNT(DISTINCT donor_id)::int AS unique_donors,
+  SUM(amount)::numeric(14, 2) AS total_amount,
+  AVG(amount)::numeric(14, 2) AS avg_amount
+FROM f
+GROUP BY 1
+ORDER BY 1;
+""", params
+
+
+def campaign_performance_query(filters: DashboardFilters) -> tuple[str, dict[str, object]]:
+    """Raised vs goal per campaign, counting only donations that pass the filters."""
+    base, params = filtered_donations(filters)
+    where = ""
+    if filters.campaign_types:
+        where = "WHERE c.campaign_type IN %(campaign_types)s"
+    params = {**params, "campaign_limit": CAMPAIGN_LIMIT}
+    return f"""
+WITH f AS ({base}),
+totals AS (
+  SELECT campaign_id, COUNT(*) AS donation_count, COUNT(DISTINCT donor_id) AS unique_donors, SUM(amount) AS total_raised
+  FROM f
+  GROUP BY campaign_id
+)
+SELECT
+  c.campaign_id,
+  c.campaign_name,
+  c.start_date,
+  c.end_date,
+  c.goal_amount,
+  c.campaign_type,
+  COALESCE(t.donation_count, 0)::int AS donation_count,
+  COALESCE(t.unique_donors, 0)::int AS unique_donors,
+  COALESCE(t.total_raised, 0)::numeric(14, 2) AS total_raised,
+  (COALESCE(t.total_raised, 0) - COALESCE(c.goal_amount, 0))::numeric(14, 2) AS raised_minus_goal
+FROM campaigns c
+LEFT JOIN totals t ON t.campaign_id = c.campaign_id
+{where}
+ORDER BY total_raised DESC, c.campaign_id
+LIMIT %(campaign_limit)s;
+""", params
+
+
+def top_donors_query(
+    filters: DashboardFilters,
+    after: tuple[object, int] | None = None,
+    page_size: int = DONOR_PAGE_SIZE,
+) -> tuple[str, dict[str, object]]:
+    """One page of donors by total given (descending), keyset-paginated.
+
+    Without a date or campaign filter the page is read from ``donor_totals``
+    by walking ``idx_donor_totals_total_given``, so every page costs the same
+    however many donations there are. Date and campaign filters change each
+    donor's total, so those pages still aggregate the filtered donations.
+
+    Args:
+        filters: Dashboard filters.
+        after: (total_given, donor_id) of the last row of the previous page.
+        page_size: Rows per page.
+    """
+    if filters.start_date is None and filters.end_date is None and not filters.campaign_types:
+        return _top_donors_from_totals(filters, after, page_size)
+    base, params = filtered_donations(filters)
+    params = {**params, "page_size": page_size}
+    keyset = ""
+    if after is not None:
+        keyset = "WHERE (t.total_given, t.donor_id) < (%(after_total)s, %(after_id)s)"
+        params["after_total"], params["after_id"] = after
+    return f"""
+WITH f AS ({base}),
+t AS (
+  SELECT
+    donor_id,
+    COUNT(*)::int AS donation_count,
+    SUM(amount)::numeric(14, 2) AS total_given,
+    MIN(donation_date)::date AS first_gift_date,
+    MAX(donation_date)::date AS last_gift_date
+  FROM f
+  GROUP BY donor_id
+)
+SELECT t.donor_id, d.first_name, d.last_name, t.donation_count, t.total_given, t.first_gift_date, t.last_gift_date
+FROM t
+JOIN donors d ON d.donor_id = t.donor_id
+{keyset}
+ORDER BY t.total_given DESC, t.donor_id DESC
+LIMIT %(page_size)s;
+""", params
+
+
+def _top_donors_from_totals(
+    filters: DashboardFilters,
+    after: tuple[object, int] | None,
+    page_size: int,
+) -> tuple[str, dict[str, object]]:
+    where: list[str] = []
+    params: dict[str, object] = {"page_size": page_size}
+    if filters.donor_types:
+        where.append("d.donor_type IN %(donor_types)s")
+        params["donor_types"] = filters.donor_types
+    if filters.portfolio_holder_ids:
+        where.append(
+            "EXISTS (SELECT 1 FROM portfolio_assignments pa "
+            "WHERE pa.donor_id = t.donor_id AND pa.portfolio_holder_id IN %(portfolio_holder_ids)s)"
+        )
+        params["portfolio_holder_ids"] = filters.portfolio_holder_ids
+    if after is not None:
+        where.append("(t.total_given, t.donor_id) < (%(after_total)s, %(after_id)s)")
+        params["after_total"], params["after_id"] = after
+    condition = "WHERE " + " AND ".join(where) if where else ""
+    return f"""
+SELECT t.donor_id, d.first_name, d.last_name, t.donation_count, t.total_given, t.first_gift_date, t.last_gift_date
+FROM donor_totals t
+JOIN donors d ON d.donor_id = t.donor_id
+{condition}
+ORDER BY t.total_given DESC, t.donor_id DESC
+LIMIT %(page_size)s;
+""", params
+
+
+def ensure_donor_totals_schema(cursor) -> None:
+    """Create the donor_totals table (safe to run repeatedly)."""
+    cursor.execute(DONOR_TOTALS_DDL)
+
+
+def refresh_donor_totals(conn) -> int:
+    """Rebuild donor_totals in one transaction and bump its watermark.
+
+    Args:
+        conn: Open psycopg2 connection.
+
+    Returns:
+        Number of donors written.
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM donor_totals")
+            cursor.execute(_REFRESH_DONOR_TOTALS_SQL)
+            donors = cursor.rowcount
+            bump_watermarks(cursor, DONOR_TOTALS_TABLES)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return donors
+
+
+FILTER_OPTIONS_SQL = """
+SELECT 'campaign_type' AS kind, campaign_type AS value, NULL AS label FROM campaigns WHERE campaign_type IS NOT NULL GROUP BY 2
+UNION ALL
+SELECT 'donor_type', donor_type, NULL FROM donors WHERE donor_type IS NOT NULL GROUP BY 2
+UNION ALL
+SELECT 'portfolio_holder', portfolio_holder_id::text, name FROM portfolio_holders
+ORDER BY 1, 3, 2;
+"""
+
+# Index-backed (idx_donations_date): bounds for the date filter widget.
+DATE_BOUNDS_SQL = "SELECT MIN(donation_date) AS first_date, MAX(donation_date) AS last_date FROM donations;"
+
+# Every query the dashboard issues on first load (no filters), by name.
+DASHBOARD_QUERIES: dict[str, tuple[str, dict[str, object]]] = {
+    "filter_options": (FILTER_OPTIONS_SQL, {}),
+    "date_bounds": (DATE_BOUNDS_SQL, {}),
+    "kpis": kpi_query(DashboardFilters()),
+    "monthly_giving": monthly_giving_query(DashboardFilters()),
+    "campaign_performance": campaign_performance_query(DashboardFilters()),
+    "top_donors": top_donors_query(DashboardFilters()),
+}
@@ -4,9 +4,13 @@ Reusable across scripts and testable.
 """
 from faker import Faker
 from datetime import datetime
+from pathlib import Path
 import random
 from typing import Dict, List, Optional
 
+import numpy as np
+import pandas as pd
+
 fake = Faker()
 
 def generate_donor(donor_id: int, seed: int = None) -> Dict:
@@ -207,4 +211,117 @@ def validate_donation(donation: Dict) -> bool:
     if 'campaign_id' in donation and donation['campaign_id'] is not None and donation['campaign_id'] <= 0:
         return False
     
-    return True
\ No newline at end of file
+    return True
+
+DONOR_TYPES = ['Individual', 'Foundation', 'Business', 'Other']
+PAYMENT_METHODS = ['Credit Card', 'Check', 'Bank Transfer', 'Cash']
+CAMPAIGN_TYPES = ['Direct Mail', 'Email', 'Event', 'Social Media']
+
+
+def generate_bulk_dataset(
+    output_dir,
+    n_donors: int,
+    n_donations: int,
+    n_campaigns: int = 10,
+    n_holders: int = 3,
+    seed: int = 42,
+    chunk_size: int = 500_000,
+) -> Dict[str, int]:
+    """
+    Generate a large synthetic dataset with numpy and write it as CSV.
+    
+    Same files and columns as generate_sample_data.py, but built column-wise
+    (names drawn from a small Faker pool) and written in chunks, so millions
+    of donations can be produced in seconds with bounded memory.
+    
+    Args:
+        output_dir: Directory for donors.csv, campaigns.csv, donations.csv,
+            portfolio_holders.csv and portfolio_assignments.csv
+        n_donors: Number of donors
+        n_donations: Number of donations (~10% without a campaign)
+        n_campaigns: Number of campaigns
+        n_holders: Number of portfolio holders (~24% of donors are assigned)
+        seed: Random seed for reproducibility
+        chunk_size: Donations generated and written per chunk
+        
+    Returns:
+        Dictionary of row counts per file (without extension)
+    """
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    Faker.seed(seed)
+    first_names = np.array([fake.first_name() for _ in range(500)])
+    last_names = np.array([fake.last_name() for _ in range(500)])
+    cities = np.array([fake.city() for _ in range(200)])
+    states = np.array([fake.state_abbr() for _ in range(50)])
+    today = np.datetime64(datetime.now().date())
+    
+    def _dates(n, max_days_ago, min_days_ago=0):
+        return today - rng.integers(min_days_ago, max_days_ago + 1, n).astype('timedelta64[D]')
+    
+    donor_ids = np.arange(1, n_donors + 1)
+    first = first_names[rng.integers(0, len(first_names), n_donors)]
+    last = last_names[rng.integers(0, len(last_names), n_donors)]
+    donors = pd.DataFrame({
+        'donor_id': donor_ids,
+        'first_name': first,
+        'last_name': last,
+        'email': pd.Series(first).str.lower() + '.' + pd.Series(last).str.lower() + donor_ids.astype(str) + '@example.org',
+        'phone': [f"555-{a:03d}-{b:04d}" for a, b in zip(rng.integers(0, 1000, n_donors), rng.integers(0, 10000, n_donors))],
+        'address': [f"{n} Main St" for n in rng.integers(1, 9999, n_donors)],
+        'city': cities[rng.integers(0, len(cities), n_donors)],
+        'state': states[rng.integers(0, len(states), n_donors)],
+        'zip_code': [f"{z:05d}" for z in rng.integers(1000, 99999, n_donors)],
+        'created_date': _dates(n_donors, 5 * 365),
+        'donor_type': rng.choice(DONOR_TYPES, n_donors),
+    })
+    donors.to_csv(out / 'donors.csv', index=False)
+    
+    campaigns = pd.DataFrame({
+        'campaign_id': np.arange(1, n_campaigns + 1),
+        'campaign_name': [f"Campaign {i}" for i in range(1, n_campaigns + 1)],
+        'start_date': _dates(n_campaigns, 2 * 365, 365),
+        'end_date': _dates(n_campaigns, 365),
+        'goal_amount': rng.integers(10000, 100001, n_campaigns),
+        'campaign_type': rng.choice(CAMPAIGN_TYPES, n_campaigns),
+    })
+    campaigns.to_csv(out / 'campaigns.csv', index=False)
+    
+    for start in range(0, n_donations, chunk_size):
+        n = min(chunk_size, n_donations - start)
+        campaign_id = rng.integers(1, n_campaigns + 1, n).astype(float)
+        campaign_id[rng.random(n) < 0.10] = np.nan
+        pd.DataFrame({
+            'donation_id': np.arange(start + 1, start + n + 1),
+            'donor_id': rng.integers(1, n_donors + 1, n),
+            'amount': rng.uniform(10, 5000, n).round(2),
+            'donation_date': _dates(n, 3 * 365),
+            'campaign_id': pd.array(campaign_id, dtype='Int64'),
+            'payment_method': rng.choice(PAYMENT_METHODS, n),
+            'is_recurring': rng.random(n) < 0.5,
+        }).to_csv(out / 'donations.csv', index=False, mode='w' if start == 0 else 'a', header=start == 0)
+    
+    holders = pd.DataFrame({
+        'portfolio_holder_id': np.arange(1, n_holders + 1),
+        'name': [f"{fake.first_name()} {fake.last_name()}" for _ in range(n_holders)],
+        'email': [fake.email() for _ in range(n_holders)],
+    })
+    holders.to_csv(out / 'portfolio_holders.csv', index=False)
+    
+    assigned = rng.permutation(donor_ids)[: int(n_donors * 0.24)]
+    assignments = pd.DataFrame({
+        'assignment_id': np.arange(1, len(assigned) + 1),
+        'donor_id': assigned,
+        'portfolio_holder_id': rng.integers(1, n_holders + 1, len(assigned)),
+        'assigned_date': _dates(len(assigned), 2 * 365),
+    })
+    assignments.to_csv(out / 'portfolio_assignments.csv', index=False)
+    
+    return {
+        'donors': n_donors,
+        'campaigns': n_campaigns,
+        'donations': n_donations,
+        'portfolio_holders': n_holders,
+        'portfolio_assignments': len(assignments),
+    }
@@ -0,0 +1,260 @@
+"""Declarative data quality rules, compiled to one aggregate query per table.
+
+Rules live in ``config/data_quality.toml``. Each rule becomes one aggregate
+expression that counts failing rows, and all rules on the same table are
+selected together from a single scan (orphan rules add a ``NOT EXISTS``
+probe of the referenced table, so a non-unique reference column cannot
+duplicate rows and inflate the other rules' counts). Results are appended to ``dq_results`` with the query
+timing, so the table doubles as a quality history.
+
+Rule types:
+    not_null   column must not be NULL
+    range      column within ``min`` / ``max`` (either may be omitted)
+    unique     no duplicate values of ``column`` (or the ``columns`` tuple)
+    orphan     non-NULL ``column`` must exist in ``references`` ("table.column")
+    freshness  MAX(``column``) no older than ``max_age_days``
+"""
+
+from __future__ import annotations
+
+import time
+import tomllib
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+
+from psycopg2.extras import execute_values
+
+from src.row_hash import ident
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "config" / "data_quality.toml"
+
+RULE_TYPES = ("not_null", "range", "unique", "orphan", "freshness")
+SEVERITIES = ("error", "warn")
+
+DQ_RESULTS_DDL = """
+CREATE TABLE IF NOT EXISTS dq_results (
+    result_id BIGSERIAL PRIMARY KEY,
+    run_id UUID NOT NULL,
+    checked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    table_name VARCHAR(100) NOT NULL,
+    rule_name VARCHAR(100) NOT NULL,
+    rule_type VARCHAR(20) NOT NULL,
+    severity VARCHAR(10) NOT NULL,
+    rows_checked BIGINT NOT NULL,
+    failed_rows BIGINT NOT NULL,
+    passed BOOLEAN NOT NULL,
+    query_ms NUMERIC(12, 3) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dq_results_rule_time ON dq_results(rule_name, checked_at);
+"""
+
+
+class DataQualityError(ValueError):
+    """Raised for invalid rule definitions."""
+
+
+@dataclass(frozen=True)
+class Rule:
+    """One data quality rule.
+
+    Attributes:
+        name: Unique rule name (recorded in dq_results).
+        table: Table the rule checks.
+        type: One of RULE_TYPES.
+        columns: Checked column(s); only ``unique`` accepts more than one.
+        references: "table.column" for orphan rules.
+        min: Inclusive lower bound for range rules.
+        max: Inclusive upper bound for range rules.
+        max_age_days: Allowed staleness for freshness rules.
+        severity: "error" fails the load, "warn" is only reported.
+        max_failures: Failing rows tolerated before the rule fails.
+    """
+
+    name: str
+    table: str
+    type: str
+    columns: tuple[str, ...]
+    references: str | None = None
+    min: int | float | date | datetime | None = None
+    max: int | float | date | datetime | None = None
+    max_age_days: int | None = None
+    severity: str = "error"
+    max_failures: int = 0
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> Rule:
+        """Build and validate a rule from one ``[[rules]]`` TOML table."""
+        raw = dict(raw)
+        name = raw.pop("name", None)
+        if not name:
+            raise DataQualityError(f"Rule without a name: {raw}")
+        columns = raw.pop("columns", None) or ([raw.pop("column")] if "column" in raw else [])
+        try:
+            rule = cls(name=name, columns=tuple(columns), **raw)
+        except TypeError as e:
+            raise DataQualityError(f"Rule {name!r}: {e}") from e
+        rule.validate()
+        return rule
+
+    def validate(self) -> None:
+        """Check identifiers and the options each rule type needs."""
+        problems = []
+        if self.type not in RULE_TYPES:
+            problems.append(f"unknown type {self.type!r}")
+        if self.severity not in SEVERITIES:
+            problems.append(f"severity must be one of {SEVERITIES}")
+        if not self.columns:
+            problems.append("needs a column")
+        if len(self.columns) > 1 and self.type != "unique":
+            problems.append("only unique rules accept several columns")
+        if self.type == "range" and self.min is None and self.max is None:
+            problems.append("range needs min and/or max")
+        if self.type == "orphan" and (not self.references or self.references.count(".") != 1):
+            problems.append('orphan needs references = "table.column"')
+        if self.type == "freshness" and not isinstance(self.max_age_days, int):
+            problems.append("freshness needs an integer max_age_days")
+        try:
+            for name in (self.table, *self.columns, *(self.references or "").split(".")):
+                if name:
+                    ident(name)
+        except ValueError as e:
+            problems.append(str(e))
+        if problems:
+            raise DataQualityError(f"Rule {self.name!r}: " + "; ".join(problems))
+
+
+@dataclass(frozen=True)
+class RuleResult:
+    """Outcome of one rule in one run."""
+
+    rule: Rule
+    rows_checked: int
+    failed_rows: int
+    query_ms: float
+
+    @property
+    def passed(self) -> bool:
+        return self.failed_rows <= self.rule.max_failures
+
+
+def load_rules(path: Path = DEFAULT_RULES_PATH) -> list[Rule]:
+    """Read and validate rules from a TOML file."""
+    with open(path, "rb") as f:
+        config = tomllib.load(f)
+    rules = [Rule.from_dict(raw) for raw in config.get("rules", [])]
+    names = [r.name for r in rules]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise DataQualityError(f"Duplicate rule names: {duplicates}")
+    return rules
+
+
+def compile_table_query(table: str, rules: list[Rule]) -> tuple[str, dict[str, object]]:
+    """Compile all rules on one table into a single aggregate query.
+
+    The query returns ``COUNT(*)`` followed by one failing-row count per rule,
+    in rule order. Orphan rules probe the referenced table with ``NOT EXISTS``
+    rather than joining it, which stays correct when the referenced column is
+    not a key.
+
+    Returns:
+        (sql, params) ready for ``cursor.execute``.
+    """
+    t = ident(table)
+    selects = ["COUNT(*)"]
+    params: dict[str, object] = {}
+    for i, rule in enumerate(rules):
+        col = f"t.{rule.columns[0]}"
+        if rule.type == "not_null":
+            selects.append(f"COUNT(*) FILTER (WHERE {col} IS NULL)")
+        elif rule.type == "range":
+            bounds = []
+            if rule.min is not None:
+                params[f"r{i}_min"] = rule.min
+                bounds.append(f"{col} < %(r{i}_min)s")
+            if rule.max is not None:
+                params[f"r{i}_max"] = rule.max
+                bounds.append(f"{col} > %(r{i}_max)s")
+            selects.append(f"COUNT(*) FILTER (WHERE {' OR '.join(bounds)})")
+        elif rule.type == "unique":
+            if len(rule.columns) == 1:
+                selects.append(f"COUNT({col}) - COUNT(DISTINCT {col})")
+            else:
+                cols = ", ".join(f"t.{c}" for c in rule.columns)
+                selects.append(f"COUNT(*) - COUNT(DISTINCT ({cols}))")
+        elif rule.type == "orphan":
+            ref_table, ref_col = rule.references.split(".")
+            selects.append(
+                f"COUNT(*) FILTER (WHERE {col} IS NOT NULL "
+                f"AND NOT EXISTS (SELECT 1 FROM {ref_table} j{i} WHERE j{i}.{ref_col} = {col}))"
+            )
+        elif rule.type == "freshness":
+            params[f"r{i}_days"] = rule.max_age_days
+            selects.append(
+                f"CASE WHEN MAX({col}) IS NULL "
+                f"OR MAX({col}) < now() - make_interval(days => %(r{i}_days)s) THEN 1 ELSE 0 END"
+            )
+    sql = "SELECT\n    " + ",\n    ".join(selects) + f"\nFROM {t} t"
+    return sql, params
+
+
+def rules_by_table(rules: list[Rule]) -> dict[str, list[Rule]]:
+    """Group rules by table, preserving config order."""
+    grouped: dict[str, list[Rule]] = {}
+    for rule in rules:
+        grouped.setdefault(rule.table, []).append(rule)
+    return grouped
+
+
+def ensure_dq_schema(cursor) -> None:
+    """Create the dq_results history table (safe to run repeatedly)."""
+    cursor.execute(DQ_RESULTS_DDL)
+
+
+def run_checks(conn, rules: list[Rule]) -> list[RuleResult]:
+    """Run every rule (one query per table) and append results to dq_results.
+
+    Args:
+        conn: Open psycopg2 connection.
+        rules: Rules to evaluate, e.g. from ``load_rules()``.
+
+    Returns:
+        One RuleResult per rule, grouped by table.
+    """
+    results: list[RuleResult] = []
+    run_id = str(uuid.uuid4())
+    try:
+        with conn.cursor() as cursor:
+            for table, table_rules in rules_by_table(rules).items():
+                sql, params = compile_table_query(table, table_rules)
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                rows_checked, *failures = cursor.fetchone()
+                query_ms = (time.perf_counter() - started) * 1000
+                results.extend(
+                    RuleResult(rule, int(rows_checked), int(failed), query_ms)
+                    for rule, failed in zip(table_rules, failures)
+                )
+            execute_values(
+                cursor,
+                """
+                INSERT INTO dq_results (
+                    run_id, table_name, rule_name, rule_type, severity,
+                    rows_checked, failed_rows, passed, query_ms
+                ) VALUES %s
+                """,
+                [
+                    (
+                        run_id, r.rule.table, r.rule.name, r.rule.type, r.rule.severity,
+                        r.rows_checked, r.failed_rows, r.passed, round(r.query_ms, 3),
+                    )
+                    for r in results
+                ],
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return results
@@ -0,0 +1,71 @@
+"""Shared PostgreSQL connection settings.
+
+Reads DB_HOST, DB_PORT, DB_NAME, DB_USER and DB_PASSWORD from the
+environment (optionally from .env at the project root). Connections are
+instrumented by default: every statement is timed into
+``src.query_metrics.METRICS``.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import psycopg2
+import psycopg2.pool
+from dotenv import load_dotenv
+
+from src.query_metrics import InstrumentedCursor, MetricsConnection
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+load_dotenv(PROJECT_ROOT / ".env")
+
+
+def build_db_config() -> dict[str, object]:
+    """Build psycopg2 connection args from environment variables."""
+    cfg: dict[str, object] = {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+        "database": os.getenv("DB_NAME", "donorcrm_db"),
+        "user": os.getenv("DB_USER", "postgres"),
+    }
+    password = os.getenv("DB_PASSWORD", "").strip()
+    if password:
+        cfg["password"] = password
+    return cfg
+
+
+def has_db_config() -> bool:
+    """True if any DB_* variable is set (i.e. the user configured a database)."""
+    return any(os.getenv(k) for k in ("DB_HOST", "DB_NAME", "DB_USER", "DB_PASSWORD"))
+
+
+def _connect_kwargs(instrumented: bool, overrides: dict) -> dict:
+    kwargs = {**build_db_config(), **overrides}
+    if instrumented:
+        kwargs.setdefault("connection_factory", MetricsConnection)
+        kwargs.setdefault("cursor_factory", InstrumentedCursor)
+    return kwargs
+
+
+def get_connection(source: str | None = None, instrumented: bool = True, **overrides):
+    """Open a new psycopg2 connection.
+
+    Args:
+        source: Label recorded with each query in query_log (e.g. "dashboard").
+        instrumented: Time every statement into the query metrics registry.
+        **overrides: psycopg2.connect arguments that win over the environment.
+    """
+    conn = psycopg2.connect(**_connect_kwargs(instrumented, overrides))
+    if instrumented and isinstance(conn, MetricsConnection):
+        conn.metrics_source = source
+    return conn
+
+
+def connection_pool(maxconn: int = 4, instrumented: bool = True, **overrides) -> psycopg2.pool.ThreadedConnectionPool:
+    """Thread-safe pool of (instrumented) connections for long-running processes.
+
+    Connections are opened on first use, not when the pool is created.
+    """
+    return psycopg2.pool.ThreadedConnectionPool(0, maxconn, **_connect_kwargs(instrumented, overrides))
@@ -0,0 +1,216 @@
+"""BM25 retrieval over the docs the assistant uses as context.
+
+The data dictionary and ``docs/integrations/*.md`` are split into chunks at
+headings (code fences are respected; long sections are split again at blank
+lines) and indexed with Okapi BM25. The assistant sends only the chunks that
+match the question and the uploaded columns instead of every doc in full.
+
+``load_doc_index`` keeps one index per docs version (file names, sizes and
+mtimes) in memory and persists it as JSON under ``data/cache/``, so a new
+process skips tokenizing when the docs have not changed.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Not src.db.PROJECT_ROOT: importing src.db loads dotenv, which the assistant defers.
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DOCS_DIR = _PROJECT_ROOT / "docs"
+INDEX_PATH = _PROJECT_ROOT / "data" / "cache" / "doc_index.json"
+# Sections longer than this are split at blank lines (outside code fences).
+MAX_CHUNK_CHARS = 2000
+
+_HEADING = re.compile(r"^(#{1,3})\s+(.*?)\s*$")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was "
+    "what when which with you your we our can do does should will not if into per each".split()
+)
+
+
+@dataclass(frozen=True)
+class DocChunk:
+    """One retrievable section of a doc."""
+
+    source: str
+    heading: str
+    text: str
+    title: str = ""
+
+    @property
+    def indexed_text(self) -> str:
+        """Title and heading are indexed with the text, so "Constant Contact" finds that doc."""
+        return f"{self.title}\n{self.heading}\n{self.text}"
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens; camelCase and snake_case are split, plurals folded."""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text).lower()
+    return [
+        word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+        for word in re.findall(r"[a-z0-9]+", text)
+        if len(word) > 1 and word not in _STOPWORDS
+    ]
+
+
+def _split_long(lines: list[str], max_chars: int) -> list[list[str]]:
+    """Split at blank lines outside code fences into parts of about ``max_chars``."""
+    parts: list[list[str]] = [[]]
+    size, fenced = 0, False
+    for line in lines:
+        if line.startswith("```"):
+            fenced = not fenced
+        if not line.strip() and not fenced and size >= max_chars:
+            parts.append([])
+            size = 0
+            continue
+        parts[-1].append(line)
+        size += len(line) + 1
+    return [p for p in parts if any(line.strip() for line in p)]
+
+
+def chunk_markdown(text: str, source: str, max_chars: int = MAX_CHUNK_CHARS) -> list[DocChunk]:
+    """Chunks at #, ## and ### headings; headings include their parent ("Data Schema > Overview")."""
+    sections: list[tuple[str, list[str]]] = [("", [])]
+    path: list[str] = []
+    title = ""
+    fenced = False
+    for line in text.splitlines():
+        if line.startswith("```"):
+            fenced = not fenced
+        heading = None if fenced else _HEADING.match(line)
+        if heading:
+            level = len(heading.group(1))
+            if level == 1:
+                title = heading.group(2)
+            path = path[: level - 1] + [heading.group(2)]
+            # The document title (#) is context for every chunk, not part of the heading path.
+            sections.append((" > ".join(path[1:] or path), [line]))
+        else:
+            sections[-1][1].append(line)
+    chunks = []
+    for heading, lines in sections:
+        for part in _split_long(lines, max_chars):
+            body = "\n".join(part).strip()
+            if body and body != part[0].strip() or len(sections) == 1:
+                chunks.append(DocChunk(source, heading, body, title))
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over ``DocChunk`` texts (heading words count as text).
+
+    Args:
+        chunks: Indexed chunks.
+        term_freqs: Per-chunk term counts; computed when not given (e.g. not loaded from disk).
+        k1: Term frequency saturation.
+        b: Length normalization.
+    """
+
+    def __init__(
+        self,
+        chunks: list[DocChunk],
+        term_freqs: list[dict[str, int]] | None = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.chunks = chunks
+        self.term_freqs = term_freqs or [dict(Counter(tokenize(c.indexed_text))) for c in chunks]
+        self.k1, self.b = k1, b
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        for i, tf in enumerate(self.term_freqs):
+            for term, count in tf.items():
+                self.postings.setdefault(term, []).append((i, count))
+        n = len(chunks)
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5)) for term, docs in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 5) -> list[tuple[DocChunk, float]]:
+        """Top ``k`` chunks for ``query`` with positive scores, best first."""
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, count in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * count * (self.k1 + 1) / (count + norm)
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.chunks[i], score) for i, score in best]
+
+    def to_dict(self) -> dict:
+        return {"chunks": [asdict(c) for c in self.chunks], "term_freqs": self.term_freqs, "k1": self.k1, "b": self.b}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> BM25Index:
+        return cls([DocChunk(**c) for c in data["chunks"]], data["term_freqs"], data["k1"], data["b"])
+
+
+def doc_paths(docs_dir: Path = DOCS_DIR) -> list[Path]:
+    """The data dictionary and every integration doc, in a stable order."""
+    paths = [docs_dir / "DATA_DICTIONARY.md", *sorted((docs_dir / "integrations").glob("*.md"))]
+    return [p for p in paths if p.is_file()]
+
+
+def docs_version(docs_dir: Path = DOCS_DIR) -> list[list]:
+    """[name, size, mtime_ns] per doc; any edit, addition or removal changes it."""
+    version = []
+    for path in doc_paths(docs_dir):
+        stat = path.stat()
+        version.append([path.relative_to(docs_dir).as_posix(), stat.st_size, stat.st_mtime_ns])
+    return version
+
+
+def build_doc_index(docs_dir: Path = DOCS_DIR) -> BM25Index:
+    chunks = []
+    for path in doc_paths(docs_dir):
+        text = path.read_text(encoding="utf-8", errors="replace")
+        chunks.extend(chunk_markdown(text, path.relative_to(docs_dir).as_posix()))
+    return BM25Index(chunks)
+
+
+def _read_persisted(cache_path: Path, version: list[list]) -> BM25Index | None:
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != version:
+        return None
+    return BM25Index.from_dict(data["index"])
+
+
+def _persist(cache_path: Path, version: list[list], index: BM25Index) -> None:
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": version, "index": index.to_dict()}), encoding="utf-8")
+        tmp.replace(cache_path)
+    except OSError as e:
+        logger.warning("Could not persist doc index to %s: %s", cache_path, e)
+
+
+@lru_cache(maxsize=4)
+def _index_for(docs_dir: Path, cache_path: Path, version: str) -> BM25Index:
+    parsed = json.loads(version)
+    index = _read_persisted(cache_path, parsed)
+    if index is None:
+        index = build_doc_index(docs_dir)
+        _persist(cache_path, parsed, index)
+    return index
+
+
+def load_doc_index(docs_dir: Path = DOCS_DIR, cache_path: Path = INDEX_PATH) -> BM25Index:
+    """Index for the current docs: from memory, else from ``cache_path``, else built and saved."""
+    return _index_for(docs_dir, cache_path, json.dumps(docs_version(docs_dir)))
@@ -0,0 +1,219 @@
+"""Slowly changing dimension (Type 2) history for donors and campaigns.
+
+Each tracked table gets a ``row_hash`` column maintained by a BEFORE INSERT
+OR UPDATE trigger, so hashes are precomputed as rows are written. The hash is
+type-aware: every column is rendered to a canonical text form for its type
+(dates as YYYY-MM-DD, money with two decimals, booleans as true/false, NULL
+as a marker distinct from the empty string) before hashing.
+
+``apply_history`` then diffs the base table against the *current* history
+rows in one set-based pass, and only changed keys are closed (valid_to set)
+and re-inserted. Point-in-time queries use a GiST index on
+``tstzrange(valid_from, valid_to)``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from src.row_hash import HashColumn, ident, sql_row_hash
+
+
+@dataclass(frozen=True)
+class HistorySpec:
+    """A base table tracked with SCD Type 2 history.
+
+    Attributes:
+        table: Base table name.
+        key: Business key column.
+        columns: Tracked (hashed) columns, key included first.
+    """
+
+    table: str
+    key: str
+    columns: tuple[HashColumn, ...]
+
+    @property
+    def history_table(self) -> str:
+        return ident(f"{self.table}_history")
+
+    @property
+    def column_names(self) -> list[str]:
+        return [c.name for c in self.columns]
+
+    def ddl(self) -> str:
+        """Idempotent DDL: row_hash column + trigger, history table and indexes."""
+        t, h, k = ident(self.table), self.history_table, ident(self.key)
+        return f"""
+        ALTER TABLE {t} ADD COLUMN IF NOT EXISTS row_hash CHAR(32);
+
+        CREATE OR REPLACE FUNCTION {t}_set_row_hash() RETURNS trigger AS $$
+        BEGIN
+            NEW.row_hash := {sql_row_hash(self.columns, prefix="NEW.")};
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_{t}_row_hash ON {t};
+        CREATE TRIGGER trg_{t}_row_hash
+            BEFORE INSERT OR UPDATE ON {t}
+            FOR EACH ROW EXECUTE FUNCTION {t}_set_row_hash();
+
+        -- Backfill rows written before the trigger existed.
+        UPDATE {t} SET row_hash = {sql_row_hash(self.columns)} WHERE row_hash IS NULL;
+
+        CREATE TABLE IF NOT EXISTS {h} (
+            history_id BIGSERIAL PRIMARY KEY,
+            LIKE {t},
+            valid_from TIMESTAMPTZ NOT NULL,
+            valid_to TIMESTAMPTZ NOT NULL DEFAULT 'infinity'
+        );
+
+        -- At most one current version per key; also serves the change-detection join.
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_{h}_current
+            ON {h} ({k}) WHERE valid_to = 'infinity';
+        -- Per-key version lookups.
+        CREATE INDEX IF NOT EXISTS ix_{h}_key_from ON {h} ({k}, valid_from);
+        -- Point-in-time ("as of") queries across all keys.
+        CREATE INDEX IF NOT EXISTS ix_{h}_period
+            ON {h} USING gist (tstzrange(valid_from, valid_to));
+        """
+
+    def diff_sql(self) -> str:
+        """Set-based change detection: base table vs current history, by row hash."""
+        t, h, k = ident(self.table), self.history_table, ident(self.key)
+        return f"""
+        CREATE TEMP TABLE _scd_changes ON COMMIT DROP AS
+        SELECT
+            COALESCE(s.{k}, cur.{k}) AS key,
+            CASE
+                WHEN cur.{k} IS NULL THEN 'insert'
+                WHEN s.{k} IS NULL THEN 'delete'
+                ELSE 'update'
+            END AS change
+        FROM {t} s
+        FULL JOIN (
+            SELECT {k}, row_hash FROM {h} WHERE valid_to = 'infinity'
+        ) cur ON cur.{k} = s.{k}
+        WHERE s.{k} IS NULL
+           OR cur.{k} IS NULL
+           OR s.row_hash IS DISTINCT FROM cur.row_hash
+        """
+
+    def close_sql(self) -> str:
+        """Close current versions of updated and deleted keys."""
+        h, k = self.history_table, ident(self.key)
+        return f"""
+        UPDATE {h} hist
+        SET valid_to = %(as_of)s
+        FROM _scd_changes c
+        WHERE hist.{k} = c.key
+          AND hist.valid_to = 'infinity'
+          AND c.change <> 'insert'
+        """
+
+    def insert_sql(self) -> str:
+        """Insert new current versions for inserted and updated keys."""
+        t, h, k = ident(self.table), self.history_table, ident(self.key)
+        cols = ", ".join(self.column_names)
+        src_cols = ", ".join(f"s.{c}" for c in self.column_names)
+        return f"""
+        INSERT INTO {h} ({cols}, row_hash, valid_from, valid_to)
+        SELECT {src_cols}, s.row_hash, %(as_of)s, 'infinity'
+        FROM {t} s
+        JOIN _scd_changes c ON c.key = s.{k} AND c.change <> 'delete'
+        """
+
+    def as_of_sql(self) -> str:
+        """Versions valid at ``%(as_of)s`` (served by the GiST period index)."""
+        h = self.history_table
+        cols = ", ".join(self.column_names)
+        return f"""
+        SELECT {cols}, valid_from, valid_to
+        FROM {h}
+        WHERE tstzrange(valid_from, valid_to) @> %(as_of)s::timestamptz
+        """
+
+
+DONORS_HISTORY = HistorySpec(
+    table="donors",
+    key="donor_id",
+    columns=(
+        HashColumn("donor_id", "int"),
+        HashColumn("first_name", "text"),
+        HashColumn("last_name", "text"),
+        HashColumn("email", "text"),
+        HashColumn("phone", "text"),
+        HashColumn("address", "text"),
+        HashColumn("city", "text"),
+        HashColumn("state", "text"),
+        HashColumn("zip_code", "text"),
+        HashColumn("created_date", "date"),
+        HashColumn("donor_type", "text"),
+    ),
+)
+
+CAMPAIGNS_HISTORY = HistorySpec(
+    table="campaigns",
+    key="campaign_id",
+    columns=(
+        HashColumn("campaign_id", "int"),
+        HashColumn("campaign_name", "text"),
+        HashColumn("start_date", "date"),
+        HashColumn("end_date", "date"),
+        HashColumn("goal_amount", "int"),
+        HashColumn("campaign_type", "text"),
+    ),
+)
+
+HISTORY_SPECS: dict[str, HistorySpec] = {
+    DONORS_HISTORY.table: DONORS_HISTORY,
+    CAMPAIGNS_HISTORY.table: CAMPAIGNS_HISTORY,
+}
+
+
+def ensure_history_schema(cursor) -> None:
+    """Create row_hash triggers and history tables (safe to run repeatedly)."""
+    for spec in HISTORY_SPECS.values():
+        cursor.execute(spec.ddl())
+
+
+def apply_history(conn, as_of: datetime | None = None) -> dict[str, dict[str, int]]:
+    """Record changes in every tracked table as SCD Type 2 versions.
+
+    Runs in one transaction: per table, one set-based diff, then one UPDATE
+    (close changed/deleted) and one INSERT (new versions). Unchanged rows
+    are never touched.
+
+    Args:
+        conn: Open psycopg2 connection.
+        as_of: Effective timestamp for the new versions (default: now()).
+
+    Returns:
+        Dict of table -> {"inserted", "updated", "deleted"} key counts.
+    """
+    summary: dict[str, dict[str, int]] = {}
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(%(as_of)s, now())", {"as_of": as_of})
+            effective = cursor.fetchone()[0]
+            params = {"as_of": effective}
+            for table, spec in HISTORY_SPECS.items():
+                cursor.execute(spec.diff_sql())
+                cursor.execute("SELECT change, COUNT(*) FROM _scd_changes GROUP BY change")
+                counts = {"insert": 0, "update": 0, "delete": 0}
+                counts.update(dict(cursor.fetchall()))
+                cursor.execute(spec.close_sql(), params)
+                cursor.execute(spec.insert_sql(), params)
+                cursor.execute("DROP TABLE _scd_changes")
+                summary[table] = {
+                    "inserted": counts["insert"],
+                    "updated": counts["update"],
+                    "deleted": counts["delete"],
+                }
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return summary
@@ -0,0 +1,446 @@
+"""Streaming readers for intake uploads: CSV, Excel (.xlsx), JSON and XML.
+
+Every reader yields pandas DataFrame chunks for ``SchemaProfiler`` without
+holding the whole document in memory:
+
+- ``.csv``: ``pd.read_csv`` in chunks.
+- ``.xlsx``: the first worksheet is read row by row straight from the zip
+  with ``iterparse`` (shared strings are loaded once; numbers, booleans and
+  date-formatted cells keep their types). The first row is the header.
+- ``.json``: a top-level array of records, or the first array inside a
+  top-level object (e.g. Constant Contact's ``{"contacts": [...]}``), is
+  decoded one element at a time from a sliding text buffer.
+  ``.jsonl``/``.ndjson``: one record per line.
+- ``.xml``: ``iterparse`` over the root's children, one record each (e.g.
+  DonorPerfect ``<record><field name=... value=.../></record>``); elements
+  are cleared as soon as they are read.
+
+Nested values are flattened into dotted columns (``email_address.address``).
+Lists of scalars are joined with "; ", and lists of objects keep their first
+``MAX_LIST_ITEMS`` entries as ``phone_numbers.0.phone_number`` and so on.
+
+Only the standard library and pandas are needed.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta
+from pathlib import Path, PurePosixPath
+from typing import IO, Any
+
+import pandas as pd
+
+FORMATS = {
+    ".csv": "csv",
+    ".xlsx": "xlsx",
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".xml": "xml",
+}
+UPLOAD_TYPES = [ext.lstrip(".") for ext in FORMATS]
+MAX_LIST_ITEMS = 3
+_READ_SIZE = 1 << 20
+_JSON = json.JSONDecoder()
+
+
+class IntakeFormatError(ValueError):
+    """The upload's format is unsupported or its content does not match it."""
+
+
+def detect_format(name: str) -> str:
+    """Format key from a file name, e.g. "export.XLSX" -> "xlsx"."""
+    fmt = FORMATS.get(Path(name).suffix.lower())
+    if fmt is None:
+        raise IntakeFormatError(f"Unsupported file type: {name} (expected {', '.join(FORMATS)})")
+    return fmt
+
+
+# --- Flattening ---
+
+def _is_scalar(value: Any) -> bool:
+    return not isinstance(value, (dict, list))
+
+
+def flatten_record(record: dict[str, Any], prefix: str = "", out: dict[str, Any] | None = None) -> dict[str, Any]:
+    """Nested dicts and lists as dotted columns (see module docstring)."""
+    out = {} if out is None else out
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flatten_record(value, f"{name}.", out)
+        elif isinstance(value, list):
+            if all(_is_scalar(v) for v in value):
+                out[name] = "; ".join(str(v) for v in value if v is not None) or None
+            else:
+                for i, item in enumerate(value[:MAX_LIST_ITEMS]):
+                    if isinstance(item, dict):
+                        flatten_record(item, f"{name}.{i}.", out)
+                    else:
+                        out[f"{name}.{i}"] = item if _is_scalar(item) else json.dumps(item)
+        else:
+            out[name] = value
+    return out
+
+
+def batch_records(records: Iterable[dict[str, Any]], chunksize: int, flatten: bool = True) -> Iterator[pd.DataFrame]:
+    """Records (flattened unless already flat) in DataFrames of ``chunksize`` rows."""
+    batch: list[dict[str, Any]] = []
+    for record in records:
+        batch.append(flatten_record(record) if flatten else record)
+        if len(batch) >= chunksize:
+            yield pd.DataFrame.from_records(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame.from_records(batch)
+
+
+def convert_numeric(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Text columns whose every value parses as a number become numeric (as ``read_csv`` would)."""
+    for column in chunk.columns:
+        values = chunk[column]
+        if values.dtype.kind in "iufbM" or not values.notna().any():
+            continue
+        # Most text columns fail on their first values; skip converting them in full.
+        if pd.to_numeric(values.dropna().head(20), errors="coerce").isna().any():
+            continue
+        numbers = pd.to_numeric(values, errors="coerce")
+        if numbers.notna().sum() == values.notna().sum():
+            chunk[column] = numbers
+    return chunk
+
+
+# --- JSON ---
+
+class _TextBuffer:
+    """Decoded text from a binary stream, read ``_READ_SIZE`` bytes at a time."""
+
+    def __init__(self, source: IO[bytes]):
+        self.source = source
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read more text; False at end of input."""
+        if self.eof:
+            return False
+        data = self.source.read(_READ_SIZE)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.eof = not data
+        # Drop consumed text so the buffer stays about one read long.
+        self.text = self.text[self.pos:] + self.decoder.decode(data, final=self.eof)
+        self.pos = 0
+        return not self.eof or bool(self.text)
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at end of input), without consuming it."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill() or self.eof and self.pos >= len(self.text):
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise IntakeFormatError(f"Malformed JSON: expected one of {chars!r}, found {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode the next JSON value, reading more input until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _JSON.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as e:
+                if self.fill():
+                    continue
+                raise IntakeFormatError(f"Malformed JSON: {e}") from e
+            # A number at the end of the buffer may continue in the next read.
+            if end == len(self.text) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _array_items(buffer: _TextBuffer) -> Iterator[Any]:
+    buffer.expect("[")
+    if buffer.peek() == "]":
+        buffer.pos += 1
+        return
+    while True:
+        yield buffer.value()
+        if buffer.expect(",]") == "]":
+            return
+
+
+def iter_json_records(source: IO[bytes], records_key: str | None = None) -> Iterator[dict[str, Any]]:
+    """Records from a JSON array, or from the first (or ``records_key``) array in an object.
+
+    An object without such an array is one record.
+    """
+    buffer = _TextBuffer(source)
+    first = buffer.peek()
+    if first == "[":
+        items: Iterator[Any] = _array_items(buffer)
+    elif first == "{":
+        buffer.pos += 1
+        fields: dict[str, Any] = {}
+        items = iter(())
+        while buffer.peek() != "}":
+            if fields or buffer.text[buffer.pos] == ",":
+                buffer.expect(",")
+            key = buffer.value()
+            buffer.expect(":")
+            if buffer.peek() == "[" and records_key in (None, key):
+                items = _array_items(buffer)
+                break
+            fields[key] = buffer.value()
+            if buffer.peek() == "":
+                raise IntakeFormatError("Malformed JSON: unexpected end of file")
+        else:
+            items = iter([fields])
+    else:
+        raise IntakeFormatError("JSON upload must be an array of records or an object containing one")
+    for item in items:
+        yield item if isinstance(item, dict) else {"value": item}
+
+
+def iter_jsonl_records(source: IO[bytes]) -> Iterator[dict[str, Any]]:
+    """One JSON record per non-blank line."""
+    for number, line in enumerate(source, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8-sig" if number == 1 else "utf-8")
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise IntakeFormatError(f"Malformed JSON on line {number}: {e}") from e
+        yield item if isinstance(item, dict) else {"value": item}
+
+
+# --- XML ---
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _xml_record(elem: ET.Element, prefix: str = "", out: dict[str, Any] | None = None) -> dict[str, Any]:
+    out = {} if out is None else out
+    if elem.attrib:
+        for attr, value in elem.attrib.items():
+            out[f"{prefix}@{_local(attr)}"] = value or None
+    for child in elem:
+        field, value = child.get("name"), child.get("value")
+        if field is not None and value is not None and len(child) == 0:
+            # <field name="donor_id" value="147"/> (DonorPerfect and similar)
+            out[f"{prefix}{field}"] = value or None
+        elif len(child) == 0:
+            text = (child.text or "").strip() or None
+            name = f"{prefix}{_local(child.tag)}"
+            out[name] = text if out.get(name) is None else f"{out[name]}; {text}"
+            if child.attrib:
+                for attr, value in child.attrib.items():
+                    out[f"{name}.@{_local(attr)}"] = value or None
+        else:
+            _xml_record(child, f"{prefix}{_local(child.tag)}.", out)
+    return out
+
+
+def iter_xml_records(source: IO[bytes] | str | Path) -> Iterator[dict[str, Any]]:
+    """One record per child of the root element, flattened; memory stays at one record."""
+    depth = 0
+    root: ET.Element | None = None
+    try:
+        for event, elem in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if root is None:
+                    root = elem
+                continue
+            depth -= 1
+            if depth == 1:
+                yield _xml_record(elem)
+                elem.clear()
+                root.clear()
+    except ET.ParseError as e:
+        raise IntakeFormatError(f"Malformed XML: {e}") from e
+
+
+# --- Excel (.xlsx) ---
+
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+# Built-in number formats that display dates or times.
+_DATE_FORMAT_IDS = frozenset(range(14, 23)) | {45, 46, 47}
+_DATE_CODE = re.compile(r"[dmyhs]", re.IGNORECASE)
+_CELL_REF = re.compile(r"([A-Z]+)")
+
+
+def _column_index(ref: str) -> int:
+    index = 0
+    for letter in _CELL_REF.match(ref).group(1):
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _first_sheet_path(book: zipfile.ZipFile) -> tuple[str, bool]:
+    """Zip path of the first worksheet and whether the workbook uses the 1904 date system."""
+    workbook = ET.fromstring(book.read("xl/workbook.xml"))
+    pr = workbook.find(f"{_NS_MAIN}workbookPr")
+    date1904 = pr is not None and pr.get("date1904") in ("1", "true")
+    sheet = workbook.find(f"{_NS_MAIN}sheets/{_NS_MAIN}sheet")
+    if sheet is None:
+        raise IntakeFormatError("Workbook has no worksheets")
+    rels = ET.fromstring(book.read("xl/_rels/workbook.xml.rels"))
+    target = next(r.get("Target") for r in rels.iter(f"{_NS_PKG_REL}Relationship") if r.get("Id") == sheet.get(f"{_NS_REL}id"))
+    path = target.lstrip("/") if target.startswith("/") else str(PurePosixPath("xl") / target)
+    return path, date1904
+
+
+def _shared_strings(book: zipfile.ZipFile) -> list[str]:
+    if "xl/sharedStrings.xml" not in book.namelist():
+        return []
+    strings = []
+    with book.open("xl/sharedStrings.xml") as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == f"{_NS_MAIN}si":
+                strings.append("".join(t.text or "" for t in elem.iter(f"{_NS_MAIN}t")))
+                elem.clear()
+    return strings
+
+
+def _date_styles(book: zipfile.ZipFile) -> frozenset[int]:
+    """Indexes of cell styles (``s`` attribute) that format numbers as dates."""
+    if "xl/styles.xml" not in book.namelist():
+        return frozenset()
+    styles = ET.fromstring(book.read("xl/styles.xml"))
+    custom = {
+        int(f.get("numFmtId")): f.get("formatCode", "")
+        for f in styles.iter(f"{_NS_MAIN}numFmt")
+    }
+
+    def is_date(fmt_id: int) -> bool:
+        if fmt_id in custom:
+            code = re.sub(r'"[^"]*"|\[[^\]]*\]|\\.', "", custom[fmt_id])
+            return bool(_DATE_CODE.search(code))
+        return fmt_id in _DATE_FORMAT_IDS
+
+    xfs = styles.find(f"{_NS_MAIN}cellXfs")
+    if xfs is None:
+        return frozenset()
+    return frozenset(i for i, xf in enumerate(xfs) if is_date(int(xf.get("numFmtId", 0))))
+
+
+def _cell_value(cell: ET.Element, strings: list[str], date_styles: frozenset[int], epoch: datetime) -> Any:
+    kind = cell.get("t", "n")
+    if kind == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{_NS_MAIN}t")) or None
+    v = cell.find(f"{_NS_MAIN}v")
+    if v is None or v.text is None:
+        return None
+    if kind == "s":
+        return strings[int(v.text)]
+    if kind == "b":
+        return v.text == "1"
+    if kind in ("str", "d"):
+        return v.text
+    if kind == "e":
+        return None
+    number = float(v.text) if any(c in v.text for c in ".eE") else int(v.text)
+    if int(cell.get("s", 0)) in date_styles:
+        return epoch + timedelta(days=number)
+    return number
+
+
+def _unique_headers(values: list[Any]) -> list[str]:
+    headers, seen = [], {}
+    for i, value in enumerate(values):
+        name = str(value) if value not in (None, "") else f"column_{i + 1}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        headers.append(name)
+    return headers
+
+
+def iter_xlsx_rows(source: IO[bytes] | str | Path) -> Iterator[list[Any]]:
+    """Cell values of the first worksheet, one list per row (gaps are None)."""
+    try:
+        book = zipfile.ZipFile(source)
+    except zipfile.BadZipFile as e:
+        raise IntakeFormatError("Not an .xlsx workbook (legacy .xls files are not supported)") from e
+    with book:
+        path, date1904 = _first_sheet_path(book)
+        strings = _shared_strings(book)
+        date_styles = _date_styles(book)
+        epoch = datetime(1904, 1, 1) if date1904 else datetime(1899, 12, 30)
+        sheet_data: ET.Element | None = None
+        with book.open(path) as f:
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == f"{_NS_MAIN}sheetData":
+                        sheet_data = elem
+                    continue
+                if elem.tag != f"{_NS_MAIN}row":
+                    continue
+                row: list[Any] = []
+                for position, cell in enumerate(elem.iter(f"{_NS_MAIN}c")):
+                    index = _column_index(cell.get("r")) if cell.get("r") else position
+                    row.extend([None] * (index - len(row) + 1))
+                    row[index] = _cell_value(cell, strings, date_styles, epoch)
+                if sheet_data is not None:
+                    sheet_data.clear()  # drop rows already read
+                yield row
+
+
+def iter_xlsx_records(source: IO[bytes] | str | Path) -> Iterator[dict[str, Any]]:
+    """Rows of the first worksheet as dicts keyed by the header row."""
+    rows = iter_xlsx_rows(source)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = _unique_headers(header)
+    for row in rows:
+        if any(v is not None for v in row):
+            yield dict(zip(columns, row + [None] * (len(columns) - len(row))))
+
+
+# --- Entry point ---
+
+def read_chunks(source: IO[bytes] | str | Path, fmt: str, chunksize: int = 50_000) -> Iterator[pd.DataFrame]:
+    """DataFrame chunks of an upload in ``fmt`` (a ``FORMATS`` value)."""
+    if fmt == "csv":
+        with pd.read_csv(source, chunksize=chunksize) as reader:
+            yield from reader
+        return
+    if fmt == "xlsx":
+        records = iter_xlsx_records(source)
+    elif fmt in ("json", "jsonl", "xml"):
+        if isinstance(source, (str, Path)):
+            with open(source, "rb") as f:
+                yield from read_chunks(f, fmt, chunksize)
+            return
+        records = {"json": iter_json_records, "jsonl": iter_jsonl_records, "xml": iter_xml_records}[fmt](source)
+    else:
+        raise IntakeFormatError(f"Unsupported format: {fmt}")
+    # Excel and XML records are flat already.
+    for chunk in batch_records(records, chunksize, flatten=fmt in ("json", "jsonl")):
+        # XML carries only text; JSON strings that are all numbers are left as text.
+        yield convert_numeric(chunk) if fmt == "xml" else chunk
@@ -0,0 +1,228 @@
+"""Offline analytics over Parquet snapshots with embedded DuckDB.
+
+``export_snapshots`` streams each table out of Postgres with ``COPY`` (one
+REPEATABLE READ transaction, so all tables are from the same moment) and
+converts it to Parquet with DuckDB, keeping the Postgres column types.
+``OfflineEngine`` opens the snapshots in an in-process DuckDB database and
+creates the same views as ``sql/views.sql``, so dashboard and ad-hoc
+queries run columnar and locally without touching the production database.
+
+Queries written for psycopg2 (``%(name)s`` parameters, tuples for ``IN``)
+are translated by ``to_duckdb``.
+
+DuckDB is only imported when a snapshot is written or opened.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.dashboard_queries import DONOR_TOTALS_TABLES
+from src.db import PROJECT_ROOT
+from src.portfolio import PORTFOLIO_TABLES
+from src.timeseries import ROLLUP_TABLES
+from src.watermarks import data_version
+
+SNAPSHOT_DIR = PROJECT_ROOT / "data" / "snapshots"
+VIEWS_SQL_PATH = PROJECT_ROOT / "sql" / "views.sql"
+MANIFEST_NAME = "manifest.json"
+
+SNAPSHOT_TABLES = (
+    "donors",
+    "campaigns",
+    "donations",
+    "portfolio_holders",
+    "portfolio_assignments",
+    *PORTFOLIO_TABLES,
+    *ROLLUP_TABLES,
+    *DONOR_TOTALS_TABLES,
+)
+
+_DUCKDB_TYPES = {
+    "smallint": "SMALLINT",
+    "integer": "INTEGER",
+    "bigint": "BIGINT",
+    "real": "FLOAT",
+    "double precision": "DOUBLE",
+    "boolean": "BOOLEAN",
+    "date": "DATE",
+    "timestamp without time zone": "TIMESTAMP",
+    "timestamp with time zone": "TIMESTAMPTZ",
+    "uuid": "UUID",
+}
+
+_NAMED_PARAM = re.compile(r"%\((\w+)\)s")
+_IN_PARAM = re.compile(r"\bIN\s+%\((\w+)\)s", re.IGNORECASE)
+
+
+class OfflineError(RuntimeError):
+    """Raised when snapshots are missing or cannot be written."""
+
+
+def duckdb_type(data_type: str, precision: int | None = None, scale: int | None = None) -> str:
+    """DuckDB column type for an information_schema data_type."""
+    if data_type == "numeric":
+        if precision is not None and precision <= 38:
+            return f"DECIMAL({precision}, {scale or 0})"
+        return "DOUBLE"
+    return _DUCKDB_TYPES.get(data_type, "VARCHAR")
+
+
+def to_duckdb(sql: str, params: dict[str, object] | None = None) -> tuple[str, dict[str, object] | None]:
+    """Translate a psycopg2-style query and params to DuckDB.
+
+    ``%(name)s`` becomes ``$name``; ``IN %(name)s`` with a tuple becomes
+    ``IN (SELECT unnest($name))`` with a list.
+    """
+    sql = _IN_PARAM.sub(r"IN (SELECT unnest($\1))", sql)
+    sql = _NAMED_PARAM.sub(r"$\1", sql)
+    if not params:
+        return sql, None
+    return sql, {k: list(v) if isinstance(v, tuple) else v for k, v in params.items()}
+
+
+def sql_statements(text: str) -> list[str]:
+    """Split a SQL script on semicolons, dropping comment-only chunks."""
+    statements = []
+    for chunk in text.split(";"):
+        code = "\n".join(line for line in chunk.splitlines() if not line.strip().startswith("--")).strip()
+        if code:
+            statements.append(code)
+    return statements
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def read_manifest(snapshot_dir: Path = SNAPSHOT_DIR) -> dict:
+    """Snapshot manifest (tables, row counts, data version); OfflineError if absent."""
+    path = snapshot_dir / MANIFEST_NAME
+    if not path.is_file():
+        raise OfflineError(f"No snapshot in {snapshot_dir}; run `python export_snapshots.py` first")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def snapshot_version(snapshot_dir: Path = SNAPSHOT_DIR) -> int | None:
+    """Changes whenever a new snapshot is written; None if there is none."""
+    try:
+        return (snapshot_dir / MANIFEST_NAME).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _column_types(cursor, table: str) -> dict[str, str]:
+    cursor.execute(
+        """
+        SELECT column_name, data_type, numeric_precision, numeric_scale
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s
+        ORDER BY ordinal_position
+        """,
+        (table,),
+    )
+    columns = {name: duckdb_type(dtype, precision, scale) for name, dtype, precision, scale in cursor.fetchall()}
+    if not columns:
+        raise OfflineError(f"Table {table} does not exist")
+    return columns
+
+
+def export_snapshots(
+    conn,
+    snapshot_dir: Path = SNAPSHOT_DIR,
+    tables: tuple[str, ...] = SNAPSHOT_TABLES,
+) -> dict:
+    """Write one Parquet file per table plus a manifest.
+
+    Files are written next to the old ones and swapped in with
+    ``os.replace``; the manifest is written last.
+
+    Args:
+        conn: Open psycopg2 connection (left in its original session mode).
+        snapshot_dir: Output directory.
+        tables: Tables to export.
+
+    Returns:
+        The manifest dict.
+    """
+    import duckdb
+
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    manifest: dict = {"exported_at": datetime.now(timezone.utc).isoformat(), "tables": {}}
+    started = time.perf_counter()
+    duck = duckdb.connect()
+    autocommit = conn.autocommit
+    conn.autocommit = False
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    try:
+        with conn.cursor() as cursor:
+            manifest["data_version"] = data_version(cursor)
+            for table in tables:
+                columns = _column_types(cursor, table)
+                with tempfile.NamedTemporaryFile("w+", suffix=".csv", dir=snapshot_dir, delete=False) as csv_file:
+                    cursor.copy_expert(f"COPY {table} TO STDOUT WITH (FORMAT csv, HEADER true)", csv_file)
+                target = snapshot_dir / f"{table}.parquet"
+                partial = snapshot_dir / f".{table}.parquet.tmp"
+                try:
+                    spec = ", ".join(f"{_literal(name)}: {_literal(kind)}" for name, kind in columns.items())
+                    duck.execute(
+                        f"COPY (SELECT * FROM read_csv({_literal(csv_file.name)}, header = true, "
+                        f"columns = {{{spec}}}, allow_quoted_nulls = false)) "
+                        f"TO {_literal(str(partial))} (FORMAT parquet, COMPRESSION zstd)"
+                    )
+                finally:
+                    os.unlink(csv_file.name)
+                os.replace(partial, target)
+                rows = duck.execute(f"SELECT COUNT(*) FROM read_parquet({_literal(str(target))})").fetchone()[0]
+                manifest["tables"][table] = {"file": target.name, "rows": rows}
+        conn.rollback()
+    except Exception as e:
+        conn.rollback()
+        raise OfflineError(f"Snapshot export failed: {e}") from e
+    finally:
+        conn.set_session(isolation_level="DEFAULT", readonly="DEFAULT")
+        conn.autocommit = autocommit
+        duck.close()
+    manifest["seconds"] = round(time.perf_counter() - started, 3)
+    (snapshot_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return manifest
+
+
+class OfflineEngine:
+    """In-process DuckDB over the latest snapshot, with the dashboard views.
+
+    Tables are views over ``read_parquet``, so a newer snapshot written to
+    the same directory is picked up by the next query.
+
+    Args:
+        snapshot_dir: Directory written by ``export_snapshots``.
+        views_path: SQL script defining the analytics views.
+    """
+
+    def __init__(self, snapshot_dir: Path = SNAPSHOT_DIR, views_path: Path = VIEWS_SQL_PATH):
+        import duckdb
+
+        manifest = read_manifest(snapshot_dir)
+        self.snapshot_dir = snapshot_dir
+        self.con = duckdb.connect()
+        for table, info in manifest["tables"].items():
+            path = snapshot_dir / info["file"]
+            self.con.execute(f"CREATE OR REPLACE VIEW {table} AS SELECT * FROM read_parquet({_literal(str(path))})")
+        for statement in sql_statements(views_path.read_text(encoding="utf-8")):
+            self.con.execute(statement)
+
+    def query_df(self, sql: str, params: dict[str, object] | None = None):
+        """Run a psycopg2-style query and return a pandas DataFrame."""
+        sql, params = to_duckdb(sql, params)
+        # One cursor per call: DuckDB connections must not be shared across threads.
+        cursor = self.con.cursor()
+        try:
+            return cursor.execute(sql, params).df() if params else cursor.execute(sql).df()
+        finally:
+            cursor.close()
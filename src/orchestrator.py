@@ -0,0 +1,400 @@
+"""Pipeline orchestrator: stages as a DAG with content-hash skipping.
+
+Each stage declares the files it reads (globs, hashed by content), the
+files it must produce, the tables whose load watermarks it depends on, the
+tables it writes, and its upstream stages. The project modules a script
+imports (followed transitively) are hashed as inputs too, so a change to
+DDL or refresh logic in ``src/`` reruns every stage that runs it. A stage's
+fingerprint combines all of these with its upstream fingerprints; a stage is skipped when its fingerprint matches the
+last successful run recorded in ``data/state/run_history.jsonl`` and its
+outputs exist. Independent stages run in parallel, each as its own
+``python <script>`` process.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import subprocess
+import sys
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.db import PROJECT_ROOT, get_connection
+from src.watermarks import read_watermarks
+
+DEFAULT_HISTORY_PATH = PROJECT_ROOT / "data" / "state" / "run_history.jsonl"
+
+CORE_TABLES = ("donors", "campaigns", "donations", "portfolio_holders", "portfolio_assignments")
+
+SUCCEEDED = "succeeded"
+SKIPPED = "skipped"
+FAILED = "failed"
+BLOCKED = "blocked"
+WOULD_RUN = "would_run"
+
+
+class OrchestratorError(ValueError):
+    """Raised for invalid stage graphs."""
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One pipeline step.
+
+    Attributes:
+        name: Stage name used on the command line and in run history.
+        script: Python script (relative to the project root) to execute.
+        inputs: Glob patterns of files whose contents affect the stage, besides
+            the script and the project modules it imports.
+        outputs: Files the stage produces; a missing output forces a run.
+        tables: Tables whose load watermarks are inputs to the stage.
+        writes: Tables the stage writes. Their watermarks are left out of its
+            fingerprint, so neither its own writes nor connector syncs into
+            the same tables force it to run again.
+        depends_on: Upstream stage names.
+    """
+
+    name: str
+    script: str
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    tables: tuple[str, ...] = ()
+    writes: tuple[str, ...] = ()
+    depends_on: tuple[str, ...] = ()
+
+    @property
+    def watched_tables(self) -> tuple[str, ...]:
+        """Tables whose watermarks go into the fingerprint (``tables`` minus ``writes``)."""
+        return tuple(t for t in self.tables if t not in self.writes)
+
+
+PIPELINE: tuple[Stage, ...] = (
+    Stage(
+        "generate",
+        "generate_sample_data.py",
+        inputs=("generate_sample_data.py",),
+        outputs=tuple(f"data/synthetic/{t}.csv" for t in CORE_TABLES),
+    ),
+    Stage(
+        "setup",
+        "database_setup.py",
+        inputs=("database_setup.py",),
+    ),
+    Stage(
+        "load",
+        "load_data.py",
+        inputs=(
+            "load_data.py",
+            "data/synthetic/*.csv",
+            "config/data_quality.toml",
+        ),
+        writes=CORE_TABLES,
+        depends_on=("generate", "setup"),
+    ),
+    Stage(
+        "views",
+        "create_views.py",
+        inputs=("create_views.py", "sql/views.sql"),
+        tables=("donors", "campaigns", "donations"),
+        depends_on=("load",),
+    ),
+)
+
+
+@dataclass
+class StageOutcome:
+    """What happened to one stage in a run."""
+
+    stage: str
+    status: str
+    fingerprint: str | None = None
+    seconds: float = 0.0
+    reason: str = ""
+    output: str = field(default="", repr=False)
+
+
+def hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprints(root: Path, patterns: Iterable[str]) -> dict[str, str]:
+    """Content hash per file matched by the patterns ("missing" for empty globs)."""
+    hashes: dict[str, str] = {}
+    for pattern in patterns:
+        matches = sorted(p for p in root.glob(pattern) if p.is_file())
+        if not matches:
+            hashes[pattern] = "missing"
+        for path in matches:
+            hashes[path.relative_to(root).as_posix()] = hash_file(path)
+    return hashes
+
+
+def local_imports(root: Path, script: str) -> tuple[str, ...]:
+    """Project modules a script imports, directly or through other project modules.
+
+    Only imports that resolve to a file under ``root`` (e.g. ``src.portfolio``
+    or ``from src import db``) are followed; a missing or unparsable script
+    has none.
+
+    Returns:
+        Sorted paths relative to ``root``.
+    """
+    found: set[str] = set()
+    pending = [root / script]
+    while pending:
+        path = pending.pop()
+        try:
+            tree = ast.parse(path.read_text(encoding="utf-8"))
+        except (OSError, SyntaxError, ValueError):
+            continue
+        names: list[str] = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.extend(a.name for a in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names.append(node.module)
+                names.extend(f"{node.module}.{a.name}" for a in node.names)
+        for name in names:
+            base = root.joinpath(*name.split("."))
+            for candidate in (base.with_suffix(".py"), base / "__init__.py"):
+                rel = candidate.relative_to(root).as_posix()
+                if rel not in found and candidate.is_file():
+                    found.add(rel)
+                    pending.append(candidate)
+    return tuple(sorted(found))
+
+
+def topological_order(stages: Iterable[Stage]) -> list[Stage]:
+    """Stages ordered so every stage follows its dependencies.
+
+    Raises:
+        OrchestratorError: On unknown dependencies or cycles.
+    """
+    by_name = {s.name: s for s in stages}
+    for stage in by_name.values():
+        unknown = set(stage.depends_on) - set(by_name)
+        if unknown:
+            raise OrchestratorError(f"Stage {stage.name!r} depends on unknown {sorted(unknown)}")
+    ordered: list[Stage] = []
+    done: set[str] = set()
+    remaining = dict(by_name)
+    while remaining:
+        ready = [s for s in remaining.values() if set(s.depends_on) <= done]
+        if not ready:
+            raise OrchestratorError(f"Dependency cycle among {sorted(remaining)}")
+        for stage in ready:
+            ordered.append(stage)
+            done.add(stage.name)
+            del remaining[stage.name]
+    return ordered
+
+
+def with_upstream(stages: Iterable[Stage], selected: Iterable[str]) -> set[str]:
+    """Selected stage names plus everything they depend on."""
+    by_name = {s.name: s for s in stages}
+    wanted: set[str] = set()
+    pending = list(selected)
+    while pending:
+        name = pending.pop()
+        if name not in by_name:
+            raise OrchestratorError(f"Unknown stage {name!r}")
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(by_name[name].depends_on)
+    return wanted
+
+
+class RunHistory:
+    """Append-only JSON Lines log of stage outcomes."""
+
+    def __init__(self, path: Path = DEFAULT_HISTORY_PATH):
+        self.path = Path(path)
+        self._last_success: dict[str, str] = {}
+        if self.path.exists():
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    if record["status"] in (SUCCEEDED, SKIPPED):
+                        self._last_success[record["stage"]] = record["fingerprint"]
+
+    def last_success(self, stage: str) -> str | None:
+        """Fingerprint of the stage's most recent successful (or skipped) run."""
+        return self._last_success.get(stage)
+
+    def append(self, run_id: str, outcome: StageOutcome) -> None:
+        record = {
+            "run_id": run_id,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            **{k: v for k, v in asdict(outcome).items() if k != "output"},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        if outcome.status in (SUCCEEDED, SKIPPED):
+            self._last_success[outcome.stage] = outcome.fingerprint
+
+
+def read_table_watermarks(tables: Iterable[str]) -> dict[str, int]:
+    """Load watermarks from the database (empty if it is unreachable)."""
+    try:
+        conn = get_connection(source="orchestrator", connect_timeout=5)
+    except Exception:
+        return {}
+    try:
+        with conn.cursor() as cursor:
+            return read_watermarks(cursor, tables)
+    except Exception:
+        return {}
+    finally:
+        conn.close()
+
+
+def run_script(root: Path, script: str) -> tuple[int, str]:
+    """Run a stage script with this interpreter; returns (exit code, combined output)."""
+    proc = subprocess.run(
+        [sys.executable, script],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    return proc.returncode, proc.stdout + proc.stderr
+
+
+class Orchestrator:
+    """Runs a stage DAG, skipping stages whose fingerprints are unchanged.
+
+    Args:
+        stages: Pipeline stages (validated as a DAG).
+        root: Directory scripts and input globs are relative to.
+        history: Run history used for skip decisions and appended to.
+        watermark_reader: Callable returning {table: version}.
+        runner: Callable ``(root, script) -> (exit_code, output)``.
+        max_workers: Stages that may run at the same time.
+    """
+
+    def __init__(
+        self,
+        stages: Iterable[Stage] = PIPELINE,
+        root: Path = PROJECT_ROOT,
+        history: RunHistory | None = None,
+        watermark_reader: Callable[[Iterable[str]], dict[str, int]] = read_table_watermarks,
+        runner: Callable[[Path, str], tuple[int, str]] = run_script,
+        max_workers: int = 4,
+    ):
+        self.stages = topological_order(stages)
+        self.by_name = {s.name: s for s in self.stages}
+        self.root = Path(root)
+        self.history = history if history is not None else RunHistory()
+        self.watermark_reader = watermark_reader
+        self.runner = runner
+        self.max_workers = max_workers
+
+    def fingerprint(self, stage: Stage, upstream: dict[str, str]) -> str:
+        """Hash of the stage definition, input files, table watermarks and upstream fingerprints."""
+        tables = stage.watched_tables
+        watermarks = self.watermark_reader(tables) if tables else {}
+        payload = {
+            "script": stage.script,
+            "files": file_fingerprints(
+                self.root, (stage.script, *local_imports(self.root, stage.script), *stage.inputs)
+            ),
+            "tables": {t: watermarks.get(t) for t in tables},
+            "upstream": {d: upstream.get(d) for d in stage.depends_on},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def _skip_reason(self, stage: Stage, fingerprint: str, force: bool) -> str | None:
+        if force:
+            return None
+        missing = [o for o in stage.outputs if not (self.root / o).exists()]
+        if missing:
+            return None
+        if self.history.last_success(stage.name) == fingerprint:
+            return "inputs unchanged"
+        return None
+
+    def run(
+        self,
+        selected: Iterable[str] | None = None,
+        force: bool = False,
+        dry_run: bool = False,
+    ) -> list[StageOutcome]:
+        """Run (or plan) the pipeline.
+
+        Args:
+            selected: Stage names to run, plus their upstream stages (default: all).
+            force: Run every selected stage regardless of fingerprints.
+            dry_run: Only report which stages would run or be skipped.
+
+        Returns:
+            One outcome per selected stage, in topological order.
+        """
+        wanted = with_upstream(self.stages, selected) if selected else set(self.by_name)
+        stages = [s for s in self.stages if s.name in wanted]
+        run_id = str(uuid.uuid4())
+        outcomes: dict[str, StageOutcome] = {}
+        fingerprints: dict[str, str] = {}
+
+        if dry_run:
+            for stage in stages:
+                fp = self.fingerprint(stage, fingerprints)
+                fingerprints[stage.name] = fp
+                upstream_runs = any(outcomes[d].status == WOULD_RUN for d in stage.depends_on if d in outcomes)
+                reason = None if upstream_runs else self._skip_reason(stage, fp, force)
+                outcomes[stage.name] = StageOutcome(stage.name, SKIPPED if reason else WOULD_RUN, fp, reason=reason or "")
+            return [outcomes[s.name] for s in stages]
+
+        running: dict[Future, tuple[Stage, str, float]] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(outcomes) < len(stages):
+                for stage in stages:
+                    if stage.name in outcomes or any(s.name == stage.name for s, _, _ in running.values()):
+                        continue
+                    deps = [outcomes.get(d) for d in stage.depends_on if d in wanted]
+                    if any(d is None for d in deps):
+                        continue
+                    if any(d.status in (FAILED, BLOCKED) for d in deps):
+                        outcomes[stage.name] = StageOutcome(stage.name, BLOCKED, reason="upstream failed")
+                        self.history.append(run_id, outcomes[stage.name])
+                        continue
+                    fp = self.fingerprint(stage, fingerprints)
+                    reason = self._skip_reason(stage, fp, force)
+                    if reason:
+                        fingerprints[stage.name] = fp
+                        outcomes[stage.name] = StageOutcome(stage.name, SKIPPED, fp, reason=reason)
+                        self.history.append(run_id, outcomes[stage.name])
+                        continue
+                    future = pool.submit(self.runner, self.root, stage.script)
+                    running[future] = (stage, fp, time.perf_counter())
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, fp, started = running.pop(future)
+                    seconds = time.perf_counter() - started
+                    try:
+                        code, output = future.result()
+                    except Exception as e:
+                        code, output = 1, f"{type(e).__name__}: {e}"
+                    if code == 0:
+                        # Re-fingerprint: the stage may have bumped watermarks of its own tables.
+                        fp = self.fingerprint(stage, fingerprints)
+                        fingerprints[stage.name] = fp
+                        outcome = StageOutcome(stage.name, SUCCEEDED, fp, seconds, output=output)
+                    else:
+                        outcome = StageOutcome(stage.name, FAILED, fp, seconds, f"exit code {code}", output)
+                    outcomes[stage.name] = outcome
+                    self.history.append(run_id, outcome)
+        return [outcomes[s.name] for s in stages]
@@ -0,0 +1,195 @@
+"""Per-portfolio aggregates for the portfolio holder dashboard.
+
+``refresh_portfolio_aggregates`` rebuilds two small tables after each load:
+
+- ``portfolio_donor_summary``: one row per (holder, assigned donor) with
+  lifetime, current-year and prior-year giving and a retention status.
+- ``portfolio_summary``: one row per holder with totals, retention rate
+  and counts of lapsing and upgraded donors.
+
+Years are the 12 months ending at ``as_of`` (default: the latest donation
+date) and the 12 months before that. The dashboard then reads a holder's
+figures by primary key instead of joining across all donations.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+
+from src.watermarks import bump_watermarks
+
+PORTFOLIO_TABLES = ("portfolio_donor_summary", "portfolio_summary")
+
+# Retention status of an assigned donor, comparing the current and prior year.
+STATUSES = ("upgraded", "downgraded", "retained", "new", "lapsing", "lapsed", "no_gifts")
+
+PORTFOLIO_AGGREGATES_DDL = """
+CREATE TABLE IF NOT EXISTS portfolio_donor_summary (
+    portfolio_holder_id INTEGER NOT NULL,
+    donor_id INTEGER NOT NULL,
+    gift_count INTEGER NOT NULL,
+    lifetime_total NUMERIC(14, 2) NOT NULL,
+    first_gift_date DATE,
+    last_gift_date DATE,
+    current_year_total NUMERIC(14, 2) NOT NULL,
+    prior_year_total NUMERIC(14, 2) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    PRIMARY KEY (portfolio_holder_id, donor_id)
+);
+CREATE INDEX IF NOT EXISTS idx_portfolio_donor_summary_status
+    ON portfolio_donor_summary(portfolio_holder_id, status);
+
+CREATE TABLE IF NOT EXISTS portfolio_summary (
+    portfolio_holder_id INTEGER PRIMARY KEY,
+    holder_name VARCHAR(255),
+    donor_count INTEGER NOT NULL,
+    lifetime_total NUMERIC(14, 2) NOT NULL,
+    current_year_total NUMERIC(14, 2) NOT NULL,
+    prior_year_total NUMERIC(14, 2) NOT NULL,
+    current_year_donors INTEGER NOT NULL,
+    prior_year_donors INTEGER NOT NULL,
+    retained_donors INTEGER NOT NULL,
+    retention_rate NUMERIC(5, 4),
+    lapsing_donors INTEGER NOT NULL,
+    upgraded_donors INTEGER NOT NULL,
+    as_of DATE,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""
+
+_REFRESH_DONORS_SQL = """
+INSERT INTO portfolio_donor_summary (
+    portfolio_holder_id, donor_id, gift_count, lifetime_total, first_gift_date,
+    last_gift_date, current_year_total, prior_year_total, status
+)
+WITH gifts AS (
+    SELECT
+        pa.portfolio_holder_id,
+        pa.donor_id,
+        COUNT(dn.donation_id) AS gift_count,
+        COALESCE(SUM(dn.amount), 0) AS lifetime_total,
+        MIN(dn.donation_date) AS first_gift_date,
+        MAX(dn.donation_date) AS last_gift_date,
+        COALESCE(SUM(dn.amount) FILTER (WHERE dn.donation_date > %(current_start)s), 0) AS current_total,
+        COUNT(dn.donation_id) FILTER (WHERE dn.donation_date > %(current_start)s) AS current_gifts,
+        COALESCE(SUM(dn.amount) FILTER (
+            WHERE dn.donation_date > %(prior_start)s AND dn.donation_date <= %(current_start)s
+        ), 0) AS prior_total,
+        COUNT(dn.donation_id) FILTER (
+            WHERE dn.donation_date > %(prior_start)s AND dn.donation_date <= %(current_start)s
+        ) AS prior_gifts
+    FROM (SELECT DISTINCT portfolio_holder_id, donor_id FROM portfolio_assignments) pa
+    LEFT JOIN donations dn ON dn.donor_id = pa.donor_id AND dn.donation_date <= %(as_of)s
+    GROUP BY pa.portfolio_holder_id, pa.donor_id
+)
+SELECT
+    portfolio_holder_id, donor_id, gift_count, lifetime_total, first_gift_date,
+    last_gift_date, current_total, prior_total,
+    CASE
+        WHEN current_gifts > 0 AND prior_gifts > 0 AND current_total > prior_total THEN 'upgraded'
+        WHEN current_gifts > 0 AND prior_gifts > 0 AND current_total < prior_total THEN 'downgraded'
+        WHEN current_gifts > 0 AND prior_gifts > 0 THEN 'retained'
+        WHEN current_gifts > 0 THEN 'new'
+        WHEN prior_gifts > 0 THEN 'lapsing'
+        WHEN gift_count > 0 THEN 'lapsed'
+        ELSE 'no_gifts'
+    END
+FROM gifts
+"""
+
+_REFRESH_HOLDERS_SQL = """
+INSERT INTO portfolio_summary (
+    portfolio_holder_id, holder_name, donor_count, lifetime_total, current_year_total,
+    prior_year_total, current_year_donors, prior_year_donors, retained_donors,
+    retention_rate, lapsing_donors, upgraded_donors, as_of, refreshed_at
+)
+SELECT
+    ph.portfolio_holder_id,
+    ph.name,
+    COUNT(s.donor_id),
+    COALESCE(SUM(s.lifetime_total), 0),
+    COALESCE(SUM(s.current_year_total), 0),
+    COALESCE(SUM(s.prior_year_total), 0),
+    COUNT(*) FILTER (WHERE s.status IN ('upgraded', 'downgraded', 'retained', 'new')),
+    COUNT(*) FILTER (WHERE s.status IN ('upgraded', 'downgraded', 'retained', 'lapsing')),
+    COUNT(*) FILTER (WHERE s.status IN ('upgraded', 'downgraded', 'retained')),
+    (COUNT(*) FILTER (WHERE s.status IN ('upgraded', 'downgraded', 'retained'))::numeric
+        / NULLIF(COUNT(*) FILTER (WHERE s.status IN ('upgraded', 'downgraded', 'retained', 'lapsing')), 0)
+    )::numeric(5, 4),
+    COUNT(*) FILTER (WHERE s.status = 'lapsing'),
+    COUNT(*) FILTER (WHERE s.status = 'upgraded'),
+    %(as_of)s,
+    NOW()
+FROM portfolio_holders ph
+LEFT JOIN portfolio_donor_summary s ON s.portfolio_holder_id = ph.portfolio_holder_id
+GROUP BY ph.portfolio_holder_id, ph.name
+"""
+
+PORTFOLIO_OVERVIEW_SQL = """
+SELECT
+    portfolio_holder_id, holder_name, donor_count, lifetime_total, current_year_total,
+    prior_year_total, retention_rate, lapsing_donors, upgraded_donors, as_of
+FROM portfolio_summary
+ORDER BY holder_name;
+"""
+
+
+def portfolio_donors_query(holder_id: int, status: str, limit: int = 50) -> tuple[str, dict[str, object]]:
+    """Donors in one holder's portfolio with a given status (index read).
+
+    Lapsing donors are ordered by what they gave last year, everyone else
+    by this year's giving.
+    """
+    if status not in STATUSES:
+        raise ValueError(f"Unknown portfolio status: {status!r}")
+    order = "s.prior_year_total" if status in ("lapsing", "lapsed") else "s.current_year_total"
+    return f"""
+SELECT
+    s.donor_id, d.first_name, d.last_name, d.email, s.gift_count, s.lifetime_total,
+    s.prior_year_total, s.current_year_total, s.last_gift_date
+FROM portfolio_donor_summary s
+JOIN donors d ON d.donor_id = s.donor_id
+WHERE s.portfolio_holder_id = %(holder_id)s AND s.status = %(status)s
+ORDER BY {order} DESC, s.donor_id
+LIMIT %(limit)s;
+""", {"holder_id": holder_id, "status": status, "limit": limit}
+
+
+def ensure_portfolio_schema(cursor) -> None:
+    """Create the portfolio aggregate tables (safe to run repeatedly)."""
+    cursor.execute(PORTFOLIO_AGGREGATES_DDL)
+
+
+def refresh_portfolio_aggregates(conn, as_of: date | None = None) -> dict[str, int]:
+    """Rebuild both aggregate tables in one transaction and bump their watermarks.
+
+    Args:
+        conn: Open psycopg2 connection.
+        as_of: End of the current year window (default: latest donation date).
+
+    Returns:
+        Dict with "donors" and "holders" row counts written.
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT d, (d - INTERVAL '1 year')::date, (d - INTERVAL '2 years')::date
+                FROM (SELECT COALESCE(%(as_of)s::date, MAX(donation_date), CURRENT_DATE) AS d FROM donations) x
+                """,
+                {"as_of": as_of},
+            )
+            effective, current_start, prior_start = cursor.fetchone()
+            params = {"as_of": effective, "current_start": current_start, "prior_start": prior_start}
+            cursor.execute("DELETE FROM portfolio_donor_summary")
+            cursor.execute(_REFRESH_DONORS_SQL, params)
+            donors = cursor.rowcount
+            cursor.execute("DELETE FROM portfolio_summary")
+            cursor.execute(_REFRESH_HOLDERS_SQL, params)
+            holders = cursor.rowcount
+            bump_watermarks(cursor, PORTFOLIO_TABLES)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {"donors": donors, "holders": holders}
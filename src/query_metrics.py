@@ -0,0 +1,368 @@
+"""Query latency instrumentation for the dashboard and the loaders.
+
+Connections from ``src.db.get_connection`` use ``InstrumentedCursor``, which
+times every ``execute``/``executemany``/``copy_expert`` and records it in the
+process-wide ``METRICS`` registry under a normalized query fingerprint
+(literals and parameters replaced by ``?``). The registry keeps a rolling
+window of durations per fingerprint for p50/p95/p99, counts cache hits
+reported by callers (e.g. Streamlit's cache), and buffers entries until
+``flush_query_log`` writes them to the ``query_log`` table.
+
+SELECTs slower than ``slow_ms`` (env QUERY_SLOW_MS, default 500) are re-run
+once under ``EXPLAIN (ANALYZE, BUFFERS)`` and the plan is stored with the
+log entry; each fingerprint is explained at most once per cooldown.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import psycopg2.extensions
+import psycopg2.sql
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG_DDL = """
+CREATE TABLE IF NOT EXISTS query_log (
+    log_id BIGSERIAL PRIMARY KEY,
+    logged_at TIMESTAMPTZ NOT NULL,
+    source VARCHAR(50),
+    fingerprint CHAR(16) NOT NULL,
+    query_text TEXT NOT NULL,
+    duration_ms NUMERIC(12, 3) NOT NULL,
+    rows_returned BIGINT,
+    cache_hit BOOLEAN NOT NULL DEFAULT FALSE,
+    plan JSONB
+);
+CREATE INDEX IF NOT EXISTS idx_query_log_fp_time ON query_log(fingerprint, logged_at);
+"""
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMS = re.compile(r"%\(\w+\)s|%s")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+_READ_ONLY = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+# Data-modifying CTEs, SELECT ... INTO (creates a table) and FOR UPDATE/SHARE locks.
+_WRITES = re.compile(r"\b(insert|update|delete|merge|into|for\s+(?:key\s+)?share)\b", re.IGNORECASE)
+
+
+def is_read_only(sql: str | bytes) -> bool:
+    """True for a SELECT, or a WITH query, that writes nothing and takes no row locks.
+
+    EXPLAIN ANALYZE executes the statement, so anything else is never explained.
+    """
+    text = sql.decode("utf-8", errors="replace") if isinstance(sql, bytes) else sql
+    text = _STRINGS.sub("''", _COMMENTS.sub(" ", text))
+    return bool(_READ_ONLY.match(text)) and not _WRITES.search(text)
+
+
+def normalize_sql(sql: str | bytes) -> str:
+    """Query shape: comments dropped, literals and parameters as ``?``, whitespace collapsed."""
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", errors="replace")
+    text = _COMMENTS.sub(" ", sql)
+    text = _STRINGS.sub("?", text)
+    text = _PARAMS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _LISTS.sub("(?...)", text)
+    return _SPACE.sub(" ", text).strip().rstrip(";").strip().lower()
+
+
+def first_statement(sql: str | bytes) -> str | bytes:
+    """The first statement of a multi-statement batch (e.g. an ``execute_batch`` page).
+
+    Batches are fingerprinted by their first statement, so normalizing one
+    costs the same as a single statement instead of growing with page size.
+    """
+    sep = b";" if isinstance(sql, bytes) else ";"
+    end = sql.find(sep)
+    if end == -1 or not sql[end + 1:].strip():
+        return sql
+    return sql[:end]
+
+
+def fingerprint(sql: str | bytes) -> tuple[str, str]:
+    """(16-hex-digit id, normalized text) for a query."""
+    text = normalize_sql(sql)
+    return hashlib.md5(text.encode("utf-8")).hexdigest()[:16], text
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(q / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class _FingerprintStats:
+    text: str
+    durations: deque = field(default_factory=deque)
+    calls: int = 0
+    cache_hits: int = 0
+    rows: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+class QueryMetrics:
+    """Thread-safe rolling statistics per query fingerprint.
+
+    Args:
+        window: Durations kept per fingerprint for percentiles.
+        slow_ms: Threshold above which SELECTs are EXPLAINed.
+        explain_cooldown_s: Minimum seconds between plans for one fingerprint.
+        max_pending: Log entries buffered before the oldest are dropped.
+    """
+
+    def __init__(
+        self,
+        window: int = 500,
+        slow_ms: float = 500.0,
+        explain_cooldown_s: float = 300.0,
+        max_pending: int = 10_000,
+    ):
+        self.window = window
+        self.slow_ms = slow_ms
+        self.explain_cooldown_s = explain_cooldown_s
+        self._stats: dict[str, _FingerprintStats] = {}
+        self._pending: deque[tuple] = deque(maxlen=max_pending)
+        self._last_explained: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        sql: str | bytes,
+        duration_ms: float,
+        rows: int | None = None,
+        cache_hit: bool = False,
+        source: str | None = None,
+        plan: object | None = None,
+    ) -> str:
+        """Record one execution (or cache hit); returns the fingerprint."""
+        fp, text = fingerprint(sql)
+        with self._lock:
+            stats = self._stats.get(fp)
+            if stats is None:
+                stats = self._stats[fp] = _FingerprintStats(text, deque(maxlen=self.window))
+            if cache_hit:
+                stats.cache_hits += 1
+            else:
+                stats.calls += 1
+                stats.durations.append(duration_ms)
+                stats.total_ms += duration_ms
+                stats.max_ms = max(stats.max_ms, duration_ms)
+                stats.rows += max(rows or 0, 0)
+            self._pending.append((
+                time.time(), source, fp, text, round(duration_ms, 3),
+                rows if rows is not None and rows >= 0 else None, cache_hit,
+                json.dumps(plan) if plan is not None else None,
+            ))
+        return fp
+
+    def should_explain(self, sql: str | bytes, duration_ms: float) -> bool:
+        """True for a slow read-only query not explained within the cooldown."""
+        if duration_ms < self.slow_ms:
+            return False
+        if not is_read_only(sql):
+            return False
+        fp, _ = fingerprint(sql)
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_explained.get(fp)
+            if last is not None and now - last < self.explain_cooldown_s:
+                return False
+            self._last_explained[fp] = now
+        return True
+
+    def snapshot(self) -> list[dict[str, object]]:
+        """Per-fingerprint summary, slowest p95 first."""
+        with self._lock:
+            items = [(fp, s, sorted(s.durations)) for fp, s in self._stats.items()]
+        rows = []
+        for fp, s, durations in items:
+            lookups = s.calls + s.cache_hits
+            rows.append({
+                "fingerprint": fp,
+                "query": s.text,
+                "calls": s.calls,
+                "cache_hits": s.cache_hits,
+                "cache_hit_ratio": round(s.cache_hits / lookups, 3) if lookups else 0.0,
+                "p50_ms": round(_percentile(durations, 50), 3),
+                "p95_ms": round(_percentile(durations, 95), 3),
+                "p99_ms": round(_percentile(durations, 99), 3),
+                "avg_ms": round(s.total_ms / s.calls, 3) if s.calls else 0.0,
+                "max_ms": round(s.max_ms, 3),
+                "avg_rows": round(s.rows / s.calls, 1) if s.calls else 0.0,
+            })
+        return sorted(rows, key=lambda r: r["p95_ms"], reverse=True)
+
+    def drain(self) -> list[tuple]:
+        """Remove and return buffered log entries."""
+        with self._lock:
+            entries = list(self._pending)
+            self._pending.clear()
+        return entries
+
+    def requeue(self, entries: list[tuple]) -> None:
+        """Put drained entries back at the front of the buffer (e.g. after a failed flush)."""
+        with self._lock:
+            self._pending.extendleft(reversed(entries))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._pending.clear()
+            self._last_explained.clear()
+
+
+METRICS = QueryMetrics(slow_ms=float(os.getenv("QUERY_SLOW_MS", "500")))
+
+
+class MetricsConnection(psycopg2.extensions.connection):
+    """Connection carrying a ``metrics_source`` label (e.g. "dashboard", "load_data")."""
+
+    metrics_source: str | None = None
+
+
+class _Instrumented:
+    """Timing wrappers for ``execute``, ``executemany`` and ``copy_expert``.
+
+    Mixed in ahead of a psycopg2 cursor class; see ``InstrumentedCursor``.
+    """
+
+    def _record(self, query, params, started: float, failed: bool = False) -> None:
+        duration_ms = (time.perf_counter() - started) * 1000
+        if isinstance(query, psycopg2.sql.Composable):
+            query = query.as_string(self)
+        first = first_statement(query)
+        source = getattr(self.connection, "metrics_source", None)
+        plan = None
+        # Batches are never explained: their parameters belong to the whole batch.
+        if not failed and first is query and METRICS.should_explain(query, duration_ms):
+            plan = explain_analyze(self.connection, query, params)
+        rows = None if failed else self.rowcount
+        METRICS.record(first, duration_ms, rows, source=source, plan=plan)
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            self._record(query, vars, started, failed=True)
+            raise
+        self._record(query, vars, started)
+        return result
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            result = super().executemany(query, vars_list)
+        except Exception:
+            self._record(query, None, started, failed=True)
+            raise
+        self._record(query, None, started)
+        return result
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            result = super().copy_expert(sql, file, size)
+        except Exception:
+            self._record(sql, None, started, failed=True)
+            raise
+        self._record(sql, None, started)
+        return result
+
+
+class InstrumentedCursor(_Instrumented, psycopg2.extensions.cursor):
+    """psycopg2 cursor that records every statement in ``METRICS``.
+
+    ``psycopg2.sql`` queries are rendered against the cursor before they are
+    fingerprinted. Multi-statement batches are recorded once, under their
+    first statement. Bulk paths (CSV loads, connector syncs) may still open
+    connections with ``instrumented=False`` to skip the timing. The recording source is the connection's
+    ``metrics_source`` attribute (set by ``src.db.get_connection``) when
+    present.
+    """
+
+
+def explain_analyze(conn, sql, params=None) -> object | None:
+    """Run ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` on a plain cursor; None on failure.
+
+    Only called for read-only statements, but ANALYZE does execute the query
+    a second time, which is why plans are rate-limited per fingerprint.
+    Inside a transaction the plan runs under a savepoint, so a failed EXPLAIN
+    (statement timeout, lock, bad parameters) is rolled back to it instead of
+    leaving the caller's transaction aborted.
+    """
+    savepoint = not conn.autocommit
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cursor:
+            if savepoint:
+                cursor.execute("SAVEPOINT query_metrics_explain")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {_as_text(sql)}", params)
+                plan = cursor.fetchone()[0]
+            except Exception:
+                if savepoint:
+                    cursor.execute("ROLLBACK TO SAVEPOINT query_metrics_explain")
+                raise
+            if savepoint:
+                cursor.execute("RELEASE SAVEPOINT query_metrics_explain")
+            return plan
+    except Exception as e:
+        logger.warning("EXPLAIN ANALYZE failed: %s", e)
+        return None
+
+
+def _as_text(sql) -> str:
+    return sql.decode("utf-8") if isinstance(sql, bytes) else str(sql)
+
+
+def ensure_query_log_schema(cursor) -> None:
+    """Create the query_log table (safe to run repeatedly)."""
+    cursor.execute(QUERY_LOG_DDL)
+
+
+def flush_query_log(conn, metrics: QueryMetrics = METRICS) -> int:
+    """Write buffered entries to query_log and commit; returns rows written.
+
+    Uses a plain cursor so the export itself is not recorded. Entries are put
+    back if the insert fails.
+    """
+    entries = metrics.drain()
+    if not entries:
+        return 0
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cursor:
+            execute_values(
+                cursor,
+                """
+                INSERT INTO query_log (
+                    logged_at, source, fingerprint, query_text,
+                    duration_ms, rows_returned, cache_hit, plan
+                ) VALUES %s
+                """,
+                entries,
+                template="(to_timestamp(%s), %s, %s, %s, %s, %s, %s, %s::jsonb)",
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        metrics.requeue(entries)
+        raise
+    return len(entries)
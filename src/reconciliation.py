@@ -0,0 +1,306 @@
+"""Source-versus-database reconciliation for the CSV load.
+
+While each source file is streamed into Postgres, a ``SourceProfile``
+accumulates the row count, exact amount sum, null counts and an
+order-independent checksum (sum of per-row hash prefixes, see
+``src.row_hash``) per table, and per month for donations. After the load,
+one consolidated aggregate query per table computes the same figures in the
+database, and ``reconcile`` produces a JSON-serializable pass/fail report.
+
+The CSV load owns only the rows whose keys appear in its files (connectors
+sync other rows into the same tables), so the database side is restricted to
+the keys the source profile saw.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+
+from src.row_hash import (
+    HashColumn,
+    checksum_terms,
+    frame_row_hashes,
+    ident,
+    money_text,
+    sql_checksum_term,
+)
+
+DEFAULT_REPORT_PATH = Path("data/reports/reconciliation.json")
+
+# Checksums are compared modulo 2**64 so the report stays compact.
+_CHECKSUM_MOD = 1 << 64
+_UNKNOWN_MONTH = "unknown"
+_KEYS_TABLE = "_recon_keys"
+
+
+@dataclass(frozen=True)
+class ReconSpec:
+    """What to reconcile for one loaded table.
+
+    Attributes:
+        table: Target table name.
+        columns: Loaded columns, hashed into the row checksum.
+        amount: Money column to sum exactly, if any.
+        month: Date column for a per-month breakdown, if any.
+        nullable: Columns whose NULL counts are compared.
+    """
+
+    table: str
+    columns: tuple[HashColumn, ...]
+    amount: str | None = None
+    month: str | None = None
+    nullable: tuple[str, ...] = ()
+
+    @property
+    def column_names(self) -> list[str]:
+        return [c.name for c in self.columns]
+
+    @property
+    def key(self) -> str:
+        """Primary key column (the first loaded column)."""
+        return self.columns[0].name
+
+    def aggregate_sql(self, keys_table: str | None = None) -> str:
+        """One aggregate query returning totals (and per-month rows, if configured).
+
+        Every row has the shape ``(is_total, month, row_count, amount_sum,
+        checksum, *null_counts)``. With ``keys_table``, only rows whose key is
+        in its ``key`` column are aggregated.
+        """
+        t = ident(self.table)
+        where = f"\n        WHERE {ident(self.key)} IN (SELECT key FROM {keys_table})" if keys_table else ""
+        amount = f"COALESCE(SUM({ident(self.amount)}), 0)" if self.amount else "0"
+        nulls = "".join(
+            f",\n            COUNT(*) FILTER (WHERE {ident(c)} IS NULL) AS null_{c}"
+            for c in self.nullable
+        )
+        measures = f"""
+            COUNT(*) AS row_count,
+            {amount} AS amount_sum,
+            COALESCE(SUM({sql_checksum_term(self.columns)}), 0) AS checksum{nulls}"""
+        if not self.month:
+            return f"SELECT TRUE AS is_total, NULL::text AS month,{measures}\n        FROM {t}{where}"
+        month = f"to_char({ident(self.month)}, 'YYYY-MM')"
+        return f"""
+        SELECT
+            GROUPING({month}) = 1 AS is_total,
+            {month} AS month,{measures}
+        FROM {t}{where}
+        GROUP BY GROUPING SETS ((), ({month}))
+        """
+
+
+@dataclass
+class _Totals:
+    rows: int = 0
+    amount_sum: Decimal = Decimal("0")
+    checksum: int = 0
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "rows": self.rows,
+            "amount_sum": str(self.amount_sum.quantize(Decimal("0.01"))),
+            "checksum": f"{self.checksum % _CHECKSUM_MOD:016x}",
+        }
+
+
+@dataclass
+class SourceProfile:
+    """Running aggregates over a source file, fed one chunk at a time."""
+
+    spec: ReconSpec
+    totals: _Totals = field(default_factory=_Totals)
+    null_counts: dict[str, int] = field(default_factory=dict)
+    months: dict[str, _Totals] = field(default_factory=dict)
+    key_chunks: list[object] = field(default_factory=list, repr=False)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Fold one chunk of source rows into the profile."""
+        if chunk.empty:
+            return
+        self.key_chunks.append(chunk[self.spec.key].to_numpy())
+        terms = checksum_terms(frame_row_hashes(chunk, self.spec.columns))
+        if self.spec.amount:
+            amounts = chunk[self.spec.amount].map(
+                lambda v: Decimal("0") if pd.isna(v) else Decimal(money_text(v))
+            )
+        else:
+            amounts = pd.Series(Decimal("0"), index=chunk.index, dtype=object)
+        self._add(self.totals, len(chunk), amounts, terms)
+        for col in self.spec.nullable:
+            self.null_counts[col] = self.null_counts.get(col, 0) + int(chunk[col].isna().sum())
+        if self.spec.month:
+            keys = pd.to_datetime(chunk[self.spec.month]).dt.strftime("%Y-%m").fillna(_UNKNOWN_MONTH)
+            for month, idx in keys.groupby(keys).groups.items():
+                self._add(self.months.setdefault(month, _Totals()), len(idx), amounts[idx], terms[idx])
+
+    @staticmethod
+    def _add(target: _Totals, rows: int, amounts: pd.Series, terms: pd.Series) -> None:
+        target.rows += rows
+        target.amount_sum += sum(amounts, Decimal("0"))
+        target.checksum += sum(terms)
+
+    def keys(self) -> Iterator[int]:
+        """Primary keys of every source row seen so far."""
+        for chunk in self.key_chunks:
+            yield from (int(k) for k in chunk)
+
+    def as_dict(self) -> dict[str, object]:
+        result = self.totals.as_dict()
+        result["null_counts"] = dict(self.null_counts)
+        if self.spec.month:
+            result["months"] = {m: t.as_dict() for m, t in sorted(self.months.items())}
+        return result
+
+
+def database_profile(cursor, spec: ReconSpec, keys: Iterable[int] | None = None) -> dict[str, object]:
+    """Run the consolidated aggregate query and shape it like ``SourceProfile.as_dict``.
+
+    Args:
+        cursor: Open psycopg2 cursor.
+        spec: Table to profile.
+        keys: Only profile rows with these primary keys (copied into a
+            temporary table); None profiles the whole table.
+    """
+    keys_table = None
+    if keys is not None:
+        keys_table = _KEYS_TABLE
+        cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {keys_table} (key BIGINT) ON COMMIT DROP")
+        cursor.execute(f"TRUNCATE {keys_table}")
+        cursor.copy_expert(f"COPY {keys_table} (key) FROM STDIN", io.StringIO("".join(f"{k}\n" for k in keys)))
+    cursor.execute(spec.aggregate_sql(keys_table))
+    result: dict[str, object] = {}
+    months: dict[str, dict[str, object]] = {}
+    for row in cursor.fetchall():
+        is_total, month, rows, amount_sum, checksum, *nulls = row
+        totals = _Totals(int(rows), Decimal(amount_sum), int(checksum))
+        if is_total:
+            result.update(totals.as_dict())
+            result["null_counts"] = {c: int(n) for c, n in zip(spec.nullable, nulls)}
+        else:
+            months[month or _UNKNOWN_MONTH] = totals.as_dict()
+    if spec.month:
+        result["months"] = dict(sorted(months.items()))
+    return result
+
+
+def compare(source: dict[str, object], database: dict[str, object]) -> list[str]:
+    """List human-readable mismatches between two profiles (empty when they agree)."""
+    mismatches = []
+    for metric in ("rows", "amount_sum", "checksum", "null_counts"):
+        if source.get(metric) != database.get(metric):
+            mismatches.append(f"{metric}: source={source.get(metric)} database={database.get(metric)}")
+    src_months = source.get("months") or {}
+    db_months = database.get("months") or {}
+    for month in sorted(set(src_months) | set(db_months)):
+        if src_months.get(month) != db_months.get(month):
+            mismatches.append(f"month {month}: source={src_months.get(month)} database={db_months.get(month)}")
+    return mismatches
+
+
+def reconcile(conn, profiles: dict[str, SourceProfile]) -> dict[str, object]:
+    """Compare every source profile with the database rows it loaded and build the report.
+
+    Rows with keys outside the source (e.g. synced by a connector) are not
+    counted. The transaction is rolled back, which drops the key table.
+    """
+    tables: dict[str, object] = {}
+    with conn.cursor() as cursor:
+        for table, profile in profiles.items():
+            source = profile.as_dict()
+            database = database_profile(cursor, profile.spec, profile.keys())
+            mismatches = compare(source, database)
+            tables[table] = {
+                "passed": not mismatches,
+                "mismatches": mismatches,
+                "source": source,
+                "database": database,
+            }
+    conn.rollback()
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "passed": all(t["passed"] for t in tables.values()),
+        "tables": tables,
+    }
+
+
+def write_report(report: dict[str, object], path: Path = DEFAULT_REPORT_PATH) -> Path:
+    """Write the report as JSON and return its path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return path
+
+
+RECON_SPECS: dict[str, ReconSpec] = {
+    spec.table: spec
+    for spec in (
+        ReconSpec(
+            table="donors",
+            columns=(
+                HashColumn("donor_id", "int"),
+                HashColumn("first_name", "text"),
+                HashColumn("last_name", "text"),
+                HashColumn("email", "text"),
+                HashColumn("phone", "text"),
+                HashColumn("address", "text"),
+                HashColumn("city", "text"),
+                HashColumn("state", "text"),
+                HashColumn("zip_code", "text"),
+                HashColumn("created_date", "date"),
+                HashColumn("donor_type", "text"),
+            ),
+        ),
+        ReconSpec(
+            table="campaigns",
+            columns=(
+                HashColumn("campaign_id", "int"),
+                HashColumn("campaign_name", "text"),
+                HashColumn("start_date", "date"),
+                HashColumn("end_date", "date"),
+                HashColumn("goal_amount", "int"),
+                HashColumn("campaign_type", "text"),
+            ),
+        ),
+        ReconSpec(
+            table="donations",
+            columns=(
+                HashColumn("donation_id", "int"),
+                HashColumn("donor_id", "int"),
+                HashColumn("campaign_id", "int"),
+                HashColumn("amount", "money"),
+                HashColumn("donation_date", "date"),
+                HashColumn("payment_method", "text"),
+                HashColumn("is_recurring", "bool"),
+            ),
+            amount="amount",
+            month="donation_date",
+            nullable=("campaign_id",),
+        ),
+        ReconSpec(
+            table="portfolio_holders",
+            columns=(
+                HashColumn("portfolio_holder_id", "int"),
+                HashColumn("name", "text"),
+                HashColumn("email", "text"),
+            ),
+        ),
+        ReconSpec(
+            table="portfolio_assignments",
+            columns=(
+                HashColumn("assignment_id", "int"),
+                HashColumn("donor_id", "int"),
+                HashColumn("portfolio_holder_id", "int"),
+                HashColumn("assigned_date", "date"),
+            ),
+        ),
+    )
+}
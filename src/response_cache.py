@@ -0,0 +1,142 @@
+"""Persistent LLM response cache in SQLite, with LRU eviction under a size cap.
+
+Responses are keyed by a caller-built fingerprint (see
+``src.ai_assistant.explain_fingerprint``). Reads refresh an entry's
+``last_used``; writes evict least recently used entries until the stored
+text fits in ``max_bytes``. Hit and miss counts are kept in the same file,
+so they survive restarts and are shared by every process using it.
+
+The cache is an optimization only: SQLite errors (e.g. a read-only data
+directory) are logged and treated as misses.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CACHE_PATH = _PROJECT_ROOT / "data" / "cache" / "responses.sqlite3"
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def fingerprint(payload: Any) -> str:
+    """SHA-256 of ``payload`` as canonical JSON (sorted keys, no whitespace)."""
+    text = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU cache of response text in one SQLite file.
+
+    Args:
+        path: Database file; its directory is created on first use.
+        max_bytes: Total UTF-8 size of stored responses kept after each write.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._ready:
+            conn.executescript(_SCHEMA)
+            self._ready = True
+        return conn
+
+    def _count(self, conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> str | None:
+        """Cached response for ``key`` (and count a hit), or None (and count a miss)."""
+        try:
+            with closing(self._connect()) as conn, conn:
+                row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self._count(conn, "misses")
+                    return None
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._count(conn, "hits")
+                return row[0]
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Response cache read failed (%s): %s", self.path, e)
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        """Store ``response`` and evict least recently used entries beyond ``max_bytes``."""
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, response, size, now, now),
+                )
+                # Running total from newest to oldest; drop everything past the cap.
+                conn.execute(
+                    """
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS running
+                            FROM responses
+                        ) WHERE running > ?
+                    )
+                    """,
+                    (self.max_bytes,),
+                )
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Response cache write failed (%s): %s", self.path, e)
+
+    def stats(self) -> dict[str, int]:
+        """Hits, misses, stored entries and their total bytes."""
+        out = {"hits": 0, "misses": 0, "entries": 0, "bytes": 0}
+        try:
+            with closing(self._connect()) as conn:
+                out.update(dict(conn.execute("SELECT name, value FROM counters").fetchall()))
+                out["entries"], out["bytes"] = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Response cache stats failed (%s): %s", self.path, e)
+        return out
+
+    def clear(self) -> None:
+        """Drop every response and reset the counters."""
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM responses")
+                conn.execute("DELETE FROM counters")
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Response cache clear failed (%s): %s", self.path, e)
@@ -0,0 +1,125 @@
+"""Type-aware canonical row hashing, identical in Python and in SQL.
+
+Each column is rendered to a canonical text form for its kind (dates as
+YYYY-MM-DD, money with two decimals, booleans as true/false, NULL as a marker
+distinct from the empty string), the columns are joined with a unit
+separator, and the result is md5-hashed. ``sql_row_hash`` and
+``frame_row_hashes`` produce the same hex digest for the same values, so
+hashes computed while reading a source file can be compared with hashes
+computed by Postgres.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+
+import pandas as pd
+
+HASH_SEPARATOR = "\x1f"
+HASH_SEPARATOR_SQL = "chr(31)"
+NULL_MARKER = "\\N"
+
+# Bits of the md5 digest used for additive (order-independent) checksums.
+CHECKSUM_HEX_DIGITS = 15
+
+_IDENT = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+# Column kind -> SQL expression (``{col}`` placeholder) giving its canonical text.
+_CANONICAL_SQL = {
+    "int": "{col}::text",
+    "text": "{col}::text",
+    "date": "to_char({col}, 'YYYY-MM-DD')",
+    "money": "to_char({col}, 'FM999999999990.00')",
+    "bool": "CASE WHEN {col} IS NULL THEN NULL WHEN {col} THEN 'true' ELSE 'false' END",
+}
+
+_TRUE_VALUES = {True, "True", "true", "t", "T", "1", 1}
+
+
+def ident(name: str) -> str:
+    """Validate an identifier from a spec (specs are code constants, never user input)."""
+    if not _IDENT.match(name):
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return name
+
+
+@dataclass(frozen=True)
+class HashColumn:
+    """A column that participates in a row hash.
+
+    Attributes:
+        name: Column name.
+        kind: One of int, text, date, money, bool.
+    """
+
+    name: str
+    kind: str
+
+    def __post_init__(self) -> None:
+        ident(self.name)
+        if self.kind not in _CANONICAL_SQL:
+            raise ValueError(f"Unknown hash column kind: {self.kind!r}")
+
+
+# --- SQL side ---
+
+def sql_canonical(column: HashColumn, prefix: str = "") -> str:
+    """SQL expression rendering one column as canonical text (NULL -> marker)."""
+    expr = _CANONICAL_SQL[column.kind].format(col=f"{prefix}{column.name}")
+    return f"COALESCE({expr}, '{NULL_MARKER}')"
+
+
+def sql_row_hash(columns: tuple[HashColumn, ...] | list[HashColumn], prefix: str = "") -> str:
+    """SQL expression computing the md5 row hash over the given columns."""
+    parts = ", ".join(sql_canonical(c, prefix) for c in columns)
+    return f"md5(concat_ws({HASH_SEPARATOR_SQL}, {parts}))"
+
+
+def sql_checksum_term(columns: tuple[HashColumn, ...] | list[HashColumn], prefix: str = "") -> str:
+    """SQL bigint taken from the row hash; SUM() of it is an order-independent checksum."""
+    return f"('x' || substr({sql_row_hash(columns, prefix)}, 1, {CHECKSUM_HEX_DIGITS}))::bit({CHECKSUM_HEX_DIGITS * 4})::bigint"
+
+
+# --- Python side ---
+
+def money_text(value: object) -> str:
+    """Two-decimal text for a money value, rounded the way Postgres rounds numeric input."""
+    return str(Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+
+def canonical_series(ser: pd.Series, kind: str) -> pd.Series:
+    """Vectorized canonical text for one column (matches ``sql_canonical``)."""
+    null = ser.isna()
+    present = ser[~null]
+    if kind == "int":
+        text = pd.to_numeric(present).astype("int64").astype(str)
+    elif kind == "text":
+        text = present.astype(str)
+    elif kind == "date":
+        text = pd.to_datetime(present).dt.strftime("%Y-%m-%d")
+    elif kind == "money":
+        text = present.map(money_text)
+    elif kind == "bool":
+        text = present.map(lambda v: "true" if v in _TRUE_VALUES else "false")
+    else:
+        raise ValueError(f"Unknown hash column kind: {kind!r}")
+    out = pd.Series(NULL_MARKER, index=ser.index, dtype=object)
+    out[~null] = text.astype(object)
+    return out
+
+
+def frame_row_hashes(df: pd.DataFrame, columns: tuple[HashColumn, ...] | list[HashColumn]) -> pd.Series:
+    """md5 hex digest per row (matches ``sql_row_hash``)."""
+    if df.empty:
+        return pd.Series([], dtype=object, index=df.index)
+    parts = [canonical_series(df[c.name], c.kind) for c in columns]
+    joined = parts[0].str.cat(parts[1:], sep=HASH_SEPARATOR) if len(parts) > 1 else parts[0]
+    return joined.map(lambda s: hashlib.md5(s.encode("utf-8")).hexdigest())
+
+
+def checksum_terms(hashes: pd.Series) -> pd.Series:
+    """Python counterpart of ``sql_checksum_term`` for a Series of hex digests."""
+    return hashes.map(lambda h: int(h[:CHECKSUM_HEX_DIGITS], 16))
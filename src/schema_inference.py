@@ -1,13 +1,36 @@
 """Infer schema and produce a safe, anonymized summary for LLM context.
 
 No PII is included in the output; only structure and anonymized samples.
+
+``infer_schema`` summarizes a DataFrame already in memory. ``profile_upload``
+(and ``profile_csv``) streams a file in chunks through a ``SchemaProfiler``
+instead, so large uploads are never held in memory and partial results can
+be shown while the rest of the file is read. CSV, Excel, JSON and XML are
+read by ``src/intake_readers.py``.
+
+PII is detected twice over: by column name (``PII_PATTERNS``) and by value
+(``PII_VALUE_PATTERNS``: emails, phone numbers, SSN- and card-like numbers),
+so a ``notes`` column full of email addresses is caught too. Values are
+scanned a whole column at a time, and each column's result is kept so a
+file is scanned once, not again for every redacted preview.
+
+Each column also gets a compact profile from mergeable sketches
+(``src/sketches.py``): approximate distinct count, range and quantiles,
+frequent values and value shapes. Values are left out for PII columns.
 """
 
+import re
+import time
+from collections.abc import Iterable, Iterator
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
+import numpy as np
 import pandas as pd
 
+from src.intake_readers import read_chunks
+from src.sketches import ColumnSketch
+
 
 # Column names (case-insensitive) that suggest PII - values will be redacted in samples.
 PII_PATTERNS = (
@@ -22,46 +45,116 @@ def _looks_like_pii(column_name: str) -> bool:
     return any(p in lower for p in PII_PATTERNS)
 
 
+# Value patterns that mark a string column as holding PII, whatever it is called.
+# No lookarounds, so pandas can hand them to Arrow's regex engine (RE2) for
+# pyarrow-backed strings instead of looping over values in Python.
+PII_VALUE_PATTERNS = {
+    "email": r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+",
+    "ssn": r"\b\d{3}-\d{2}-\d{4}\b",
+    "card": r"\b(?:\d{4}[ -]?){3}\d{3,4}\b",
+    "phone": r"(?:\+?1[ .-]?)?\(?\b\d{3}\)?[ .-]?\d{3}[ .-]\d{4}\b",
+}
+_PII_VALUE_RE = re.compile("|".join(f"(?:{p})" for p in PII_VALUE_PATTERNS.values()))
+_PII_KIND_RES = {kind: re.compile(p) for kind, p in PII_VALUE_PATTERNS.items()}
+
+# Kind recorded for columns flagged by name rather than by value.
+PII_BY_NAME = "column_name"
+REDACTED = "[REDACTED]"
+
+
+def _is_text(series: pd.Series) -> bool:
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+
+
+def detect_pii_values(series: pd.Series) -> frozenset[str]:
+    """PII kinds (keys of PII_VALUE_PATTERNS) found anywhere in a text column.
+
+    One vectorized scan with the combined pattern; the per-kind patterns
+    only run over the first matches, to label them.
+    """
+    if not _is_text(series):
+        return frozenset()
+    values = series.dropna().astype(str)
+    hits = values[values.str.contains(_PII_VALUE_RE)].head(1000)
+    if hits.empty:
+        return frozenset()
+    return frozenset(kind for kind, rx in _PII_KIND_RES.items() if hits.str.contains(rx).any())
+
+
+def detect_pii(df: pd.DataFrame, known: dict[str, frozenset[str]] | None = None) -> dict[str, frozenset[str]]:
+    """PII kinds per column, by name and by value.
+
+    Args:
+        df: Rows to scan.
+        known: Earlier results; columns already flagged are not scanned again.
+
+    Returns:
+        Dict of column -> kinds (empty frozenset if nothing was found).
+    """
+    result = dict(known or {})
+    for c in df.columns:
+        kinds = result.get(c)
+        if kinds is None:
+            kinds = frozenset({PII_BY_NAME}) if _looks_like_pii(str(c)) else frozenset()
+        if not kinds:
+            kinds = detect_pii_values(df[c])
+        result[c] = kinds
+    return result
+
+
+def redact_sample(sample_df: pd.DataFrame, pii: dict[str, frozenset[str]]) -> list[dict[str, Any]]:
+    """Sample rows as dicts with PII removed, one column at a time.
+
+    Columns flagged by name have every string or integer value replaced;
+    columns flagged by value keep their text with the matches replaced.
+    """
+    safe = sample_df.astype(object).where(sample_df.notna(), None)
+    for c in sample_df.columns:
+        kinds = pii.get(c, frozenset())
+        present = safe[c].notna()
+        if not kinds or not present.any():
+            continue
+        if PII_BY_NAME in kinds:
+            if sample_df[c].dtype.kind in "iu" or _is_text(sample_df[c]):
+                safe.loc[present, c] = REDACTED
+        else:
+            safe.loc[present, c] = safe.loc[present, c].astype(str).str.replace(_PII_VALUE_RE, REDACTED, regex=True)
+    return safe.to_dict("records")
+
+
 def infer_schema(df: pd.DataFrame, sample_rows: int = 5) -> dict[str, Any]:
     """Infer schema and a safe sample from a DataFrame.
 
-    No PII is included; string columns that look like PII are replaced
-    with a placeholder in the sample.
+    No PII is included: values in columns whose name looks like PII are
+    replaced with a placeholder in the sample, and emails, phone numbers,
+    SSN- and card-like numbers are replaced wherever they appear.
 
     Args:
         df: Input DataFrame (e.g. from CSV upload).
         sample_rows: Number of rows to include in the anonymized sample (default 5).
 
     Returns:
-        Dict with keys: columns (list of {name, dtype, non_null_count}),
+        Dict with keys: columns (list of {name, dtype, non_null_count, pii,
+        profile}; see ``ColumnSketch.summary``),
         shape (rows, cols), sample (list of dicts, PII redacted).
     """
     rows, cols = df.shape
+    pii = detect_pii(df)
     columns = []
     for c in df.columns:
         ser = df[c]
+        sketch = ColumnSketch()
+        sketch.update(ser)
         columns.append({
             "name": str(c),
             "dtype": str(ser.dtype),
             "non_null_count": int(ser.notna().sum()),
+            "pii": sorted(pii[c]),
+            "profile": sketch.summary(pii=bool(pii[c])),
         })
 
-    # Build anonymized sample: first N rows with PII-like columns redacted.
-    sample_df = df.head(sample_rows)
-    sample: list[dict[str, Any]] = []
-    for _, row in sample_df.iterrows():
-        safe_row: dict[str, Any] = {}
-        for k in df.columns:
-            v = row[k]
-            if pd.isna(v):
-                safe_row[k] = None
-            elif _looks_like_pii(k) and isinstance(v, str):
-                safe_row[k] = "[REDACTED]"
-            elif _looks_like_pii(k) and getattr(v, "__class__", None) and "int" in str(type(v)):
-                safe_row[k] = "[REDACTED]"
-            else:
-                safe_row[k] = v
-        sample.append(safe_row)
+    # Build anonymized sample: first N rows with PII redacted.
+    sample = redact_sample(df.head(sample_rows), pii)
 
     return {
         "columns": columns,
@@ -70,16 +163,210 @@ def infer_schema(df: pd.DataFrame, sample_rows: int = 5) -> dict[str, Any]:
     }
 
 
+def merge_dtypes(a: np.dtype | None, b: np.dtype | None) -> np.dtype | None:
+    """Dtype pandas would give a column whose chunks had dtypes ``a`` and ``b``.
+
+    Numbers widen (int + float -> float); any other mix becomes object.
+    None means "no non-null values seen yet".
+    """
+    if a is None or a == b:
+        return b
+    if b is None:
+        return a
+    if a.kind in "iuf" and b.kind in "iuf":
+        return np.result_type(a, b)
+    return np.dtype(object)
+
+
+class SchemaProfiler:
+    """Build an ``infer_schema``-style summary one chunk at a time.
+
+    Row and non-null counts are exact; dtypes are merged across chunks;
+    PII detection is cached per column (a flagged column is not rescanned);
+    each column's ``ColumnSketch`` is updated with every chunk;
+    the sample is a uniform reservoir sample (Algorithm R) over every row
+    seen, kept in file order.
+
+    Args:
+        sample_rows: Rows kept for the anonymized sample.
+        seed: Random seed for the reservoir (for reproducible samples).
+    """
+
+    def __init__(self, sample_rows: int = 5, seed: int | None = None):
+        self.sample_rows = sample_rows
+        self.rows = 0
+        self._columns: list[str] = []
+        self._non_null: dict[str, int] = {}
+        self._dtypes: dict[str, np.dtype | None] = {}
+        self._empty_dtypes: dict[str, np.dtype] = {}
+        self._pii: dict[str, frozenset[str]] = {}
+        self._sketches: dict[str, ColumnSketch] = {}
+        self._reservoir: list[tuple[int, dict[str, Any]]] = []
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Fold one chunk of rows into the profile."""
+        counts = chunk.notna().sum()
+        for c in chunk.columns:
+            if c not in self._non_null:
+                self._columns.append(c)
+                self._non_null[c] = 0
+                self._dtypes[c] = None
+                self._empty_dtypes[c] = chunk[c].dtype
+                self._sketches[c] = ColumnSketch()
+            self._non_null[c] += int(counts[c])
+            self._sketches[c].update(chunk[c])
+            # An all-null chunk says nothing about the column's type.
+            if counts[c]:
+                self._dtypes[c] = merge_dtypes(self._dtypes[c], chunk[c].dtype)
+        self._pii = detect_pii(chunk, self._pii)
+        self._sample_chunk(chunk)
+        self.rows += len(chunk)
+
+    def _sample_chunk(self, chunk: pd.DataFrame) -> None:
+        fill = min(self.sample_rows - len(self._reservoir), len(chunk))
+        for pos in range(max(fill, 0)):
+            self._reservoir.append((self.rows + pos, chunk.iloc[pos].to_dict()))
+        start = max(fill, 0)
+        if start >= len(chunk) or not self.sample_rows:
+            return
+        # Row i (0-based, file-wide) replaces a random slot with probability k / (i + 1).
+        seen = self.rows + np.arange(start, len(chunk))
+        slots = self._rng.integers(0, seen + 1)
+        for pos, slot in zip(np.flatnonzero(slots < self.sample_rows) + start, slots[slots < self.sample_rows]):
+            self._reservoir[slot] = (self.rows + int(pos), chunk.iloc[pos].to_dict())
+
+    def schema(self, complete: bool = True) -> dict[str, Any]:
+        """Current summary, in the same shape as ``infer_schema``.
+
+        Args:
+            complete: False while more chunks are expected; stored under "complete".
+        """
+        columns = [
+            {
+                "name": str(c),
+                "dtype": str(self._dtypes[c] if self._dtypes[c] is not None else self._empty_dtypes[c]),
+                "non_null_count": self._non_null[c],
+                "pii": sorted(self._pii[c]),
+                "profile": self._sketches[c].summary(pii=bool(self._pii[c])),
+            }
+            for c in self._columns
+        ]
+        rows = [row for _, row in sorted(self._reservoir, key=lambda item: item[0])]
+        sample_df = pd.DataFrame(rows, columns=self._columns)
+        return {
+            "columns": columns,
+            "shape": {"rows": self.rows, "cols": len(self._columns)},
+            "sample": redact_sample(sample_df, self._pii),
+            "complete": complete,
+        }
+
+
+def profile_chunks(
+    chunks: Iterable[pd.DataFrame],
+    sample_rows: int = 5,
+    update_every: float = 0.5,
+    seed: int | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Feed DataFrame chunks through ``SchemaProfiler``, yielding refined summaries.
+
+    The first chunk is always yielded (so the caller can show results
+    quickly), then at most one summary every ``update_every`` seconds, then
+    the final summary with ``"complete": True``.
+
+    Args:
+        chunks: DataFrames in file order; later chunks may add columns.
+        sample_rows: Rows kept for the anonymized sample.
+        update_every: Minimum seconds between intermediate summaries.
+        seed: Random seed for the reservoir sample.
+    """
+    profiler = SchemaProfiler(sample_rows=sample_rows, seed=seed)
+    last_yield = None
+    for chunk in chunks:
+        profiler.update(chunk)
+        now = time.perf_counter()
+        if last_yield is None or now - last_yield >= update_every:
+            last_yield = now
+            yield profiler.schema(complete=False)
+    yield profiler.schema(complete=True)
+
+
+def profile_csv(
+    source: str | Path | IO,
+    chunksize: int = 50_000,
+    sample_rows: int = 5,
+    update_every: float = 0.5,
+    seed: int | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Stream a CSV through ``profile_chunks``.
+
+    Args:
+        source: Path or file-like object (e.g. a Streamlit upload).
+        chunksize: Rows parsed per chunk.
+        sample_rows: Rows kept for the anonymized sample.
+        update_every: Minimum seconds between intermediate summaries.
+        seed: Random seed for the reservoir sample.
+    """
+    return profile_upload(source, "csv", chunksize, sample_rows, update_every, seed)
+
+
+def profile_upload(
+    source: str | Path | IO,
+    fmt: str,
+    chunksize: int = 50_000,
+    sample_rows: int = 5,
+    update_every: float = 0.5,
+    seed: int | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Stream a CSV, Excel, JSON or XML upload through ``profile_chunks``.
+
+    Args:
+        source: Path or file-like object (e.g. a Streamlit upload).
+        fmt: Format key from ``src.intake_readers.detect_format``.
+        chunksize: Rows (or records) per chunk.
+        sample_rows: Rows kept for the anonymized sample.
+        update_every: Minimum seconds between intermediate summaries.
+        seed: Random seed for the reservoir sample.
+    """
+    return profile_chunks(read_chunks(source, fmt, chunksize), sample_rows, update_every, seed)
+
+
+def _short(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{int(value):,}" if value.is_integer() else f"{value:,.2f}"
+    text = str(value)
+    return repr(text if len(text) <= 30 else text[:27] + "...")
+
+
+def describe_profile(profile: dict[str, Any], non_null: int) -> str:
+    """One line such as "~12 distinct; range 1..500; median 25; top: 'cash' 52%"."""
+    parts = [f"~{profile['distinct']:,} distinct"]
+    if "min" in profile:
+        parts.append(f"range {_short(profile['min'])}..{_short(profile['max'])}")
+    if profile.get("quantiles"):
+        parts.append(f"median {_short(profile['quantiles']['p50'])}")
+    top = [(v, c) for v, c in profile.get("top", []) if c > 1][:3]
+    if top and non_null:
+        parts.append("top: " + ", ".join(f"{_short(v)} {c / non_null:.0%}" for v, c in top))
+    if profile.get("patterns") and non_null:
+        parts.append("formats: " + ", ".join(f"{p} {c / non_null:.0%}" for p, c in profile["patterns"][:2]))
+    return "; ".join(parts)
+
+
 def format_schema_for_prompt(schema: dict[str, Any]) -> str:
     """Format the schema dict as a string suitable for an LLM system prompt."""
+    rows = f"{schema['shape']['rows']}" if schema.get("complete", True) else f"{schema['shape']['rows']}+ (still reading)"
     lines = [
         "## Ingested data schema",
-        f"- Rows: {schema['shape']['rows']}, Columns: {schema['shape']['cols']}",
+        f"- Rows: {rows}, Columns: {schema['shape']['cols']}",
         "",
         "### Columns",
     ]
     for col in schema["columns"]:
-        lines.append(f"- {col['name']}: {col['dtype']} (non-null: {col['non_null_count']})")
+        pii = f", PII: {', '.join(col['pii'])}" if col.get("pii") else ""
+        lines.append(f"- {col['name']}: {col['dtype']} (non-null: {col['non_null_count']}{pii})")
+        if col.get("profile") and col["non_null_count"]:
+            lines.append(f"  {describe_profile(col['profile'], col['non_null_count'])}")
     lines.append("")
     lines.append("### Sample rows (PII redacted)")
     for i, row in enumerate(schema["sample"], 1):
@@ -0,0 +1,255 @@
+"""Mergeable, fixed-size column sketches for profiling large uploads.
+
+Each sketch is updated with a whole pandas Series or numpy array at a time
+and can be merged with a sketch of the same kind built from other rows, so
+a multi-GB file is profiled chunk by chunk in bounded memory:
+
+- ``HyperLogLog``: approximate distinct count (about 1.6% error at p=12).
+- ``QuantileSketch``: min, max and quantiles from a t-digest-style set of
+  weighted centroids, finer at the tails.
+- ``TopK``: most frequent values, with a bound on how far counts may be
+  under-reported after trimming.
+- ``ColumnSketch``: all of the above for one column, plus a histogram of
+  value shapes (``2024-01-05`` -> ``9999-99-99``).
+"""
+
+from __future__ import annotations
+
+import string
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+_UINT64 = np.uint64
+
+
+def hash_values(values: pd.Series) -> np.ndarray:
+    """64-bit hashes of non-null values; numbers hash by value, not by dtype."""
+    values = values.dropna()
+    if values.dtype.kind in "iuf":
+        values = values.astype("float64")
+    return pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=_UINT64)
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Bit length of each uint64, exact (frexp is exact on 32-bit halves)."""
+    hi = (x >> _UINT64(32)).astype(np.float64)
+    lo = (x & _UINT64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+
+
+class HyperLogLog:
+    """Approximate distinct counter with ``2**p`` one-byte registers.
+
+    Args:
+        p: Precision; relative error is about ``1.04 / sqrt(2**p)``.
+    """
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, hashes: np.ndarray) -> None:
+        """Add 64-bit hashes (see ``hash_values``)."""
+        if not len(hashes):
+            return
+        hashes = np.asarray(hashes, dtype=_UINT64)
+        index = (hashes >> _UINT64(64 - self.p)).astype(np.intp)
+        rest = hashes & _UINT64((1 << (64 - self.p)) - 1)
+        rank = ((64 - self.p) - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: HyperLogLog) -> None:
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(int)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+
+class QuantileSketch:
+    """t-digest-style quantile sketch with at most ``compression + 1`` centroids.
+
+    Values are sorted with the current centroids and regrouped on an arcsine
+    scale of their cumulative rank, so centroids near the minimum and maximum
+    hold few values and the tails stay accurate. Min and max are exact.
+
+    Args:
+        compression: Number of rank bins; higher is more accurate and larger.
+    """
+
+    def __init__(self, compression: int = 200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> int:
+        return int(self.weights.sum())
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(len(values))]))
+
+    def merge(self, other: QuantileSketch) -> None:
+        if not len(other.weights):
+            return
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        q = (np.cumsum(weights) - weights / 2) / weights.sum()
+        bins = np.floor(self.compression * (np.arcsin(2 * q - 1) / np.pi + 0.5))
+        starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q: float) -> float | None:
+        """Approximate ``q`` quantile (0..1), or None if nothing was added."""
+        if not len(self.weights):
+            return None
+        total = self.weights.sum()
+        ranks = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * total, np.r_[0.0, ranks, total], np.r_[self.min, self.means, self.max]))
+
+
+class TopK:
+    """Most frequent values, keeping at most ``capacity`` candidates.
+
+    When candidates are trimmed, the largest dropped count is added to
+    ``error``: a reported count may be low by at most that much.
+
+    Args:
+        k: Values reported by ``top``.
+        capacity: Candidates kept between updates (default ``20 * k``).
+    """
+
+    def __init__(self, k: int = 5, capacity: int | None = None):
+        self.k = k
+        self.capacity = capacity or 20 * k
+        self.counts = pd.Series(dtype="int64")
+        self.error = 0
+
+    def update(self, values: pd.Series) -> None:
+        self.add_counts(values.value_counts(dropna=True, sort=False))
+
+    def merge(self, other: TopK) -> None:
+        self.add_counts(other.counts, other.error)
+
+    def add_counts(self, counts: pd.Series, error: int = 0) -> None:
+        """Add pre-computed counts (index: value)."""
+        merged = counts if self.counts.empty else self.counts.add(counts, fill_value=0)
+        merged = merged.astype("int64").sort_values(ascending=False, kind="stable")
+        self.error += error
+        if len(merged) > self.capacity:
+            self.error += int(merged.iloc[self.capacity])
+            merged = merged.iloc[: self.capacity]
+        self.counts = merged
+
+    def top(self) -> list[tuple[Any, int]]:
+        return [(_plain(v), int(c)) for v, c in self.counts.head(self.k).items()]
+
+
+def _plain(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+
+_SHAPES = str.maketrans(
+    {**dict.fromkeys(string.ascii_uppercase, "A"), **dict.fromkeys(string.ascii_lowercase, "a"),
+     **dict.fromkeys(string.digits, "9")}
+)
+
+
+def value_patterns(text: pd.Series, max_length: int = 24) -> pd.Series:
+    """Shape of each string: upper -> A, lower -> a, digit -> 9, rest kept."""
+    return text.str.slice(0, max_length).str.translate(_SHAPES)
+
+
+class ColumnSketch:
+    """Distinct count, range, quantiles, top values and value shapes for one column.
+
+    Args:
+        top_k: Values and shapes reported.
+    """
+
+    QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+    # Distinct strings per update whose shapes are computed; above this the
+    # shape histogram is estimated from an evenly spaced subset.
+    PATTERN_SAMPLE = 5000
+
+    def __init__(self, top_k: int = 5):
+        self.distinct = HyperLogLog()
+        self.numbers = QuantileSketch()
+        self.top = TopK(top_k)
+        self.patterns = TopK(top_k)
+        self.text_min: str | None = None
+        self.text_max: str | None = None
+
+    def update(self, series: pd.Series) -> None:
+        values = series.dropna()
+        if values.empty:
+            return
+        if values.dtype.kind in "iufb":
+            if values.dtype.kind != "b":
+                self.numbers.update(values.to_numpy(dtype=np.float64))
+            self.distinct.update(hash_values(values))
+            self.top.update(values)
+            return
+        # Text: everything else only needs each distinct string once.
+        counts = values.astype(str).value_counts(sort=False)
+        unique = counts.index.to_series(index=None)
+        self.distinct.update(hash_values(unique))
+        self.top.add_counts(counts)
+        self._text_range(unique.min(), unique.max())
+        if len(unique) > self.PATTERN_SAMPLE:
+            step = len(unique) // self.PATTERN_SAMPLE
+            unique, weights = unique.iloc[::step], counts.to_numpy()[::step]
+            weights = weights * (counts.sum() / weights.sum())
+        else:
+            weights = counts.to_numpy()
+        shapes = pd.Series(weights, index=value_patterns(unique).to_numpy()).groupby(level=0).sum()
+        self.patterns.add_counts(shapes.round().astype("int64"))
+
+    def merge(self, other: ColumnSketch) -> None:
+        self.distinct.merge(other.distinct)
+        self.numbers.merge(other.numbers)
+        self.top.merge(other.top)
+        self.patterns.merge(other.patterns)
+        if other.text_min is not None:
+            self._text_range(other.text_min, other.text_max)
+
+    def _text_range(self, low: str, high: str) -> None:
+        self.text_min = low if self.text_min is None else min(self.text_min, low)
+        self.text_max = high if self.text_max is None else max(self.text_max, high)
+
+    def summary(self, pii: bool = False) -> dict[str, Any]:
+        """Compact profile; values themselves are left out when ``pii`` is set."""
+        out: dict[str, Any] = {"distinct": self.distinct.count()}
+        if self.patterns.counts.size:
+            out["patterns"] = self.patterns.top()
+        if pii:
+            return out
+        if self.numbers.count:
+            out["min"], out["max"] = _plain(self.numbers.min), _plain(self.numbers.max)
+            out["quantiles"] = {f"p{round(q * 100)}": self.numbers.quantile(q) for q in self.QUANTILES}
+        elif self.text_min is not None:
+            out["min"], out["max"] = self.text_min, self.text_max
+        out["top"] = self.top.top()
+        return out
@@ -0,0 +1,215 @@
+"""Giving time series for charts: rollup tables, automatic grain and LTTB.
+
+``refresh_giving_rollups`` rebuilds ``giving_rollups`` after each load with
+donation counts and amounts per day, week and month, split by campaign type
+and donor type so the dashboard filters can still be applied. Week and
+month rows are summed from the day rows rather than from donations.
+
+``choose_grain`` picks the finest grain that keeps a date range under
+``MAX_BUCKETS`` buckets; ``timeseries_query`` reads the matching rollup
+(falling back to the donations table only for the portfolio filter, which
+the rollups do not carry); ``downsample`` applies largest-triangle-three-
+buckets to cap the points sent to a chart while keeping peaks and dips.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.dashboard_queries import DashboardFilters, filtered_donations
+from src.watermarks import bump_watermarks
+
+ROLLUP_TABLES = ("giving_rollups",)
+GRAINS = ("day", "week", "month")
+MAX_BUCKETS = 1000
+MAX_CHART_POINTS = 500
+
+GIVING_ROLLUPS_DDL = """
+CREATE TABLE IF NOT EXISTS giving_rollups (
+    grain VARCHAR(5) NOT NULL,
+    bucket DATE NOT NULL,
+    campaign_type VARCHAR(50),
+    donor_type VARCHAR(50),
+    donation_count INTEGER NOT NULL,
+    total_amount NUMERIC(14, 2) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_giving_rollups_grain_bucket ON giving_rollups(grain, bucket);
+"""
+
+_REFRESH_DAY_SQL = """
+INSERT INTO giving_rollups (grain, bucket, campaign_type, donor_type, donation_count, total_amount)
+SELECT 'day', dn.donation_date, c.campaign_type, d.donor_type, COUNT(*), SUM(dn.amount)
+FROM donations dn
+LEFT JOIN campaigns c ON c.campaign_id = dn.campaign_id
+LEFT JOIN donors d ON d.donor_id = dn.donor_id
+WHERE dn.donation_date IS NOT NULL AND dn.amount IS NOT NULL
+GROUP BY dn.donation_date, c.campaign_type, d.donor_type
+"""
+
+_REFRESH_COARSE_SQL = """
+INSERT INTO giving_rollups (grain, bucket, campaign_type, donor_type, donation_count, total_amount)
+SELECT %(grain)s, DATE_TRUNC(%(grain)s, bucket)::date, campaign_type, donor_type,
+       SUM(donation_count), SUM(total_amount)
+FROM giving_rollups
+WHERE grain = 'day'
+GROUP BY 2, campaign_type, donor_type
+"""
+
+
+def ensure_rollup_schema(cursor) -> None:
+    """Create the giving_rollups table (safe to run repeatedly)."""
+    cursor.execute(GIVING_ROLLUPS_DDL)
+
+
+def refresh_giving_rollups(conn) -> dict[str, int]:
+    """Rebuild day, week and month rollups in one transaction and bump the watermark.
+
+    Args:
+        conn: Open psycopg2 connection.
+
+    Returns:
+        Dict of rows written per grain ("day", "week", "month").
+    """
+    counts: dict[str, int] = {}
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM giving_rollups")
+            cursor.execute(_REFRESH_DAY_SQL)
+            counts["day"] = cursor.rowcount
+            for grain in ("week", "month"):
+                cursor.execute(_REFRESH_COARSE_SQL, {"grain": grain})
+                counts[grain] = cursor.rowcount
+            bump_watermarks(cursor, ROLLUP_TABLES)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return counts
+
+
+def bucket_start(day: date, grain: str) -> date:
+    """First day of the bucket containing ``day`` (weeks start on Monday)."""
+    if grain == "day":
+        return day
+    if grain == "week":
+        return day - timedelta(days=day.weekday())
+    if grain == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown grain: {grain!r}")
+
+
+def _next_bucket(day: date, grain: str) -> date:
+    start = bucket_start(day, grain)
+    if grain == "day":
+        return start + timedelta(days=1)
+    if grain == "week":
+        return start + timedelta(weeks=1)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def choose_grain(start: date, end: date, max_buckets: int = MAX_BUCKETS) -> str:
+    """Finest grain that shows ``start``..``end`` in at most ``max_buckets`` buckets."""
+    days = (end - start).days + 1
+    if days <= max_buckets:
+        return "day"
+    if days / 7 <= max_buckets:
+        return "week"
+    return "month"
+
+
+def _aligned(filters: DashboardFilters, grain: str) -> bool:
+    """True if the date filter covers whole buckets of ``grain``."""
+    if filters.start_date is not None and bucket_start(filters.start_date, grain) != filters.start_date:
+        return False
+    if filters.end_date is not None and _next_bucket(filters.end_date, grain) != filters.end_date + timedelta(days=1):
+        return False
+    return True
+
+
+def timeseries_query(filters: DashboardFilters, grain: str) -> tuple[str, dict[str, object]]:
+    """Giving per bucket (bucket, donation_count, total_amount), oldest first.
+
+    Reads ``grain`` rollup rows when the date range covers whole buckets,
+    otherwise re-buckets the day rollup so partial buckets at the edges are
+    exact. Portfolio filters aggregate the donations table instead.
+    """
+    if grain not in GRAINS:
+        raise ValueError(f"Unknown grain: {grain!r}")
+    if filters.portfolio_holder_ids:
+        base, params = filtered_donations(filters)
+        return f"""
+WITH f AS ({base})
+SELECT DATE_TRUNC('{grain}', donation_date)::date AS bucket,
+       COUNT(*)::int AS donation_count,
+       SUM(amount)::numeric(14, 2) AS total_amount
+FROM f
+GROUP BY 1
+ORDER BY 1;
+""", params
+
+    source_grain = grain if _aligned(filters, grain) else "day"
+    where = ["grain = %(source_grain)s"]
+    params: dict[str, object] = {"source_grain": source_grain}
+    if filters.start_date is not None:
+        where.append("bucket >= %(start_date)s")
+        params["start_date"] = filters.start_date
+    if filters.end_date is not None:
+        where.append("bucket <= %(end_date)s")
+        params["end_date"] = filters.end_date
+    if filters.campaign_types:
+        where.append("campaign_type IN %(campaign_types)s")
+        params["campaign_types"] = filters.campaign_types
+    if filters.donor_types:
+        where.append("donor_type IN %(donor_types)s")
+        params["donor_types"] = filters.donor_types
+    bucket = "bucket" if source_grain == grain else f"DATE_TRUNC('{grain}', bucket)::date"
+    return f"""
+SELECT {bucket} AS bucket,
+       SUM(donation_count)::int AS donation_count,
+       SUM(total_amount)::numeric(14, 2) AS total_amount
+FROM giving_rollups
+WHERE {" AND ".join(where)}
+GROUP BY 1
+ORDER BY 1;
+""", params
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by largest-triangle-three-buckets.
+
+    Keeps the first and last points; from each of ``threshold - 2`` equal
+    buckets in between it keeps the point forming the largest triangle with
+    the previously kept point and the next bucket's average.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        avg_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def downsample(series: pd.DataFrame, value: str = "total_amount", max_points: int = MAX_CHART_POINTS) -> pd.DataFrame:
+    """Cap ``series`` (with a ``bucket`` column) at ``max_points`` rows via LTTB."""
+    if len(series) <= max_points:
+        return series
+    x = pd.to_datetime(series["bucket"]).to_numpy(dtype="datetime64[s]").astype(np.int64)
+    y = series[value].astype(float).to_numpy()
+    return series.iloc[lttb(x, y, max_points)].reset_index(drop=True)
@@ -0,0 +1,7 @@
+"""Streamlit pages.
+
+``streamlit_app.py`` is only the navigation shell and imports a page module
+when that page is shown, so each page pays only for its own dependencies
+(the dashboard never loads the OpenAI SDK, the intake assistant never opens
+a database connection).
+"""
@@ -0,0 +1,348 @@
+"""Dashboard and portfolio pages (Postgres or the offline DuckDB snapshot)."""
+
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from src.dashboard_cache import DataVersionWatcher, VersionedCache
+from src.dashboard_queries import (
+    DASHBOARD_QUERIES,
+    DATE_BOUNDS_SQL,
+    DONOR_PAGE_SIZE,
+    FILTER_OPTIONS_SQL,
+    DashboardFilters,
+    campaign_performance_query,
+    kpi_query,
+    top_donors_query,
+)
+from src.db import connection_pool, get_connection, has_db_config
+from src.offline import OfflineEngine, snapshot_version
+from src.portfolio import PORTFOLIO_OVERVIEW_SQL, portfolio_donors_query
+from src.query_metrics import METRICS, flush_query_log
+from src.timeseries import GRAINS, choose_grain, downsample, timeseries_query
+
+
+def _cache_key(sql: str, params: dict[str, object] | None = None) -> tuple:
+    return sql, tuple(sorted((params or {}).items()))
+
+
+@st.cache_resource
+def _connection_pool():
+    """Shared by all sessions; created on the first dashboard query, not at import."""
+    return connection_pool(maxconn=int(os.getenv("DASHBOARD_POOL_SIZE", "8")))
+
+
+@contextmanager
+def _pooled_connection():
+    pool = _connection_pool()
+    conn = pool.getconn()
+    conn.metrics_source = "dashboard"
+    try:
+        yield conn
+    finally:
+        if not conn.closed:
+            conn.rollback()
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+def _run_query(key: tuple) -> pd.DataFrame:
+    sql, params = key
+    with _pooled_connection() as conn:
+        df = pd.read_sql_query(sql, conn, params=dict(params))
+        try:
+            flush_query_log(conn)
+        except Exception:
+            pass  # query_log missing (database_setup.py not rerun); entries stay buffered
+        return df
+
+
+@st.cache_resource
+def _offline_engine() -> OfflineEngine:
+    return OfflineEngine()
+
+
+def _run_offline_query(key: tuple) -> pd.DataFrame:
+    sql, params = key
+    started = time.perf_counter()
+    df = _offline_engine().query_df(sql, dict(params))
+    METRICS.record(sql, (time.perf_counter() - started) * 1000, len(df), source="duckdb")
+    return df
+
+
+@st.cache_resource
+def _dashboard_cache(backend: str) -> VersionedCache:
+    """One result cache per server process and backend.
+
+    Postgres results stay valid until the next load bumps a watermark;
+    DuckDB results until a new snapshot is exported.
+    """
+    if backend == "duckdb":
+        return VersionedCache(_run_offline_query, snapshot_version)
+    watcher = DataVersionWatcher(
+        lambda: get_connection(instrumented=False),
+        poll_interval=float(os.getenv("DASHBOARD_POLL_SECONDS", "30")),
+    )
+    cache = VersionedCache(_run_query, watcher.current)
+    watcher.on_change = lambda version: cache.refresh()
+    watcher.start().ready.wait(timeout=5)
+    cache.refresh([
+        *(_cache_key(sql, params) for sql, params in DASHBOARD_QUERIES.values()),
+        _cache_key(PORTFOLIO_OVERVIEW_SQL),
+    ])
+    return cache
+
+
+def _query_df(sql: str, params: dict[str, object] | None = None) -> pd.DataFrame:
+    """Run a SQL query and return a DataFrame (cached until the data changes)."""
+    started = time.perf_counter()
+    df, hit = _dashboard_cache(_backend()).get(_cache_key(sql, params))
+    if hit:
+        METRICS.record(sql, (time.perf_counter() - started) * 1000, len(df), cache_hit=True, source="dashboard")
+    return df
+
+
+def _backend() -> str:
+    return st.session_state.get("backend", "postgres")
+
+
+def _backend_ready() -> bool:
+    """Warn and return False if the selected backend cannot be queried."""
+    if _backend() == "duckdb":
+        if snapshot_version() is None:
+            st.warning("No offline snapshot yet. Run `uv run python export_snapshots.py` first.")
+            return False
+        return True
+    if not has_db_config():
+        st.warning(
+            "Database environment variables are not set. Create a `.env` from `.env.example` and fill in DB_* values."
+        )
+        return False
+    return True
+
+
+def render_query_metrics() -> None:
+    """Sidebar admin panel: rolling latency per query fingerprint."""
+    with st.sidebar.expander("Query performance"):
+        stats = METRICS.snapshot()
+        if not stats:
+            st.caption("No queries recorded yet.")
+            return
+        st.caption(f"Plans are captured for reads slower than {METRICS.slow_ms:,.0f} ms.")
+        st.dataframe(
+            pd.DataFrame(stats)[["query", "calls", "cache_hit_ratio", "p50_ms", "p95_ms", "p99_ms", "avg_rows"]],
+            use_container_width=True,
+            hide_index=True,
+        )
+        if st.button("Reset query stats"):
+            METRICS.reset()
+            st.rerun()
+
+
+def render_filters() -> DashboardFilters:
+    """Filter widgets; every choice is pushed down into the dashboard SQL."""
+    options = _query_df(FILTER_OPTIONS_SQL)
+    bounds = _query_df(DATE_BOUNDS_SQL).iloc[0]
+    holders = options[options["kind"] == "portfolio_holder"]
+    holder_names = dict(zip(holders["value"].astype(int), holders["label"]))
+
+    # DuckDB returns timestamps, Postgres dates; compare as dates either way.
+    first_date = pd.Timestamp(bounds["first_date"]).date() if pd.notna(bounds["first_date"]) else None
+    last_date = pd.Timestamp(bounds["last_date"]).date() if pd.notna(bounds["last_date"]) else None
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        date_range = ()
+        if first_date is not None:
+            date_range = st.date_input(
+                "Donation dates",
+                value=(first_date, last_date),
+                min_value=first_date,
+                max_value=last_date,
+            )
+    with col2:
+        campaign_types = st.multiselect(
+            "Campaign type", options[options["kind"] == "campaign_type"]["value"].tolist()
+        )
+    with col3:
+        donor_types = st.multiselect("Donor type", options[options["kind"] == "donor_type"]["value"].tolist())
+    with col4:
+        holder_ids = st.multiselect(
+            "Portfolio", list(holder_names), format_func=lambda i: holder_names.get(i, str(i))
+        )
+
+    start_date = end_date = None
+    if isinstance(date_range, (tuple, list)) and len(date_range) == 2:
+        if date_range[0] != first_date:
+            start_date = date_range[0]
+        if date_range[1] != last_date:
+            end_date = date_range[1]
+    return DashboardFilters(
+        start_date=start_date,
+        end_date=end_date,
+        campaign_types=tuple(campaign_types),
+        donor_types=tuple(donor_types),
+        portfolio_holder_ids=tuple(int(i) for i in holder_ids),
+    )
+
+
+def render_grain(filters: DashboardFilters) -> str:
+    """Trend granularity; "auto" picks the finest grain that fits the date range."""
+    choice = st.radio("Granularity", ("auto", *GRAINS), horizontal=True, key="trend_grain")
+    if choice != "auto":
+        return choice
+    bounds = _query_df(DATE_BOUNDS_SQL).iloc[0]
+    start = filters.start_date or bounds["first_date"]
+    end = filters.end_date or bounds["last_date"]
+    if pd.isna(start) or pd.isna(end):
+        return "month"
+    return choose_grain(pd.Timestamp(start).date(), pd.Timestamp(end).date())
+
+
+def render_dashboard() -> None:
+    st.title("DataBridge – Dashboard (Mock Data)")
+    st.caption("Filters, totals and rankings are computed by the query engine; only the rows shown are sent to the browser.")
+
+    if not _backend_ready():
+        return
+
+    try:
+        filters = render_filters()
+        # Keyset pagination: one (total_given, donor_id) cursor per page seen so far.
+        if st.session_state.get("donor_filters") != filters:
+            st.session_state.donor_filters = filters
+            st.session_state.donor_cursors = [None]
+        after = st.session_state.donor_cursors[-1]
+        kpis = _query_df(*kpi_query(filters)).iloc[0]
+        grain = render_grain(filters)
+        trend = _query_df(*timeseries_query(filters, grain))
+        campaigns = _query_df(*campaign_performance_query(filters))
+        top_donors = _query_df(*top_donors_query(filters, after=after))
+    except Exception as e:
+        st.error(f"Could not query the database/views: {e!s}")
+        st.info("Tip: run `uv run python create_views.py` after loading data.")
+        return
+
+    kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+    with kpi1:
+        st.metric("Total raised", f"${kpis['total_raised']:,.2f}")
+    with kpi2:
+        st.metric("Donations", f"{int(kpis['donation_count']):,}")
+    with kpi3:
+        st.metric("Unique donors", f"{int(kpis['unique_donors']):,}")
+    with kpi4:
+        st.metric("Avg donation", f"${kpis['avg_donation']:,.2f}")
+
+    st.subheader(f"Giving trend ({grain})")
+    if trend.empty:
+        st.info("No donations match these filters.")
+    else:
+        points = downsample(trend)
+        if len(points) < len(trend):
+            st.caption(f"Showing {len(points):,} of {len(trend):,} {grain}s (largest-triangle downsampling).")
+        st.line_chart(points.set_index("bucket")["total_amount"])
+
+    st.divider()
+    tab1, tab2 = st.tabs(["Campaigns", "Top donors"])
+
+    with tab1:
+        st.subheader("Campaign performance")
+        st.dataframe(
+            campaigns[[
+                "campaign_name",
+                "campaign_type",
+                "goal_amount",
+                "total_raised",
+                "raised_minus_goal",
+                "donation_count",
+                "unique_donors",
+            ]],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    with tab2:
+        page = len(st.session_state.donor_cursors)
+        st.subheader(f"Top donors by total given (page {page})")
+        st.dataframe(
+            top_donors[[
+                "donor_id",
+                "first_name",
+                "last_name",
+                "donation_count",
+                "total_given",
+                "first_gift_date",
+                "last_gift_date",
+            ]],
+            use_container_width=True,
+            hide_index=True,
+        )
+        prev_col, next_col = st.columns(2)
+        with prev_col:
+            if st.button("Previous page", disabled=page == 1):
+                st.session_state.donor_cursors.pop()
+                st.rerun()
+        with next_col:
+            if st.button("Next page", disabled=len(top_donors) < DONOR_PAGE_SIZE):
+                last = top_donors.iloc[-1]
+                st.session_state.donor_cursors.append((last["total_given"], int(last["donor_id"])))
+                st.rerun()
+
+
+def render_portfolio() -> None:
+    st.title("DataBridge – Portfolio Performance")
+    st.caption("Reads precomputed per-portfolio aggregates refreshed by load_data.py.")
+
+    if not _backend_ready():
+        return
+
+    try:
+        overview = _query_df(PORTFOLIO_OVERVIEW_SQL)
+    except Exception as e:
+        st.error(f"Could not read portfolio aggregates: {e!s}")
+        st.info("Tip: run `uv run python load_data.py` to build them.")
+        return
+    if overview.empty:
+        st.info("No portfolio holders loaded yet.")
+        return
+
+    names = dict(zip(overview["portfolio_holder_id"], overview["holder_name"]))
+    holder_id = st.selectbox("Portfolio holder", list(names), format_func=lambda i: names[i])
+    row = overview[overview["portfolio_holder_id"] == holder_id].iloc[0]
+    st.caption(f"Current year: 12 months to {row['as_of']}; compared with the 12 months before.")
+
+    kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+    with kpi1:
+        st.metric("Donors", f"{int(row['donor_count']):,}")
+    with kpi2:
+        change = row["current_year_total"] - row["prior_year_total"]
+        st.metric("Raised this year", f"${row['current_year_total']:,.2f}", f"{change:,.2f}")
+    with kpi3:
+        rate = row["retention_rate"]
+        st.metric("Retention", "n/a" if pd.isna(rate) else f"{float(rate):.0%}")
+    with kpi4:
+        st.metric("Lifetime giving", f"${row['lifetime_total']:,.2f}")
+
+    tab1, tab2, tab3 = st.tabs([
+        f"Lapsing ({int(row['lapsing_donors'])})",
+        f"Upgrading ({int(row['upgraded_donors'])})",
+        "All portfolios",
+    ])
+    try:
+        lapsing = _query_df(*portfolio_donors_query(int(holder_id), "lapsing"))
+        upgraded = _query_df(*portfolio_donors_query(int(holder_id), "upgraded"))
+    except Exception as e:
+        st.error(f"Could not read portfolio donors: {e!s}")
+        return
+    with tab1:
+        st.caption("Gave last year but not this year, largest prior-year gifts first.")
+        st.dataframe(lapsing, use_container_width=True, hide_index=True)
+    with tab2:
+        st.caption("Gave more this year than last year.")
+        st.dataframe(upgraded, use_container_width=True, hide_index=True)
+    with tab3:
+        st.dataframe(overview.drop(columns=["portfolio_holder_id", "as_of"]), use_container_width=True, hide_index=True)
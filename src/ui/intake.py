@@ -0,0 +1,194 @@
+"""Data intake assistant page: file upload (CSV, Excel, JSON, XML), schema summary and AI chat."""
+
+from __future__ import annotations
+
+import pandas as pd
+import streamlit as st
+
+from src.ai_assistant import (
+    build_chat_messages,
+    response_cache,
+    review_mappings,
+    start_stream,
+    stream_completion,
+    stream_explain_data,
+)
+from src.context_budget import ConversationMemory
+from src.column_mapping import suggest_mappings
+from src.intake_readers import UPLOAD_TYPES, detect_format
+from src.schema_inference import describe_profile, profile_upload
+
+
+def _render_summary(s: dict) -> None:
+    st.subheader("Current dataset" if s.get("complete", True) else "Current dataset (still reading...)")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Rows", s["shape"]["rows"])
+    with col2:
+        st.metric("Columns", s["shape"]["cols"])
+    with col3:
+        st.metric("Sample rows (for AI)", len(s["sample"]))
+
+    with st.expander("Column summary", expanded=True):
+        summary = pd.DataFrame([
+            {
+                "Column": c["name"],
+                "Type": c["dtype"],
+                "Non-null": c["non_null_count"],
+                "Profile": describe_profile(c["profile"], c["non_null_count"]) if c.get("profile") else "",
+            }
+            for c in s["columns"]
+        ])
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+
+    with st.expander("Sample rows (PII redacted for AI context)"):
+        st.dataframe(pd.DataFrame(s["sample"]), use_container_width=True, hide_index=True)
+
+
+def _render_mappings(schema: dict) -> None:
+    """Local mapping suggestions; only uncertain columns are offered to the AI."""
+    st.subheader("Suggested mappings")
+    mappings = suggest_mappings(schema)
+    table = pd.DataFrame([
+        {
+            "Column": m.column,
+            "Maps to": m.target if m.confident else "?",
+            "Candidates": ", ".join(f"{key} ({score:.2f})" for key, score in m.candidates),
+        }
+        for m in mappings
+    ])
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    unsure = sum(not m.confident for m in mappings)
+    if unsure and st.button(f"Ask AI about {unsure} uncertain column{'s' if unsure != 1 else ''}"):
+        with st.spinner("Asking the assistant..."):
+            st.session_state.mapping_review = review_mappings(schema, mappings)
+    if st.session_state.mapping_review:
+        st.markdown(st.session_state.mapping_review)
+
+
+def render_intake_assistant() -> None:
+    # Session state: current schema (from last upload), chat history
+    if "schema" not in st.session_state:
+        st.session_state.schema = None
+    if "chat_history" not in st.session_state:
+        st.session_state.chat_history = []
+    if "explanation" not in st.session_state:
+        st.session_state.explanation = None
+    if "mapping_review" not in st.session_state:
+        st.session_state.mapping_review = None
+    if "chat_memory" not in st.session_state:
+        st.session_state.chat_memory = ConversationMemory()
+    if "prompt_metrics" not in st.session_state:
+        st.session_state.prompt_metrics = []
+
+    st.title("DataBridge – Data Intake Assistant")
+    st.caption("Upload a CSV, Excel, JSON or XML export to understand its structure and map it to our donor schema. Ask questions in context.")
+
+    # --- File upload ---
+    uploaded_file = st.file_uploader(
+        "Upload a file",
+        type=UPLOAD_TYPES,
+        help="Donor or gift data to inspect and discuss: CSV, Excel (.xlsx), JSON or JSON Lines, or XML. "
+        "Nested JSON and XML fields become dotted columns.",
+    )
+
+    # Profile each upload once, streaming it in chunks; reruns reuse the result.
+    if uploaded_file is not None and st.session_state.get("schema_file_id") != uploaded_file.file_id:
+        st.session_state.schema_file_id = uploaded_file.file_id
+        st.session_state.explanation = None  # Reset so user can request a fresh explanation
+        st.session_state.mapping_review = None
+        progress = st.progress(0.0, text="Reading upload...")
+        partial = st.empty()
+        try:
+            for schema in profile_upload(uploaded_file, detect_format(uploaded_file.name)):
+                st.session_state.schema = schema
+                if schema["complete"]:
+                    break
+                done = min(uploaded_file.tell() / max(uploaded_file.size, 1), 0.99)
+                progress.progress(done, text=f"Read {schema['shape']['rows']:,} rows...")
+                with partial.container():
+                    _render_summary(schema)
+        except Exception as e:
+            st.error(f"Could not read {uploaded_file.name}: {e}")
+            st.session_state.schema = None
+        progress.empty()
+        partial.empty()
+    elif uploaded_file is None:
+        st.session_state.schema_file_id = None
+
+    # --- Current data summary ---
+    if st.session_state.schema:
+        _render_summary(st.session_state.schema)
+
+        _render_mappings(st.session_state.schema)
+
+        # --- Explain this data ---
+        st.subheader("Explain this data")
+        if st.button("Get AI explanation", type="primary"):
+            # Tokens are written as they arrive; later reruns show the stored text.
+            st.session_state.explanation = st.write_stream(stream_explain_data(st.session_state.schema))
+        elif st.session_state.explanation:
+            st.markdown(st.session_state.explanation)
+        stats = response_cache().stats()
+        st.caption(
+            f"Explanation cache: {stats['hits']:,} hits, {stats['misses']:,} misses, "
+            f"{stats['entries']:,} stored ({stats['bytes'] / 1024:,.0f} KB)"
+        )
+    else:
+        st.info(
+            "Upload a file above to see its schema and get an AI explanation. You can still ask about our target schema or integrations in the chat below."
+        )
+
+    # --- Chat with context ---
+    st.divider()
+    st.subheader("Chat with context")
+
+    for msg in st.session_state.chat_history:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
+
+    prompt = st.chat_input("Ask about this data, mappings to DataBridge, or our integration docs...")
+    if prompt:
+        st.session_state.chat_history.append({"role": "user", "content": prompt})
+        messages, metrics = build_chat_messages(
+            prompt,
+            st.session_state.chat_history[:-1],
+            st.session_state.schema,
+            st.session_state.chat_memory,
+        )
+        st.session_state.prompt_metrics.append(metrics)
+        with st.chat_message("assistant"):
+            reply = st.write_stream(start_stream(stream_completion(messages)))
+        st.session_state.chat_history.append({"role": "assistant", "content": reply})
+        st.rerun()
+
+    if st.session_state.prompt_metrics:
+        with st.expander("Prompt size per turn (estimated tokens)"):
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        "Turn": i,
+                        "Total": m.total_tokens,
+                        "Budget": m.budget_tokens,
+                        "System": m.system_tokens,
+                        "Summary": m.summary_tokens,
+                        "History": m.history_tokens,
+                        "Message": m.message_tokens,
+                        "Verbatim msgs": m.messages_verbatim,
+                        "Summarized msgs": m.messages_summarized,
+                        "Doc sections": m.doc_sections,
+                        "Docs dropped": m.doc_sections_dropped,
+                        "Schema": m.schema_level,
+                    }
+                    for i, m in enumerate(st.session_state.prompt_metrics, 1)
+                ]),
+                use_container_width=True,
+                hide_index=True,
+            )
+
+    if st.session_state.chat_history:
+        if st.button("Clear chat history"):
+            st.session_state.chat_history = []
+            st.session_state.chat_memory = ConversationMemory()
+            st.session_state.prompt_metrics = []
+            st.rerun()
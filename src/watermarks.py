@@ -0,0 +1,60 @@
+"""Per-table load watermarks.
+
+Every writer (the CSV loader, connectors, schema rebuilds) bumps a table's
+``version`` in ``load_watermarks`` inside the same transaction as its
+writes. Readers such as the pipeline orchestrator compare versions to tell
+whether a table changed since they last looked, without scanning it.
+
+Each bump also sends ``NOTIFY data_changed`` with the table name as payload;
+Postgres delivers it when the writing transaction commits, so listeners
+(the dashboard cache) never see a version before its data is visible.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+DATA_CHANGED_CHANNEL = "data_changed"
+
+LOAD_WATERMARKS_DDL = """
+CREATE TABLE IF NOT EXISTS load_watermarks (
+    table_name VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    loaded_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""
+
+
+def ensure_watermark_schema(cursor) -> None:
+    """Create the load_watermarks table (safe to run repeatedly)."""
+    cursor.execute(LOAD_WATERMARKS_DDL)
+
+
+def bump_watermarks(cursor, tables: Iterable[str]) -> None:
+    """Increment the version of each table (call inside the writing transaction)."""
+    for table in tables:
+        cursor.execute(
+            """
+            INSERT INTO load_watermarks (table_name, version, loaded_at)
+            VALUES (%s, 1, NOW())
+            ON CONFLICT (table_name) DO UPDATE
+            SET version = load_watermarks.version + 1, loaded_at = NOW()
+            """,
+            (table,),
+        )
+        cursor.execute("SELECT pg_notify(%s, %s)", (DATA_CHANGED_CHANNEL, table))
+
+
+def data_version(cursor) -> int:
+    """Single number that increases whenever any table is bumped."""
+    cursor.execute("SELECT COALESCE(SUM(version), 0) FROM load_watermarks")
+    return int(cursor.fetchone()[0])
+
+
+def read_watermarks(cursor, tables: Iterable[str]) -> dict[str, int]:
+    """Current version per table; tables never written are absent."""
+    cursor.execute(
+        "SELECT table_name, version FROM load_watermarks WHERE table_name = ANY(%s)",
+        (list(tables),),
+    )
+    return {name: int(version) for name, version in cursor.fetchall()}
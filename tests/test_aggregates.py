@@ -0,0 +1,32 @@
+"""
+Tests for refreshing the materialized dashboard aggregates after writes.
+Refresh functions are replaced by recorders; their SQL is tested with each module.
+"""
+from src import aggregates
+from src.aggregates import refresh_aggregates, stale_aggregates
+
+
+class TestStaleAggregates:
+    """Tests for mapping written tables to the aggregates built from them"""
+
+    def test_sources_select_aggregates(self):
+        """Test that each written table marks only the aggregates reading it, in refresh order"""
+        assert stale_aggregates(["donations"]) == ["portfolios", "rollups", "donor_totals"]
+        assert stale_aggregates(["donors"]) == ["rollups"]
+        assert stale_aggregates(["portfolio_assignments"]) == ["portfolios"]
+        assert stale_aggregates(["cc_contacts"]) == []
+
+
+class TestRefreshAggregates:
+    """Tests for rebuilding stale aggregates"""
+
+    def test_refreshes_only_stale(self, monkeypatch):
+        """Test that only aggregates built from the written tables are rebuilt"""
+        calls = []
+        monkeypatch.setattr(aggregates, "AGGREGATES", {
+            name: (sources, lambda conn, name=name: calls.append((name, conn)) or name.upper())
+            for name, (sources, _) in aggregates.AGGREGATES.items()
+        })
+        assert refresh_aggregates("conn", ["donors", "donors"]) == {"rollups": "ROLLUPS"}
+        assert calls == [("rollups", "conn")]
+        assert refresh_aggregates("conn", []) == {}
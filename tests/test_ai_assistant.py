@@ -0,0 +1,341 @@
+"""
+Tests for the AI assistant: lazy client setup, doc caching, streaming and mapping review.
+Streaming runs against a local fake OpenAI-compatible server.
+Import checks run in a fresh interpreter so other tests' imports don't interfere.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from src import ai_assistant, context_budget
+from src.column_mapping import ColumnMapping
+from src.context_budget import ContextBudget, ConversationMemory, message_tokens
+from src.db import PROJECT_ROOT
+from src.schema_inference import infer_schema
+
+
+def _modules_after_import(module):
+    code = f"import sys, {module}; print(' '.join(sorted(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    return set(out.stdout.split())
+
+
+class TestLazyImports:
+    """Tests that heavy dependencies load only when needed"""
+
+    def test_import_does_not_load_openai(self):
+        """Test that importing the assistant does not import the OpenAI SDK or dotenv"""
+        modules = _modules_after_import("src.ai_assistant")
+        assert "openai" not in modules
+        assert "dotenv" not in modules
+
+    def test_no_client_without_key(self, monkeypatch):
+        """Test that a missing API key returns None instead of building a client"""
+        monkeypatch.setenv("OPENAI_API_KEY", "")
+        assert ai_assistant.get_client() is None
+
+
+class TestReviewMappings:
+    """Tests for the LLM fallback on uncertain column mappings"""
+
+    def test_confident_mappings_skip_the_model(self, monkeypatch):
+        """Test that no client is needed when every column mapped confidently"""
+        monkeypatch.setattr(ai_assistant, "get_client", lambda: pytest.fail("client requested"))
+        mappings = [ColumnMapping("Gift Amount", (("donations.amount", 1.0),), True)]
+        assert "nothing to review" in ai_assistant.review_mappings({"columns": [], "sample": []}, mappings)
+
+
+@pytest.fixture
+def docs(tmp_path, monkeypatch):
+    """Point the assistant at a temporary docs tree and count file reads."""
+    (tmp_path / "integrations").mkdir()
+    (tmp_path / "DATA_DICTIONARY.md").write_text("dictionary v1")
+    (tmp_path / "integrations" / "crm.md").write_text("crm v1")
+    monkeypatch.setattr(ai_assistant, "_DOCS_DIR", tmp_path)
+    monkeypatch.setattr(ai_assistant, "_INTEGRATIONS_DIR", tmp_path / "integrations")
+    monkeypatch.setattr(ai_assistant, "_DOC_INDEX_PATH", tmp_path / "cache" / "doc_index.json")
+    reads = []
+    read_file = ai_assistant._read_file
+    monkeypatch.setattr(ai_assistant, "_read_file", lambda p: reads.append(p.name) or read_file(p))
+    return tmp_path, reads
+
+
+def _touch(path, text):
+    """Rewrite a file with a strictly newer mtime (coarse filesystem clocks)."""
+    before = path.stat().st_mtime_ns
+    path.write_text(text)
+    os.utime(path, ns=(before + 1_000_000, before + 1_000_000))
+
+
+class TestDocCache:
+    """Tests for mtime-based doc and system prompt caching"""
+
+    def test_docs_read_once(self, docs):
+        """Test that repeated loads do not re-read unchanged files"""
+        _, reads = docs
+        for _ in range(3):
+            assert ai_assistant.load_data_dictionary() == "dictionary v1"
+            assert ai_assistant.load_integration_docs() == {"crm": "crm v1"}
+        assert sorted(reads) == ["DATA_DICTIONARY.md", "crm.md"]
+
+    def test_changed_file_reloaded(self, docs):
+        """Test that only the edited file is re-read after its mtime changes"""
+        root, reads = docs
+        ai_assistant.load_integration_docs()
+        ai_assistant.load_data_dictionary()
+        _touch(root / "integrations" / "crm.md", "crm v2")
+        assert ai_assistant.load_integration_docs() == {"crm": "crm v2"}
+        assert ai_assistant.load_data_dictionary() == "dictionary v1"
+        assert sorted(reads) == ["DATA_DICTIONARY.md", "crm.md", "crm.md"]
+
+    def test_new_integration_doc_found(self, docs):
+        """Test that adding a doc is picked up through the directory mtime"""
+        root, _ = docs
+        ai_assistant.load_integration_docs()
+        directory = root / "integrations"
+        before = directory.stat().st_mtime_ns
+        (directory / "erp.md").write_text("erp")
+        os.utime(directory, ns=(before + 1_000_000, before + 1_000_000))
+        assert set(ai_assistant.load_integration_docs()) == {"crm", "erp"}
+
+    def test_system_context_cached_per_schema(self, docs):
+        """Test that the prompt is reused for the same schema and docs, and rebuilt otherwise"""
+        root, _ = docs
+        schema = {"columns": [], "shape": {"rows": 1, "cols": 0}, "sample": []}
+        first = ai_assistant.system_context_for(schema, doc_chunks=0)
+        assert ai_assistant.system_context_for(dict(schema), doc_chunks=0) is first
+        assert "dictionary v1" in first and "crm v1" in first
+        other = ai_assistant.system_context_for({**schema, "shape": {"rows": 2, "cols": 0}}, doc_chunks=0)
+        assert other is not first
+        assert ai_assistant.NO_DATA_TEXT in ai_assistant.system_context_for(None)
+        _touch(root / "DATA_DICTIONARY.md", "dictionary v2")
+        assert "dictionary v2" in ai_assistant.system_context_for(schema, doc_chunks=0)
+
+    def test_new_question_reuses_cached_base(self, docs, monkeypatch):
+        """Test that each question gets its own doc sections on top of one cached schema prompt"""
+        monkeypatch.setattr(ai_assistant, "_context_cache", OrderedDict())
+        formats = []
+        format_schema = ai_assistant.format_schema_for_prompt
+        monkeypatch.setattr(ai_assistant, "format_schema_for_prompt", lambda s: formats.append(s) or format_schema(s))
+        schema = {"columns": [], "shape": {"rows": 1, "cols": 0}, "sample": []}
+        first = ai_assistant.system_context_for(schema, "What is a donor?")
+        second = ai_assistant.system_context_for(schema, "How are campaigns typed?")
+        assert len(formats) == 1
+        base = ai_assistant._base_context_for(schema, full_docs=False)
+        assert first.startswith(base) and second.startswith(base)
+        assert len(ai_assistant._context_cache) == 1
+
+
+class TestDocRetrieval:
+    """Tests for sending only relevant doc sections"""
+
+    def test_pinned_tables_and_matching_sections(self, docs):
+        """Test that target tables are always sent and other sections only when relevant"""
+        root, _ = docs
+        (root / "DATA_DICTIONARY.md").write_text(
+            "# Dictionary\n\n## Table: donors\n\ndonor columns\n\n## Table: dq_results\n\nquality checks\n"
+        )
+        (root / "integrations" / "crm.md").write_text(
+            "# CRM\n\n## Gift export\n\nGift amount and date fields\n\n## Rate limits\n\n100 calls per minute\n"
+        )
+        system = ai_assistant.system_context_for(None, "How do I load a gift export?")
+        assert "donor columns" in system
+        assert "Gift amount and date fields" in system
+        assert "100 calls per minute" not in system and "quality checks" not in system
+
+    def test_savings_measured(self, tmp_path, monkeypatch):
+        """Test that retrieval sends fewer tokens than the full docs for a real question"""
+        monkeypatch.setattr(ai_assistant, "_DOC_INDEX_PATH", tmp_path / "doc_index.json")
+        savings = ai_assistant.context_token_savings(None, "How do DonorPerfect gifts map to donations?")
+        assert savings["saved_tokens"] == savings["full_tokens"] - savings["prompt_tokens"]
+        assert savings["prompt_tokens"] < savings["full_tokens"] / 2
+
+
+def _schema(rows, columns=("donor_id", "amount")):
+    return {
+        "columns": [{"name": c, "dtype": "int64", "non_null_count": rows, "pii": []} for c in columns],
+        "shape": {"rows": rows, "cols": len(columns)},
+        "sample": [],
+        "complete": True,
+    }
+
+
+class _FakeOpenAI(BaseHTTPRequestHandler):
+    """OpenAI-compatible /v1/chat/completions that streams "answer N" word by word."""
+
+    requests: list[dict] = []
+    delay = 0.0
+    status = 200
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append(body)
+        number = len(type(self).requests)
+        if type(self).status != 200:
+            data = json.dumps({"error": {"message": "bad request", "type": "invalid_request_error"}}).encode()
+            self.send_response(type(self).status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for word in ["answer", f" {number}"]:
+            chunk = {
+                "id": "chatcmpl-test",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(type(self).delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai(tmp_path, monkeypatch):
+    """Start the fake API and point the assistant's client at it."""
+    _FakeOpenAI.requests = []
+    _FakeOpenAI.delay = 0.0
+    _FakeOpenAI.status = 200
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOpenAI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setattr(ai_assistant, "_DOC_INDEX_PATH", tmp_path / "doc_index.json")
+    yield _FakeOpenAI
+    server.shutdown()
+    server.server_close()
+
+
+class TestStreaming:
+    """Tests for streamed completions against a fake OpenAI-compatible server"""
+
+    def test_chunks_arrive_before_completion_ends(self, fake_openai):
+        """Test that the first token is available while the server is still generating"""
+        ai_assistant.chat_with_context("warm up", [], None)  # import the SDK and open a connection
+        fake_openai.delay = 0.3
+        started = time.perf_counter()
+        chunks = ai_assistant.stream_chat_with_context("Hello?", [], None)
+        first = next(chunks)
+        first_at = time.perf_counter() - started
+        rest = list(chunks)
+        assert [first, *rest] == ["answer", " 2"]
+        assert first_at < 0.3 <= time.perf_counter() - started
+        assert fake_openai.requests[-1]["stream"] is True
+        assert fake_openai.requests[-1]["messages"][-1] == {"role": "user", "content": "Hello?"}
+
+    def test_requests_run_concurrently(self, fake_openai):
+        """Test that two started streams overlap instead of running one after the other"""
+        ai_assistant.chat_with_context("warm up", [], None)
+        fake_openai.delay = 0.3
+        started = time.perf_counter()
+        streams = [ai_assistant.stream_chat_with_context(q, [], None) for q in ("one?", "two?")]
+        replies = ["".join(s) for s in streams]
+        assert sorted(replies) == ["answer 2", "answer 3"]
+        assert time.perf_counter() - started < 1.0
+
+    def test_api_error_reported(self, fake_openai):
+        """Test that an API error becomes the reply instead of raising"""
+        fake_openai.status = 400
+        reply = ai_assistant.chat_with_context("Hello?", [], None)
+        assert reply.startswith("Error calling the assistant:")
+
+
+class TestExplainCache:
+    """Tests for reusing explain_data answers"""
+
+    def test_same_structure_reuses_answer(self, fake_openai, tmp_path, monkeypatch):
+        """Test that a file with the same columns is answered from the cache"""
+        monkeypatch.setattr(ai_assistant, "_RESPONSE_CACHE_PATH", tmp_path / "responses.sqlite3")
+        monkeypatch.setattr(ai_assistant, "_DOC_INDEX_PATH", tmp_path / "doc_index.json")
+        assert ai_assistant.explain_data(_schema(10)) == "answer 1"
+        assert ai_assistant.explain_data(_schema(5000)) == "answer 1"
+        assert ai_assistant.explain_data(_schema(10, ("gift_id", "amount"))) == "answer 2"
+        assert len(_FakeOpenAI.requests) == 2
+        stats = ai_assistant.response_cache().stats()
+        assert (stats["hits"], stats["misses"]) == (1, 2)
+
+    def test_cache_written_off_the_event_loop(self, fake_openai, tmp_path, monkeypatch):
+        """Test that the answer is stored from a worker thread, not the shared loop's thread"""
+        monkeypatch.setattr(ai_assistant, "_RESPONSE_CACHE_PATH", tmp_path / "responses.sqlite3")
+        writers = []
+        put = ai_assistant.ResponseCache.put
+
+        def recording_put(self, key, response):
+            writers.append(threading.current_thread().name)
+            put(self, key, response)
+
+        monkeypatch.setattr(ai_assistant.ResponseCache, "put", recording_put)
+        assert ai_assistant.explain_data(_schema(10)) == "answer 1"
+        assert len(writers) == 1 and writers[0] != "assistant-llm"
+        assert ai_assistant.response_cache().stats()["entries"] == 1
+
+    def test_errors_not_cached(self, tmp_path, monkeypatch):
+        """Test that a missing key message is not stored as an answer"""
+        monkeypatch.setattr(ai_assistant, "_RESPONSE_CACHE_PATH", tmp_path / "responses.sqlite3")
+        monkeypatch.setattr(ai_assistant, "_DOC_INDEX_PATH", tmp_path / "doc_index.json")
+        monkeypatch.setattr(ai_assistant, "get_client", lambda: None)
+        assert "API key is not set" in ai_assistant.explain_data(_schema(1))
+        assert ai_assistant.response_cache().stats()["entries"] == 0
+
+
+class TestChatBudget:
+    """Tests for budgeted chat prompts"""
+
+    def test_long_conversation_stays_within_budget(self, tmp_path, monkeypatch):
+        """Test that prompts stop growing once old turns are summarized"""
+        monkeypatch.setattr(ai_assistant, "_DOC_INDEX_PATH", tmp_path / "doc_index.json")
+        budget = ContextBudget(max_tokens=3000)
+        memory = ConversationMemory()
+        history: list[dict[str, str]] = []
+        totals = []
+        for turn in range(15):
+            question = f"How do DonorPerfect gifts map, part {turn}?"
+            messages, metrics = ai_assistant.build_chat_messages(question, history, None, memory, budget)
+            assert messages[0]["role"] == "system" and messages[-1]["content"] == question
+            totals.append(metrics.total_tokens)
+            history += [{"role": "user", "content": question}, {"role": "assistant", "content": "Answer. " + "x " * 400}]
+        assert max(totals) <= budget.max_tokens
+        assert metrics.messages_summarized > 0
+        assert "Summary of earlier messages" in messages[1]["content"]
+
+    def test_schema_formatted_once_across_turns(self, tmp_path, monkeypatch):
+        """Test that later turns reuse the formatted schema instead of re-fitting it"""
+        monkeypatch.setattr(ai_assistant, "_DOC_INDEX_PATH", tmp_path / "doc_index.json")
+        monkeypatch.setattr(ai_assistant, "_schema_cache", OrderedDict())
+        formats = []
+        format_schema = context_budget.format_schema_for_prompt
+        monkeypatch.setattr(context_budget, "format_schema_for_prompt", lambda s: formats.append(s) or format_schema(s))
+        schema = infer_schema(pd.DataFrame({"gift_amount": [10.0, 25.5]}))
+        history: list[dict[str, str]] = []
+        for turn in range(4):
+            question = f"What does gift_amount hold, part {turn}?"
+            messages, metrics = ai_assistant.build_chat_messages(question, history, schema, budget=ContextBudget())
+            history += [{"role": "user", "content": question}, {"role": "assistant", "content": "It holds amounts."}]
+        assert metrics.schema_level == "full" and "gift_amount" in messages[0]["content"]
+        assert len(formats) == 3
+
+    def test_metrics_match_messages(self, tmp_path, monkeypatch):
+        """Test that the reported sizes add up to the messages sent"""
+        monkeypatch.setattr(ai_assistant, "_DOC_INDEX_PATH", tmp_path / "doc_index.json")
+        messages, metrics = ai_assistant.build_chat_messages("Hi?", [], None, budget=ContextBudget())
+        assert metrics.total_tokens == sum(message_tokens(m) for m in messages)
+        assert metrics.schema_level == "no data"
@@ -0,0 +1,49 @@
+"""
+Tests for the benchmark harness configuration and regression check.
+Benchmarks themselves need Postgres and are run via benchmarks/run.py.
+"""
+from benchmarks.harness import find_regressions, load_config
+
+
+def _results(seconds=1.0, peak_mb=100.0, median_ms=20.0):
+    return {
+        "scales": {
+            "small": {
+                "steps": {"load": {"seconds": seconds, "peak_mb": peak_mb, "rows_per_sec": 1000.0}},
+                "queries": {"top_donors": {"median_ms": median_ms, "rows": 25}},
+            }
+        }
+    }
+
+
+class TestConfig:
+    """Tests for the shipped scale configuration"""
+
+    def test_scales_cover_requested_sizes(self):
+        """Test that 100K, 1M and 10M gift scales are configured"""
+        scales, settings = load_config()
+        assert {"100k", "1m", "10m"} <= set(scales)
+        assert scales["10m"].donations == 10_000_000
+        assert 0 < settings["tolerance"] < 1
+
+
+class TestFindRegressions:
+    """Tests for baseline comparison"""
+
+    def test_within_tolerance_passes(self):
+        """Test that small slowdowns and improvements are not regressions"""
+        assert find_regressions(_results(seconds=1.2, median_ms=10.0), _results(), 0.25) == []
+
+    def test_slower_step_and_query_are_reported(self):
+        """Test that time and memory regressions beyond tolerance are listed"""
+        regressions = find_regressions(_results(seconds=2.0, peak_mb=200.0, median_ms=40.0), _results(), 0.25)
+        assert len(regressions) == 3
+        assert regressions[0].startswith("small/steps/load/seconds: 2.0 vs baseline 1.0 (+100%)")
+
+    def test_noise_floor_ignores_tiny_absolute_changes(self):
+        """Test that a 0.2 ms query doubling is not flagged"""
+        assert find_regressions(_results(median_ms=0.4), _results(median_ms=0.2), 0.25) == []
+
+    def test_missing_scales_are_ignored(self):
+        """Test that scales absent from the baseline are skipped"""
+        assert find_regressions(_results(seconds=99), {"scales": {}}, 0.25) == []
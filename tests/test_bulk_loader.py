@@ -0,0 +1,63 @@
+"""
+Tests for COPY-based bulk loading.
+Statements are rendered against a fake cursor; no database is needed.
+"""
+import psycopg2.extensions
+import pytest
+
+from src.bulk_loader import ColumnBatch, batch_records, upsert_batch
+
+
+class _FakeCursor:
+    """Renders psycopg2.sql statements and records them with any COPY payload."""
+
+    def __init__(self):
+        self.statements = []
+        self.copied = []
+
+    def execute(self, query, params=None):
+        self.statements.append(query.as_string(self))
+
+    def copy_expert(self, sql, file, size=8192):
+        self.statements.append(sql)
+        self.copied.append(file.read())
+
+
+@pytest.fixture(autouse=True)
+def _quote_ident(monkeypatch):
+    monkeypatch.setattr(psycopg2.extensions, "quote_ident", lambda name, context: f'"{name}"')
+
+
+class TestBatchRecords:
+    """Tests for grouping records into column batches"""
+
+    def test_batches_are_bounded(self):
+        """Test that records are split at batch_size and missing keys become None"""
+        records = [{"donor_id": i} for i in range(5)]
+        batches = list(batch_records("donors", records, ["donor_id", "email"], batch_size=2))
+        assert [len(b) for b in batches] == [2, 2, 1]
+        assert batches[-1].columns == {"donor_id": [4], "email": [None]}
+
+
+class TestUpsertBatch:
+    """Tests for the COPY-then-merge upsert"""
+
+    def test_copy_then_merge_skips_unchanged_rows(self):
+        """Test that rows are copied once and only changed rows are updated"""
+        cursor = _FakeCursor()
+        batch = ColumnBatch("donors", {"donor_id": [1, 2], "email": ["a@x.org", None], "is_active": [True, False]})
+        assert upsert_batch(cursor, batch, key=["donor_id"]) == 2
+        assert cursor.copied == ['1,"a@x.org",t\n2,,f\n']
+        merge = cursor.statements[-1]
+        assert merge.startswith('INSERT INTO "donors" ("donor_id", "email", "is_active") SELECT')
+        assert merge.endswith(
+            'DO UPDATE SET "email" = EXCLUDED."email", "is_active" = EXCLUDED."is_active" '
+            'WHERE ("donors"."email", "donors"."is_active") IS DISTINCT FROM (EXCLUDED."email", EXCLUDED."is_active")'
+        )
+
+    def test_key_only_batch_does_nothing_on_conflict(self):
+        """Test that a batch with no non-key columns only inserts new keys"""
+        cursor = _FakeCursor()
+        upsert_batch(cursor, ColumnBatch("tags", {"tag": ["a"]}), key=["tag"])
+        assert cursor.statements[-1].endswith('ON CONFLICT ("tag") DO NOTHING')
+        assert upsert_batch(cursor, ColumnBatch("tags", {"tag": []}), key=["tag"]) == 0
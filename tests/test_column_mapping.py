@@ -0,0 +1,123 @@
+"""
+Tests for local column mapping against the data dictionary and integration docs.
+"""
+import os
+import time
+
+import pandas as pd
+
+from src.column_mapping import (
+    build_mapping_index,
+    format_mappings_for_prompt,
+    load_mapping_index,
+    normalize_name,
+    parse_data_dictionary,
+    parse_integration_mappings,
+    suggest_mappings,
+)
+from src.schema_inference import infer_schema
+
+DICTIONARY = """
+## Table: donors
+
+| Column | Data Type | Constraints | Description | Example |
+|--------|-----------|-------------|-------------|---------|
+| donor_id | INTEGER | PRIMARY KEY | Unique ID | 1 |
+| phone | VARCHAR(20) | | Phone number | "(555) 123-4567" |
+
+## Table: donations
+
+| Column | Data Type | Constraints | Description | Example |
+|--------|-----------|-------------|-------------|---------|
+| amount | DECIMAL(10,2) | NOT NULL | Gift amount | 250.00 |
+"""
+
+
+def _mapping(schema, column):
+    return next(m for m in suggest_mappings(schema) if m.column == column)
+
+
+class TestParsing:
+    """Tests for reading the docs into target fields"""
+
+    def test_data_dictionary_tables(self):
+        """Test that columns, kinds and example shapes are read from each table section"""
+        fields = {f.key: f for f in parse_data_dictionary(DICTIONARY)}
+        assert list(fields) == ["donors.donor_id", "donors.phone", "donations.amount"]
+        assert fields["donations.amount"].kind == "decimal"
+        assert fields["donors.phone"].example_shapes == {"(9) 9-9"}
+
+    def test_integration_mapping_targets(self):
+        """Test that table aliases and near-miss columns resolve to our fields"""
+        fields = parse_data_dictionary(DICTIONARY)
+        doc = """
+| Field | Type | PostgreSQL Mapping |
+|-------|------|--------------------|
+| `home_phone` | string | `donors.home_phone` |
+| `amount` | decimal | `gifts.amount` |
+| `flag` | string | `donors.flag` |
+"""
+        assert parse_integration_mappings(doc, fields) == [("home_phone", "donors.phone"), ("amount", "donations.amount")]
+
+    def test_normalize_name(self):
+        """Test camelCase splitting and synonym tokens"""
+        assert normalize_name("GiftAmt") == "donation amount"
+        assert normalize_name("E-mail") == "email"
+        assert normalize_name("lname") == "last name"
+
+    def test_index_cached_until_docs_change(self, tmp_path):
+        """Test that the index is rebuilt only when a doc's mtime changes"""
+        (tmp_path / "integrations").mkdir()
+        path = tmp_path / "DATA_DICTIONARY.md"
+        path.write_text(DICTIONARY)
+        first = load_mapping_index(tmp_path)
+        assert load_mapping_index(tmp_path) is first
+        path.write_text(DICTIONARY.replace("| phone |", "| mobile |"))
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert load_mapping_index(tmp_path) is not first
+
+
+class TestSuggestMappings:
+    """Tests for ranking targets against the real docs"""
+
+    def test_source_system_exports(self):
+        """Test that common DonorPerfect and Constant Contact headers map confidently"""
+        df = pd.DataFrame({
+            "Gift Date": ["03/29/2018", "04/01/2018"],
+            "Gift Amount": [149.95, 20.0],
+            "gift_type": ["VISA", "CHECK"],
+            "Email Address": ["a@x.org", "b@y.org"],
+            "Home Phone": ["(555) 123-4567", "(555) 222-3333"],
+        })
+        schema = infer_schema(df)
+        expected = {
+            "Gift Date": "donations.donation_date",
+            "Gift Amount": "donations.amount",
+            "gift_type": "donations.payment_method",
+            "Email Address": "donors.email",
+            "Home Phone": "donors.phone",
+        }
+        for column, target in expected.items():
+            mapping = _mapping(schema, column)
+            assert (mapping.target, mapping.confident) == (target, True), mapping
+
+    def test_unknown_and_ambiguous_columns_not_confident(self):
+        """Test that unrelated or ambiguous names are left for review"""
+        schema = infer_schema(pd.DataFrame({"Mystery": ["x", "y"], "Type": ["Individual", "Foundation"]}))
+        assert not _mapping(schema, "Mystery").confident
+        assert not _mapping(schema, "Type").confident
+        assert "### Low-confidence columns" in format_mappings_for_prompt(suggest_mappings(schema))
+
+    def test_shared_key_is_not_ambiguous(self):
+        """Test that donor_id in two tables counts as one field"""
+        schema = infer_schema(pd.DataFrame({"donor_id": [1, 2]}))
+        assert _mapping(schema, "donor_id").confident
+
+    def test_fast(self):
+        """Test that a wide upload is mapped in milliseconds once the index is built"""
+        schema = infer_schema(pd.DataFrame({f"column {i}": [i] for i in range(50)}))
+        index = build_mapping_index()
+        start = time.perf_counter()
+        suggest_mappings(schema, index)
+        assert time.perf_counter() - start < 0.5
@@ -0,0 +1,239 @@
+"""
+Tests for the generic connector runtime.
+Uses in-memory connectors and loaders so no network or database is needed.
+"""
+import asyncio
+import threading
+import time
+import urllib.error
+
+import psycopg2
+import pytest
+
+from src.bulk_loader import ColumnBatch
+from src.connectors import runtime
+from src.connectors.runtime import (
+    CONNECTORS,
+    Connector,
+    Pipeline,
+    RetryableError,
+    RetryPolicy,
+    TokenBucket,
+    postgres_loader,
+)
+
+
+class _PagedConnector(Connector):
+    """Serves `pages` pages of `per_page` records; optionally flaky or failing."""
+
+    name = "memory"
+    target_table = "donors"
+    columns = ["donor_id", "first_name"]
+    key = ["donor_id"]
+
+    def __init__(self, pages=5, per_page=10, flaky=0, fail_parse=False):
+        self.pages = pages
+        self.per_page = per_page
+        self.flaky = flaky
+        self.fail_parse = fail_parse
+        self.fetched = 0
+        self.lock = threading.Lock()
+
+    def initial_cursor(self):
+        return 0
+
+    def fetch_page(self, cursor):
+        if self.flaky:
+            self.flaky -= 1
+            raise RetryableError("temporary", retry_after=0)
+        with self.lock:
+            self.fetched += 1
+        start = cursor * self.per_page
+        page = [{"id": start + i, "name": f"Donor {start + i}"} for i in range(self.per_page)]
+        return page, cursor + 1 if cursor + 1 < self.pages else None
+
+    def parse(self, page):
+        if self.fail_parse:
+            raise ValueError("bad page")
+        return page
+
+    def transform(self, record):
+        if record["id"] % 10 == 9:
+            return None
+        return {"donor_id": record["id"], "first_name": record["name"]}
+
+
+class TestPipeline:
+    """Tests for the bounded fetch/parse/transform/load pipeline"""
+
+    def test_loads_all_transformed_rows(self):
+        """Test that every row that survives transform reaches the loader"""
+        loaded = []
+
+        def loader(batch, key):
+            loaded.extend(batch.columns["donor_id"])
+            assert key == ["donor_id"]
+            return len(batch)
+
+        result = Pipeline(_PagedConnector(), loader, batch_size=7).run()
+        assert result.rows_loaded == 45
+        assert len(loaded) == 45
+        stages = {s.name: s for s in result.stages}
+        assert stages["fetch"].items_out == 5
+        assert stages["parse"].items_out == 50
+        assert stages["transform"].items_out == 45
+
+    def test_slow_loader_applies_backpressure(self):
+        """Test that fetching cannot run far ahead of a slow loader"""
+        connector = _PagedConnector(pages=40, per_page=1)
+        ahead = []
+
+        def slow_loader(batch, key):
+            ahead.append(connector.fetched - len(ahead))
+            time.sleep(0.01)
+            return len(batch)
+
+        Pipeline(connector, slow_loader, queue_size=1, batch_size=1).run()
+        # Three size-1 queues plus one item held by each stage: at most ~10 pages
+        # in flight, far fewer than the 40 an unbounded fetcher would buffer.
+        assert max(ahead) <= 10
+
+    def test_retries_transient_fetch_errors(self):
+        """Test that retryable fetch failures are retried and succeed"""
+        result = Pipeline(
+            _PagedConnector(pages=1, flaky=2),
+            lambda batch, key: len(batch),
+            retry=RetryPolicy(max_attempts=3, base_delay=0),
+        ).run()
+        assert result.rows_loaded == 9
+
+    def test_stage_failure_propagates_without_deadlock(self):
+        """Test that an exception in any stage stops the pipeline and is raised"""
+        with pytest.raises(ValueError, match="bad page"):
+            Pipeline(_PagedConnector(pages=50, fail_parse=True), lambda b, k: len(b), queue_size=1).run()
+
+
+class TestRetryPolicy:
+    """Tests for exponential backoff with jitter"""
+
+    def test_delay_is_jittered_and_capped(self):
+        """Test that delays fall within the exponential envelope"""
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        delays = [policy.delay(10) for _ in range(50)]
+        assert all(0 <= d <= 5 for d in delays)
+        assert len(set(delays)) > 1
+
+    def test_retry_after_wins(self):
+        """Test that a server-provided Retry-After is honoured"""
+        assert RetryPolicy().delay(3, retry_after=2) == 2
+
+    def test_gives_up_after_max_attempts(self):
+        """Test that the last error is re-raised"""
+        calls = []
+
+        def always_fail():
+            calls.append(1)
+            raise RetryableError("nope", retry_after=0)
+
+        with pytest.raises(RetryableError):
+            RetryPolicy(max_attempts=3).call(always_fail)
+        assert len(calls) == 3
+
+    def test_permanent_http_error_not_retried(self):
+        """Test that a 4xx HTTPError (an OSError subclass) fails on the first attempt"""
+        calls = []
+
+        def forbidden():
+            calls.append(1)
+            raise urllib.error.HTTPError("http://api.test", 403, "Forbidden", None, None)
+
+        with pytest.raises(urllib.error.HTTPError):
+            RetryPolicy(max_attempts=3, base_delay=0).call(forbidden)
+        assert len(calls) == 1
+
+
+class _DroppingConnection:
+    """Fake connection whose first `drops` loads lose the server (psycopg2 then marks it closed)."""
+
+    def __init__(self, drops=0):
+        self.drops = drops
+        self.closed = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        if self.drops:
+            self.drops -= 1
+            self.closed = 2
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        if self.closed:
+            raise psycopg2.InterfaceError("connection already closed")
+        self.rollbacks += 1
+
+
+class TestPostgresLoader:
+    """Tests for loading batches through a connection that can drop"""
+
+    @pytest.fixture(autouse=True)
+    def _no_sql(self, monkeypatch):
+        monkeypatch.setattr(runtime, "upsert_batch", lambda cursor, batch, key: len(batch))
+        monkeypatch.setattr(runtime, "bump_watermarks", lambda cursor, tables: None)
+
+    def test_reconnects_before_retrying(self):
+        """Test that a dropped connection is replaced and the batch retried on the new one"""
+        dropped, fresh = _DroppingConnection(drops=1), _DroppingConnection()
+        loader = postgres_loader(dropped, connect=lambda: fresh)
+        batch = ColumnBatch("donors", {"donor_id": [1, 2]})
+        policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+        assert policy.call(loader, batch, ["donor_id"]) == 2
+        assert loader.conn is fresh and fresh.commits == 1
+        assert dropped.rollbacks == 0
+
+    def test_drop_without_factory_not_retried(self):
+        """Test that without a way to reconnect the OperationalError is raised as-is"""
+        loader = postgres_loader(_DroppingConnection(drops=1))
+        with pytest.raises(psycopg2.OperationalError):
+            loader(ColumnBatch("donors", {"donor_id": [1]}), ["donor_id"])
+
+
+class TestTokenBucket:
+    """Tests for the shared rate limiter"""
+
+    def test_limits_rate_after_burst(self):
+        """Test that blocking acquires beyond the burst are spaced at the refill rate"""
+        bucket = TokenBucket(rate=20, capacity=1)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        assert time.monotonic() - start >= 0.14
+
+    def test_async_acquire(self):
+        """Test that async acquires are rate limited the same way"""
+        async def run():
+            bucket = TokenBucket(rate=20, capacity=1)
+            start = time.monotonic()
+            for _ in range(4):
+                await bucket.acquire_async()
+            return time.monotonic() - start
+
+        assert asyncio.run(run()) >= 0.14
+
+
+def test_integrations_register_as_plugins():
+    """Test that the shipped connectors are discoverable in the registry"""
+    import src.connectors.constantcontact  # noqa: F401
+    import src.connectors.donorperfect  # noqa: F401
+
+    assert {"donorperfect", "constantcontact"} <= set(CONNECTORS)
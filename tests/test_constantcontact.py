@@ -0,0 +1,193 @@
+"""
+Tests for the async Constant Contact connector.
+Runs against a local mock V3 API with cursor pagination and rate limiting.
+"""
+import asyncio
+import json
+import socket
+import threading
+import urllib.parse
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.connectors.constantcontact import (
+    ConstantContactClient,
+    ConstantContactError,
+    JsonWatermarkStore,
+    contact_row,
+    fetch_json,
+    format_timestamp,
+    iter_contact_batches,
+    iter_engagement_batches,
+)
+from src.connectors.runtime import RetryableError
+
+CONTACTS = [
+    {
+        "contact_id": f"00000000-0000-4000-8000-00000000000{i}",
+        "email_address": {"address": f" Donor{i}@Example.com ", "permission_to_send": "explicit"},
+        "first_name": f"Donor{i}",
+        "created_at": "2023-01-01T00:00:00.000Z",
+        "updated_at": f"2024-02-0{i}T00:00:00.000Z",
+    }
+    for i in range(1, 6)
+]
+
+SENDS = {
+    activity: [
+        {"contact_id": c["contact_id"], "send_date": "2023-12-05T09:00:15.000Z", "open_date": None}
+        for c in CONTACTS[:3]
+    ]
+    for activity in ("act-a", "act-b")
+}
+
+
+class _MockApi(BaseHTTPRequestHandler):
+    """Serve /v3/contacts and tracking/sends with opaque offset cursors."""
+
+    throttle_first = False
+    hits: list[str] = []
+
+    def _page(self, items, key, limit, cursor):
+        start = int(cursor or 0)
+        body = {key: items[start:start + limit], "_links": {}}
+        if start + limit < len(items):
+            query = urllib.parse.urlencode({"limit": limit, "cursor": start + limit})
+            body["_links"]["next"] = {"href": f"{urllib.parse.urlparse(self.path).path}?{query}"}
+        return body
+
+    def do_GET(self):
+        parsed = urllib.parse.urlparse(self.path)
+        query = {k: v[0] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+        type(self).hits.append(self.path)
+        if type(self).throttle_first:
+            type(self).throttle_first = False
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        limit = int(query.get("limit", 50))
+        if parsed.path == "/v3/contacts":
+            items = CONTACTS
+            if "updated_after" in query:
+                items = [c for c in CONTACTS if c["updated_at"] > query["updated_after"]]
+            body = self._page(items, "contacts", limit, query.get("cursor"))
+        elif parsed.path.endswith("/tracking/sends"):
+            activity = parsed.path.split("/")[4]
+            body = self._page(SENDS[activity], "tracking_activities", limit, query.get("cursor"))
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mock_api():
+    """Start the mock API and return its /v3 base URL."""
+    _MockApi.hits = []
+    _MockApi.throttle_first = False
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockApi)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v3"
+    server.shutdown()
+    server.server_close()
+
+
+async def _collect(agen):
+    return [item async for item in agen]
+
+
+class TestContactRow:
+    """Tests for contact flattening and typing"""
+
+    def test_normalizes_email_and_parses_timestamps(self):
+        """Test that emails are trimmed/lowercased and timestamps are aware datetimes"""
+        row = contact_row(CONTACTS[0])
+        assert row["email"] == "donor1@example.com"
+        assert row["updated_at"] == datetime(2024, 2, 1, tzinfo=timezone.utc)
+        assert row["company_name"] is None
+
+
+class TestContactSync:
+    """Tests for paging, incremental filters and retry against the mock API"""
+
+    def test_follows_cursor_pages(self, mock_api):
+        """Test that every page is fetched and turned into one typed batch"""
+        async def run():
+            client = ConstantContactClient("token", base_url=mock_api)
+            return await _collect(iter_contact_batches(client, page_size=2))
+
+        batches = asyncio.run(run())
+        assert [len(b) for b in batches] == [2, 2, 1]
+        assert batches[0].table == "cc_contacts"
+
+    def test_updated_after_limits_to_changed_contacts(self, mock_api):
+        """Test that the watermark is passed as updated_after"""
+        async def run():
+            client = ConstantContactClient("token", base_url=mock_api)
+            return await _collect(iter_contact_batches(client, "2024-02-03T00:00:00.000Z"))
+
+        batches = asyncio.run(run())
+        assert sum(len(b) for b in batches) == 2
+
+    def test_retries_after_429(self, mock_api):
+        """Test that a throttled request is retried after Retry-After"""
+        _MockApi.throttle_first = True
+
+        async def run():
+            client = ConstantContactClient("token", base_url=mock_api)
+            return await _collect(iter_contact_batches(client, page_size=10))
+
+        batches = asyncio.run(run())
+        assert sum(len(b) for b in batches) == 5
+        assert len(_MockApi.hits) == 2
+
+    def test_activity_pages_fetched_concurrently(self, mock_api):
+        """Test that all tracking pages for all activities are collected"""
+        async def run():
+            client = ConstantContactClient("token", base_url=mock_api, max_concurrency=2)
+            return await _collect(iter_engagement_batches(client, ["act-a", "act-b"], page_size=2))
+
+        batches = asyncio.run(run())
+        rows = [(cid, act) for b in batches for cid, act in zip(b.columns["contact_id"], b.columns["campaign_activity_id"])]
+        assert len(rows) == 6
+        assert {act for _, act in rows} == {"act-a", "act-b"}
+
+
+class TestFetchJson:
+    """Tests for classifying request failures as retryable or permanent"""
+
+    def test_unreachable_host_is_retryable(self):
+        """Test that a refused connection raises RetryableError"""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        with pytest.raises(RetryableError):
+            fetch_json(f"http://127.0.0.1:{port}/v3/contacts", "token", timeout=2)
+
+    def test_client_error_is_permanent(self, mock_api):
+        """Test that a 404 raises ConstantContactError, not RetryableError"""
+        with pytest.raises(ConstantContactError, match="HTTP 404"):
+            fetch_json(f"{mock_api}/missing", "token")
+
+
+class TestWatermarkStore:
+    """Tests for persisted high-water marks"""
+
+    def test_round_trip(self, tmp_path):
+        """Test that a stored watermark survives a new store instance"""
+        path = tmp_path / "state" / "cc.json"
+        JsonWatermarkStore(path).set("contacts_updated_at", format_timestamp(datetime(2024, 2, 5, tzinfo=timezone.utc)))
+        assert JsonWatermarkStore(path).get("contacts_updated_at") == "2024-02-05T00:00:00.000Z"
@@ -0,0 +1,96 @@
+"""
+Tests for the assistant prompt token budget.
+"""
+import pandas as pd
+
+from src.context_budget import (
+    ContextBudget,
+    ConversationMemory,
+    estimate_tokens,
+    fit_chunks,
+    fit_schema_text,
+    schema_levels,
+    split_history,
+)
+from src.doc_index import DocChunk
+from src.schema_inference import infer_schema
+
+
+def _history(turns: int, words: int = 20) -> list[dict[str, str]]:
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"Question {i}? " + "word " * words})
+        history.append({"role": "assistant", "content": f"Answer {i}. " + "word " * words})
+    return history
+
+
+class TestSplitHistory:
+    """Tests for choosing the verbatim tail of the conversation"""
+
+    def test_keeps_recent_messages(self):
+        """Test that only the last recent_messages are kept when they fit"""
+        history = _history(10)
+        assert split_history(history, ContextBudget(recent_messages=4)) == 16
+
+    def test_long_messages_limited_by_share(self):
+        """Test that fewer messages are kept when they exceed the history share"""
+        history = _history(10, words=400)
+        start = split_history(history, ContextBudget(max_tokens=2000, recent_messages=6))
+        assert len(history) - start == 1
+
+
+class TestConversationMemory:
+    """Tests for the rolling summary"""
+
+    def test_folds_incrementally(self):
+        """Test that each message is summarized once, by its first sentence"""
+        memory = ConversationMemory()
+        history = _history(3)
+        memory.fold(history, 2, max_tokens=400)
+        memory.fold(history, 4, max_tokens=400)
+        assert memory.lines == [
+            "- user: Question 0?",
+            "- assistant: Answer 0.",
+            "- user: Question 1?",
+            "- assistant: Answer 1.",
+        ]
+
+    def test_capped_oldest_first(self):
+        """Test that the summary drops its oldest lines to stay within its cap"""
+        memory = ConversationMemory()
+        memory.fold(_history(50), 100, max_tokens=60)
+        assert estimate_tokens(memory.text()) <= 60
+        assert memory.lines[-1] == "- assistant: Answer 49."
+        assert f"({memory.dropped} oldest omitted)" in memory.text()
+
+    def test_reset_when_history_cleared(self):
+        """Test that a shorter history starts a new summary"""
+        memory = ConversationMemory()
+        memory.fold(_history(5), 8, max_tokens=400)
+        memory.fold(_history(1), 0, max_tokens=400)
+        assert memory.text() == ""
+
+
+class TestFitting:
+    """Tests for trimming schema text and doc sections"""
+
+    def test_schema_levels(self):
+        """Test that samples, then profiles, then columns are dropped to fit"""
+        schema = infer_schema(pd.DataFrame({f"column_{i}": ["some text value"] * 3 for i in range(40)}))
+        full, level = fit_schema_text(schema, 100_000)
+        assert level == "full"
+        for budget, expected in [
+            (estimate_tokens(full) - 1, "no sample rows"),
+            (600, "no value profiles"),
+            (150, "columns truncated"),
+        ]:
+            text, level = fit_schema_text(schema, budget)
+            assert level == expected
+            assert fit_schema_text(schema, budget, list(schema_levels(schema))) == (text, level)
+            assert estimate_tokens(text) <= budget
+        assert "more columns not shown" in text
+
+    def test_chunks_kept_in_order(self):
+        """Test that doc sections are dropped from the least relevant end"""
+        chunks = [DocChunk("a.md", f"Section {i}", "text " * 100) for i in range(5)]
+        assert fit_chunks(chunks, 300) == chunks[:2]
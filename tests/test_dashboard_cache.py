@@ -0,0 +1,125 @@
+"""
+Tests for the data-version dashboard cache.
+Versions come from a plain variable or a fake cursor; no database is needed.
+"""
+import threading
+
+from src.dashboard_cache import DataVersionWatcher, VersionedCache
+from src.watermarks import DATA_CHANGED_CHANNEL, bump_watermarks
+
+
+class _Source:
+    """Mutable data version plus a loader that counts calls."""
+
+    def __init__(self, version=1):
+        self.version = version
+        self.loads = []
+
+    def __call__(self):
+        return self.version
+
+    def load(self, key):
+        self.loads.append(key)
+        return f"{key}@{self.version}"
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((sql, params))
+
+    def fetchone(self):
+        return (self.conn.version,)
+
+
+class _FakeConnection:
+    def __init__(self, version):
+        self.version = version
+        self.executed = []
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+
+class TestVersionedCache:
+    """Tests for version-keyed caching"""
+
+    def test_hits_until_version_changes(self):
+        """Test that results are reused indefinitely until the data version moves"""
+        source = _Source()
+        cache = VersionedCache(source.load, source)
+        assert cache.get("q") == ("q@1", False)
+        assert cache.get("q") == ("q@1", True)
+        source.version = 2
+        assert cache.get("q") == ("q@2", False)
+        assert source.loads == ["q", "q"]
+
+    def test_unknown_version_is_never_reused(self):
+        """Test that nothing is served from cache while the version is unknown"""
+        source = _Source(version=None)
+        cache = VersionedCache(source.load, source)
+        cache.get("q")
+        assert cache.get("q")[1] is False
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest unused entry is dropped at capacity"""
+        source = _Source()
+        cache = VersionedCache(source.load, source, max_entries=2)
+        cache.get("a")
+        cache.get("b")
+        cache.get("a")
+        cache.get("c")
+        assert len(cache) == 2
+        assert cache.get("a")[1] is True
+        assert cache.get("b")[1] is False
+
+    def test_stale_result_served_during_background_refresh(self):
+        """Test that users get the old result, not a cold query, while a refresh runs"""
+        source = _Source()
+        release = threading.Event()
+
+        def slow_load(key):
+            if source.version == 2:
+                release.wait(timeout=5)
+            return source.load(key)
+
+        cache = VersionedCache(slow_load, source)
+        cache.get("q")
+        source.version = 2
+        thread = cache.refresh()
+        assert cache.get("q") == ("q@1", True)
+        release.set()
+        thread.join(timeout=5)
+        assert cache.get("q") == ("q@2", True)
+        assert source.loads == ["q", "q"]
+
+
+class TestDataVersionWatcher:
+    """Tests for version tracking"""
+
+    def test_change_fires_callback_once(self):
+        """Test that on_change runs only when the version actually moves"""
+        changes = []
+        watcher = DataVersionWatcher(connect=None, on_change=changes.append)
+        conn = _FakeConnection(version=3)
+        watcher.check(conn)
+        watcher.check(conn)
+        conn.version = 5
+        watcher.check(conn)
+        assert changes == [5]
+        assert watcher.current() == 5
+
+    def test_bump_sends_notification(self):
+        """Test that every watermark bump notifies listeners"""
+        conn = _FakeConnection(version=0)
+        with conn.cursor() as cursor:
+            bump_watermarks(cursor, ["donors"])
+        assert ("SELECT pg_notify(%s, %s)", (DATA_CHANGED_CHANNEL, "donors")) in conn.executed
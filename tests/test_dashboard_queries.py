@@ -0,0 +1,180 @@
+"""
+Tests for dashboard SQL builders.
+Queries are inspected as text; filters must become parameters, never literals.
+"""
+from datetime import date
+
+import pytest
+
+from src.dashboard_queries import (
+    DASHBOARD_QUERIES,
+    DONOR_TOTALS_DDL,
+    DONOR_TOTALS_TABLES,
+    DashboardFilters,
+    _REFRESH_DONOR_TOTALS_SQL,
+    campaign_performance_query,
+    filtered_donations,
+    kpi_query,
+    refresh_donor_totals,
+    top_donors_query,
+)
+from src.offline import to_duckdb
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.fail_on and self.conn.fail_on in sql:
+            raise RuntimeError("boom")
+        self.conn.executed.append((" ".join(sql.split()), params))
+        self.rowcount = 3
+
+
+class _FakeConnection:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestFilteredDonations:
+    """Tests for filter pushdown"""
+
+    def test_no_filters_scans_donations_only(self):
+        """Test that an unfiltered query adds no joins or predicates"""
+        sql, params = filtered_donations(DashboardFilters())
+        assert "JOIN" not in sql and "WHERE" not in sql
+        assert params == {}
+
+    def test_filters_become_parameters(self):
+        """Test that each filter adds its predicate and join with bound values"""
+        filters = DashboardFilters(
+            start_date=date(2024, 1, 1),
+            campaign_types=("Annual Fund",),
+            donor_types=("Individual", "Foundation"),
+            portfolio_holder_ids=(2,),
+        )
+        sql, params = filtered_donations(filters)
+        assert "JOIN campaigns c" in sql and "JOIN donors d" in sql
+        assert "portfolio_assignments" in sql and "end_date" not in sql
+        assert "Annual Fund" not in sql
+        assert params == {
+            "start_date": date(2024, 1, 1),
+            "campaign_types": ("Annual Fund",),
+            "donor_types": ("Individual", "Foundation"),
+            "portfolio_holder_ids": (2,),
+        }
+
+    def test_filters_are_hashable(self):
+        """Test that filter state can key the result cache"""
+        assert hash(DashboardFilters(donor_types=("Individual",))) == hash(DashboardFilters(donor_types=("Individual",)))
+
+
+class TestDashboardQueries:
+    """Tests for bounded result queries"""
+
+    def test_kpis_computed_in_database(self):
+        """Test that KPI totals are one aggregate row, not per-month sums"""
+        sql, _ = kpi_query(DashboardFilters())
+        assert "COUNT(DISTINCT donor_id)" in sql and "GROUP BY" not in sql
+
+    def test_campaigns_limited(self):
+        """Test that campaign rows are capped and type-filtered"""
+        sql, params = campaign_performance_query(DashboardFilters(campaign_types=("Gala",)))
+        assert "LIMIT %(campaign_limit)s" in sql
+        assert "WHERE c.campaign_type IN %(campaign_types)s" in sql
+        assert params["campaign_limit"] > 0
+
+    def test_keyset_pagination(self):
+        """Test that later pages seek past the previous page's last row"""
+        first_sql, first_params = top_donors_query(DashboardFilters(), page_size=10)
+        assert "(t.total_given, t.donor_id) <" not in first_sql
+        assert "OFFSET" not in first_sql and first_params == {"page_size": 10}
+        sql, params = top_donors_query(DashboardFilters(), after=(500, 42), page_size=10)
+        assert "WHERE (t.total_given, t.donor_id) < (%(after_total)s, %(after_id)s)" in sql
+        assert "ORDER BY t.total_given DESC, t.donor_id DESC" in sql
+        assert (params["after_total"], params["after_id"]) == (500, 42)
+
+    def test_top_donors_read_totals_without_date_or_campaign_filter(self):
+        """Test that donor and portfolio filters page over donor_totals without aggregating donations"""
+        filters = DashboardFilters(donor_types=("Individual",), portfolio_holder_ids=(2,))
+        sql, params = top_donors_query(filters, after=(500, 42))
+        assert "FROM donor_totals t" in sql
+        assert "donations" not in sql and "GROUP BY" not in sql
+        assert params["donor_types"] == ("Individual",) and params["portfolio_holder_ids"] == (2,)
+        dated, _ = top_donors_query(DashboardFilters(start_date=date(2024, 1, 1)))
+        assert "donor_totals" not in dated and "GROUP BY donor_id" in dated
+        by_campaign, _ = top_donors_query(DashboardFilters(campaign_types=("Gala",)))
+        assert "donor_totals" not in by_campaign
+
+    def test_top_donor_pages_match_donations_on_duckdb(self):
+        """Test that paging over donor_totals returns the same rows as aggregating donations"""
+        duckdb = pytest.importorskip("duckdb")
+        con = duckdb.connect()
+        con.execute(
+            "CREATE TABLE donors AS SELECT i AS donor_id, 'F' || i AS first_name, 'L' || i AS last_name, "
+            "CASE WHEN i % 3 = 0 THEN 'Corporate' ELSE 'Individual' END AS donor_type FROM range(1, 41) r(i)"
+        )
+        con.execute("CREATE TABLE portfolio_assignments AS SELECT i AS donor_id, 1 + i % 2 AS portfolio_holder_id FROM range(1, 41) r(i)")
+        con.execute(
+            "CREATE TABLE donations AS SELECT i AS donation_id, 1 + i % 40 AS donor_id, NULL AS campaign_id, (5 + i % 17)::DECIMAL(10, 2) AS amount, "
+            "DATE '2024-01-01' + i::INTEGER AS donation_date FROM range(500) r(i)"
+        )
+        con.execute(DONOR_TOTALS_DDL)
+        con.execute(_REFRESH_DONOR_TOTALS_SQL)
+
+        def pages(filters):
+            rows, after = [], None
+            while True:
+                page = con.execute(*to_duckdb(*top_donors_query(filters, after=after, page_size=7))).fetchall()
+                rows += page
+                if len(page) < 7:
+                    return rows
+                after = (page[-1][4], page[-1][0])
+
+        # An open-ended start date keeps every donation but forces the aggregate path
+        for donor_types, holders in (((), ()), (("Individual",), (2,))):
+            totals = pages(DashboardFilters(donor_types=donor_types, portfolio_holder_ids=holders))
+            aggregated = pages(DashboardFilters(start_date=date(2000, 1, 1), donor_types=donor_types, portfolio_holder_ids=holders))
+            assert totals == aggregated
+        assert len(pages(DashboardFilters())) == 40
+
+
+class TestRefreshDonorTotals:
+    """Tests for the donor_totals rebuild"""
+
+    def test_rebuilt_in_one_transaction(self):
+        """Test that totals are replaced and the watermark bumped before one commit"""
+        conn = _FakeConnection()
+        assert refresh_donor_totals(conn) == 3
+        assert conn.executed[0][0] == "DELETE FROM donor_totals"
+        bumped = [p[0] for s, p in conn.executed if s.startswith("INSERT INTO load_watermarks")]
+        assert tuple(bumped) == DONOR_TOTALS_TABLES
+        assert conn.commits == 1
+
+    def test_failure_rolls_back(self):
+        """Test that a failed rebuild leaves the previous totals in place"""
+        conn = _FakeConnection(fail_on="GROUP BY donor_id")
+        with pytest.raises(RuntimeError):
+            refresh_donor_totals(conn)
+        assert conn.rollbacks == 1
+        assert conn.commits == 0
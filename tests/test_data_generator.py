@@ -9,6 +9,7 @@ from src.data_generator import (
     generate_campaign,
     generate_portfolio_holder,
     generate_portfolio_assignment,
+    generate_bulk_dataset,
     validate_donor,
     validate_donation
 )
@@ -225,4 +226,27 @@ class TestGeneratePortfolioAssignment:
         assignment = generate_portfolio_assignment(
             assignment_id=1, donor_id=1, portfolio_holder_id=1, assigned_date=d
         )
-        assert assignment['assigned_date'] == d
\ No newline at end of file
+        assert assignment['assigned_date'] == d
+
+class TestGenerateBulkDataset:
+    """Tests for generate_bulk_dataset function"""
+
+    def test_writes_all_files_with_sample_columns(self, tmp_path):
+        """Test that bulk files match the layout of generate_sample_data.py"""
+        import pandas as pd
+        counts = generate_bulk_dataset(tmp_path, n_donors=50, n_donations=1000, chunk_size=300)
+        donations = pd.read_csv(tmp_path / 'donations.csv')
+        donors = pd.read_csv(tmp_path / 'donors.csv')
+        assert counts['donations'] == len(donations) == 1000
+        assert list(donations.columns) == list(generate_donation(1, 1).keys())
+        assert list(donors.columns) == list(generate_donor(1).keys())
+        assert donations['donation_id'].is_unique
+        assert donations['donor_id'].between(1, 50).all()
+        assert donations['campaign_id'].isna().any()
+        assert all(validate_donor(d) for d in donors.to_dict('records'))
+
+    def test_reproducible_with_seed(self, tmp_path):
+        """Test that the same seed produces identical files"""
+        generate_bulk_dataset(tmp_path / 'a', n_donors=20, n_donations=100, seed=7)
+        generate_bulk_dataset(tmp_path / 'b', n_donors=20, n_donations=100, seed=7)
+        assert (tmp_path / 'a' / 'donations.csv').read_text() == (tmp_path / 'b' / 'donations.csv').read_text()
@@ -0,0 +1,133 @@
+"""
+Tests for the declarative data quality engine.
+Covers rule parsing and query compilation; execution uses a fake connection.
+"""
+import pytest
+
+from src.data_quality import (
+    DEFAULT_RULES_PATH,
+    DataQualityError,
+    Rule,
+    compile_table_query,
+    load_rules,
+    rules_by_table,
+    run_checks,
+)
+
+
+def _rule(**kwargs):
+    return Rule.from_dict({"name": "r", "table": "donations", **kwargs})
+
+
+class _FakeCursor:
+    def __init__(self, row):
+        self.row = row
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchone(self):
+        return self.row
+
+
+class _FakeConn:
+    def __init__(self, row):
+        self.cursor_obj = _FakeCursor(row)
+        self.committed = False
+
+    def cursor(self):
+        return self.cursor_obj
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+class TestRuleConfig:
+    """Tests for loading and validating rules"""
+
+    def test_shipped_config_is_valid(self):
+        """Test that the repository's rule file loads and covers core tables"""
+        rules = load_rules(DEFAULT_RULES_PATH)
+        assert {"donors", "campaigns", "donations"} <= set(rules_by_table(rules))
+
+    def test_loads_toml(self, tmp_path):
+        """Test that TOML rules become Rule objects with defaults"""
+        path = tmp_path / "dq.toml"
+        path.write_text(
+            '[[rules]]\nname = "pos"\ntable = "donations"\ntype = "range"\ncolumn = "amount"\nmin = 0.01\n'
+        )
+        (rule,) = load_rules(path)
+        assert rule.columns == ("amount",)
+        assert rule.severity == "error"
+
+    @pytest.mark.parametrize("raw", [
+        {"type": "between", "column": "amount"},
+        {"type": "range", "column": "amount"},
+        {"type": "orphan", "column": "donor_id", "references": "donors"},
+        {"type": "freshness", "column": "donation_date"},
+        {"type": "not_null", "column": "amount; DROP TABLE donors"},
+        {"type": "not_null", "column": "amount", "threshold": 3},
+    ])
+    def test_rejects_invalid_rules(self, raw):
+        """Test that incomplete or unsafe rules fail at load time"""
+        with pytest.raises(DataQualityError):
+            _rule(**raw)
+
+
+class TestCompile:
+    """Tests for compiling rules into one query per table"""
+
+    def test_all_rules_share_one_scan(self):
+        """Test that every rule on a table becomes a column of a single SELECT"""
+        rules = [
+            _rule(type="not_null", column="amount"),
+            _rule(type="range", column="amount", min=0.01, max=100000),
+            _rule(type="unique", column="donation_id"),
+            _rule(type="orphan", column="donor_id", references="donors.donor_id"),
+            _rule(type="freshness", column="donation_date", max_age_days=30),
+        ]
+        sql, params = compile_table_query("donations", rules)
+        assert sql.startswith("SELECT") and sql.count("FROM donations t") == 1
+        assert "JOIN" not in sql  # a join on a non-unique column would duplicate rows
+        assert "NOT EXISTS (SELECT 1 FROM donors j3 WHERE j3.donor_id = t.donor_id)" in sql
+        assert "COUNT(t.donation_id) - COUNT(DISTINCT t.donation_id)" in sql
+        assert params == {"r1_min": 0.01, "r1_max": 100000, "r4_days": 30}
+
+    def test_composite_unique(self):
+        """Test that multi-column uniqueness counts distinct tuples"""
+        rule = _rule(type="unique", columns=["donor_id", "campaign_id"])
+        sql, _ = compile_table_query("donations", [rule])
+        assert "COUNT(DISTINCT (t.donor_id, t.campaign_id))" in sql
+
+
+class TestRunChecks:
+    """Tests for evaluating results and recording history"""
+
+    def test_results_and_history_rows(self, monkeypatch):
+        """Test that failures respect max_failures and every rule is recorded"""
+        inserted = []
+        monkeypatch.setattr(
+            "src.data_quality.execute_values",
+            lambda cursor, sql, rows: inserted.extend(rows),
+        )
+        rules = [
+            _rule(type="not_null", column="amount"),
+            Rule.from_dict({"name": "dup", "table": "donations", "type": "unique",
+                            "column": "donation_id", "max_failures": 5, "severity": "warn"}),
+        ]
+        conn = _FakeConn((100, 2, 3))
+        results = run_checks(conn, rules)
+        assert [(r.failed_rows, r.passed) for r in results] == [(2, False), (3, True)]
+        assert len(conn.cursor_obj.executed) == 1
+        assert [row[2] for row in inserted] == ["r", "dup"]
+        assert conn.committed
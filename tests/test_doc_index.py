@@ -0,0 +1,113 @@
+"""
+Tests for doc chunking and BM25 retrieval.
+"""
+import json
+
+from src import doc_index
+from src.doc_index import BM25Index, build_doc_index, chunk_markdown, load_doc_index, tokenize
+
+DOC = """# Constant Contact API Integration
+
+## Rate Limits
+
+10,000 requests per day.
+
+## Data Schema
+
+### Contact Resource
+
+```python
+# not a heading
+email_address = contact["email_address"]
+```
+
+### Tags Schema
+
+Tags group contacts.
+"""
+
+
+def _write_docs(root, text=DOC):
+    (root / "integrations").mkdir(exist_ok=True)
+    (root / "DATA_DICTIONARY.md").write_text("# Data Dictionary\n\n## Table: donors\n\nOne row per donor.\n")
+    (root / "integrations" / "cc.md").write_text(text)
+
+
+class TestChunking:
+    """Tests for splitting markdown into sections"""
+
+    def test_heading_paths_and_code_fences(self):
+        """Test that sections get nested headings and # lines in code blocks are not headings"""
+        chunks = chunk_markdown(DOC, "cc.md")
+        assert [c.heading for c in chunks] == ["Rate Limits", "Data Schema > Contact Resource", "Data Schema > Tags Schema"]
+        assert "# not a heading" in chunks[1].text
+        assert {c.title for c in chunks} == {"Constant Contact API Integration"}
+
+    def test_long_sections_split_at_blank_lines(self):
+        """Test that oversized sections are split between paragraphs"""
+        text = "## Notes\n\n" + "\n\n".join(f"paragraph {i} " + "x" * 50 for i in range(10))
+        chunks = chunk_markdown(text, "notes.md", max_chars=200)
+        assert len(chunks) > 1
+        assert all(c.heading == "Notes" for c in chunks)
+        assert "paragraph 9" in chunks[-1].text
+
+    def test_tokenize(self):
+        """Test camelCase and snake_case splitting, stopwords and plurals"""
+        assert tokenize("The giftAmounts of donor_ids") == ["gift", "amount", "donor", "ids"]
+
+
+class TestBM25Index:
+    """Tests for ranking"""
+
+    def test_title_and_heading_match(self):
+        """Test that the doc title and section heading steer results"""
+        index = BM25Index(chunk_markdown(DOC, "cc.md"))
+        (best, score), *_ = index.search("constant contact rate limits")
+        assert best.heading == "Rate Limits" and score > 0
+        assert index.search("unrelated words") == []
+
+    def test_integration_doc_ranked_for_its_source(self, tmp_path):
+        """Test that a source-system gift question finds that system's gift section across the docs tree"""
+        _write_docs(tmp_path)
+        (tmp_path / "DATA_DICTIONARY.md").write_text(
+            "# Data Dictionary\n\n## Table: donations\n\nOne row per gift: amount and donation date.\n\n"
+            "## Table: campaigns\n\nFundraising campaigns and goals.\n"
+        )
+        (tmp_path / "integrations" / "donorperfect.md").write_text(
+            "# DonorPerfect API\n\n## Authentication\n\nAn API key per request.\n\n"
+            "## Gift Records\n\nEach gift has gift_amount and gift_date fields.\n"
+        )
+        hits = build_doc_index(tmp_path).search("DonorPerfect gift amount and gift date", 2)
+        assert (hits[0][0].source, hits[0][0].heading) == ("integrations/donorperfect.md", "Gift Records")
+        assert "Authentication" not in [c.heading for c, _ in hits]
+
+    def test_real_docs_build(self):
+        """Test that the shipped docs index and answer a question"""
+        index = build_doc_index()
+        assert index.chunks
+        assert index.search("DonorPerfect gift amount and gift date", 3)
+
+
+class TestLoadDocIndex:
+    """Tests for the persisted index"""
+
+    def test_persisted_and_reused(self, tmp_path, monkeypatch):
+        """Test that a saved index is loaded without re-reading docs while they are unchanged"""
+        _write_docs(tmp_path)
+        cache = tmp_path / "cache" / "doc_index.json"
+        built = load_doc_index(tmp_path, cache)
+        assert json.loads(cache.read_text())["version"] == doc_index.docs_version(tmp_path)
+
+        doc_index._index_for.cache_clear()
+        monkeypatch.setattr(doc_index, "build_doc_index", lambda docs_dir: (_ for _ in ()).throw(AssertionError))
+        loaded = load_doc_index(tmp_path, cache)
+        assert loaded.chunks == built.chunks
+
+    def test_rebuilt_when_docs_change(self, tmp_path):
+        """Test that editing a doc gives a new index with the new text"""
+        _write_docs(tmp_path)
+        cache = tmp_path / "doc_index.json"
+        load_doc_index(tmp_path, cache)
+        _write_docs(tmp_path, DOC + "\n## Webhooks\n\nPush notifications for new contacts.\n")
+        (hit, _), *_ = load_doc_index(tmp_path, cache).search("webhooks")
+        assert hit.heading == "Webhooks"
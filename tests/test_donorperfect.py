@@ -0,0 +1,167 @@
+"""
+Tests for the streaming DonorPerfect connector.
+Runs against a local stub HTTP server that replays recorded XML fixtures.
+"""
+import io
+import re
+import threading
+import urllib.parse
+from datetime import date
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from src.connectors.donorperfect import (
+    DONORS,
+    GIFTS,
+    DonorPerfectClient,
+    DonorPerfectError,
+    iter_batches,
+    iter_records,
+    parse_date,
+    parse_flag,
+    parse_money,
+)
+from src.connectors.runtime import RetryableError
+
+FIXTURES = Path(__file__).parent / "fixtures" / "donorperfect"
+EMPTY_RESPONSE = b'<?xml version="1.0" encoding="utf-8"?><result></result>'
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    """Serve fixtures named <TABLE>_after_<ID>.xml for keyset page queries."""
+
+    requests: list[str] = []
+    status = 200
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        action = query.get("action", [""])[0]
+        type(self).requests.append(action)
+        if type(self).status != 200:
+            self.send_response(type(self).status)
+            self.end_headers()
+            return
+        if query.get("apikey", [""])[0] == "bad":
+            body = (FIXTURES / "error.xml").read_bytes()
+        else:
+            m = re.search(r"FROM (\w+) WHERE \w+ > (\d+)", action)
+            path = FIXTURES / f"{m.group(1)}_after_{m.group(2)}.xml" if m else None
+            body = path.read_bytes() if path and path.is_file() else EMPTY_RESPONSE
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Start the replay server on a free port and return its base URL."""
+    _ReplayHandler.requests = []
+    _ReplayHandler.status = 200
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ReplayHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/xmlrequest.asp"
+    server.shutdown()
+    server.server_close()
+
+
+class TestTypeConversions:
+    """Tests for DonorPerfect -> Python type conversion helpers"""
+
+    def test_date_accepts_mm_dd_yyyy_with_time(self):
+        """Test that DP dates with a trailing time part parse to a date"""
+        assert parse_date("12/31/2023 12:00:00 AM") == date(2023, 12, 31)
+
+    def test_money_rounds_to_cents_and_strips_commas(self):
+        """Test that money values become Decimals with two places"""
+        assert parse_money("1,000") == Decimal("1000.00")
+
+    def test_flags_and_empty_values(self):
+        """Test that Y/N flags map to booleans and empty to None"""
+        assert parse_flag("Y") is True
+        assert parse_flag("n") is False
+        assert parse_flag("") is None
+
+
+class TestIterRecords:
+    """Tests for incremental XML parsing"""
+
+    def test_parses_fields_and_empty_values_as_none(self):
+        """Test that records are dicts of field name to value"""
+        records = list(iter_records((FIXTURES / "DP_after_0.xml").open("rb")))
+        assert len(records) == 2
+        assert records[0]["first_name"] == "John"
+        assert records[1]["email"] is None
+
+    def test_is_lazy(self):
+        """Test that records are yielded before the document is fully read"""
+        it = iter_records(io.BytesIO((FIXTURES / "DP_after_0.xml").read_bytes() + b"<<broken"))
+        assert next(it)["donor_id"] == "147"
+
+    def test_error_document_raises(self):
+        """Test that an <error> element surfaces as DonorPerfectError"""
+        with pytest.raises(DonorPerfectError, match="Invalid API key"):
+            list(iter_records((FIXTURES / "error.xml").open("rb")))
+
+    def test_malformed_xml_raises(self):
+        """Test that truncated responses surface as DonorPerfectError"""
+        with pytest.raises(DonorPerfectError):
+            list(iter_records(io.BytesIO(b"<result><record>")))
+
+
+class TestPagination:
+    """Tests for keyset pagination against the stub server"""
+
+    def test_pages_until_short_page(self, stub_server):
+        """Test that all pages are fetched and pagination stops on a short page"""
+        client = DonorPerfectClient("key", base_url=stub_server)
+        donors = list(client.paginate(DONORS, page_size=2))
+        assert [d["donor_id"] for d in donors] == [147, 150, 151]
+        assert len(_ReplayHandler.requests) == 2
+        assert "donor_id > 150" in _ReplayHandler.requests[1]
+
+    def test_records_are_typed_for_target_table(self, stub_server):
+        """Test that donor codes and text are mapped onto DataBridge columns"""
+        client = DonorPerfectClient("key", base_url=stub_server)
+        donors = list(client.paginate(DONORS, page_size=2))
+        assert donors[0]["zip_code"] == "62701"
+        assert donors[0]["donor_type"] == "Individual"
+        assert donors[1]["donor_type"] == "Business"
+        assert donors[2]["donor_type"] == "Other"
+        assert donors[2]["first_name"] == "José"
+
+    def test_gift_batches_are_columnar_and_typed(self, stub_server):
+        """Test that gifts arrive as column batches ready for COPY"""
+        client = DonorPerfectClient("key", base_url=stub_server)
+        batches = list(iter_batches(client, "gifts", page_size=10, batch_size=10))
+        assert len(batches) == 1
+        batch = batches[0]
+        assert batch.table == "donations"
+        assert batch.column_names == GIFTS.target_columns
+        assert batch.columns["amount"] == [Decimal("149.95"), Decimal("1000.00")]
+        assert batch.columns["donation_date"] == [date(2018, 3, 29), date(2023, 12, 31)]
+        assert batch.columns["payment_method"] == ["Credit Card", "STOCK"]
+
+    def test_api_error_raises(self, stub_server):
+        """Test that an error response aborts the sync"""
+        client = DonorPerfectClient("bad", base_url=stub_server)
+        with pytest.raises(DonorPerfectError):
+            list(client.paginate(DONORS))
+
+    def test_http_errors_classified(self, stub_server):
+        """Test that 5xx is retryable and 4xx is a permanent error"""
+        client = DonorPerfectClient("key", base_url=stub_server)
+        _ReplayHandler.status = 503
+        with pytest.raises(RetryableError, match="HTTP 503"):
+            list(client.paginate(DONORS))
+        _ReplayHandler.status = 403
+        with pytest.raises(DonorPerfectError, match="HTTP 403"):
+            list(client.paginate(DONORS))
@@ -0,0 +1,60 @@
+"""
+Tests for SCD Type 2 history SQL generation.
+"""
+import pytest
+
+from src.history import DONORS_HISTORY, HISTORY_SPECS
+from src.row_hash import HashColumn, sql_canonical, sql_row_hash
+
+
+class TestRowHashSql:
+    """Tests for type-aware row hash expressions"""
+
+    def test_null_is_distinct_from_empty_string(self):
+        """Test that NULL is rendered as a marker rather than dropped"""
+        expr = sql_canonical(HashColumn("email", "text"))
+        assert expr == "COALESCE(email::text, '\\N')"
+
+    def test_types_render_canonically(self):
+        """Test that dates, money and booleans have fixed text forms"""
+        assert "to_char(d, 'YYYY-MM-DD')" in sql_canonical(HashColumn("d", "date"))
+        assert "FM999999999990.00" in sql_canonical(HashColumn("m", "money"))
+        assert "THEN 'true' ELSE 'false'" in sql_canonical(HashColumn("b", "bool"))
+
+    def test_hash_uses_separator_and_prefix(self):
+        """Test that columns are joined with a separator before hashing"""
+        expr = sql_row_hash([HashColumn("a", "int"), HashColumn("b", "text")], prefix="NEW.")
+        assert expr.startswith("md5(concat_ws(chr(31), ")
+        assert "NEW.a::text" in expr and "NEW.b::text" in expr
+
+    def test_rejects_unknown_kind_and_bad_identifier(self):
+        """Test that specs cannot inject SQL"""
+        with pytest.raises(ValueError):
+            HashColumn("amount", "float")
+        with pytest.raises(ValueError):
+            HashColumn("x; DROP TABLE donors", "text")
+
+
+class TestHistorySpec:
+    """Tests for the generated SCD statements"""
+
+    def test_tracks_donors_and_campaigns(self):
+        """Test that both dimensions have history specs"""
+        assert set(HISTORY_SPECS) == {"donors", "campaigns"}
+        assert DONORS_HISTORY.history_table == "donors_history"
+
+    def test_diff_compares_only_current_versions(self):
+        """Test that change detection joins current rows by precomputed hash"""
+        sql = DONORS_HISTORY.diff_sql()
+        assert "WHERE valid_to = 'infinity'" in sql
+        assert "s.row_hash IS DISTINCT FROM cur.row_hash" in sql
+
+    def test_close_and_insert_only_touch_changes(self):
+        """Test that DML is driven by the change set, not the whole table"""
+        assert "FROM _scd_changes c" in DONORS_HISTORY.close_sql()
+        assert "JOIN _scd_changes c" in DONORS_HISTORY.insert_sql()
+
+    def test_point_in_time_uses_indexed_range(self):
+        """Test that as-of queries match the GiST period index expression"""
+        assert "tstzrange(valid_from, valid_to) @>" in DONORS_HISTORY.as_of_sql()
+        assert "USING gist (tstzrange(valid_from, valid_to))" in DONORS_HISTORY.ddl()
@@ -0,0 +1,240 @@
+"""
+Tests for the streaming Excel, JSON and XML intake readers.
+"""
+import io
+import json
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src import intake_readers
+from src.intake_readers import (
+    IntakeFormatError,
+    detect_format,
+    flatten_record,
+    iter_json_records,
+    iter_jsonl_records,
+    iter_xlsx_records,
+    iter_xml_records,
+    read_chunks,
+)
+from src.schema_inference import profile_upload
+
+FIXTURES = Path(__file__).parent / "fixtures" / "donorperfect"
+
+_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+
+
+def _xlsx(rows: list[str], shared: list[str]) -> io.BytesIO:
+    """Minimal workbook: one sheet, shared strings and a date style (index 1)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        z.writestr(
+            "xl/workbook.xml",
+            f'<workbook xmlns="{_MAIN}" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets></workbook>',
+        )
+        z.writestr(
+            "xl/_rels/workbook.xml.rels",
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="worksheet" Target="worksheets/sheet1.xml"/></Relationships>',
+        )
+        z.writestr(
+            "xl/sharedStrings.xml",
+            f'<sst xmlns="{_MAIN}">' + "".join(f"<si><t>{s}</t></si>" for s in shared) + "</sst>",
+        )
+        z.writestr(
+            "xl/styles.xml",
+            f'<styleSheet xmlns="{_MAIN}"><numFmts><numFmt numFmtId="164" formatCode="yyyy-mm-dd"/></numFmts>'
+            '<cellXfs><xf numFmtId="0"/><xf numFmtId="164"/></cellXfs></styleSheet>',
+        )
+        z.writestr(
+            "xl/worksheets/sheet1.xml",
+            f'<worksheet xmlns="{_MAIN}"><sheetData>' + "".join(rows) + "</sheetData></worksheet>",
+        )
+    buffer.seek(0)
+    return buffer
+
+
+def _contacts(n: int) -> bytes:
+    contacts = [
+        {
+            "contact_id": f"c-{i}",
+            "email_address": {"address": f"d{i}@example.org", "permission_to_send": "implicit"},
+            "first_name": "Ada",
+            "amount": i * 10.5,
+            "list_memberships": ["news", "events"],
+            "phone_numbers": [{"phone_number": "555-0100", "kind": "home"}],
+        }
+        for i in range(n)
+    ]
+    return json.dumps({"contacts": contacts, "contacts_count": n, "_links": {"next": None}}).encode()
+
+
+class TestDetectFormat:
+    """Tests for choosing a reader from the upload's name"""
+
+    def test_known_extensions(self):
+        """Test that extensions map to readers regardless of case"""
+        assert detect_format("RE_export.XLSX") == "xlsx"
+        assert detect_format("contacts.ndjson") == "jsonl"
+        assert detect_format("dp.xml") == "xml"
+
+    def test_unknown_extension(self):
+        """Test that legacy .xls and other types are rejected with a clear error"""
+        with pytest.raises(IntakeFormatError, match="Unsupported file type"):
+            detect_format("old.xls")
+
+
+class TestFlattenRecord:
+    """Tests for turning nested records into columns"""
+
+    def test_nested_values(self):
+        """Test that dicts become dotted columns, scalar lists are joined and object lists indexed"""
+        record = {
+            "id": 1,
+            "email_address": {"address": "a@x.org", "meta": {"opt_in": True}},
+            "lists": ["news", "events"],
+            "phones": [{"number": "1"}, {"number": "2"}, {"number": "3"}, {"number": "4"}],
+            "empty": [],
+        }
+        assert flatten_record(record) == {
+            "id": 1,
+            "email_address.address": "a@x.org",
+            "email_address.meta.opt_in": True,
+            "lists": "news; events",
+            "phones.0.number": "1",
+            "phones.1.number": "2",
+            "phones.2.number": "3",
+            "empty": None,
+        }
+
+
+class TestJsonReader:
+    """Tests for incremental JSON parsing"""
+
+    def test_records_inside_object(self, monkeypatch):
+        """Test that the records array of a wrapper object is streamed across tiny reads"""
+        monkeypatch.setattr(intake_readers, "_READ_SIZE", 7)  # split tokens and numbers across reads
+        records = list(iter_json_records(io.BytesIO(_contacts(5))))
+        assert [r["contact_id"] for r in records] == [f"c-{i}" for i in range(5)]
+        assert records[4]["amount"] == 42.0
+
+    def test_top_level_array_and_scalars(self):
+        """Test that a bare array is read and scalar items become a value column"""
+        assert list(iter_json_records(io.BytesIO(b' [ {"a": 1}, 2 ] '))) == [{"a": 1}, {"value": 2}]
+        assert list(iter_json_records(io.BytesIO(b"[]"))) == []
+
+    def test_object_without_array_is_one_record(self):
+        """Test that an object with no array value is a single record"""
+        assert list(iter_json_records(io.BytesIO(b'{"a": 1, "b": {"c": 2}}'))) == [{"a": 1, "b": {"c": 2}}]
+
+    def test_reads_incrementally(self, monkeypatch):
+        """Test that the first record is available before the document is read"""
+        monkeypatch.setattr(intake_readers, "_READ_SIZE", 1024)
+        source = io.BytesIO(_contacts(2000))
+        next(iter_json_records(source))
+        assert source.tell() < len(source.getvalue()) // 10
+
+    def test_malformed(self):
+        """Test that truncated JSON raises IntakeFormatError"""
+        with pytest.raises(IntakeFormatError):
+            list(iter_json_records(io.BytesIO(b'[{"a": 1}, {"a": ')))
+
+    def test_json_lines(self):
+        """Test that JSON Lines skip blank lines and report the failing line"""
+        assert list(iter_jsonl_records(io.BytesIO(b'{"a": 1}\n\n{"a": 2}\n'))) == [{"a": 1}, {"a": 2}]
+        with pytest.raises(IntakeFormatError, match="line 2"):
+            list(iter_jsonl_records(io.BytesIO(b'{"a": 1}\n{oops\n')))
+
+
+class TestXmlReader:
+    """Tests for iterparse-based XML reading"""
+
+    def test_donorperfect_fields(self):
+        """Test that DonorPerfect field elements become columns and numbers are typed"""
+        chunk = next(read_chunks(FIXTURES / "DPGIFT_after_0.xml", "xml"))
+        assert list(chunk.columns) == ["gift_id", "donor_id", "amount", "gift_date", "gift_type"]
+        assert chunk["gift_id"].tolist() == [10230, 10231]
+        assert chunk["amount"].tolist() == ["149.95", "1,000"]  # like read_csv, "1,000" stays text
+
+    def test_nested_elements(self):
+        """Test that child text, attributes and nested elements are flattened"""
+        xml = (
+            b'<donors><donor id="7"><name>Ada</name><address type="home"><city>Oslo</city></address>'
+            b"<tag>a</tag><tag>b</tag></donor><donor id=\"8\"><name/></donor></donors>"
+        )
+        assert list(iter_xml_records(io.BytesIO(xml))) == [
+            {"@id": "7", "name": "Ada", "address.@type": "home", "address.city": "Oslo", "tag": "a; b"},
+            {"@id": "8", "name": None},
+        ]
+
+    def test_malformed(self):
+        """Test that broken XML raises IntakeFormatError"""
+        with pytest.raises(IntakeFormatError, match="Malformed XML"):
+            list(iter_xml_records(io.BytesIO(b"<a><b></a>")))
+
+
+class TestXlsxReader:
+    """Tests for row iteration over .xlsx worksheets"""
+
+    def test_cell_types(self):
+        """Test that shared strings, numbers, booleans, dates, inline strings and gaps are read"""
+        book = _xlsx(
+            [
+                '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c><c r="C1" t="s"><v>2</v></c>'
+                '<c r="E1" t="s"><v>3</v></c></row>',
+                '<row r="2"><c r="A2"><v>147</v></c><c r="B2"><v>25.5</v></c><c r="C2" s="1"><v>45292</v></c>'
+                '<c r="D2" t="b"><v>1</v></c><c r="E2" t="inlineStr"><is><t>Ada</t></is></c></row>',
+                '<row r="3"></row>',
+                '<row r="4"><c r="A4"><v>150</v></c><c r="E4" t="e"><v>#N/A</v></c></row>',
+            ],
+            ["donor_id", "amount", "gift_date", "first_name"],
+        )
+        assert list(iter_xlsx_records(book)) == [
+            {"donor_id": 147, "amount": 25.5, "gift_date": datetime(2024, 1, 1), "column_4": True, "first_name": "Ada"},
+            {"donor_id": 150, "amount": None, "gift_date": None, "column_4": None, "first_name": None},
+        ]
+
+    def test_not_a_workbook(self):
+        """Test that a non-zip upload (e.g. legacy .xls) raises IntakeFormatError"""
+        with pytest.raises(IntakeFormatError, match="xlsx"):
+            list(iter_xlsx_records(io.BytesIO(b"\xd0\xcf\x11\xe0 not a zip")))
+
+
+class TestProfileUpload:
+    """Tests for profiling non-CSV uploads in chunks"""
+
+    def test_formats_profile_alike(self):
+        """Test that the same records profile to the same columns from CSV, JSON Lines and XML"""
+        rows = [{"donor_id": i, "amount": i * 2.5, "city": "Oslo"} for i in range(1, 8)]
+        csv = pd.DataFrame(rows).to_csv(index=False).encode()
+        jsonl = "\n".join(json.dumps(r) for r in rows).encode()
+        xml = (
+            "<result>"
+            + "".join(
+                "<record>" + "".join(f'<field name="{k}" value="{v}"/>' for k, v in r.items()) + "</record>"
+                for r in rows
+            )
+            + "</result>"
+        ).encode()
+        schemas = {
+            fmt: list(profile_upload(io.BytesIO(data), fmt, chunksize=3, update_every=0))[-1]
+            for fmt, data in [("csv", csv), ("jsonl", jsonl), ("xml", xml)]
+        }
+        for schema in schemas.values():
+            assert schema["complete"] and schema["shape"] == {"rows": 7, "cols": 3}
+        dtypes = {fmt: [c["dtype"] for c in s["columns"]] for fmt, s in schemas.items()}
+        assert dtypes["jsonl"] == dtypes["csv"] == dtypes["xml"]
+
+    def test_nested_json_columns(self):
+        """Test that nested JSON fields appear as dotted, PII-checked columns"""
+        schema = list(profile_upload(io.BytesIO(_contacts(10)), "json", chunksize=4))[-1]
+        columns = {c["name"]: c for c in schema["columns"]}
+        assert schema["shape"]["rows"] == 10
+        assert columns["email_address.address"]["pii"]
+        assert columns["list_memberships"]["dtype"] in ("object", "str")
+        assert "phone_numbers.0.phone_number" in columns
@@ -0,0 +1,96 @@
+"""
+Tests for the offline DuckDB analytics mode.
+Translation tests run everywhere; engine tests need the duckdb package.
+"""
+import json
+
+import pytest
+
+from src.dashboard_queries import DASHBOARD_QUERIES, DashboardFilters, top_donors_query
+from src.offline import (
+    MANIFEST_NAME,
+    VIEWS_SQL_PATH,
+    OfflineEngine,
+    duckdb_type,
+    snapshot_version,
+    sql_statements,
+    to_duckdb,
+)
+
+
+class TestTranslation:
+    """Tests for psycopg2-to-DuckDB query translation"""
+
+    def test_named_params_and_in_tuples(self):
+        """Test that %(name)s becomes $name and IN tuples become list lookups"""
+        sql, params = to_duckdb(
+            "SELECT 1 FROM donors d WHERE d.donor_type IN %(types)s AND d.donor_id > %(min_id)s",
+            {"types": ("Individual", "Corporate"), "min_id": 5},
+        )
+        assert sql == "SELECT 1 FROM donors d WHERE d.donor_type IN (SELECT unnest($types)) AND d.donor_id > $min_id"
+        assert params == {"types": ["Individual", "Corporate"], "min_id": 5}
+
+    def test_no_params(self):
+        """Test that parameterless queries pass through unchanged"""
+        assert to_duckdb("SELECT 1;", {}) == ("SELECT 1;", None)
+
+    def test_column_types(self):
+        """Test that Postgres types map to DuckDB types"""
+        assert duckdb_type("numeric", 10, 2) == "DECIMAL(10, 2)"
+        assert duckdb_type("numeric") == "DOUBLE"
+        assert duckdb_type("character varying") == "VARCHAR"
+        assert duckdb_type("timestamp with time zone") == "TIMESTAMPTZ"
+
+    def test_views_script_splits_into_statements(self):
+        """Test that every view in views.sql becomes one statement"""
+        statements = sql_statements(VIEWS_SQL_PATH.read_text(encoding="utf-8"))
+        assert len(statements) == 3
+        assert all(s.startswith("CREATE OR REPLACE VIEW") for s in statements)
+
+    def test_snapshot_version_absent(self, tmp_path):
+        """Test that a directory without a manifest has no version"""
+        assert snapshot_version(tmp_path) is None
+
+
+class TestOfflineEngine:
+    """Tests for querying Parquet snapshots (requires duckdb)"""
+
+    @pytest.fixture
+    def snapshot(self, tmp_path):
+        duckdb = pytest.importorskip("duckdb")
+        con = duckdb.connect()
+        tables = {
+            "donors": "SELECT * FROM (VALUES (1, 'Ann', 'Lee', 'a@x.org', 'Individual'), "
+            "(2, 'Bo', 'Kim', 'b@x.org', 'Corporate')) t(donor_id, first_name, last_name, email, donor_type)",
+            "campaigns": "SELECT * FROM (VALUES (1, 'Gala', DATE '2024-01-01', DATE '2024-12-31', 1000, 'Event')) "
+            "t(campaign_id, campaign_name, start_date, end_date, goal_amount, campaign_type)",
+            "donations": "SELECT * FROM (VALUES (1, 1, 1, 100.00::DECIMAL(10, 2), DATE '2024-01-05'), "
+            "(2, 2, 1, 50.00::DECIMAL(10, 2), DATE '2024-02-10'), (3, 1, NULL, 25.00::DECIMAL(10, 2), "
+            "DATE '2024-02-11')) t(donation_id, donor_id, campaign_id, amount, donation_date)",
+            "donor_totals": "SELECT * FROM (VALUES (1, 2, 125.00::DECIMAL(14, 2), DATE '2024-01-05', DATE '2024-02-11'), "
+            "(2, 1, 50.00::DECIMAL(14, 2), DATE '2024-02-10', DATE '2024-02-10')) "
+            "t(donor_id, donation_count, total_given, first_gift_date, last_gift_date)",
+        }
+        manifest = {"tables": {}}
+        for table, select in tables.items():
+            path = tmp_path / f"{table}.parquet"
+            con.execute(f"COPY ({select}) TO '{path}' (FORMAT parquet)")
+            manifest["tables"][table] = {"file": path.name, "rows": 0}
+        (tmp_path / MANIFEST_NAME).write_text(json.dumps(manifest))
+        return tmp_path
+
+    def test_views_match_postgres_definitions(self, snapshot):
+        """Test that the shared view definitions run on the snapshot"""
+        engine = OfflineEngine(snapshot)
+        monthly = engine.query_df("SELECT * FROM vw_monthly_giving")
+        assert monthly["donation_count"].tolist() == [1, 2]
+        campaigns = engine.query_df("SELECT * FROM vw_campaign_performance")
+        assert float(campaigns["total_raised"].iloc[0]) == 150.0
+
+    def test_dashboard_queries_run_with_filters(self, snapshot):
+        """Test that parameterized dashboard queries run unchanged"""
+        engine = OfflineEngine(snapshot)
+        sql, params = DASHBOARD_QUERIES["kpis"]
+        assert float(engine.query_df(sql, params)["total_raised"].iloc[0]) == 175.0
+        page = engine.query_df(*top_donors_query(DashboardFilters(donor_types=("Individual",)), page_size=1))
+        assert page["donor_id"].tolist() == [1]
@@ -0,0 +1,181 @@
+"""
+Tests for the pipeline orchestrator.
+Stages run through a fake runner in a temporary project root.
+"""
+import threading
+import time
+
+import pytest
+
+from src.orchestrator import (
+    BLOCKED,
+    FAILED,
+    SKIPPED,
+    SUCCEEDED,
+    WOULD_RUN,
+    Orchestrator,
+    OrchestratorError,
+    RunHistory,
+    Stage,
+    topological_order,
+)
+
+STAGES = (
+    Stage("generate", "gen.py", inputs=("gen.py",), outputs=("out.csv",)),
+    Stage("setup", "setup.py"),
+    Stage("load", "load.py", inputs=("out.csv",), tables=("donors",), depends_on=("generate", "setup")),
+    Stage("views", "views.py", depends_on=("load",)),
+)
+
+
+class _Runner:
+    """Records scripts run; gen.py writes its output, failing scripts exit 1."""
+
+    def __init__(self, fail=(), delay=0.0):
+        self.fail = set(fail)
+        self.delay = delay
+        self.ran = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, root, script):
+        with self.lock:
+            self.ran.append(script)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        if script == "gen.py":
+            (root / "out.csv").write_text("id\n1\n")
+        with self.lock:
+            self.active -= 1
+        return (1, "boom") if script in self.fail else (0, "ok")
+
+
+@pytest.fixture
+def project(tmp_path):
+    for script in ("gen.py", "setup.py", "load.py", "views.py"):
+        (tmp_path / script).write_text(f"# {script}\n")
+    return tmp_path
+
+
+def _orchestrator(project, runner, watermarks=None):
+    return Orchestrator(
+        STAGES,
+        root=project,
+        history=RunHistory(project / "state" / "history.jsonl"),
+        watermark_reader=lambda tables: dict(watermarks or {}),
+        runner=runner,
+    )
+
+
+def _statuses(outcomes):
+    return {o.stage: o.status for o in outcomes}
+
+
+class TestDag:
+    """Tests for graph validation"""
+
+    def test_orders_dependencies_first(self):
+        """Test that every stage follows its upstream stages"""
+        names = [s.name for s in topological_order(reversed(STAGES))]
+        assert names.index("load") > names.index("generate")
+        assert names[-1] == "views"
+
+    def test_rejects_cycles_and_unknown_stages(self):
+        """Test that invalid graphs fail fast"""
+        with pytest.raises(OrchestratorError):
+            topological_order([Stage("a", "a.py", depends_on=("b",)), Stage("b", "b.py", depends_on=("a",))])
+        with pytest.raises(OrchestratorError):
+            topological_order([Stage("a", "a.py", depends_on=("missing",))])
+
+
+class TestIncrementalRuns:
+    """Tests for fingerprint-based skipping"""
+
+    def test_second_run_skips_everything(self, project):
+        """Test that unchanged inputs skip every stage on rerun"""
+        runner = _Runner()
+        assert set(_statuses(_orchestrator(project, runner).run()).values()) == {SUCCEEDED}
+        assert set(_statuses(_orchestrator(project, runner).run()).values()) == {SKIPPED}
+        assert len(runner.ran) == 4
+
+    def test_changed_file_reruns_stage_and_downstream(self, project):
+        """Test that editing an input reruns that stage and everything after it"""
+        _orchestrator(project, _Runner()).run()
+        (project / "setup.py").write_text("# changed\n")
+        runner = _Runner()
+        statuses = _statuses(_orchestrator(project, runner).run())
+        assert statuses == {"generate": SKIPPED, "setup": SUCCEEDED, "load": SUCCEEDED, "views": SUCCEEDED}
+
+    def test_imported_module_change_reruns(self, project):
+        """Test that editing a project module a script imports reruns that stage"""
+        (project / "pkg").mkdir()
+        (project / "pkg" / "__init__.py").write_text("")
+        (project / "pkg" / "ddl.py").write_text("from pkg.refresh import rebuild\n")
+        (project / "pkg" / "refresh.py").write_text("import json\n")
+        (project / "setup.py").write_text("import sys\nfrom pkg import ddl\n")
+        _orchestrator(project, _Runner()).run()
+        (project / "pkg" / "refresh.py").write_text("import json  # changed\n")
+        statuses = _statuses(_orchestrator(project, _Runner()).run())
+        assert statuses == {"generate": SKIPPED, "setup": SUCCEEDED, "load": SUCCEEDED, "views": SUCCEEDED}
+
+    def test_table_watermark_change_reruns(self, project):
+        """Test that a bumped table watermark invalidates dependent stages"""
+        _orchestrator(project, _Runner(), {"donors": 1}).run()
+        statuses = _statuses(_orchestrator(project, _Runner(), {"donors": 2}).run())
+        assert statuses["load"] == SUCCEEDED and statuses["setup"] == SKIPPED
+
+    def test_own_writes_do_not_rerun(self, project):
+        """Test that watermarks of tables a stage writes are not part of its fingerprint"""
+        stages = (Stage("load", "load.py", tables=("donors", "campaigns"), writes=("donors",)),)
+
+        def run(watermarks):
+            return _statuses(Orchestrator(
+                stages,
+                root=project,
+                history=RunHistory(project / "state" / "history.jsonl"),
+                watermark_reader=lambda tables: {t: watermarks[t] for t in tables},
+                runner=_Runner(),
+            ).run())
+
+        run({"donors": 1, "campaigns": 1})
+        assert run({"donors": 2, "campaigns": 1}) == {"load": SKIPPED}
+        assert run({"donors": 2, "campaigns": 2}) == {"load": SUCCEEDED}
+
+    def test_missing_output_forces_run(self, project):
+        """Test that a deleted output reruns its producer"""
+        _orchestrator(project, _Runner()).run()
+        (project / "out.csv").unlink()
+        assert _statuses(_orchestrator(project, _Runner()).run())["generate"] == SUCCEEDED
+
+    def test_dry_run_does_not_execute(self, project):
+        """Test that a dry run reports a plan without running anything"""
+        runner = _Runner()
+        outcomes = _orchestrator(project, runner).run(dry_run=True)
+        assert set(_statuses(outcomes).values()) == {WOULD_RUN}
+        assert runner.ran == []
+
+
+class TestExecution:
+    """Tests for parallelism and failure handling"""
+
+    def test_independent_stages_run_in_parallel(self, project):
+        """Test that generate and setup overlap"""
+        runner = _Runner(delay=0.1)
+        _orchestrator(project, runner).run()
+        assert runner.max_active == 2
+
+    def test_failure_blocks_downstream_and_is_retried(self, project):
+        """Test that a failed stage blocks dependents and reruns next time"""
+        statuses = _statuses(_orchestrator(project, _Runner(fail={"load.py"})).run())
+        assert statuses["load"] == FAILED and statuses["views"] == BLOCKED
+        runner = _Runner()
+        _orchestrator(project, runner).run()
+        assert runner.ran == ["load.py", "views.py"]
+
+    def test_selected_stage_includes_upstream(self, project):
+        """Test that selecting a stage also runs what it depends on"""
+        runner = _Runner()
+        outcomes = _orchestrator(project, runner).run(selected=["load"])
+        assert {o.stage for o in outcomes} == {"generate", "setup", "load"}
@@ -0,0 +1,97 @@
+"""
+Tests for per-portfolio aggregates.
+The refresh runs against a fake connection that records each statement.
+"""
+from datetime import date
+
+import pytest
+
+from src.portfolio import PORTFOLIO_TABLES, portfolio_donors_query, refresh_portfolio_aggregates
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.fail_on and self.conn.fail_on in sql:
+            raise RuntimeError("boom")
+        self.conn.executed.append((" ".join(sql.split()), params))
+        self.rowcount = 7 if "INSERT INTO portfolio_donor_summary" in sql else 3
+
+    def fetchone(self):
+        return (date(2025, 6, 30), date(2024, 6, 30), date(2023, 6, 30))
+
+
+class _FakeConnection:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestRefreshPortfolioAggregates:
+    """Tests for the aggregate rebuild"""
+
+    def test_rebuilds_both_tables_in_one_transaction(self):
+        """Test that donors are summarized before holders and watermarks are bumped"""
+        conn = _FakeConnection()
+        assert refresh_portfolio_aggregates(conn) == {"donors": 7, "holders": 3}
+        statements = [sql for sql, _ in conn.executed]
+        donors = next(i for i, s in enumerate(statements) if s.startswith("INSERT INTO portfolio_donor_summary"))
+        holders = next(i for i, s in enumerate(statements) if s.startswith("INSERT INTO portfolio_summary"))
+        assert donors < holders
+        bumped = [p[0] for s, p in conn.executed if s.startswith("INSERT INTO load_watermarks")]
+        assert tuple(bumped) == PORTFOLIO_TABLES
+        assert conn.commits == 1
+
+    def test_year_windows_passed_as_parameters(self):
+        """Test that the current and prior year bounds come from the as-of date"""
+        conn = _FakeConnection()
+        refresh_portfolio_aggregates(conn, as_of=date(2025, 6, 30))
+        params = next(p for s, p in conn.executed if s.startswith("INSERT INTO portfolio_donor_summary"))
+        assert params == {
+            "as_of": date(2025, 6, 30),
+            "current_start": date(2024, 6, 30),
+            "prior_start": date(2023, 6, 30),
+        }
+
+    def test_failure_rolls_back(self):
+        """Test that a failed rebuild leaves the previous aggregates in place"""
+        conn = _FakeConnection(fail_on="INSERT INTO portfolio_summary")
+        with pytest.raises(RuntimeError):
+            refresh_portfolio_aggregates(conn)
+        assert conn.rollbacks == 1 and conn.commits == 0
+
+
+class TestPortfolioDonorsQuery:
+    """Tests for the per-holder donor list"""
+
+    def test_reads_one_holder_and_status(self):
+        """Test that the list is an indexed lookup with bound parameters"""
+        sql, params = portfolio_donors_query(4, "lapsing")
+        assert "WHERE s.portfolio_holder_id = %(holder_id)s AND s.status = %(status)s" in sql
+        assert "ORDER BY s.prior_year_total DESC" in sql
+        assert params == {"holder_id": 4, "status": "lapsing", "limit": 50}
+
+    def test_rejects_unknown_status(self):
+        """Test that only known statuses are accepted"""
+        with pytest.raises(ValueError):
+            portfolio_donors_query(4, "vip")
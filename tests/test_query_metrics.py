@@ -0,0 +1,209 @@
+"""
+Tests for query latency instrumentation.
+Metrics are recorded directly; the log export runs against a fake connection.
+"""
+import json
+
+import psycopg2.extensions
+import pytest
+
+from src import query_metrics
+from src.bulk_loader import ColumnBatch, upsert_batch
+from src.query_metrics import (
+    QueryMetrics,
+    _Instrumented,
+    explain_analyze,
+    fingerprint,
+    first_statement,
+    flush_query_log,
+    is_read_only,
+    normalize_sql,
+)
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 2
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def connection(self):
+        return self.conn
+
+    def mogrify(self, template, args):
+        return repr(args).encode()
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(sql)
+        if self.conn.fail or isinstance(sql, str) and sql.startswith(self.conn.fail_on):
+            raise RuntimeError("relation query_log does not exist")
+
+    def copy_expert(self, sql, file, size=8192):
+        self.conn.executed.append(sql)
+
+    def fetchone(self):
+        return ([{"Plan": {}}],)
+
+
+class _InstrumentedFakeCursor(_Instrumented, _FakeCursor):
+    """The InstrumentedCursor wrappers over the fake cursor."""
+
+
+class _FakeConnection:
+    """Collects executed SQL; optionally fails every statement."""
+
+    def __init__(self, fail=False, fail_on=(), autocommit=False):
+        self.fail = fail
+        self.fail_on = tuple(fail_on)
+        self.autocommit = autocommit
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.encoding = "UTF8"
+
+    def cursor(self, cursor_factory=None):
+        return _FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestFingerprint:
+    """Tests for query normalization"""
+
+    def test_literals_and_parameters_share_a_fingerprint(self):
+        """Test that queries differing only in values map to one fingerprint"""
+        a = "SELECT * FROM donors WHERE donor_id = 5 AND state = 'NY' -- note"
+        b = "select *\n  from donors where donor_id = %(id)s and state = %s;"
+        assert fingerprint(a) == fingerprint(b)
+        assert normalize_sql(a) == "select * from donors where donor_id = ? and state = ?"
+
+    def test_batches_use_first_statement(self):
+        """Test that an execute_batch page is fingerprinted by its first statement only"""
+        batch = b";".join(b"INSERT INTO donors (donor_id) VALUES (%d)" % i for i in range(100))
+        assert first_statement(batch) == b"INSERT INTO donors (donor_id) VALUES (0)"
+        assert first_statement("SELECT 1;") == "SELECT 1;"
+        assert fingerprint(first_statement(batch)) == fingerprint("INSERT INTO donors (donor_id) VALUES (%s)")
+
+    def test_in_lists_collapse(self):
+        """Test that IN lists of any length normalize the same way"""
+        assert normalize_sql("WHERE id IN (1, 2, 3)") == normalize_sql("WHERE id IN (4, 5)")
+
+
+class TestQueryMetrics:
+    """Tests for rolling statistics"""
+
+    def test_percentiles_and_cache_ratio(self):
+        """Test p50/p95/p99 over the window and the cache hit ratio"""
+        metrics = QueryMetrics(window=100)
+        for ms in range(1, 101):
+            metrics.record("SELECT 1", float(ms), rows=2)
+        metrics.record("SELECT 1", 0.1, rows=2, cache_hit=True)
+        [stats] = metrics.snapshot()
+        assert (stats["p50_ms"], stats["p95_ms"], stats["p99_ms"]) == (50.0, 95.0, 99.0)
+        assert stats["calls"] == 100 and stats["cache_hits"] == 1
+        assert stats["cache_hit_ratio"] == pytest.approx(1 / 101, abs=1e-3)
+        assert stats["avg_rows"] == 2.0
+
+    def test_window_drops_old_durations(self):
+        """Test that percentiles only reflect the most recent executions"""
+        metrics = QueryMetrics(window=3)
+        for ms in (1000.0, 1.0, 2.0, 3.0):
+            metrics.record("SELECT 1", ms)
+        [stats] = metrics.snapshot()
+        assert stats["p99_ms"] == 3.0
+        assert stats["max_ms"] == 1000.0
+
+    def test_should_explain_only_slow_reads_once_per_cooldown(self):
+        """Test that plans are captured for slow SELECTs and rate-limited"""
+        metrics = QueryMetrics(slow_ms=100, explain_cooldown_s=60)
+        assert not metrics.should_explain("SELECT 1", 50)
+        assert not metrics.should_explain("DELETE FROM donors", 500)
+        assert metrics.should_explain("SELECT 1", 500)
+        assert not metrics.should_explain("SELECT 2", 500)
+        assert metrics.should_explain("WITH x AS (SELECT 1) SELECT * FROM x", 500)
+
+    def test_writing_statements_are_not_read_only(self):
+        """Test that data-modifying CTEs, SELECT INTO and row locks are never re-executed"""
+        assert is_read_only("SELECT updated_at FROM donors WHERE note = 'delete me' -- insert")
+        assert is_read_only(b"WITH x AS (SELECT 1) SELECT * FROM x")
+        assert not is_read_only("WITH gone AS (DELETE FROM donors RETURNING *) SELECT count(*) FROM gone")
+        assert not is_read_only("with x as (update donations set amount = 1 returning 1) select 1")
+        assert not is_read_only("SELECT * INTO donors_copy FROM donors")
+        assert not is_read_only("SELECT * FROM donors FOR UPDATE")
+        assert not is_read_only("SELECT * FROM donors FOR NO KEY UPDATE")
+
+
+class TestExplainAnalyze:
+    """Tests for capturing plans on the caller's connection"""
+
+    def test_failure_rolls_back_to_savepoint(self):
+        """Test that a failed EXPLAIN does not leave the caller's transaction aborted"""
+        conn = _FakeConnection(fail_on=["EXPLAIN"])
+        assert explain_analyze(conn, "SELECT pg_sleep(10)") is None
+        assert conn.executed[0] == "SAVEPOINT query_metrics_explain"
+        assert conn.executed[-1] == "ROLLBACK TO SAVEPOINT query_metrics_explain"
+        assert conn.rollbacks == 0
+
+    def test_success_releases_savepoint(self):
+        """Test that a captured plan releases its savepoint"""
+        conn = _FakeConnection()
+        assert explain_analyze(conn, "SELECT 1") == [{"Plan": {}}]
+        assert conn.executed[-1] == "RELEASE SAVEPOINT query_metrics_explain"
+
+    def test_autocommit_needs_no_savepoint(self):
+        """Test that autocommit connections run the plan alone"""
+        conn = _FakeConnection(autocommit=True)
+        explain_analyze(conn, "SELECT 1")
+        assert [s.split()[0] for s in conn.executed] == ["EXPLAIN"]
+
+
+class TestInstrumentedCursor:
+    """Tests for recording statements as they execute"""
+
+    def test_composed_queries_are_rendered(self, monkeypatch):
+        """Test that upsert_batch's psycopg2.sql queries are recorded as text"""
+        monkeypatch.setattr(psycopg2.extensions, "quote_ident", lambda name, context: f'"{name}"')
+        metrics = QueryMetrics()
+        monkeypatch.setattr(query_metrics, "METRICS", metrics)
+        cursor = _InstrumentedFakeCursor(_FakeConnection())
+        batch = ColumnBatch("donors", {"donor_id": [1, 2], "first_name": ["Ada", "Bo"]})
+        assert upsert_batch(cursor, batch, key=["donor_id"]) == 2
+        queries = {row["query"] for row in metrics.snapshot()}
+        assert len(queries) == 4
+        assert any(
+            q.startswith('insert into "donors" ("donor_id", "first_name") select "donor_id", "first_name" from "_stage_donors"')
+            for q in queries
+        )
+
+
+class TestFlushQueryLog:
+    """Tests for exporting buffered entries"""
+
+    def test_writes_pending_entries(self):
+        """Test that entries are inserted once and the buffer is emptied"""
+        metrics = QueryMetrics()
+        metrics.record("SELECT 1", 5.0, rows=1, source="dashboard", plan=[{"Plan": {}}])
+        metrics.record("SELECT 1", 0.1, rows=1, cache_hit=True, source="dashboard")
+        conn = _FakeConnection()
+        assert flush_query_log(conn, metrics) == 2
+        assert conn.commits == 1 and "INSERT INTO query_log" in conn.executed[-1].decode()
+        assert flush_query_log(conn, metrics) == 0
+
+    def test_failed_flush_keeps_entries(self):
+        """Test that entries are requeued when the insert fails"""
+        metrics = QueryMetrics()
+        metrics.record("SELECT 1", 5.0, plan={"a": 1})
+        with pytest.raises(RuntimeError):
+            flush_query_log(_FakeConnection(fail=True), metrics)
+        [entry] = metrics.drain()
+        assert json.loads(entry[-1]) == {"a": 1}
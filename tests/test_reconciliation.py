@@ -0,0 +1,132 @@
+"""
+Tests for source-versus-database reconciliation.
+The database side is exercised through a fake cursor returning aggregate rows.
+"""
+import hashlib
+from decimal import Decimal
+
+import pandas as pd
+
+from src.reconciliation import RECON_SPECS, SourceProfile, compare, database_profile
+from src.row_hash import HashColumn, frame_row_hashes
+
+DONATIONS = pd.DataFrame({
+    "donation_id": [1, 2, 3, 4],
+    "donor_id": [10, 11, 10, 12],
+    "campaign_id": [1.0, None, 2.0, 1.0],
+    "amount": [100.5, 20.0, 0.125, 50.0],
+    "donation_date": ["2024-01-05", "2024-01-20", "2024-02-01", "2024-03-15"],
+    "payment_method": ["Check", "Cash", "Online", "Check"],
+    "is_recurring": [True, False, False, True],
+})
+
+
+def _profile(*chunks):
+    profile = SourceProfile(RECON_SPECS["donations"])
+    for chunk in chunks:
+        profile.update(chunk)
+    return profile.as_dict()
+
+
+class _FakeCursor:
+    """Returns preset rows for the one aggregate query it is given."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.sql = None
+        self.copied = None
+
+    def execute(self, sql, params=None):
+        self.sql = sql
+
+    def copy_expert(self, sql, file):
+        self.copied = file.read()
+
+    def fetchall(self):
+        return self.rows
+
+
+class TestRowHashPython:
+    """Tests for the Python side of the canonical row hash"""
+
+    def test_matches_canonical_text(self):
+        """Test that types render like the SQL expressions before hashing"""
+        columns = [
+            HashColumn("id", "int"),
+            HashColumn("amount", "money"),
+            HashColumn("on", "date"),
+            HashColumn("flag", "bool"),
+            HashColumn("note", "text"),
+        ]
+        df = pd.DataFrame({"id": [7.0], "amount": [0.125], "on": ["2024-01-05"], "flag": [True], "note": [None]})
+        expected = hashlib.md5("7\x1f0.13\x1f2024-01-05\x1ftrue\x1f\\N".encode()).hexdigest()
+        assert frame_row_hashes(df, columns).iloc[0] == expected
+
+
+class TestSourceProfile:
+    """Tests for streaming source aggregates"""
+
+    def test_totals_months_and_nulls(self):
+        """Test that counts, exact sums and null counts are accumulated"""
+        result = _profile(DONATIONS)
+        assert result["rows"] == 4
+        assert result["amount_sum"] == "170.63"
+        assert result["null_counts"] == {"campaign_id": 1}
+        assert list(result["months"]) == ["2024-01", "2024-02", "2024-03"]
+        assert result["months"]["2024-01"]["rows"] == 2
+
+    def test_chunking_and_order_do_not_change_checksum(self):
+        """Test that the checksum is independent of chunk boundaries and row order"""
+        whole = _profile(DONATIONS)
+        chunked = _profile(DONATIONS.iloc[:3], DONATIONS.iloc[3:])
+        shuffled = _profile(DONATIONS.iloc[::-1])
+        assert whole == chunked == shuffled
+
+    def test_changed_value_changes_checksum(self):
+        """Test that editing a single field is detected"""
+        edited = DONATIONS.copy()
+        edited.loc[1, "payment_method"] = "Card"
+        assert _profile(edited)["checksum"] != _profile(DONATIONS)["checksum"]
+
+
+class TestDatabaseSide:
+    """Tests for the consolidated aggregate query and comparison"""
+
+    def test_one_query_with_grouping_sets(self):
+        """Test that totals and months come from a single grouped query"""
+        sql = RECON_SPECS["donations"].aggregate_sql()
+        assert "GROUP BY GROUPING SETS ((), (to_char(donation_date, 'YYYY-MM')))" in sql
+        assert "COUNT(*) FILTER (WHERE campaign_id IS NULL)" in sql
+        assert "GROUP BY" not in RECON_SPECS["donors"].aggregate_sql()
+
+    def test_matching_database_passes_and_drift_is_reported(self):
+        """Test that identical aggregates pass and a missing row is a mismatch"""
+        source = _profile(DONATIONS)
+        def as_int(month):
+            return int(source["months"][month]["checksum"], 16)
+
+        rows = [
+            (True, None, 4, Decimal("170.63"), int(source["checksum"], 16), 1),
+            (False, "2024-01", 2, Decimal("120.50"), as_int("2024-01"), 1),
+            (False, "2024-02", 1, Decimal("0.13"), as_int("2024-02"), 0),
+            (False, "2024-03", 1, Decimal("50.00"), as_int("2024-03"), 0),
+        ]
+        database = database_profile(_FakeCursor(rows), RECON_SPECS["donations"])
+        assert compare(source, database) == []
+
+        database = database_profile(_FakeCursor(rows[:3]), RECON_SPECS["donations"])
+        mismatches = compare(source, database)
+        assert len(mismatches) == 1
+        assert mismatches[0].startswith("month 2024-03:")
+
+    def test_only_source_keys_are_reconciled(self):
+        """Test that the database side is restricted to the keys in the source file"""
+        profile = SourceProfile(RECON_SPECS["donations"])
+        profile.update(DONATIONS.iloc[:3])
+        profile.update(DONATIONS.iloc[3:])
+        assert list(profile.keys()) == [1, 2, 3, 4]
+        cursor = _FakeCursor([(True, None, 0, Decimal("0"), 0, 0)])
+        database_profile(cursor, RECON_SPECS["donations"], profile.keys())
+        assert cursor.copied == "1\n2\n3\n4\n"
+        assert "WHERE donation_id IN (SELECT key FROM _recon_keys)" in cursor.sql
+        assert "WHERE" not in RECON_SPECS["donors"].aggregate_sql()
@@ -0,0 +1,54 @@
+"""
+Tests for the persistent LLM response cache.
+"""
+from src.response_cache import ResponseCache, fingerprint
+
+
+class TestFingerprint:
+    """Tests for canonical cache keys"""
+
+    def test_key_order_does_not_matter(self):
+        """Test that equal payloads hash the same regardless of dict order"""
+        assert fingerprint({"a": 1, "b": [1, 2]}) == fingerprint({"b": [1, 2], "a": 1})
+        assert fingerprint({"a": 1}) != fingerprint({"a": 2})
+
+
+class TestResponseCache:
+    """Tests for hits, misses, persistence and LRU eviction"""
+
+    def test_hit_and_miss_counted(self, tmp_path):
+        """Test that lookups return stored text and update the counters"""
+        cache = ResponseCache(tmp_path / "cache" / "responses.sqlite3")
+        assert cache.get("k") is None
+        cache.put("k", "explained")
+        assert cache.get("k") == "explained"
+        assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": 9}
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test that another process (instance) sees stored responses and counters"""
+        path = tmp_path / "responses.sqlite3"
+        ResponseCache(path).put("k", "v")
+        other = ResponseCache(path)
+        assert other.get("k") == "v"
+        assert other.stats()["hits"] == 1
+
+    def test_least_recently_used_evicted(self, tmp_path):
+        """Test that writes beyond the size cap drop the least recently read entries"""
+        cache = ResponseCache(tmp_path / "responses.sqlite3", max_bytes=30)
+        cache.put("a", "x" * 10)
+        cache.put("b", "x" * 10)
+        cache.put("c", "x" * 10)
+        assert cache.get("a") is not None  # a is now the most recently used
+        cache.put("d", "x" * 10)
+        assert cache.get("b") is None
+        assert [cache.get(k) is not None for k in "acd"] == [True, True, True]
+        assert cache.stats()["bytes"] == 30
+
+    def test_unwritable_path_is_a_miss(self, tmp_path):
+        """Test that a cache that cannot be opened behaves as always empty"""
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        cache = ResponseCache(blocker / "responses.sqlite3")
+        cache.put("k", "v")
+        assert cache.get("k") is None
+        assert cache.stats()["entries"] == 0
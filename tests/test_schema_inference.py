@@ -0,0 +1,177 @@
+"""
+Tests for schema inference and the streaming CSV profiler.
+"""
+import io
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from src.schema_inference import (
+    PII_BY_NAME,
+    SchemaProfiler,
+    detect_pii,
+    detect_pii_values,
+    format_schema_for_prompt,
+    infer_schema,
+    merge_dtypes,
+    profile_csv,
+    redact_sample,
+)
+
+
+def _csv(rows: int) -> str:
+    lines = ["donor_id,amount,gift_type,note,email"]
+    for i in range(rows):
+        amount = "" if i == rows - 1 else str(i)  # integer column gains a NaN at the very end
+        note = "late" if i >= rows - 3 else ""  # all-null until the last chunk
+        lines.append(f"{i},{amount},{'cash' if i % 2 else 'check'},{note},d{i}@example.org")
+    return "\n".join(lines) + "\n"
+
+
+class TestInferSchema:
+    """Tests for the in-memory summary"""
+
+    def test_pii_columns_redacted(self):
+        """Test that PII-like string and integer values are redacted in the sample"""
+        df = pd.DataFrame({"email": ["a@x.org"], "donor_id": [7], "amount": [10.5]})
+        schema = infer_schema(df)
+        assert schema["sample"] == [{"email": "[REDACTED]", "donor_id": "[REDACTED]", "amount": 10.5}]
+        assert schema["shape"] == {"rows": 1, "cols": 3}
+
+
+class TestPiiDetection:
+    """Tests for value-based PII detection and redaction"""
+
+    def test_value_patterns(self):
+        """Test that each value pattern is recognized inside free text"""
+        assert detect_pii_values(pd.Series(["write to ann@example.org"])) == {"email"}
+        assert detect_pii_values(pd.Series(["call (555) 123-4567", None])) == {"phone"}
+        assert detect_pii_values(pd.Series(["ssn 123-45-6789"])) == {"ssn"}
+        assert detect_pii_values(pd.Series(["4111 1111 1111 1111"])) == {"card"}
+
+    def test_ordinary_values_not_flagged(self):
+        """Test that dates, amounts, long ids and numeric columns are left alone"""
+        assert detect_pii_values(pd.Series(["2024-01-05", "1,234.56", "1700000000000"])) == frozenset()
+        assert detect_pii_values(pd.Series([5551234567])) == frozenset()
+
+    def test_unlabelled_column_caught_by_value(self):
+        """Test that a column with an innocent name but email values is redacted"""
+        df = pd.DataFrame({"contact": ["a@x.org", None], "notes": ["ssn 123-45-6789 on file", "hello"]})
+        schema = infer_schema(df)
+        assert [c["pii"] for c in schema["columns"]] == [["email"], ["ssn"]]
+        assert schema["sample"] == [
+            {"contact": "[REDACTED]", "notes": "ssn [REDACTED] on file"},
+            {"contact": None, "notes": "hello"},
+        ]
+
+    def test_flagged_columns_not_rescanned(self):
+        """Test that earlier results are reused instead of scanning the column again"""
+        known = {"notes": frozenset({"email"})}
+        assert detect_pii(pd.DataFrame({"notes": ["nothing here"]}), known) == known
+        assert detect_pii(pd.DataFrame({"phone_number": ["n/a"]}))["phone_number"] == {PII_BY_NAME}
+
+    def test_name_flagged_floats_kept(self):
+        """Test that name-based redaction covers strings and integers, as before"""
+        df = pd.DataFrame({"donor_id": [7], "zip_score": [0.5], "amount": [1.0]})
+        rows = redact_sample(df, detect_pii(df))
+        assert rows == [{"donor_id": "[REDACTED]", "zip_score": 0.5, "amount": 1.0}]
+
+
+class TestMergeDtypes:
+    """Tests for combining per-chunk dtypes"""
+
+    def test_numeric_widening(self):
+        """Test that int and float chunks merge to float"""
+        assert merge_dtypes(np.dtype("int64"), np.dtype("float64")) == np.dtype("float64")
+
+    def test_mixed_kinds_become_object(self):
+        """Test that numbers mixed with strings or bools merge to object"""
+        assert merge_dtypes(np.dtype("int64"), np.dtype(object)) == np.dtype(object)
+        assert merge_dtypes(np.dtype("bool"), np.dtype("int64")) == np.dtype(object)
+
+    def test_unknown_side_is_ignored(self):
+        """Test that None (no values seen yet) takes the other dtype"""
+        assert merge_dtypes(None, np.dtype("int64")) == np.dtype("int64")
+        assert merge_dtypes(np.dtype("int64"), None) == np.dtype("int64")
+
+
+class TestSchemaProfiler:
+    """Tests for chunked profiling"""
+
+    def test_matches_whole_file_read(self):
+        """Test that chunked counts and dtypes equal a single pd.read_csv"""
+        text = _csv(1000)
+        whole = infer_schema(pd.read_csv(io.StringIO(text)))
+        streamed = list(profile_csv(io.StringIO(text), chunksize=64, update_every=0))[-1]
+        assert streamed["complete"] is True
+        assert streamed["shape"] == whole["shape"]
+        assert streamed["columns"] == whole["columns"]
+
+    def test_reservoir_sample_in_file_order(self):
+        """Test that the sample has the requested size, is sorted by row and redacts PII"""
+        profiler = SchemaProfiler(sample_rows=5, seed=1)
+        for chunk in pd.read_csv(io.StringIO(_csv(500)), chunksize=50):
+            profiler.update(chunk)
+        sample = profiler.schema()["sample"]
+        assert len(sample) == 5
+        amounts = [row["amount"] for row in sample]
+        assert amounts == sorted(amounts)
+        assert {row["email"] for row in sample} == {"[REDACTED]"}
+
+    def test_pii_found_in_early_chunk_is_kept(self):
+        """Test that a column flagged in one chunk stays flagged and redacted later"""
+        profiler = SchemaProfiler(sample_rows=4, seed=0)
+        profiler.update(pd.DataFrame({"contact": ["a@x.org", "b@x.org"]}))
+        profiler.update(pd.DataFrame({"contact": ["Dear friend, a@x.org", "c@x.org"]}))
+        schema = profiler.schema()
+        assert schema["columns"][0]["pii"] == ["email"]
+        assert "a@x.org" not in str(schema["sample"])
+
+    def test_reservoir_is_uniform(self):
+        """Test that every row is about equally likely to be sampled"""
+        frame = pd.DataFrame({"n": np.arange(10)})
+        hits: Counter = Counter()
+        for seed in range(200):
+            profiler = SchemaProfiler(sample_rows=3, seed=seed)
+            for start in range(0, 10, 4):
+                profiler.update(frame.iloc[start:start + 4])
+            hits.update(row["n"] for row in profiler.schema()["sample"])
+        # Expected 60 hits per row (200 runs * 3 / 10 rows).
+        assert len(hits) == 10
+        assert min(hits.values()) > 30
+        assert max(hits.values()) < 95
+
+    def test_first_result_before_file_is_read(self):
+        """Test that a partial summary is yielded after the first chunk"""
+        results = profile_csv(io.StringIO(_csv(1000)), chunksize=100, update_every=60)
+        first = next(results)
+        assert first["complete"] is False
+        assert first["shape"]["rows"] == 100
+        rest = list(results)
+        assert len(rest) == 1
+        assert rest[0]["shape"]["rows"] == 1000
+
+
+class TestFormatSchemaForPrompt:
+    """Tests for the LLM prompt text"""
+
+    def test_column_profiles_included(self):
+        """Test that each column gets a one-line profile and PII values stay out"""
+        df = pd.DataFrame({
+            "gift_type": ["cash", "check", "cash", "cash"],
+            "amount": [10.0, 20.0, 30.0, 40.0],
+            "email": ["a@x.org", "b@x.org", "a@x.org", "c@x.org"],
+        })
+        text = format_schema_for_prompt(infer_schema(df))
+        assert "~2 distinct; range 'cash'..'check'; top: 'cash' 75%; formats: aaaa 75%, aaaaa 25%" in text
+        assert "range 10..40; median 25" in text
+        assert "a@x.org" not in text
+        assert "formats: a@a.aaa 100%" in text
+
+    def test_partial_schema_flagged(self):
+        """Test that row counts from an unfinished read are marked as lower bounds"""
+        schema = {"columns": [], "shape": {"rows": 100, "cols": 0}, "sample": [], "complete": False}
+        assert "Rows: 100+ (still reading)" in format_schema_for_prompt(schema)
+        schema["complete"] = True
+        assert "Rows: 100," in format_schema_for_prompt(schema)
@@ -0,0 +1,133 @@
+"""
+Tests for the mergeable column sketches used to profile uploads.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.sketches import ColumnSketch, HyperLogLog, QuantileSketch, TopK, hash_values, value_patterns
+
+
+def _chunks(series: pd.Series, size: int) -> list[pd.Series]:
+    return [series.iloc[i:i + size] for i in range(0, len(series), size)]
+
+
+class TestHyperLogLog:
+    """Tests for approximate distinct counts"""
+
+    @pytest.mark.parametrize("n", [10, 5_000, 200_000])
+    def test_estimate_within_error(self, n):
+        """Test that the estimate is within a few percent across cardinalities"""
+        values = pd.Series(np.arange(n) * 7)
+        hll = HyperLogLog()
+        hll.update(hash_values(pd.concat([values, values])))
+        assert abs(hll.count() - n) <= max(2, 0.05 * n)
+
+    def test_merge_equals_single_pass(self):
+        """Test that merging per-chunk sketches gives the same registers as one sketch"""
+        values = pd.Series(np.random.default_rng(0).integers(0, 10_000, 50_000))
+        whole, merged = HyperLogLog(), HyperLogLog()
+        whole.update(hash_values(values))
+        for chunk in _chunks(values, 7_000):
+            part = HyperLogLog()
+            part.update(hash_values(chunk))
+            merged.merge(part)
+        assert np.array_equal(whole.registers, merged.registers)
+
+    def test_numbers_hash_by_value(self):
+        """Test that 1 and 1.0 count once (an int chunk followed by a float chunk)"""
+        hll = HyperLogLog()
+        hll.update(hash_values(pd.Series([1, 2])))
+        hll.update(hash_values(pd.Series([1.0, 2.0, None])))
+        assert hll.count() == 2
+
+
+class TestQuantileSketch:
+    """Tests for the t-digest-style quantile sketch"""
+
+    def test_quantiles_close_to_exact(self):
+        """Test that chunked updates track exact quantiles of a skewed distribution"""
+        values = np.random.default_rng(1).lognormal(3, 1, 200_000)
+        sketch = QuantileSketch()
+        for chunk in np.array_split(values, 13):
+            sketch.update(chunk)
+        for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+            assert sketch.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.02)
+        assert sketch.min == values.min() and sketch.max == values.max()
+        assert len(sketch.means) <= sketch.compression + 1
+
+    def test_merge(self):
+        """Test that merged sketches keep the combined count, range and median"""
+        a, b = QuantileSketch(), QuantileSketch()
+        a.update(np.arange(0, 1000))
+        b.update(np.arange(1000, 2000))
+        a.merge(b)
+        assert a.count == 2000
+        assert (a.min, a.max) == (0, 1999)
+        assert a.quantile(0.5) == pytest.approx(1000, rel=0.01)
+
+    def test_empty(self):
+        """Test that an empty sketch has no quantiles and ignores NaN"""
+        sketch = QuantileSketch()
+        sketch.update(np.array([np.nan]))
+        assert sketch.quantile(0.5) is None
+
+
+class TestTopK:
+    """Tests for frequent values"""
+
+    def test_heavy_hitters_survive_trimming(self):
+        """Test that frequent values are reported with an error bound after trimming"""
+        values = pd.Series(np.random.default_rng(2).zipf(1.5, 100_000))
+        top = TopK(k=3, capacity=20)
+        for chunk in _chunks(values, 10_000):
+            top.update(chunk)
+        exact = values.value_counts()
+        assert [v for v, _ in top.top()] == exact.index[:3].tolist()
+        for value, count in top.top():
+            assert count <= exact[value] <= count + top.error
+
+
+class TestColumnSketch:
+    """Tests for the per-column profile"""
+
+    def test_text_profile(self):
+        """Test that text columns report range, top values and value shapes"""
+        sketch = ColumnSketch()
+        sketch.update(pd.Series(["2024-01-05", "2024-02-01", None]))
+        sketch.update(pd.Series(["2023-12-31", "2024-01-05"]))
+        summary = sketch.summary()
+        assert summary["distinct"] == 3
+        assert (summary["min"], summary["max"]) == ("2023-12-31", "2024-02-01")
+        assert summary["top"][0] == ("2024-01-05", 2)
+        assert summary["patterns"] == [("9999-99-99", 4)]
+
+    def test_numeric_profile(self):
+        """Test that numeric columns report range and quantiles"""
+        sketch = ColumnSketch()
+        sketch.update(pd.Series([10, 20, 30, 40, 50]))
+        summary = sketch.summary()
+        assert (summary["min"], summary["max"]) == (10.0, 50.0)
+        assert summary["quantiles"]["p50"] == 30.0
+
+    def test_pii_summary_has_no_values(self):
+        """Test that PII columns report only counts and shapes"""
+        sketch = ColumnSketch()
+        sketch.update(pd.Series(["ann@example.org", "bo@example.org"]))
+        assert set(sketch.summary(pii=True)) == {"distinct", "patterns"}
+
+    def test_merge_matches_single_sketch(self):
+        """Test that merging chunk sketches matches one sketch over all rows"""
+        values = pd.Series([f"A-{i % 37:03d}" for i in range(5_000)])
+        whole, merged = ColumnSketch(), ColumnSketch()
+        whole.update(values)
+        for chunk in _chunks(values, 999):
+            part = ColumnSketch()
+            part.update(chunk)
+            merged.merge(part)
+        assert merged.summary() == whole.summary()
+
+    def test_value_patterns(self):
+        """Test the character-class shapes"""
+        shapes = value_patterns(pd.Series(["Ab-12", "zip 02139"]))
+        assert shapes.tolist() == ["Aa-99", "aaa 99999"]
@@ -0,0 +1,201 @@
+"""
+Tests for giving time series: rollup refresh, grain choice, rollup queries and LTTB.
+The refresh runs against a fake connection; the SQL itself runs on DuckDB when installed.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dashboard_queries import DashboardFilters
+from src.offline import to_duckdb
+from src.timeseries import (
+    GIVING_ROLLUPS_DDL,
+    ROLLUP_TABLES,
+    _REFRESH_COARSE_SQL,
+    _REFRESH_DAY_SQL,
+    bucket_start,
+    choose_grain,
+    downsample,
+    lttb,
+    refresh_giving_rollups,
+    timeseries_query,
+)
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.fail_on and self.conn.fail_on in sql:
+            raise RuntimeError("boom")
+        self.conn.executed.append((" ".join(sql.split()), params))
+        self.rowcount = 30 if "SELECT 'day'" in sql else 5
+
+
+class _FakeConnection:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestRefreshGivingRollups:
+    """Tests for the rollup rebuild"""
+
+    def test_day_rows_built_before_coarser_grains(self):
+        """Test that week and month rows are summed from the day rows in one transaction"""
+        conn = _FakeConnection()
+        assert refresh_giving_rollups(conn) == {"day": 30, "week": 5, "month": 5}
+        grains = [p["grain"] for s, p in conn.executed if p and "grain" in p]
+        assert grains == ["week", "month"]
+        bumped = [p[0] for s, p in conn.executed if s.startswith("INSERT INTO load_watermarks")]
+        assert tuple(bumped) == ROLLUP_TABLES
+        assert conn.commits == 1
+
+    def test_failure_rolls_back(self):
+        """Test that a failed rebuild leaves the previous rollups in place"""
+        conn = _FakeConnection(fail_on="WHERE grain = 'day'")
+        with pytest.raises(RuntimeError):
+            refresh_giving_rollups(conn)
+        assert conn.rollbacks == 1
+        assert conn.commits == 0
+
+
+class TestGrain:
+    """Tests for bucket boundaries and automatic grain choice"""
+
+    def test_bucket_start(self):
+        """Test that weeks start on Monday and months on the 1st"""
+        wednesday = date(2025, 3, 12)
+        assert bucket_start(wednesday, "day") == wednesday
+        assert bucket_start(wednesday, "week") == date(2025, 3, 10)
+        assert bucket_start(wednesday, "month") == date(2025, 3, 1)
+        with pytest.raises(ValueError):
+            bucket_start(wednesday, "year")
+
+    def test_choose_grain_by_range(self):
+        """Test that the finest grain under the bucket cap is chosen"""
+        start = date(2015, 1, 1)
+        assert choose_grain(start, start + timedelta(days=364)) == "day"
+        assert choose_grain(start, start + timedelta(days=5 * 365)) == "week"
+        assert choose_grain(start, start + timedelta(days=30 * 365)) == "month"
+        assert choose_grain(start, start + timedelta(days=364), max_buckets=100) == "week"
+
+
+class TestTimeseriesQuery:
+    """Tests for reading the rollups"""
+
+    def test_unfiltered_reads_matching_grain(self):
+        """Test that an open range reads the coarse rollup directly"""
+        sql, params = timeseries_query(DashboardFilters(), "month")
+        assert params == {"source_grain": "month"}
+        assert "FROM giving_rollups" in sql
+        assert "DATE_TRUNC" not in sql
+
+    def test_partial_buckets_rebucket_day_rows(self):
+        """Test that a range cutting through a month is summed from day rows"""
+        filters = DashboardFilters(start_date=date(2025, 1, 15), end_date=date(2025, 3, 31))
+        sql, params = timeseries_query(filters, "month")
+        assert params["source_grain"] == "day"
+        assert "DATE_TRUNC('month', bucket)" in sql
+
+    def test_aligned_range_reads_matching_grain(self):
+        """Test that whole-month ranges still use the month rollup"""
+        filters = DashboardFilters(start_date=date(2025, 1, 1), end_date=date(2025, 2, 28), donor_types=("Individual",))
+        sql, params = timeseries_query(filters, "month")
+        assert params["source_grain"] == "month"
+        assert params["donor_types"] == ("Individual",)
+        assert "donor_type IN %(donor_types)s" in sql
+
+    def test_portfolio_filter_uses_donations(self):
+        """Test that portfolio filters fall back to the donations table"""
+        sql, params = timeseries_query(DashboardFilters(portfolio_holder_ids=(3,)), "week")
+        assert "giving_rollups" not in sql
+        assert params["portfolio_holder_ids"] == (3,)
+
+    def test_unknown_grain(self):
+        """Test that grains outside GRAINS are rejected before reaching SQL"""
+        with pytest.raises(ValueError):
+            timeseries_query(DashboardFilters(), "hour")
+
+    def test_rollups_match_donations_on_duckdb(self):
+        """Test that refresh and query SQL give the same totals as the raw donations"""
+        duckdb = pytest.importorskip("duckdb")
+        con = duckdb.connect()
+        con.execute("CREATE TABLE donors AS SELECT * FROM (VALUES (1, 'Individual'), (2, 'Corporate')) t(donor_id, donor_type)")
+        con.execute("CREATE TABLE campaigns AS SELECT * FROM (VALUES (1, 'Event')) t(campaign_id, campaign_type)")
+        con.execute(
+            "CREATE TABLE donations AS SELECT i AS donation_id, 1 + i % 2 AS donor_id, "
+            "CASE WHEN i % 3 = 0 THEN NULL ELSE 1 END AS campaign_id, (10 + i)::DECIMAL(10, 2) AS amount, "
+            "DATE '2024-01-01' + i::INTEGER AS donation_date FROM range(400) r(i)"
+        )
+        con.execute(GIVING_ROLLUPS_DDL)
+        con.execute(_REFRESH_DAY_SQL)
+        for grain in ("week", "month"):
+            con.execute(*to_duckdb(_REFRESH_COARSE_SQL, {"grain": grain}))
+
+        filters = DashboardFilters(start_date=date(2024, 2, 10), end_date=date(2024, 6, 30), donor_types=("Individual",))
+        got = con.execute(*to_duckdb(*timeseries_query(filters, "month"))).df()
+        expected = con.execute(
+            "SELECT DATE_TRUNC('month', donation_date)::date AS bucket, SUM(amount) AS total FROM donations "
+            "WHERE donor_id = 1 AND donation_date BETWEEN DATE '2024-02-10' AND DATE '2024-06-30' GROUP BY 1 ORDER BY 1"
+        ).df()
+        assert got["total_amount"].astype(float).tolist() == expected["total"].astype(float).tolist()
+        monthly = con.execute(*to_duckdb(*timeseries_query(DashboardFilters(), "month"))).df()
+        assert float(monthly["total_amount"].sum()) == float(sum(10 + i for i in range(400)))
+
+
+class TestLttb:
+    """Tests for largest-triangle-three-buckets downsampling"""
+
+    def test_keeps_endpoints_and_point_count(self):
+        """Test that the first and last points are kept and the output is capped"""
+        x = np.arange(1000)
+        y = np.sin(x / 50)
+        kept = lttb(x, y, 100)
+        assert len(kept) == 100
+        assert kept[0] == 0 and kept[-1] == 999
+        assert np.all(np.diff(kept) > 0)
+
+    def test_keeps_spikes(self):
+        """Test that an isolated peak survives downsampling"""
+        y = np.zeros(1000)
+        y[437] = 100.0
+        assert 437 in lttb(np.arange(1000), y, 50)
+
+    def test_small_inputs_unchanged(self):
+        """Test that series at or under the threshold are returned whole"""
+        assert lttb(np.arange(10), np.arange(10), 20).tolist() == list(range(10))
+
+    def test_downsample_frame(self):
+        """Test that a date-bucketed frame is capped and keeps its columns"""
+        series = pd.DataFrame({
+            "bucket": pd.date_range("2015-01-01", periods=3000, freq="D").date,
+            "donation_count": 1,
+            "total_amount": np.random.default_rng(0).random(3000),
+        })
+        points = downsample(series, max_points=200)
+        assert len(points) == 200
+        assert list(points.columns) == ["bucket", "donation_count", "total_amount"]
+        assert points["bucket"].iloc[-1] == series["bucket"].iloc[-1]
+        assert len(downsample(series.head(50), max_points=200)) == 50